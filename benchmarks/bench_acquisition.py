@@ -0,0 +1,44 @@
+"""
+Benchmark for acquiring traces from the local OSA server simulator, so no network access is needed.
+Times a TRACE request and its decoding, and a full acquisition of a trace with its x limits
+through AsyncOsaClient, for traces of 1k to 1M points.
+
+Run from the project root with: python -m benchmarks.bench_acquisition
+"""
+import timeit
+
+from osa.services.async_client import AsyncOsaClient, EventLoopThread
+from osa.services.limits_cache import LimitsCache
+from osa.services.osa_session import OsaSession
+from osa.services.server_requests import get_trace, get_x_lims
+from osa.simulator.server import OsaSimulator
+from osa.simulator.spectrum import SpectrumGenerator
+
+TRACE_SIZES = (1_000, 10_000, 100_000, 1_000_000)
+
+
+def measure(fn, repeat: int = 5) -> float:
+    """ :return: Best time in milliseconds """
+    fn()
+    return min(timeit.repeat(fn, repeat=repeat, number=1)) * 1000
+
+
+def run():
+    loop_thread = EventLoopThread()
+    print(f"{'points':>10}{'TRACE':>12}{'acquire':>12}")
+    for points in TRACE_SIZES:
+        with OsaSimulator(SpectrumGenerator(points=points, seed=0), port=0) as simulator:
+            session = OsaSession(api_url=simulator.url, timeouts={'TRACE': 30})
+            client = AsyncOsaClient(session)
+            # Limits are requested with every acquisition
+            x_lims_cache = LimitsCache(lambda: get_x_lims(session), ttl=0)
+            trace = measure(lambda: get_trace(session))
+            acquire = measure(lambda: loop_thread.run(client.acquire(x_lims_cache, deadline=None)))
+            client.close()
+            session.close()
+        print(f"{points:>10}{trace:>9.2f} ms{acquire:>9.2f} ms")
+    loop_thread.stop()
+
+
+if __name__ == '__main__':
+    run()
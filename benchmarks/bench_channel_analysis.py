@@ -0,0 +1,43 @@
+"""
+Benchmark for channel analysis of DWDM spectra.
+Times analyze_channels on synthetic spectra of 40 and 80 channels on a noisy floor.
+
+Run from the project root with: python -m benchmarks.bench_channel_analysis
+"""
+import timeit
+
+import numpy as np
+
+from osa.analysis.channel_analysis import analyze_channels
+from osa.services.server_requests import TraceData
+from osa.utils.unit_conversions import mw_to_dbm
+
+TRACE_LENGTHS = (10000, 100000, 1000000)
+CHANNEL_COUNTS = (40, 80)
+
+
+def create_spectrum(length: int, channels: int) -> TraceData:
+    """ Gaussian channels on the 50 GHz grid from 1527 nm, over a -60 dBm noise floor with 5 % ripple """
+    x_start, x_stop = 1525.0, 1527.0 + 0.4 * channels + 2
+    x = np.linspace(x_start, x_stop, length)
+    power_mw = np.full(length, 1e-6)
+    for centre in 1527 + 0.4 * np.arange(channels):
+        power_mw += 0.1 * np.exp(-0.5 * ((x - centre) / 0.02) ** 2)
+    power_mw *= 1 + 0.05 * np.random.default_rng(0).standard_normal(length)
+    return TraceData(data=mw_to_dbm(power_mw), time='', instrument='', x_label='Wavelength',
+                     y_label='dBm', x_units='nm', x_increment=x[1] - x[0], x_start=x_start,
+                     resolution_bandwidth_nm=0.1)
+
+
+def run(number: int = 20):
+    print(f"{'points':>10}{'channels':>10}{'found':>8}{'time':>12}")
+    for length in TRACE_LENGTHS:
+        for channels in CHANNEL_COUNTS:
+            trace_data = create_spectrum(length, channels)
+            found = len(analyze_channels(trace_data))
+            seconds = min(timeit.repeat(lambda: analyze_channels(trace_data), number=number, repeat=5))
+            print(f"{length:>10}{channels:>10}{found:>8}{seconds / number * 1e3:>9.2f} ms")
+
+
+if __name__ == '__main__':
+    run()
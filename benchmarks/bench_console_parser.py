@@ -0,0 +1,31 @@
+"""
+Benchmark for parsing OSA console replies.
+Compares parse_reply against the previous eval-based parsing.
+
+Run from the project root with: python -m benchmarks.bench_console_parser
+"""
+import timeit
+
+from osa.services.console_parser import parse_reply
+
+REPLIES = {
+    'LIM': "+READY>[1515, 1580]",
+    'LIM (floats)': "+READY>[1515.0000000000002, 1.58e+3]",
+}
+
+
+def parse_with_eval(reply: str) -> list:
+    """ Previous parsing of LIM replies """
+    return eval(reply.replace('+READY>', '', 1))
+
+
+def run(number: int = 20000):
+    print(f"{'reply':<16}{'eval':>12}{'parse_reply':>16}")
+    for name, reply in REPLIES.items():
+        eval_time = min(timeit.repeat(lambda: parse_with_eval(reply), number=number, repeat=5))
+        parse_time = min(timeit.repeat(lambda: parse_reply(reply, 'LIM'), number=number, repeat=5))
+        print(f"{name:<16}{eval_time / number * 1e6:>9.2f} us{parse_time / number * 1e6:>13.2f} us")
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,74 @@
+"""
+Benchmark of saving the plot: time the GUI thread is blocked exporting a PNG synchronously with
+pyqtgraph, against taking a snapshot and queueing it, and time the export thread takes per format.
+
+Run from the project root with: python -m benchmarks.bench_export
+"""
+import os
+import shutil
+import tempfile
+import timeit
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+import numpy as np
+from PyQt5 import QtWidgets
+
+from osa.export.plot_exporter import FORMATS, PlotExporter, reserve_file_stem
+from osa.gui.plot_widget import PlotWidget
+from osa.services.server_requests import TraceData
+
+TRACE_SIZES = (10_000, 100_000, 1_000_000)
+
+
+def create_trace_data(num_points: int) -> TraceData:
+    rng = np.random.default_rng(0)
+    return TraceData(data=rng.normal(-60, 1, num_points), time='2021-05-29T14:10:43Z',
+                     instrument='Benchmark', x_label='Wavelength', y_label='dBm', x_units='nm',
+                     x_increment=60 / num_points, x_start=1520)
+
+
+def export_with_pyqtgraph(plot_widget: PlotWidget, directory: str):
+    """ Exports the plot to PNG synchronously with pyqtgraph's ImageExporter, as saving did before PlotExporter """
+    import pyqtgraph.exporters
+
+    path = reserve_file_stem(directory, plot_widget.plot_title, ('png',)) + '.png'
+    pyqtgraph.exporters.ImageExporter(plot_widget.graph_widget.plotItem).export(fileName=path)
+
+
+def measure(fn, repeat: int = 5) -> float:
+    """ :return: Best time in milliseconds """
+    return min(timeit.repeat(fn, repeat=repeat, number=1)) * 1000
+
+
+def run():
+    app = QtWidgets.QApplication([])
+    plot_widget = PlotWidget()
+    plot_widget.resize(1000, 600)
+    plot_widget.show()
+    app.processEvents()
+    directory = tempfile.mkdtemp()
+
+    try:
+        print(f"{'':>10}{'GUI thread blocked':^26}{'export thread':^{12 * len(FORMATS)}}")
+        print(f"{'points':>10}{'sync png':>13}{'snapshot':>13}" + ''.join(f"{name:>12}" for name in FORMATS))
+        for num_points in TRACE_SIZES:
+            plot_widget.update_data(create_trace_data(num_points))
+            app.processEvents()
+            synchronous = measure(lambda: export_with_pyqtgraph(plot_widget, directory))
+            # Queue large enough that no snapshot is dropped while measuring. Exports of the queued
+            # snapshots are finished before the export thread is timed.
+            exporter = PlotExporter(queue_size=100)
+            queued = measure(lambda: exporter.submit(plot_widget.snapshot(), directory, ('npy',)))
+            exporter.stop()
+            snapshot = plot_widget.snapshot()
+            # Timed on this thread, as the export thread would take
+            formats = [measure(lambda: exporter.export(snapshot, directory, (name,)), repeat=3) for name in FORMATS]
+            print(f"{num_points:>10}{synchronous:>10.2f} ms{queued:>10.2f} ms"
+                  + ''.join(f"{t:>9.2f} ms" for t in formats))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    run()
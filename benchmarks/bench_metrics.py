@@ -0,0 +1,37 @@
+"""
+Benchmark of the cost of instrumentation: a timed block, a counter increment and a snapshot,
+with metrics disabled and enabled.
+
+Run from the project root with: python -m benchmarks.bench_metrics
+"""
+import timeit
+
+from osa.utils.metrics import Metrics
+
+
+def measure(fn, number: int) -> float:
+    """ :return: Best time per call in microseconds """
+    return min(timeit.repeat(fn, repeat=5, number=number)) / number * 1e6
+
+
+def timed_block(metrics: Metrics):
+    with metrics.timer('fetch'):
+        pass
+
+
+def run():
+    print(f"{'':<12}{'disabled':>12}{'enabled':>12}")
+    for name, fn, number in (('timer', timed_block, 100_000),
+                             ('increment', lambda metrics: metrics.increment('retries'), 100_000),
+                             ('snapshot', lambda metrics: metrics.snapshot(), 1_000)):
+        times = []
+        for enabled in (False, True):
+            metrics = Metrics(enabled=enabled)
+            for i in range(metrics.window):
+                metrics.observe('fetch', i / 1000)
+            times.append(measure(lambda: fn(metrics), number))
+        print(f"{name:<12}" + ''.join(f"{t:>9.2f} us" for t in times))
+
+
+if __name__ == '__main__':
+    run()
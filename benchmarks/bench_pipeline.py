@@ -0,0 +1,240 @@
+"""
+End-to-end benchmark of the acquisition to render pipeline, stage by stage and as a whole.
+Traces are served by the local OSA server simulator and drawn on the offscreen Qt platform,
+so the suite runs without network access or a display, e.g. in CI.
+
+Stages, each timed at every trace size:
+  fetch       - TRACE request and transfer of the response body, served from memory
+  decode      - decode_trace of the response body
+  construct   - creating TraceData from the decoded response as get_trace does: timestamp parsing,
+                m to nm conversion of x-values (copied first, as they are converted in place) and TraceData
+  convert     - converting x-values from m to nm and from wavelength to frequency
+  plot        - PlotWidget.update_data and rendering the plot
+  export      - a snapshot of the plot drawn and written to PNG by PlotExporter, as on its export thread
+  record      - appending the trace to a trace store and flushing it
+  end_to_end  - get_trace, plotting, rendering and recording a trace
+
+Results are written as JSON with --output. Given a previous result file with --baseline, the run fails
+with exit status 1 if the median time of any stage is more than --tolerance slower than in the baseline.
+Baselines are machine specific: create them on the machine that compares against them.
+
+Run from the project root with: python -m benchmarks.bench_pipeline
+e.g. python -m benchmarks.bench_pipeline --output baseline.json
+     python -m benchmarks.bench_pipeline --baseline baseline.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+import numpy as np
+from PyQt5 import QtWidgets
+
+from osa.export.plot_exporter import PlotExporter
+from osa.gui.plot_widget import PlotWidget
+from osa.recording.trace_store import TraceStoreWriter
+from osa.services import server_requests, trace_decoder
+from osa.services.osa_session import OsaSession
+from osa.services.server_requests import TraceData, get_trace
+from osa.services.trace_decoder import decode_trace
+from osa.simulator.server import OsaSimulator
+from osa.simulator.spectrum import SpectrumGenerator
+from osa.utils.unit_conversions import m_to_nm, wavelength_to_frequency
+
+TRACE_SIZES = (1_000, 10_000, 100_000, 1_000_000)
+STAGES = ('fetch', 'decode', 'construct', 'convert', 'plot', 'export', 'record', 'end_to_end')
+
+# Stages slower than their baseline by less than this are not regressions, however large the ratio,
+# as differences of a few microseconds are timer noise
+MIN_REGRESSION_MS = 0.05
+
+
+class CachedSimulator(OsaSimulator):
+    """ Simulator replying to every TRACE with the same body, so that fetch times only the transfer """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cached_trace_body = super().trace_body()
+
+    def trace_body(self, fault: str = None) -> bytes:
+        return self.cached_trace_body
+
+
+def time_runs(fn, repeat: int, max_seconds: float) -> list:
+    """
+    Calls fn repeat times after a warm-up call, stopping early once max_seconds have passed
+    :return: Time of each call in milliseconds
+    """
+    fn()
+    times = []
+    started_at = time.perf_counter()
+    while len(times) < repeat and (len(times) < 3 or time.perf_counter() - started_at < max_seconds):
+        call_started_at = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - call_started_at) * 1000)
+    return times
+
+
+def benchmark_size(points: int, plot_widget: PlotWidget, directory: str, repeat: int, max_seconds: float) -> dict:
+    """ :return: Dict of stage name to times in milliseconds """
+    with CachedSimulator(SpectrumGenerator(points=points, seed=0), port=0, include_x_data=True) as simulator:
+        session = OsaSession(api_url=simulator.url, timeouts={'TRACE': 60})
+        body = session.get('TRACE').content
+        decoded = decode_trace(body)
+
+        def construct() -> TraceData:
+            # x-values are converted to nm in place, so each call gets a copy, as each decoded response has its own
+            return server_requests.__create_trace_data__(dict(decoded, xdata=decoded['xdata'].copy()), np.float64)
+
+        trace_data = construct()
+        x_data_m = decoded['xdata']
+        x_nm = np.empty_like(x_data_m)
+        frequency = np.empty_like(x_data_m)
+
+        def convert():
+            m_to_nm(x_data_m, out=x_nm)
+            wavelength_to_frequency(x_nm, out=frequency)
+
+        def plot():
+            plot_widget.update_data(trace_data)
+            plot_widget.graph_widget.grab()
+
+        exporter = PlotExporter()
+
+        def export():
+            # Timed on this thread, as the export thread of the app would take
+            exporter.export(plot_widget.snapshot(), directory, ('png',))
+
+        writer = TraceStoreWriter(os.path.join(directory, f'store-{points}'))
+
+        def record():
+            writer.append(trace_data)
+            writer.flush()
+
+        def end_to_end():
+            acquired = get_trace(session)
+            plot_widget.update_data(acquired)
+            plot_widget.graph_widget.grab()
+            writer.append(acquired)
+            writer.flush()
+
+        plot_widget.set_title(f'bench-{points}')
+        stages = {'fetch': lambda: session.get('TRACE').content,
+                  'decode': lambda: decode_trace(body),
+                  'construct': construct,
+                  'convert': convert,
+                  'plot': plot,
+                  'export': export,
+                  'record': record,
+                  'end_to_end': end_to_end}
+        try:
+            return {stage: time_runs(stages[stage], repeat, max_seconds) for stage in STAGES}
+        finally:
+            exporter.stop()
+            writer.close()
+            session.close()
+
+
+def run_suite(sizes=TRACE_SIZES, repeat: int = 10, max_seconds: float = 2) -> dict:
+    """
+    Runs every stage at every size
+    :return: Results with 'environment' and 'results', keyed by '<stage>/<points>'
+    """
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+    plot_widget = PlotWidget()
+    plot_widget.resize(1000, 600)
+    plot_widget.show()
+    app.processEvents()
+
+    directory = tempfile.mkdtemp()
+    results = {}
+    try:
+        for points in sizes:
+            # Request and export messages would drown the results
+            with contextlib.redirect_stdout(io.StringIO()):
+                times_by_stage = benchmark_size(points, plot_widget, directory, repeat, max_seconds)
+            for stage, times in times_by_stage.items():
+                results[f'{stage}/{points}'] = {'median_ms': statistics.median(times), 'min_ms': min(times),
+                                                'runs': len(times)}
+    finally:
+        shutil.rmtree(directory)
+    environment = {'python': platform.python_version(), 'numpy': np.__version__,
+                   'platform': platform.platform(), 'orjson': trace_decoder.orjson is not None}
+    return {'environment': environment, 'results': results}
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """
+    Finds stages slower than in the baseline
+    :param results: Results of run_suite
+    :param baseline: Earlier results of run_suite
+    :param tolerance: Allowed slowdown, e.g. 0.25 for 25 %
+    :return: List of (key, median ms, baseline median ms) of the regressed stages
+    """
+    regressions = []
+    for key, result in results['results'].items():
+        if key not in baseline['results']:
+            continue
+        median, baseline_median = result['median_ms'], baseline['results'][key]['median_ms']
+        if median > baseline_median * (1 + tolerance) and median - baseline_median > MIN_REGRESSION_MS:
+            regressions.append((key, median, baseline_median))
+    return regressions
+
+
+def print_results(results: dict, baseline: dict = None):
+    sizes = sorted({int(key.split('/')[1]) for key in results['results']})
+    print(f"{'stage':<12}" + ''.join(f"{points:>14}" for points in sizes))
+    for stage in STAGES:
+        cells = []
+        for points in sizes:
+            result = results['results'].get(f'{stage}/{points}')
+            baseline_result = (baseline or {}).get('results', {}).get(f'{stage}/{points}')
+            if result is None:
+                cells.append(f"{'-':>14}")
+            elif baseline_result is None:
+                cells.append(f"{result['median_ms']:>11.2f} ms")
+            else:
+                cells.append(f"{result['median_ms'] / baseline_result['median_ms']:>13.2f}x")
+        print(f"{stage:<12}" + ''.join(cells))
+
+
+def run(sizes=TRACE_SIZES, output: str = None, baseline_path: str = None, tolerance: float = 0.25,
+        repeat: int = 10) -> int:
+    """ :return: Exit status, 1 if a stage regressed against the baseline """
+    results = run_suite(sizes, repeat)
+    if output:
+        with open(output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if not baseline_path:
+        print_results(results)
+        return 0
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print("Median time relative to the baseline:")
+    print_results(results, baseline)
+    regressions = compare(results, baseline, tolerance)
+    for key, median, baseline_median in regressions:
+        print(f"Regression in {key}: {median:.2f} ms, baseline {baseline_median:.2f} ms")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.bench_pipeline')
+    parser.add_argument('--sizes', type=int, nargs='+', default=TRACE_SIZES, help="Trace sizes in points")
+    parser.add_argument('--repeat', type=int, default=10, help="Maximum runs of each stage at each size")
+    parser.add_argument('--output', help="File to write results to as JSON")
+    parser.add_argument('--baseline', help="Results file to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="Allowed slowdown against the baseline (default: %(default)s)")
+    args = parser.parse_args()
+    sys.exit(run(args.sizes, args.output, args.baseline, args.tolerance, args.repeat))
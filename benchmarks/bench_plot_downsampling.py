@@ -0,0 +1,56 @@
+"""
+Benchmark for redrawing large traces in PlotWidget, with and without downsampling.
+Measures time to update the plot with a new trace and render it offscreen.
+
+Run from the project root with: python -m benchmarks.bench_plot_downsampling
+"""
+import os
+import timeit
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+import numpy as np
+from PyQt5 import QtWidgets
+
+from osa.gui.plot_widget import PlotWidget
+from osa.services.server_requests import TraceData
+
+TRACE_SIZES = (10_000, 100_000, 1_000_000)
+
+
+def create_trace_data(num_points: int) -> TraceData:
+    rng = np.random.default_rng(0)
+    return TraceData(data=rng.normal(-60, 1, num_points), time='2021-05-29T14:10:43Z',
+                     instrument='Benchmark', x_label='Wavelength', y_label='dBm', x_units='nm',
+                     x_increment=60 / num_points, x_start=1520)
+
+
+def measure_redraw(plot_widget: PlotWidget, trace_data: TraceData, repeat: int = 5) -> float:
+    """ :return: Best time in milliseconds to update and render the plot """
+    def redraw():
+        plot_widget.update_data(trace_data)
+        plot_widget.graph_widget.grab()
+
+    redraw()
+    return min(timeit.repeat(redraw, repeat=repeat, number=1)) * 1000
+
+
+def run():
+    app = QtWidgets.QApplication([])
+    plot_widget = PlotWidget()
+    plot_widget.resize(1000, 600)
+    plot_widget.show()
+    app.processEvents()
+
+    print(f"{'points':>10}{'downsampled':>16}{'full':>12}")
+    for num_points in TRACE_SIZES:
+        trace_data = create_trace_data(num_points)
+        plot_widget.set_downsampling(True)
+        downsampled = measure_redraw(plot_widget, trace_data)
+        plot_widget.set_downsampling(False)
+        full = measure_redraw(plot_widget, trace_data)
+        print(f"{num_points:>10}{downsampled:>13.2f} ms{full:>9.2f} ms")
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,134 @@
+"""
+Benchmark for GUI startup, run on the offscreen Qt platform so it also runs without a display, e.g. in CI.
+Each run starts a fresh interpreter and measures, from the start of the imports:
+  import       - importing osa.gui.app
+  window       - creating and showing the main window
+  interactive  - the event loop handling its first event after the window is shown
+  first frame  - the first trace being plotted
+Traces are served from a recorded response, so no OSA server is needed and network time is not measured.
+Also checks that modules meant to load on first use were not imported at startup.
+
+Run from the project root with: python -m benchmarks.bench_startup
+Exits with status 1 if the median time to first frame exceeds --budget milliseconds.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from types import SimpleNamespace
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'tests', 'services', 'data')
+FIXTURE = 'large_trace_response.json'
+STAGES = ('import', 'window', 'interactive', 'first frame')
+
+# Modules only needed once the user exports a plot, enables channel analysis or records or opens a recording
+LAZY_MODULES = ('pyqtgraph.exporters', 'osa.analysis.pipeline', 'multiprocessing.shared_memory',
+                'osa.recording.recorder', 'osa.recording.trace_store', 'osa.recording.playback')
+
+
+class RecordedSession:
+    """ Answers TRACE requests with a recorded response """
+
+    def __init__(self, trace_body: bytes):
+        self.trace_body = trace_body
+
+    def get(self, command: str, timeout: float = None):
+        return SimpleNamespace(content=self.trace_body)
+
+
+def measure_startup() -> dict:
+    """
+    Starts the GUI as osa.gui.app.run does and measures its stages. Runs in the child process.
+    :return: Dict of stage name to seconds since the start of the imports, and lazy modules imported
+    """
+    started_at = time.perf_counter()
+    from PyQt5 import QtWidgets
+    from PyQt5.QtCore import QTimer
+
+    from osa.gui import app
+    from osa.services.server_requests import get_trace
+    times = {'import': time.perf_counter() - started_at}
+
+    with open(os.path.join(DATA_DIR, FIXTURE), 'rb') as f:
+        session = RecordedSession(f.read())
+
+    qt_app = QtWidgets.QApplication([])
+    win = app.MainWindow()
+    worker = win.acquisition_worker
+    worker.client = None
+    worker.fetch_trace = lambda: get_trace(session)
+    worker.x_lims_cache.fetch_x_lims = lambda: [1500, 1600]
+
+    set_plot_data = win.set_plot_data
+
+    def set_first_plot_data(trace_data, x_lims):
+        set_plot_data(trace_data, x_lims)
+        win.plot_widget.graph_widget.repaint()
+        times['first frame'] = time.perf_counter() - started_at
+        qt_app.quit()
+
+    win.set_plot_data = set_first_plot_data
+    win.show()
+    times['window'] = time.perf_counter() - started_at
+    QTimer.singleShot(0, lambda: times.setdefault('interactive', time.perf_counter() - started_at))
+    QTimer.singleShot(0, win.populate_plot)
+    # Gives up if no trace arrives
+    QTimer.singleShot(30000, qt_app.quit)
+    qt_app.exec_()
+
+    lazy_imported = [module for module in LAZY_MODULES if module in sys.modules]
+    win.close()
+    return {'times': times, 'lazy_imported': lazy_imported}
+
+
+def run_child() -> dict:
+    environment = dict(os.environ, QT_QPA_PLATFORM='offscreen')
+    output = subprocess.run([sys.executable, '-m', 'benchmarks.bench_startup', '--child'],
+                            env=environment, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def run(runs: int = 5, budget: float = None) -> int:
+    """
+    :param runs: Number of fresh processes to measure
+    :param budget: Maximum median time to first frame in milliseconds, if checked
+    :return: Exit status
+    """
+    results = [run_child() for _ in range(runs)]
+    print(f"{'stage':>12}{'median':>12}{'best':>12}")
+    medians = {}
+    for stage in STAGES:
+        seconds = [result['times'][stage] for result in results if stage in result['times']]
+        if not seconds:
+            print(f"{stage:>12}{'-':>12}{'-':>12}")
+            continue
+        medians[stage] = statistics.median(seconds) * 1000
+        print(f"{stage:>12}{medians[stage]:>9.1f} ms{min(seconds) * 1000:>9.1f} ms")
+
+    status = 0
+    lazy_imported = sorted({module for result in results for module in result['lazy_imported']})
+    if lazy_imported:
+        print(f"Imported at startup: {', '.join(lazy_imported)}")
+        status = 1
+    if 'first frame' not in medians:
+        print("No trace was plotted.")
+        status = 1
+    elif budget is not None and medians['first frame'] > budget:
+        print(f"Time to first frame is over budget of {budget:g} ms.")
+        status = 1
+    return status
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--budget', type=float, help="Maximum median time to first frame in milliseconds")
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        print(json.dumps(measure_startup()))
+    else:
+        sys.exit(run(args.runs, args.budget))
@@ -0,0 +1,58 @@
+"""
+Benchmark for decoding responses to TRACE requests.
+Compares parse time and peak memory per trace of decode_trace against
+decoding the full response with json and converting ydata to an array.
+
+Run from the project root with: python -m benchmarks.bench_trace_decoder
+"""
+import json
+import os
+import timeit
+import tracemalloc
+
+import numpy as np
+
+from osa.services import trace_decoder
+from osa.services.trace_decoder import decode_trace
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'tests', 'services', 'data')
+FIXTURES = ('small_trace_response.json', 'large_trace_response.json')
+
+
+def decode_with_json(body: bytes) -> np.ndarray:
+    """ Previous decoding: full JSON document, then list to array """
+    return np.asarray(json.loads(body)['ydata'], dtype=np.float64)
+
+
+def measure(fn, body: bytes, repeat: int = 5, number: int = 20) -> tuple[float, int]:
+    """
+    :return: Best time per call in milliseconds, peak memory per call in bytes
+    """
+    fn(body)
+    best = min(timeit.repeat(lambda: fn(body), repeat=repeat, number=number)) / number
+
+    tracemalloc.start()
+    fn(body)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return best * 1000, peak
+
+
+def run():
+    decoders = {'json + list': decode_with_json,
+                'decode_trace (numpy)': lambda body: decode_trace(body, use_fast_backend=False)}
+    if trace_decoder.orjson is not None:
+        decoders['decode_trace (orjson)'] = lambda body: decode_trace(body, use_fast_backend=True)
+
+    for file_name in FIXTURES:
+        with open(os.path.join(DATA_DIR, file_name), 'rb') as f:
+            body = f.read()
+        print(f"{file_name} ({len(body) / 1024:.0f} KB)")
+        for name, fn in decoders.items():
+            time_ms, peak = measure(fn, body)
+            print(f"  {name:<24}{time_ms:8.3f} ms {peak / 1024:10.1f} KB peak")
+
+
+if __name__ == '__main__':
+    run()
@@ -1,6 +1,8 @@
 import sys
-from osa.gui import app
 
 
 def start_gui():
+    # Imported here so that the headless modules can be used without PyQt5 installed
+    from osa.gui import app
+
     sys.exit(app.run())
@@ -0,0 +1,231 @@
+import numpy as np
+
+from osa.config import (CHANNEL_MIN_PROMINENCE_DB, CHANNEL_MIN_SPACING_NM, CHANNEL_NOISE_WINDOW_NM,
+                        OSNR_REFERENCE_BANDWIDTH_NM)
+from osa.services.server_requests import TraceData
+from osa.utils.unit_conversions import dbm_to_mw, mw_to_dbm, wavelength_to_frequency
+
+# One record per channel found by analyze_channels. Values that could not be measured are NaN.
+CHANNEL_DTYPE = np.dtype([
+    # Index of the channel's highest sample
+    ('index', '<i8'),
+    # Centre of the -3 dB width, or of the interpolated peak if it has no -3 dB width
+    ('wavelength_nm', '<f8'),
+    ('frequency_thz', '<f8'),
+    # Interpolated peak power
+    ('power_dbm', '<f8'),
+    ('prominence_db', '<f8'),
+    ('width_3db_nm', '<f8'),
+    ('width_20db_nm', '<f8'),
+    # Noise floor at the channel centre, in the resolution bandwidth
+    ('noise_dbm', '<f8'),
+    # OSNR in OSNR_REFERENCE_BANDWIDTH_NM, or in the resolution bandwidth if it is not known
+    ('osnr_db', '<f8'),
+])
+
+# Maximum number of times peaks are filtered by prominence. Prominences are measured again
+# after each pass, as removing a peak can lower the valleys around its neighbours.
+MAX_PROMINENCE_PASSES = 20
+
+
+def find_peaks(y: np.ndarray, min_prominence: float, min_spacing: int) -> tuple:
+    """
+    Finds peaks of a trace.
+    A peak is the highest sample within min_spacing samples on either side. Its prominence is
+    its height above the higher of the two valleys separating it from its neighbouring peaks,
+    or from the ends of the trace.
+    :param y: Trace values, NaN values are ignored
+    :param min_prominence: Minimum prominence of peaks
+    :param min_spacing: Minimum distance between peaks in samples
+    :return: (peaks, prominences, left_bases, right_bases) arrays, where the bases are
+        the indices of the lowest sample on either side of each peak
+    """
+    length = len(y)
+    empty = np.empty(0, dtype=np.intp)
+    if length < 3:
+        return empty, np.empty(0), empty, empty
+    if np.isnan(y).any():
+        y = np.where(np.isnan(y), np.nanmin(y) if not np.isnan(y).all() else 0, y)
+
+    window_max = __sliding_max__(y, max(int(min_spacing), 1))
+    is_peak = (y == window_max)
+    is_peak[1:] &= y[1:] > y[:-1]
+    is_peak[0] = is_peak[-1] = False
+    peaks = np.flatnonzero(is_peak)
+
+    for remaining_passes in range(MAX_PROMINENCE_PASSES, 0, -1):
+        if not len(peaks):
+            return empty, np.empty(0), empty, empty
+        # Valleys between consecutive peaks, and between the outer peaks and the trace ends
+        valleys = __segment_argmin__(y, np.r_[0, peaks])
+        left_bases, right_bases = valleys[:-1], valleys[1:]
+        prominences = y[peaks] - np.maximum(y[left_bases], y[right_bases])
+        keep = prominences >= min_prominence
+        if keep.all() or remaining_passes == 1:
+            return peaks[keep], prominences[keep], left_bases[keep], right_bases[keep]
+
+        # A peak limited by the valley next to a lower peak is kept until that peak is removed
+        limited_left = y[left_bases] >= y[right_bases]
+        neighbours = np.where(limited_left, np.r_[-1, peaks[:-1]], np.r_[peaks[1:], -1])
+        has_lower_neighbour = (neighbours >= 0) & (y[np.maximum(neighbours, 0)] < y[peaks])
+        peaks = peaks[keep | has_lower_neighbour]
+
+
+def analyze_channels(trace_data: TraceData,
+                     min_prominence_db: float = CHANNEL_MIN_PROMINENCE_DB,
+                     min_spacing_nm: float = CHANNEL_MIN_SPACING_NM,
+                     noise_window_nm: float = CHANNEL_NOISE_WINDOW_NM,
+                     reference_bandwidth_nm: float = OSNR_REFERENCE_BANDWIDTH_NM) -> np.ndarray:
+    """
+    Finds the channels of a DWDM spectrum and measures them.
+    Every step is vectorized over the samples or the channels, so analysis takes O(points) time.
+    The noise floor is measured in the valleys on either side of a channel, averaged in mW over
+    noise_window_nm, and linearly interpolated to the channel centre.
+    OSNR is the ratio of the peak power above the noise floor to the noise floor, scaled from the
+    trace's resolution_bandwidth_nm to reference_bandwidth_nm.
+    :param trace_data: Trace in dBm, with x-values in nm
+    :param min_prominence_db: Minimum height of a channel above the valleys around it
+    :param min_spacing_nm: Minimum spacing between channels
+    :param noise_window_nm: Width of the window averaged to measure the noise floor
+    :param reference_bandwidth_nm: Bandwidth OSNR is referred to
+    :return: Array of CHANNEL_DTYPE records, ordered by sample index
+    """
+    y = np.asarray(trace_data.data, dtype=np.float64)
+    x = trace_data.x
+    length = len(y)
+    sample_spacing = abs(x[-1] - x[0]) / (length - 1) if length > 1 else 0
+    if not sample_spacing:
+        return np.empty(0, dtype=CHANNEL_DTYPE)
+
+    min_spacing = int(round(min_spacing_nm / sample_spacing))
+    peaks, prominences, left_bases, right_bases = find_peaks(y, min_prominence_db, min_spacing)
+    channels = np.empty(len(peaks), dtype=CHANNEL_DTYPE)
+    if not len(peaks):
+        return channels
+
+    samples = np.arange(length, dtype=np.float64)
+    peak_position, power = __interpolate_peaks__(y, peaks)
+    left_3db, right_3db = __crossings__(y, peaks, left_bases, right_bases, power - 3)
+    left_20db, right_20db = __crossings__(y, peaks, left_bases, right_bases, power - 20)
+    centre_position = np.where(np.isnan(left_3db) | np.isnan(right_3db),
+                               peak_position, (left_3db + right_3db) / 2)
+
+    noise_mw = __interpolate_noise__(y, centre_position, left_bases, right_bases,
+                                     noise_window_nm / sample_spacing)
+    signal_mw = dbm_to_mw(power) - noise_mw
+    with np.errstate(divide='ignore', invalid='ignore'):
+        osnr_db = mw_to_dbm(signal_mw / noise_mw)
+        osnr_db[~(signal_mw > 0)] = np.nan
+    if trace_data.resolution_bandwidth_nm:
+        osnr_db -= 10 * np.log10(reference_bandwidth_nm / trace_data.resolution_bandwidth_nm)
+
+    channels['index'] = peaks
+    channels['wavelength_nm'] = np.interp(centre_position, samples, x)
+    channels['frequency_thz'] = wavelength_to_frequency(channels['wavelength_nm'])
+    channels['power_dbm'] = power
+    channels['prominence_db'] = prominences
+    channels['width_3db_nm'] = np.abs(np.interp(right_3db, samples, x) - np.interp(left_3db, samples, x))
+    channels['width_20db_nm'] = np.abs(np.interp(right_20db, samples, x) - np.interp(left_20db, samples, x))
+    with np.errstate(divide='ignore'):
+        channels['noise_dbm'] = mw_to_dbm(noise_mw)
+    channels['osnr_db'] = osnr_db
+    return channels
+
+
+def __sliding_max__(values: np.ndarray, half_width: int) -> np.ndarray:
+    """
+    Gets the maximum of values[i - half_width:i + half_width + 1] for every i.
+    Uses the van Herk/Gil-Werman algorithm: O(n) regardless of the window width.
+    """
+    width = 2 * half_width + 1
+    length = len(values)
+    padding = (-(length + 2 * half_width)) % width
+    padded = np.concatenate([np.full(half_width, -np.inf), values, np.full(half_width + padding, -np.inf)])
+    blocks = padded.reshape(-1, width)
+    prefix = np.maximum.accumulate(blocks, axis=1).ravel()
+    suffix = np.maximum.accumulate(blocks[:, ::-1], axis=1)[:, ::-1].ravel()
+    return np.maximum(suffix[:length], prefix[width - 1:width - 1 + length])
+
+
+def __segment_argmin__(values: np.ndarray, starts: np.ndarray) -> np.ndarray:
+    """
+    Gets the index of the first minimum of each segment values[starts[k]:starts[k + 1]],
+    the last segment ending at the end of values.
+    :param starts: Increasing segment starts, the first being 0
+    """
+    minimums = np.minimum.reduceat(values, starts)
+    lengths = np.diff(np.r_[starts, len(values)])
+    is_minimum = np.flatnonzero(values == np.repeat(minimums, lengths))
+    return is_minimum[np.searchsorted(is_minimum, starts)]
+
+
+def __interpolate_peaks__(y: np.ndarray, peaks: np.ndarray) -> tuple:
+    """
+    Fits a parabola through each peak and its neighbours.
+    :return: (position, value) of each parabola's vertex, the position in samples
+    """
+    before, at, after = y[peaks - 1], y[peaks], y[peaks + 1]
+    curvature = before - 2 * at + after
+    with np.errstate(divide='ignore', invalid='ignore'):
+        offset = np.where(curvature < 0, 0.5 * (before - after) / curvature, 0)
+    offset = np.clip(offset, -0.5, 0.5)
+    return peaks + offset, at - 0.25 * (before - after) * offset
+
+
+def __crossings__(y: np.ndarray, peaks: np.ndarray, left_bases: np.ndarray, right_bases: np.ndarray,
+                  thresholds: np.ndarray) -> tuple:
+    """
+    Finds where each peak's trace first falls below its threshold on either side,
+    searching no further than the peak's bases.
+    :return: (left, right) positions in samples, linearly interpolated between samples.
+        NaN where the trace does not fall below the threshold before the base.
+    """
+    length = len(y)
+    indices = np.arange(length)
+
+    # Samples after the previous peak up to a peak are compared with that peak's threshold
+    left_thresholds = np.repeat(np.r_[thresholds, -np.inf],
+                                np.r_[peaks[0] + 1, np.diff(peaks), length - 1 - peaks[-1]])
+    last_below = np.maximum.accumulate(np.where(y < left_thresholds, indices, -1))[peaks]
+    left_found = last_below >= left_bases
+    left = np.clip(last_below, 0, length - 2)
+    left_position = left + __fraction__(y[left], y[left + 1], thresholds)
+
+    # Samples from a peak up to the next peak are compared with that peak's threshold
+    right_thresholds = np.repeat(np.r_[-np.inf, thresholds],
+                                 np.r_[peaks[0], np.diff(peaks), length - peaks[-1]])
+    first_below = np.minimum.accumulate(np.where(y < right_thresholds, indices, length)[::-1])[::-1][peaks]
+    right_found = first_below <= right_bases
+    right = np.clip(first_below, 1, length - 1)
+    right_position = right - 1 + __fraction__(y[right - 1], y[right], thresholds)
+
+    return np.where(left_found, left_position, np.nan), np.where(right_found, right_position, np.nan)
+
+
+def __fraction__(start: np.ndarray, stop: np.ndarray, value: np.ndarray) -> np.ndarray:
+    """ Gets how far value is from start towards stop, between 0 and 1 """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        fraction = (value - start) / (stop - start)
+    return np.clip(np.nan_to_num(fraction), 0, 1)
+
+
+def __interpolate_noise__(y: np.ndarray, positions: np.ndarray, left_bases: np.ndarray,
+                          right_bases: np.ndarray, window: float) -> np.ndarray:
+    """
+    Measures the noise floor at the bases of each peak, as the mean power in mW of window
+    samples around them, and linearly interpolates it to positions between the bases.
+    :return: Noise floor in mW at each position
+    """
+    length = len(y)
+    half_window = int(window // 2)
+    cumulative = np.r_[0, np.cumsum(dbm_to_mw(np.nan_to_num(y, nan=-np.inf)))]
+
+    def mean_around(bases):
+        start = np.clip(bases - half_window, 0, length)
+        stop = np.clip(bases + half_window + 1, 0, length)
+        return (cumulative[stop] - cumulative[start]) / (stop - start)
+
+    left_noise, right_noise = mean_around(left_bases), mean_around(right_bases)
+    span = right_bases - left_bases
+    weight = np.where(span > 0, (positions - left_bases) / np.maximum(span, 1), 0.5)
+    return left_noise + np.clip(weight, 0, 1) * (right_noise - left_noise)
@@ -0,0 +1,244 @@
+import collections
+import logging
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+from osa.analysis.channel_analysis import analyze_channels
+from osa.config import ANALYSIS_WORKERS
+from osa.services.server_requests import TraceData
+from osa.utils.metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+
+# Pipeline stages timed for each trace:
+#   copy     - copying the trace to shared memory
+#   queue    - waiting for a worker process to start analysing it
+#   analysis - running the analysis function
+#   return   - sending the result back from the worker process
+PIPELINE_STAGES = ('copy', 'queue', 'analysis', 'return')
+
+# TraceData fields sent to worker processes alongside the shared memory
+TRACE_METADATA_FIELDS = ('time', 'instrument', 'x_label', 'y_label', 'x_units', 'x_increment',
+                         'x_start', 'resolution_bandwidth_nm', 'total_power_dbm')
+
+
+class AnalysisPipeline:
+    """
+    Analyses traces in a pool of worker processes, away from the GUI thread and its GIL.
+    Trace arrays are copied once into shared memory when submitted and read from there by the workers,
+    results come back as the (small) array returned by the analysis function.
+    At most one trace per worker is analysed at once. Traces submitted while all workers are
+    busy replace the trace waiting for a worker, so only the latest trace is analysed next
+    and submitting never blocks. Results older than one already delivered are dropped.
+    """
+
+    def __init__(self, analyze=analyze_channels, on_result=None, workers: int = ANALYSIS_WORKERS,
+                 timing_window: int = 100):
+        """
+        :param analyze: Function taking a TraceData and returning its analysis. Must be picklable,
+            e.g. a module-level function, and its result must not reference the trace's arrays.
+        :param on_result: Function called with (trace id, result, stage times in seconds) for
+            each analysed trace. Called from a background thread.
+        :param workers: Number of worker processes
+        :param timing_window: Number of traces stage times are averaged over
+        """
+        self.analyze = analyze
+        self.on_result = on_result
+        self.workers = workers
+        # Spawned workers do not inherit the GUI's threads and locks
+        self.executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+        self.lock = threading.Lock()
+        self.free_buffers = []
+        self.in_flight = 0
+        # Arguments of start for the trace waiting for a worker
+        self.pending = None
+        self.last_trace_id = 0
+        self.last_result_id = 0
+        self.closed = False
+
+        self.submitted_traces = 0
+        self.analysed_traces = 0
+        self.dropped_traces = 0
+        self.failed_traces = 0
+        self.stage_times = {stage: collections.deque(maxlen=timing_window) for stage in PIPELINE_STAGES}
+
+    def submit(self, trace_data: TraceData) -> int:
+        """
+        Copies a trace to shared memory and queues it for analysis without waiting for a worker.
+        If all workers are busy, the trace waits for a worker instead of any trace already waiting.
+        :param trace_data: Trace to analyse. It may be modified once submit returns.
+        :return: Id of the trace, passed to on_result with its result
+        :raises:
+            RuntimeError - raised if the pipeline is closed
+        """
+        with self.lock:
+            if self.closed:
+                raise RuntimeError("Analysis pipeline is closed.")
+            self.last_trace_id += 1
+            trace_id = self.last_trace_id
+            self.submitted_traces += 1
+
+        copy_started_at = time.monotonic()
+        job = self.copy_to_shared_memory(trace_data)
+        copied_at = time.monotonic()
+        times = {'copy': copied_at - copy_started_at}
+
+        replaced = None
+        with self.lock:
+            start_now = self.in_flight < self.workers
+            if start_now:
+                self.in_flight += 1
+            else:
+                replaced, self.pending = self.pending, (trace_id, job, copied_at, times)
+                if replaced is not None:
+                    self.dropped_traces += 1
+        if replaced is not None:
+            self.release_buffer(replaced[1][0])
+        if start_now:
+            self.start(trace_id, job, copied_at, times)
+        return trace_id
+
+    def copy_to_shared_memory(self, trace_data: TraceData) -> tuple:
+        """
+        Copies trace arrays to a shared memory buffer
+        :return: (buffer, length, y dtype, whether x_data was copied, other TraceData fields)
+        """
+        y = trace_data.data
+        x_data = trace_data.x_data
+        buffer = self.take_buffer(y.nbytes + (0 if x_data is None else x_data.nbytes))
+        np.ndarray(y.shape, y.dtype, buffer=buffer.buf)[:] = y
+        if x_data is not None:
+            np.ndarray(x_data.shape, x_data.dtype, buffer=buffer.buf, offset=y.nbytes)[:] = x_data
+        metadata = {field: getattr(trace_data, field) for field in TRACE_METADATA_FIELDS}
+        return buffer, len(y), y.dtype.str, x_data is not None, metadata
+
+    def start(self, trace_id: int, job: tuple, copied_at: float, times: dict):
+        """ Sends a trace copied to shared memory to a worker. A worker must have been reserved. """
+        buffer = job[0]
+        try:
+            future = self.executor.submit(__analyze_shared_trace__, self.analyze, buffer.name, *job[1:])
+        except RuntimeError as e:
+            # Executor shut down, or broken by a worker process dying
+            logger.error("Failed to start analysis of trace %d: %r", trace_id, e)
+            self.release_buffer(buffer)
+            with self.lock:
+                self.in_flight -= 1
+                self.failed_traces += 1
+            return
+        future.add_done_callback(lambda f: self.finish(f, trace_id, buffer, copied_at, times))
+
+    def finish(self, future, trace_id: int, buffer: SharedMemory, copied_at: float, times: dict):
+        """ Delivers the result of a trace and starts the trace waiting for a worker, if any """
+        returned_at = time.monotonic()
+        self.release_buffer(buffer)
+        with self.lock:
+            pending, self.pending = self.pending, None
+            if pending is None:
+                self.in_flight -= 1
+        if pending is not None:
+            self.start(*pending)
+
+        if future.cancelled():
+            return
+        try:
+            result, started_at, finished_at = future.result()
+        except Exception as e:
+            with self.lock:
+                self.failed_traces += 1
+            logger.error("Analysis of trace %d failed: %r", trace_id, e)
+            return
+
+        times.update({'queue': started_at - copied_at, 'analysis': finished_at - started_at,
+                      'return': returned_at - finished_at})
+        get_metrics().observe('analysis', times['analysis'])
+        with self.lock:
+            self.analysed_traces += 1
+            for stage, seconds in times.items():
+                self.stage_times[stage].append(seconds)
+            if trace_id < self.last_result_id:
+                # A later trace was analysed first
+                self.dropped_traces += 1
+                return
+            self.last_result_id = trace_id
+
+        if self.on_result is not None:
+            self.on_result(trace_id, result, times)
+
+    def take_buffer(self, nbytes: int) -> SharedMemory:
+        """ Gets a free shared memory buffer of at least nbytes, reusing buffers of earlier traces """
+        with self.lock:
+            buffer = self.free_buffers.pop() if self.free_buffers else None
+        if buffer is not None and buffer.size < nbytes:
+            buffer.close()
+            buffer.unlink()
+            buffer = None
+        if buffer is None:
+            # Leave room for slightly longer traces
+            buffer = SharedMemory(create=True, size=max(nbytes + nbytes // 4, 1))
+        return buffer
+
+    def release_buffer(self, buffer: SharedMemory):
+        with self.lock:
+            if not self.closed:
+                self.free_buffers.append(buffer)
+                return
+        buffer.close()
+        buffer.unlink()
+
+    def stage_timings(self) -> dict:
+        """
+        Gets mean time of each stage over the last traces
+        :return: Dict of stage name to seconds, None for stages not timed yet
+        """
+        with self.lock:
+            return {stage: (sum(times) / len(times) if times else None)
+                    for stage, times in self.stage_times.items()}
+
+    def close(self):
+        """ Stops the worker processes, cancelling traces not being analysed yet, and frees shared memory. """
+        with self.lock:
+            self.closed = True
+            pending, self.pending = self.pending, None
+            buffers, self.free_buffers = self.free_buffers, []
+        if pending is not None:
+            buffers.append(pending[1][0])
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        for buffer in buffers:
+            buffer.close()
+            buffer.unlink()
+
+
+def __analyze_shared_trace__(analyze, buffer_name: str, length: int, dtype: str, has_x_data: bool,
+                             metadata: dict) -> tuple:
+    """
+    Analyses a trace held in shared memory. Runs in a worker process.
+    :return: (result, start time, finish time)
+    """
+    started_at = time.monotonic()
+    buffer = SharedMemory(name=buffer_name)
+    try:
+        result = analyze(__shared_trace_data__(buffer, length, dtype, has_x_data, metadata))
+    finally:
+        try:
+            buffer.close()
+        except BufferError:
+            # Views of the buffer are still referenced, e.g. by the traceback of an exception
+            pass
+    return result, started_at, time.monotonic()
+
+
+def __shared_trace_data__(buffer: SharedMemory, length: int, dtype: str, has_x_data: bool,
+                          metadata: dict) -> TraceData:
+    """ Gets TraceData viewing the arrays in a shared memory buffer """
+    y = np.ndarray(length, dtype=dtype, buffer=buffer.buf)
+    x_data = np.ndarray(length, dtype=np.float64, buffer=buffer.buf, offset=y.nbytes) if has_x_data else None
+    x_start = metadata.pop('x_start')
+    trace_data = TraceData(y, x_data=x_data, dtype=y.dtype, **metadata)
+    if x_data is None:
+        trace_data.x_start = x_start
+    return trace_data
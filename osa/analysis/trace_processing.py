@@ -0,0 +1,216 @@
+import numpy as np
+
+from osa.config import TRACE_AVERAGE_COUNT
+from osa.services.server_requests import TraceData
+from osa.utils.unit_conversions import dbm_to_mw, mw_to_dbm
+
+# Averaging modes
+AVERAGING_OFF = 'off'
+# Mean of the last average_count traces
+AVERAGING_MOVING = 'moving'
+# Exponentially weighted mean, each trace weighted 1 / average_count once average_count traces are in
+AVERAGING_EXPONENTIAL = 'exponential'
+AVERAGING_MODES = (AVERAGING_OFF, AVERAGING_MOVING, AVERAGING_EXPONENTIAL)
+
+
+class MovingAverage:
+    """
+    Mean of the last count traces, kept as a running sum of linear powers.
+    """
+
+    def __init__(self, count: int, length: int):
+        """
+        :param count: Number of traces averaged
+        :param length: Number of points per trace
+        """
+        self.count = count
+        self.traces_mw = np.zeros((count, length))
+        self.sum_mw = np.zeros(length)
+        # Row the next trace is written to
+        self.head = 0
+        self.added = 0
+
+    def reset(self):
+        self.sum_mw.fill(0)
+        self.head = 0
+        self.added = 0
+
+    def add(self, power_mw: np.ndarray):
+        """ Adds a trace in mW, replacing the oldest one once count traces are in """
+        oldest = self.traces_mw[self.head]
+        if self.added == self.count:
+            np.subtract(self.sum_mw, oldest, out=self.sum_mw)
+        np.copyto(oldest, power_mw)
+        np.add(self.sum_mw, oldest, out=self.sum_mw)
+        self.head = (self.head + 1) % self.count
+        self.added = min(self.added + 1, self.count)
+
+        if self.head == 0:
+            # Recompute the sum once per cycle so rounding errors do not build up
+            np.sum(self.traces_mw, axis=0, out=self.sum_mw)
+
+    def mean(self, out: np.ndarray) -> np.ndarray:
+        """ Writes mean power in mW of the traces added to out """
+        return np.divide(self.sum_mw, max(self.added, 1), out=out)
+
+
+class ExponentialAverage:
+    """
+    Exponentially weighted mean of linear powers.
+    The first count traces are weighted equally, so the mean does not depend on the first trace
+    more than on later ones.
+    """
+
+    def __init__(self, count: int, length: int):
+        """
+        :param count: Inverse of the weight of a new trace
+        :param length: Number of points per trace
+        """
+        self.count = count
+        self.mean_mw = np.zeros(length)
+        self.added = 0
+
+    def reset(self):
+        self.added = 0
+
+    def add(self, power_mw: np.ndarray):
+        """
+        Adds a trace in mW
+        :param power_mw: Trace, overwritten with intermediate values
+        """
+        self.added = min(self.added + 1, self.count)
+        # mean += (power - mean) / added
+        np.subtract(power_mw, self.mean_mw, out=power_mw)
+        np.multiply(power_mw, 1 / self.added, out=power_mw)
+        np.add(self.mean_mw, power_mw, out=self.mean_mw)
+
+    def mean(self, out: np.ndarray) -> np.ndarray:
+        """ Writes mean power in mW of the traces added to out """
+        np.copyto(out, self.mean_mw)
+        return out
+
+
+class TraceProcessor:
+    """
+    Averages traces and keeps their max-hold and min-hold.
+    Averages are taken of linear powers in mW and converted back to dBm.
+    Buffers are allocated when the sweep changes and reused for every trace of the sweep,
+    so processing a trace costs O(points) without allocating arrays.
+    All accumulators restart when the sweep changes.
+    """
+
+    def __init__(self, averaging: str = AVERAGING_OFF, average_count: int = TRACE_AVERAGE_COUNT,
+                 max_hold: bool = False, min_hold: bool = False):
+        """
+        :param averaging: One of AVERAGING_MODES
+        :param average_count: Number of traces averaged
+        :param max_hold: If True, keeps the maximum of each point over all traces
+        :param min_hold: If True, keeps the minimum of each point over all traces
+        :raises:
+            ValueError - raised if averaging is not one of AVERAGING_MODES
+        """
+        self.averaging = AVERAGING_OFF
+        self.average_count = average_count
+        self.max_hold_enabled = max_hold
+        self.min_hold_enabled = min_hold
+        self.sweep = None
+        self.average = None
+        self.power_mw = None
+        self.average_dbm = None
+        self.max_hold = None
+        self.min_hold = None
+        self.set_averaging(averaging, average_count)
+
+    def set_averaging(self, mode: str, count: int = None):
+        """
+        Sets averaging mode, restarting the average
+        :param mode: One of AVERAGING_MODES
+        :param count: Number of traces averaged, unchanged if None
+        :raises:
+            ValueError - raised if mode is not one of AVERAGING_MODES or count is less than 1
+        """
+        if mode not in AVERAGING_MODES:
+            raise ValueError(f"Unknown averaging mode {mode}.")
+        if count is not None:
+            if count < 1:
+                raise ValueError("At least one trace must be averaged.")
+            self.average_count = count
+        self.averaging = mode
+        self.average = None
+        self.allocate_average()
+
+    def set_max_hold(self, enabled: bool):
+        """ Enables or disables max-hold, restarting it """
+        self.max_hold_enabled = enabled
+        self.max_hold = None
+        self.allocate_holds()
+
+    def set_min_hold(self, enabled: bool):
+        """ Enables or disables min-hold, restarting it """
+        self.min_hold_enabled = enabled
+        self.min_hold = None
+        self.allocate_holds()
+
+    def reset(self):
+        """ Restarts the average and holds from the next trace """
+        if self.average is not None:
+            self.average.reset()
+        if self.max_hold is not None:
+            self.max_hold.fill(-np.inf)
+        if self.min_hold is not None:
+            self.min_hold.fill(np.inf)
+
+    def process(self, trace_data: TraceData) -> TraceData:
+        """
+        Adds a trace to the average and holds.
+        :param trace_data: Trace with y-values in dBm
+        :return: The averaged trace, or trace_data if averaging is off. The averaged
+            trace's values are overwritten by the next call.
+        """
+        if trace_data.sweep != self.sweep:
+            self.sweep = trace_data.sweep
+            self.average = self.power_mw = self.average_dbm = None
+            self.max_hold = self.min_hold = None
+            self.allocate_average()
+            self.allocate_holds()
+
+        y = trace_data.data
+        # fmax and fmin ignore NaN values
+        if self.max_hold is not None:
+            np.fmax(self.max_hold, y, out=self.max_hold)
+        if self.min_hold is not None:
+            np.fmin(self.min_hold, y, out=self.min_hold)
+
+        if self.average is None:
+            return trace_data
+
+        dbm_to_mw(y, out=self.power_mw)
+        self.average.add(self.power_mw)
+        self.average.mean(out=self.average_dbm)
+        # A mean power of 0 mW is -inf dBm
+        with np.errstate(divide='ignore'):
+            mw_to_dbm(self.average_dbm, out=self.average_dbm)
+        return trace_data.with_data(self.average_dbm)
+
+    @property
+    def length(self):
+        return None if self.sweep is None else self.sweep[0]
+
+    def allocate_average(self):
+        """ Allocates average buffers for the current sweep, if averaging is on """
+        if self.averaging == AVERAGING_OFF or self.length is None:
+            return
+        average_type = MovingAverage if self.averaging == AVERAGING_MOVING else ExponentialAverage
+        self.average = average_type(self.average_count, self.length)
+        if self.power_mw is None:
+            self.power_mw = np.empty(self.length)
+            self.average_dbm = np.empty(self.length)
+
+    def allocate_holds(self):
+        """ Allocates hold buffers for the current sweep, if enabled """
+        if self.length is None:
+            return
+        if self.max_hold_enabled and self.max_hold is None:
+            self.max_hold = np.full(self.length, -np.inf)
+        if self.min_hold_enabled and self.min_hold is None:
+            self.min_hold = np.full(self.length, np.inf)
@@ -0,0 +1,331 @@
+"""
+Headless acquisition and export of recordings, for unattended use without a display.
+Only uses osa.services, osa.recording, osa.analysis and osa.export, so pyqtgraph is never imported,
+and PyQt5 only to draw exported images.
+
+Run from the project root with: python -m osa.cli acquire --help
+"""
+import argparse
+import contextlib
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+
+import numpy as np
+
+from osa.config import ACQUISITION_RATE, EXPORT_FORMATS, LOG_LEVEL, METRICS_EXPORT_INTERVAL
+from osa.exceptions.osa_server_exception import OsaServerException
+from osa.export.plot_exporter import FORMATS, IMAGE_FORMATS, PlotExporter, export_recording
+from osa.recording.recorder import Recorder
+from osa.recording.trace_store import TraceStoreReader
+from osa.recording.trace_stream import STREAM_FORMATS, BinaryTraceWriter, NdjsonTraceWriter
+from osa.services.limits_cache import LimitsCache
+from osa.services.osa_session import OsaSession, set_session
+from osa.services.rate_controller import RateController
+from osa.services.request_error_manager import CircuitBreaker, RetryPolicy, request_until_success
+from osa.services.server_requests import get_trace
+from osa.utils.log import configure_logging
+from osa.utils.metrics import get_metrics
+
+# y-value types traces can be acquired, streamed and recorded as
+DTYPES = {'float64': np.float64, 'float32': np.float32}
+
+logger = logging.getLogger(__name__)
+
+
+class HeadlessAcquisition:
+    """
+    Acquires traces at a target rate and passes them to writers and a recorder.
+    Frames are scheduled against a fixed timeline rather than from the end of the last frame,
+    so the rate does not drift however long acquisition runs. Frames that could not start on
+    time are skipped rather than made up, and failed acquisitions are counted and do not stop
+    acquisition. stop() may be called from any thread or a signal handler.
+    """
+
+    def __init__(self, fetch_trace=get_trace, x_lims_cache: LimitsCache = None,
+                 retry_policy: RetryPolicy = None, circuit_breaker: CircuitBreaker = None,
+                 writers: list = (), recorder: Recorder = None, analyze=None,
+                 rate: float = ACQUISITION_RATE, count: int = None, duration: float = None,
+                 metrics_path: str = None, metrics_interval: float = METRICS_EXPORT_INTERVAL,
+                 clock=time.monotonic):
+        """
+        :param fetch_trace: Function returning a TraceData
+        :param x_lims_cache: Cache of the [start, stop] x limits, requested with get_x_lims by default
+        :param retry_policy: How acquisitions are retried
+        :param circuit_breaker: Breaker pausing requests while the server keeps failing
+        :param writers: Trace writers, e.g. NdjsonTraceWriter, each trace is written to
+        :param recorder: Recorder each trace is recorded with, if any
+        :param analyze: Function taking a TraceData and returning its channels, if traces are analysed
+        :param rate: Target rate in Hz, 0 to acquire as fast as possible
+        :param count: Number of traces to acquire, None to acquire until stopped
+        :param duration: Seconds to acquire for, None to acquire until stopped
+        :param metrics_path: File metrics are written to every metrics_interval seconds and when
+            acquisition finishes, if any
+        :param metrics_interval: Seconds between writes of the metrics file
+        :param clock: Function returning the current time in seconds
+        """
+        self.fetch_trace = fetch_trace
+        self.x_lims_cache = x_lims_cache or LimitsCache()
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.circuit_breaker = circuit_breaker or CircuitBreaker()
+        self.writers = list(writers)
+        self.recorder = recorder
+        self.analyze = analyze
+        self.rate_controller = RateController(rate, clock=clock)
+        self.count = count
+        self.duration = duration
+        self.metrics_path = metrics_path
+        self.metrics_interval = metrics_interval
+        self.clock = clock
+        self.stop_event = threading.Event()
+        self.acquired_traces = 0
+        self.metrics_written_at = None
+
+    def acquire_once(self):
+        """
+        Requests a trace, and its x limits if the server did not send x-values
+        :return: TraceData
+        """
+        trace_data = self.fetch_trace()
+        if trace_data.x_data is None:
+            trace_data.x_start = self.x_lims_cache.get(trace_data)[0]
+        return trace_data
+
+    def acquire_frame(self) -> bool:
+        """
+        Acquires one trace, analyses it if enabled and passes it on
+        :return: False if no trace was acquired
+        """
+        try:
+            trace_data = request_until_success(self.acquire_once, policy=self.retry_policy,
+                                               breaker=self.circuit_breaker)
+        except OsaServerException as e:
+            logger.warning("Acquisition failed: %s", e)
+            return False
+        recorded_at = time.time()
+
+        channels = None if self.analyze is None else self.analyze(trace_data)
+        for writer in self.writers:
+            writer.write(trace_data, recorded_at, channels)
+        if self.recorder is not None:
+            self.recorder.record(trace_data, recorded_at)
+        self.acquired_traces += 1
+        return True
+
+    def run(self) -> int:
+        """
+        Acquires traces until count traces were acquired, duration has passed or stop() is called
+        :return: Number of traces acquired
+        """
+        started_at = next_frame_at = self.clock()
+        while not self.stop_event.is_set() and not self.finished(next_frame_at - started_at):
+            self.rate_controller.frame_started()
+            success = self.acquire_frame()
+            self.rate_controller.frame_finished(success)
+            self.update_metrics(success)
+
+            now = self.clock()
+            next_frame_at += self.rate_controller.interval
+            if next_frame_at < now:
+                # Frames that could not start on time are skipped, not made up
+                next_frame_at = now
+            if self.finished(next_frame_at - started_at):
+                break
+            self.stop_event.wait(next_frame_at - now)
+        if self.metrics_path is not None:
+            self.write_metrics()
+        return self.acquired_traces
+
+    def update_metrics(self, success: bool):
+        """ Counts a finished frame and writes the metrics file when it is due """
+        metrics = get_metrics()
+        metrics.increment('frames')
+        if not success:
+            metrics.increment('failed_frames')
+        metrics.set_gauge('frame_rate', self.rate_controller.achieved_rate)
+        if self.metrics_path is None:
+            return
+        if self.metrics_written_at is None or self.clock() - self.metrics_written_at >= self.metrics_interval:
+            self.write_metrics()
+
+    def write_metrics(self):
+        self.metrics_written_at = self.clock()
+        try:
+            get_metrics().write(self.metrics_path)
+        except OSError as e:
+            logger.error("Failed to write metrics to %s: %s", self.metrics_path, e)
+
+    def finished(self, elapsed: float) -> bool:
+        """ :param elapsed: Seconds from the start of acquisition to the next frame """
+        return ((self.count is not None and self.acquired_traces >= self.count)
+                or (self.duration is not None and elapsed >= self.duration))
+
+    def stop(self):
+        self.stop_event.set()
+
+    def summary(self) -> str:
+        rate_controller = self.rate_controller
+        return (f"Acquired {self.acquired_traces} traces at {rate_controller.achieved_rate:.2f} Hz, "
+                f"{rate_controller.skipped_frames} frames skipped, {rate_controller.failed_frames} failed.")
+
+
+def create_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='python -m osa.cli', description="Headless OSA acquisition and export.")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    acquire = commands.add_parser(
+        'acquire', help="Acquire traces and stream them to stdout or record them.",
+        description="Acquire traces and stream them to stdout or record them. Log messages are "
+                    "written to stderr. Stops after --count traces, after --duration seconds, "
+                    "or on SIGINT or SIGTERM.")
+    acquire.add_argument('--rate', type=float, default=ACQUISITION_RATE,
+                         help="Target rate in Hz, 0 to acquire as fast as the server responds "
+                              "(default: %(default)s)")
+    acquire.add_argument('--count', type=int, help="Number of traces to acquire")
+    acquire.add_argument('--duration', type=float, help="Seconds to acquire for")
+    acquire.add_argument('--format', choices=STREAM_FORMATS + ('none',),
+                         help="Format traces are written to stdout in "
+                              "(default: ndjson, or none when recording)")
+    acquire.add_argument('--record', metavar='DIRECTORY', help="Record traces to a trace store directory")
+    acquire.add_argument('--dtype', choices=tuple(DTYPES), default='float64',
+                         help="Type y-values are acquired, streamed and recorded as (default: %(default)s)")
+    acquire.add_argument('--analyze', action='store_true',
+                         help="Find the channels of each trace, added to ndjson output")
+    acquire.add_argument('--url', help="URL of the OSA server commands")
+    acquire.add_argument('--metrics', metavar='FILE',
+                         help="Record request, parse and retry metrics and write them to FILE, as JSON if it "
+                              f"ends with .json, else as Prometheus text, every {METRICS_EXPORT_INTERVAL} seconds")
+    acquire.add_argument('--log-level', default=LOG_LEVEL, choices=('DEBUG', 'INFO', 'WARNING', 'ERROR'),
+                         help="Lowest level of log messages written to stderr (default: %(default)s)")
+    acquire.add_argument('--log-format', choices=('text', 'json'), default='text',
+                         help="Write log messages as text or as JSON lines (default: %(default)s)")
+
+    export = commands.add_parser(
+        'export', help="Export the traces of a recording as images and data files.",
+        description="Export the traces of a recording as images and data files, one set of files per "
+                    "trace named after its instrument and time. Images are drawn without a display.")
+    export.add_argument('recording', help="Trace store directory of the recording")
+    export.add_argument('--output', metavar='DIRECTORY', default='.',
+                        help="Directory files are written to (default: %(default)s)")
+    export.add_argument('--formats', nargs='+', choices=FORMATS, default=list(EXPORT_FORMATS),
+                        help="Formats each trace is written in (default: %(default)s)")
+    export.add_argument('--every', type=int, default=1, help="Export every Nth trace (default: %(default)s)")
+    export.add_argument('--frequency', action='store_true', help="Draw x-axes in THz instead of nm")
+    return parser
+
+
+def acquire(args, stdout) -> int:
+    """
+    Runs the acquire command
+    :param args: Parsed arguments
+    :param stdout: Binary stream traces are written to
+    :return: Exit code
+    """
+    configure_logging(args.log_level, structured=args.log_format == 'json')
+    if args.metrics:
+        get_metrics().set_enabled(True)
+    if args.url:
+        set_session(OsaSession(api_url=args.url))
+    dtype = DTYPES[args.dtype]
+    output_format = args.format or ('none' if args.record else 'ndjson')
+
+    writers = []
+    if output_format == 'ndjson':
+        writers.append(NdjsonTraceWriter(stdout))
+    elif output_format == 'binary':
+        writers.append(BinaryTraceWriter(stdout, dtype=dtype))
+    analyze = None
+    if args.analyze:
+        from osa.analysis.channel_analysis import analyze_channels
+        analyze = analyze_channels
+    try:
+        recorder = Recorder(args.record, dtype=dtype) if args.record else None
+    except (OSError, ValueError) as e:
+        print(f"Cannot record to {args.record}: {e}")
+        return 1
+
+    acquisition = HeadlessAcquisition(fetch_trace=lambda: get_trace(dtype=dtype), writers=writers,
+                                      recorder=recorder, analyze=analyze, rate=args.rate,
+                                      count=args.count, duration=args.duration, metrics_path=args.metrics)
+    previous_handlers = {signum: signal.signal(signum, lambda *_: acquisition.stop())
+                         for signum in (signal.SIGINT, signal.SIGTERM)}
+    try:
+        acquisition.run()
+    except BrokenPipeError:
+        # Reader of stdout went away, e.g. head. Stops Python failing to flush stdout at exit.
+        os.dup2(os.open(os.devnull, os.O_WRONLY), stdout.fileno())
+    finally:
+        for signum, handler in previous_handlers.items():
+            signal.signal(signum, handler)
+        if recorder is not None:
+            recorder.stop()
+        print(acquisition.summary())
+
+    if recorder is not None and recorder.error is not None:
+        return 1
+    return 0 if acquisition.acquired_traces or acquisition.count == 0 else 1
+
+
+def export(args) -> int:
+    """
+    Runs the export command
+    :param args: Parsed arguments
+    :return: Exit code
+    """
+    configure_logging()
+    if args.every < 1:
+        print("--every must be at least 1.")
+        return 1
+    try:
+        reader = TraceStoreReader(args.recording)
+    except (OSError, ValueError) as e:
+        print(f"Cannot open recording {args.recording}: {e}")
+        return 1
+    try:
+        os.makedirs(args.output, exist_ok=True)
+    except OSError as e:
+        reader.close()
+        print(f"Cannot export to {args.output}: {e}")
+        return 1
+
+    app = None
+    if any(export_format in IMAGE_FORMATS for export_format in args.formats):
+        # Images are drawn with QPainter, which needs an application for fonts, but no display.
+        # It is kept referenced until the export thread has finished drawing.
+        os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+        from PyQt5.QtGui import QGuiApplication
+        app = QGuiApplication.instance() or QGuiApplication(sys.argv[:1])
+
+    exporter = PlotExporter()
+    stop_event = threading.Event()
+    previous_handlers = {signum: signal.signal(signum, lambda *_: stop_event.set())
+                         for signum in (signal.SIGINT, signal.SIGTERM)}
+    try:
+        queued = export_recording(reader, exporter, args.output, args.formats, every=args.every,
+                                  display_frequency=args.frequency, stop_event=stop_event)
+    finally:
+        for signum, handler in previous_handlers.items():
+            signal.signal(signum, handler)
+        exporter.stop()
+        reader.close()
+    print(f"Exported {exporter.exported_snapshots} of {queued} traces to {args.output}"
+          + (f", failed to export {exporter.failed_snapshots}." if exporter.failed_snapshots else "."))
+    return 0 if exporter.error is None else 1
+
+
+def main(argv: list = None) -> int:
+    args = create_parser().parse_args(argv)
+    stdout = sys.stdout.buffer
+    # Messages must not mix with traces written to stdout
+    with contextlib.redirect_stdout(sys.stderr):
+        if args.command == 'acquire':
+            return acquire(args, stdout)
+        if args.command == 'export':
+            return export(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1 +1,141 @@
-API_URL = "http://flaskosa.herokuapp.com/cmd/"
\ No newline at end of file
+API_URL = "http://flaskosa.herokuapp.com/cmd/"
+
+# Maximum number of keep-alive connections pooled per OSA server
+CONNECTION_POOL_SIZE = 4
+
+# Request timeouts in seconds for each OSA console command
+COMMAND_TIMEOUTS = {
+    'TRACE': 1,
+    'LIM': 2,
+}
+
+# Request timeout in seconds for commands not listed in COMMAND_TIMEOUTS
+DEFAULT_COMMAND_TIMEOUT = 2
+
+# Draw large traces downsampled to the plot width, keeping the min and max of each pixel
+PLOT_DOWNSAMPLING_ENABLED = True
+
+# Points drawn per horizontal pixel of the plot when downsampling
+PLOT_DOWNSAMPLING_POINTS_PER_PIXEL = 2
+
+# Seconds for which x limits from a LIM request are reused before requesting them again
+X_LIMS_CACHE_TTL = 60
+
+# Seconds allowed for requesting a trace and its x limits in one acquisition cycle
+ACQUISITION_DEADLINE = 3
+
+# Retries of failed requests: delay before retry n is
+# min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** (n - 1)) seconds, shortened by up to RETRY_JITTER of itself
+RETRY_MAX_ATTEMPTS = 5
+RETRY_BASE_DELAY = 0.05
+RETRY_MAX_DELAY = 1
+RETRY_JITTER = 0.5
+
+# Consecutive failed requests after which requests stop being sent to the server
+CIRCUIT_BREAKER_FAILURE_THRESHOLD = 5
+
+# Seconds to wait before sending a probe request to a server that kept failing
+CIRCUIT_BREAKER_RESET_TIMEOUT = 10
+
+# Target rate in Hz of continuous acquisition, 0 to acquire as fast as possible
+ACQUISITION_RATE = 1
+
+# Recording: a new chunk file is started once the current one reaches either limit
+RECORDING_MAX_CHUNK_BYTES = 256 * 1024 * 1024
+RECORDING_MAX_CHUNK_SECONDS = 3600
+
+# Recording: index records held back until their traces are flushed, at most this many, so readers
+# of a store being recorded never see a record before the values it points to
+RECORDING_INDEX_BATCH = 64
+
+# Maximum number of traces waiting to be written. Traces arriving when it is full are dropped.
+RECORDING_QUEUE_SIZE = 256
+
+# Longest pause in seconds between replayed traces, so gaps in a recording are skipped quickly
+PLAYBACK_MAX_FRAME_DELAY = 2
+
+# Waterfall: number of traces shown, and maximum number of columns each trace is reduced to.
+# The waterfall holds 2 * rows * columns float32 values, 3.3 MB with the defaults.
+WATERFALL_ROWS = 200
+WATERFALL_MAX_COLUMNS = 2048
+
+# Number of traces averaged by default when averaging is enabled
+TRACE_AVERAGE_COUNT = 10
+
+# Channel analysis: minimum height of a channel above the valleys separating it from its neighbours, in dB
+CHANNEL_MIN_PROMINENCE_DB = 10
+
+# Channel analysis: minimum spacing between channels in nm, half the 50 GHz DWDM grid
+CHANNEL_MIN_SPACING_NM = 0.2
+
+# Channel analysis: width in nm of the window averaged to measure the noise floor in each valley
+CHANNEL_NOISE_WINDOW_NM = 0.05
+
+# Bandwidth in nm OSNR is referred to
+OSNR_REFERENCE_BANDWIDTH_NM = 0.1
+
+# Number of worker processes analysing traces. At most this many traces are analysed at once,
+# and while all workers are busy only the latest trace waits for one.
+ANALYSIS_WORKERS = 2
+
+# Address the local OSA server simulator listens on by default (python -m osa.simulator.server)
+SIMULATOR_HOST = '127.0.0.1'
+SIMULATOR_PORT = 8000
+
+# Default sweep of simulated traces: number of points and wavelength range in nm
+SIMULATOR_POINTS = 10000
+SIMULATOR_START_NM = 1525
+SIMULATOR_STOP_NM = 1565
+
+# Default channel layout of simulated traces, centred in the sweep
+SIMULATOR_CHANNEL_COUNT = 40
+SIMULATOR_CHANNEL_SPACING_NM = 0.8
+
+# Seconds the simulator waits before answering a request it makes time out
+SIMULATOR_TIMEOUT_SECONDS = 5
+
+# Level of log messages shown: DEBUG also shows a message for every trace requested and plotted
+LOG_LEVEL = 'INFO'
+
+# Instrumentation of fetching, parsing, retrying, rendering and exporting traces. Disabled by default,
+# and enabled in the GUI by showing the performance overlay or in the CLI with --metrics.
+METRICS_ENABLED = False
+
+# Number of most recent timings rolling percentiles are computed over
+METRICS_WINDOW = 1000
+
+# Seconds between writes of the metrics file given with --metrics
+METRICS_EXPORT_INTERVAL = 10
+
+# Instruments acquired from in parallel by the multi-instrument view (python -m osa.gui.instrument_window).
+# Each entry has a 'name' and a 'url' of its console commands, and optionally 'timeouts' overriding
+# COMMAND_TIMEOUTS and 'rate' in Hz overriding ACQUISITION_RATE for that instrument,
+# e.g. {'name': 'rack1-osa1', 'url': 'http://10.0.1.11/cmd/', 'timeouts': {'TRACE': 3}, 'rate': 2}.
+# A JSON file with a list of such entries can be given on the command line instead.
+INSTRUMENTS = [
+    {'name': 'OSA', 'url': API_URL},
+]
+
+# Maximum number of instruments requested from at once. Each instrument uses at most one at a time,
+# so instruments only wait for each other when there are more of them than workers.
+INSTRUMENT_WORKERS = 32
+
+# Milliseconds between redraws of the multi-instrument view. Only the latest trace of each
+# instrument is drawn, however many arrive in between.
+INSTRUMENT_REFRESH_INTERVAL = 100
+
+# Milliseconds each redraw of the multi-instrument view may spend updating plots. Instruments
+# left over are drawn first on the next redraw, so the GUI keeps responding with many instruments.
+INSTRUMENT_REFRESH_BUDGET = 30
+
+# Plot export: formats written by default, images (png, svg) and raw data sidecars (csv, npy)
+EXPORT_FORMATS = ('png', 'csv')
+
+# Width and height in pixels of exported images
+EXPORT_IMAGE_SIZE = (1200, 700)
+
+# Maximum number of plot snapshots waiting to be exported. Snapshots arriving when it is full are dropped.
+EXPORT_QUEUE_SIZE = 16
+
+# Auto export exports a snapshot of the plot every this many traces of continuous acquisition
+EXPORT_EVERY_N_TRACES = 10
@@ -0,0 +1,8 @@
+from osa.exceptions.osa_server_exception import OsaServerException
+
+
+class CircuitOpen(OsaServerException):
+    """
+    Raised when a request is not sent because recent requests to OSA server kept failing
+    """
+    pass
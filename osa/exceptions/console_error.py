@@ -0,0 +1,8 @@
+from osa.exceptions.osa_server_exception import OsaServerException
+
+
+class ConsoleError(OsaServerException):
+    """
+    Raised when OSA server replies to a console command with an error
+    """
+    pass
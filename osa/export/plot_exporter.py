@@ -0,0 +1,225 @@
+import contextlib
+import itertools
+import logging
+import os
+import queue
+import re
+import threading
+
+import numpy as np
+
+from osa.config import EXPORT_FORMATS, EXPORT_IMAGE_SIZE, EXPORT_QUEUE_SIZE
+from osa.export.snapshot import PlotSnapshot
+from osa.utils.metrics import get_metrics
+from osa.utils.x_axis_cache import XAxisCache
+
+# Formats snapshots are exported in: images of the plot and raw data sidecars
+IMAGE_FORMATS = ('png', 'svg')
+DATA_FORMATS = ('csv', 'npy')
+FORMATS = IMAGE_FORMATS + DATA_FORMATS
+
+# Rows of CSV sidecars formatted at once, bounding the memory used for the text of large traces
+CSV_BLOCK_ROWS = 65536
+
+logger = logging.getLogger(__name__)
+
+
+class PlotExporter:
+    """
+    Exports plot snapshots as images and raw data sidecars from a background thread.
+    submit() never blocks unless asked to: if exports fall behind and the queue is full,
+    the snapshot is dropped and counted in dropped_snapshots, so exporting never stalls acquisition.
+    All files of a snapshot share a name made from its title, numbered if files of an earlier
+    snapshot already have it, so snapshots with the same title never overwrite each other.
+    """
+
+    # Queued to stop the export thread
+    __stop__ = object()
+
+    def __init__(self, image_size: tuple = EXPORT_IMAGE_SIZE, queue_size: int = EXPORT_QUEUE_SIZE, on_exported=None):
+        """
+        :param image_size: (width, height) of images in pixels
+        :param queue_size: Maximum number of snapshots waiting to be exported
+        :param on_exported: Function called from the export thread with the list of paths written
+            for each snapshot, if any
+        """
+        self.image_size = image_size
+        self.on_exported = on_exported
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.exported_snapshots = 0
+        self.dropped_snapshots = 0
+        self.failed_snapshots = 0
+        self.error = None
+        self.thread = threading.Thread(target=self.export_snapshots, name='osa-exporter', daemon=True)
+        self.thread.start()
+
+    def submit(self, snapshot: PlotSnapshot, directory: str, formats=EXPORT_FORMATS, block: bool = False) -> bool:
+        """
+        Queues a snapshot to be exported
+        :param snapshot: Snapshot of the plot
+        :param directory: Directory files are written to
+        :param formats: Formats written, from FORMATS
+        :param block: True to wait for room in the queue rather than drop the snapshot, e.g. for batch exports.
+            Only waits while the export thread is running.
+        :return: False if the snapshot was dropped
+        :raises:
+            ValueError - raised if a format is not in FORMATS
+        """
+        __check_formats__(formats)
+        if self.put((snapshot, directory, tuple(formats)), block):
+            return True
+        self.dropped_snapshots += 1
+        return False
+
+    def put(self, item, block: bool) -> bool:
+        """
+        Queues an item, waiting for room only while the export thread can still make some
+        :return: False if the queue is full
+        """
+        while True:
+            try:
+                self.queue.put(item, block=block, timeout=0.1 if block else None)
+                return True
+            except queue.Full:
+                if not block or not self.thread.is_alive():
+                    return False
+
+    def export_snapshots(self):
+        """
+        Exports queued snapshots until stopped.
+        A snapshot failing to be exported is counted in failed_snapshots and the rest are still exported,
+        so the queue keeps draining and submit() and stop() return.
+        """
+        while True:
+            item = self.queue.get()
+            if item is PlotExporter.__stop__:
+                break
+            try:
+                paths = self.export(*item)
+                self.exported_snapshots += 1
+                if self.on_exported is not None:
+                    self.on_exported(paths)
+            except Exception as e:
+                if self.error is None:
+                    logger.error("Failed to export plot to %s: %s", item[1], e)
+                self.error = e
+                self.failed_snapshots += 1
+
+    def export(self, snapshot: PlotSnapshot, directory: str, formats=EXPORT_FORMATS) -> list:
+        """
+        Writes a snapshot in each format, on the calling thread.
+        If any file fails, the files of the snapshot written so far are removed, so its name is free again.
+        :return: Paths of the files written
+        :raises:
+            OSError - raised if a file cannot be written
+        """
+        __check_formats__(formats)
+        with get_metrics().timer('export'):
+            stem = reserve_file_stem(directory, snapshot.title, formats)
+            paths = []
+            try:
+                for export_format in formats:
+                    path = f'{stem}.{export_format}'
+                    if export_format in IMAGE_FORMATS:
+                        # Qt is only imported once images are exported, so data sidecars can be written headless
+                        from osa.export import renderer
+                        render = renderer.render_png if export_format == 'png' else renderer.render_svg
+                        render(snapshot, path, self.image_size)
+                    elif export_format == 'csv':
+                        write_csv(snapshot, path)
+                    else:
+                        write_npy(snapshot, path)
+                    paths.append(path)
+            except BaseException:
+                # Includes the empty file reserving the name and a partly written file
+                for export_format in formats:
+                    with contextlib.suppress(FileNotFoundError):
+                        os.remove(f'{stem}.{export_format}')
+                raise
+        logger.debug("Exported plot to %s", ', '.join(paths))
+        return paths
+
+    def stop(self):
+        """ Exports remaining queued snapshots, then stops the export thread """
+        self.put(PlotExporter.__stop__, block=True)
+        self.thread.join()
+
+
+def reserve_file_stem(directory: str, title: str, extensions) -> str:
+    """
+    Gets a path without extension for the files of a snapshot, such that no file with it and
+    any of the extensions exists yet, and reserves it by creating the file with the first extension.
+    :param directory: Directory of the files
+    :param title: Plot title the name is made from
+    :param extensions: Extensions of the files
+    :return: '<directory>/<title>' or, if taken, '<directory>/<title>-<n>' with the lowest free n
+    """
+    # ':' and path separators are not allowed in file names
+    name = re.sub(r'[<>:"/\\|?*\x00-\x1f]', '-', title).strip() or 'plot'
+    for n in itertools.count():
+        stem = os.path.join(directory, name if n == 0 else f'{name}-{n}')
+        if any(os.path.exists(f'{stem}.{extension}') for extension in extensions[1:]):
+            continue
+        try:
+            os.close(os.open(f'{stem}.{extensions[0]}', os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        except FileExistsError:
+            continue
+        return stem
+
+
+def write_csv(snapshot: PlotSnapshot, path: str):
+    """
+    Writes the raw data of a snapshot as CSV, one row per point with a header of column names.
+    Blocks of rows are formatted with a single % operation, several times faster than np.savetxt,
+    which formats each row separately.
+    """
+    columns = snapshot.data_columns()
+    data = np.column_stack(list(columns.values()))
+    row_format = ','.join(['%.10g'] * data.shape[1]) + '\n'
+    with open(path, 'w') as f:
+        f.write(','.join(columns) + '\n')
+        for start in range(0, len(data), CSV_BLOCK_ROWS):
+            block = data[start:start + CSV_BLOCK_ROWS]
+            f.write((row_format * len(block)) % tuple(block.ravel().tolist()))
+
+
+def write_npy(snapshot: PlotSnapshot, path: str):
+    """ Writes the raw data of a snapshot as a structured array with one field per column """
+    columns = snapshot.data_columns()
+    data = np.empty(len(snapshot.y), dtype=[(name, np.float64) for name in columns])
+    for name, values in columns.items():
+        data[name] = values
+    np.save(path, data)
+
+
+def export_recording(reader, exporter: PlotExporter, directory: str, formats=EXPORT_FORMATS, every: int = 1,
+                     display_frequency: bool = False, stop_event: threading.Event = None) -> int:
+    """
+    Exports traces of a recorded session, waiting for room in the exporter's queue so none is dropped
+    :param reader: TraceStoreReader of the session
+    :param exporter: Exporter writing the files
+    :param directory: Directory files are written to
+    :param formats: Formats written, from FORMATS
+    :param every: Export every this many traces, starting with the first
+    :param display_frequency: True to draw x-axes as frequencies
+    :param stop_event: Event stopping the export early when set, if any
+    :return: Number of traces queued for export
+    """
+    x_axis_cache = XAxisCache()
+    queued = 0
+    for position in range(0, len(reader), every):
+        if stop_event is not None and stop_event.is_set():
+            break
+        snapshot = PlotSnapshot.from_trace(reader[position], display_frequency=display_frequency,
+                                           x_axis_cache=x_axis_cache)
+        if not exporter.submit(snapshot, directory, formats, block=True):
+            # The export thread is no longer running
+            break
+        queued += 1
+    return queued
+
+
+def __check_formats__(formats):
+    unknown = [export_format for export_format in formats if export_format not in FORMATS]
+    if unknown or not formats:
+        raise ValueError(f"Export formats must be some of {', '.join(FORMATS)}, got {', '.join(formats)}.")
@@ -0,0 +1,214 @@
+"""
+Draws plot snapshots with QPainter onto images and SVG files.
+QImage and QSvgGenerator, unlike widgets, may be painted on any thread, so snapshots are drawn
+away from the GUI thread. A QGuiApplication must exist, for fonts.
+"""
+import math
+
+import numpy as np
+from PyQt5.QtCore import QPointF, QRectF, QSize, Qt
+from PyQt5.QtGui import QColor, QFont, QImage, QPainter, QPainterPath, QPen
+from PyQt5.QtSvg import QSvgGenerator
+
+from osa.config import EXPORT_IMAGE_SIZE
+from osa.export.snapshot import TRACE_COLOR, PlotSnapshot
+from osa.utils.downsampling import MinMaxPyramid, visible_range
+
+# Margins in pixels around the plot area, left for tick labels and axis labels
+MARGIN_LEFT = 80
+MARGIN_RIGHT = 20
+MARGIN_TOP = 40
+MARGIN_BOTTOM = 60
+
+# Single letter colours, as accepted by pyqtgraph
+COLORS = {'r': (255, 0, 0), 'g': (0, 255, 0), 'b': (0, 0, 255), 'c': (0, 255, 255),
+          'm': (255, 0, 255), 'y': (255, 255, 0), 'k': (0, 0, 0), 'w': (255, 255, 255)}
+
+# Qt's PNG quality, from 0 (smallest, slowest) to 100 (uncompressed). The default spends most of an export
+# compressing: 80 saves over twice as fast for files about 40 % larger.
+PNG_QUALITY = 80
+
+BACKGROUND_COLOR = QColor(0, 0, 0)
+FOREGROUND_COLOR = QColor(200, 200, 200)
+GRID_COLOR = QColor(255, 255, 255, 40)
+
+
+def render_png(snapshot: PlotSnapshot, path: str, size: tuple = EXPORT_IMAGE_SIZE):
+    """
+    Draws a snapshot to a PNG file
+    :param size: (width, height) of the image in pixels
+    :raises:
+        OSError - raised if the image cannot be written
+    """
+    image = QImage(size[0], size[1], QImage.Format_RGB32)
+    painter = QPainter(image)
+    try:
+        paint_plot(painter, snapshot, *size)
+    finally:
+        painter.end()
+    if not image.save(path, 'PNG', PNG_QUALITY):
+        raise OSError(f"Cannot write image {path}")
+
+
+def render_svg(snapshot: PlotSnapshot, path: str, size: tuple = EXPORT_IMAGE_SIZE):
+    """
+    Draws a snapshot to an SVG file
+    :param size: (width, height) of the drawing in pixels
+    :raises:
+        OSError - raised if the file cannot be written
+    """
+    generator = QSvgGenerator()
+    generator.setFileName(path)
+    generator.setSize(QSize(*size))
+    generator.setViewBox(QRectF(0, 0, *size))
+    generator.setTitle(snapshot.title)
+    painter = QPainter()
+    if not painter.begin(generator):
+        raise OSError(f"Cannot write image {path}")
+    try:
+        paint_plot(painter, snapshot, *size)
+    finally:
+        painter.end()
+
+
+def paint_plot(painter: QPainter, snapshot: PlotSnapshot, width: int, height: int):
+    """ Draws title, axes with grid and tick labels, trace, overlays and markers of a snapshot """
+    painter.fillRect(0, 0, width, height, BACKGROUND_COLOR)
+    plot_rect = QRectF(MARGIN_LEFT, MARGIN_TOP, width - MARGIN_LEFT - MARGIN_RIGHT,
+                       height - MARGIN_TOP - MARGIN_BOTTOM)
+    x_range = snapshot.x_range or __finite_range__(snapshot.x)
+    y_range = snapshot.y_range or __padded__(__finite_range__(
+        np.concatenate([snapshot.y] + [values for values, color in snapshot.overlays.values()])))
+
+    def to_pixels(x, y):
+        x_fraction = (np.asarray(x, dtype=np.float64) - x_range[0]) / (x_range[1] - x_range[0])
+        if snapshot.display_frequency:
+            x_fraction = 1 - x_fraction
+        y_fraction = (y_range[1] - np.asarray(y, dtype=np.float64)) / (y_range[1] - y_range[0])
+        return plot_rect.left() + x_fraction * plot_rect.width(), plot_rect.top() + y_fraction * plot_rect.height()
+
+    font = QFont()
+    font.setPixelSize(12)
+    painter.setFont(font)
+    __paint_axes__(painter, plot_rect, x_range, y_range, snapshot, to_pixels)
+
+    painter.save()
+    painter.setClipRect(plot_rect)
+    painter.setRenderHint(QPainter.Antialiasing)
+    start, stop = visible_range(snapshot.x, x_range[0], x_range[1], margin=1)
+    max_points = 2 * int(plot_rect.width())
+    curves = [(snapshot.y, TRACE_COLOR)] + list(snapshot.overlays.values())
+    for y, color in curves:
+        x, y = MinMaxPyramid(y).decimate(snapshot.x, start, stop, max_points)
+        painter.setPen(QPen(__qcolor__(color), 1))
+        painter.drawPath(__curve_path__(*to_pixels(x, y)))
+    if snapshot.markers is not None and len(snapshot.markers[0]):
+        painter.setPen(Qt.NoPen)
+        painter.setBrush(__qcolor__('y'))
+        for px, py in zip(*to_pixels(*snapshot.markers)):
+            painter.drawPolygon(QPointF(px, py - 5), QPointF(px - 5, py + 4), QPointF(px + 5, py + 4))
+    painter.restore()
+
+
+def nice_ticks(low: float, high: float, count: int = 8) -> np.ndarray:
+    """
+    Gets round tick values covering a range
+    :param count: Approximate number of ticks
+    :return: Multiples of 1, 2 or 5 times a power of ten between low and high
+    """
+    if not high > low:
+        return np.array([low])
+    raw_step = (high - low) / count
+    magnitude = 10 ** math.floor(math.log10(raw_step))
+    step = next(m * magnitude for m in (1, 2, 5, 10) if m * magnitude >= raw_step)
+    first = math.ceil(low / step) * step
+    return first + step * np.arange(int((high - first) / step + 1e-9) + 1)
+
+
+def __paint_axes__(painter: QPainter, plot_rect: QRectF, x_range: tuple, y_range: tuple,
+                   snapshot: PlotSnapshot, to_pixels):
+    """ Draws grid lines, tick labels, axis labels, the plot frame and the title """
+    metrics = painter.fontMetrics()
+    x_ticks = nice_ticks(*x_range, count=max(int(plot_rect.width() / 100), 2))
+    y_ticks = nice_ticks(*y_range, count=max(int(plot_rect.height() / 60), 2))
+    x_pixels, _ = to_pixels(x_ticks, np.zeros(len(x_ticks)))
+    _, y_pixels = to_pixels(np.zeros(len(y_ticks)), y_ticks)
+    x_decimals = __decimals__(x_ticks)
+    y_decimals = __decimals__(y_ticks)
+
+    for value, px in zip(x_ticks, x_pixels):
+        painter.setPen(QPen(GRID_COLOR, 1))
+        painter.drawLine(QPointF(px, plot_rect.top()), QPointF(px, plot_rect.bottom()))
+        painter.setPen(QPen(FOREGROUND_COLOR, 1))
+        label = f"{value:.{x_decimals}f}"
+        painter.drawText(QPointF(px - metrics.horizontalAdvance(label) / 2, plot_rect.bottom() + 18), label)
+    for value, py in zip(y_ticks, y_pixels):
+        painter.setPen(QPen(GRID_COLOR, 1))
+        painter.drawLine(QPointF(plot_rect.left(), py), QPointF(plot_rect.right(), py))
+        painter.setPen(QPen(FOREGROUND_COLOR, 1))
+        label = f"{value:.{y_decimals}f}"
+        painter.drawText(QPointF(plot_rect.left() - metrics.horizontalAdvance(label) - 6, py + 4), label)
+
+    painter.setPen(QPen(FOREGROUND_COLOR, 1))
+    painter.drawRect(plot_rect)
+    painter.drawText(QPointF(plot_rect.center().x() - metrics.horizontalAdvance(snapshot.x_label) / 2,
+                             plot_rect.bottom() + 45), snapshot.x_label)
+    painter.save()
+    painter.translate(20, plot_rect.center().y() + metrics.horizontalAdvance(snapshot.y_label) / 2)
+    painter.rotate(-90)
+    painter.drawText(QPointF(0, 0), snapshot.y_label)
+    painter.restore()
+    painter.save()
+    title_font = QFont(painter.font())
+    title_font.setPixelSize(16)
+    painter.setFont(title_font)
+    painter.drawText(QRectF(0, 0, plot_rect.right() + MARGIN_RIGHT, MARGIN_TOP), Qt.AlignCenter, snapshot.title)
+    painter.restore()
+
+
+def __curve_path__(x: np.ndarray, y: np.ndarray) -> QPainterPath:
+    """ Gets a path through the points, broken where values are not finite """
+    path = QPainterPath()
+    connected = False
+    for px, py, finite in zip(x.tolist(), y.tolist(), (np.isfinite(x) & np.isfinite(y)).tolist()):
+        if not finite:
+            connected = False
+        elif connected:
+            path.lineTo(px, py)
+        else:
+            path.moveTo(px, py)
+            connected = True
+    return path
+
+
+def __finite_range__(values: np.ndarray) -> tuple:
+    """ Gets (min, max) of the finite values, widened if they are all equal """
+    finite = values[np.isfinite(values)]
+    if not len(finite):
+        return 0.0, 1.0
+    low, high = float(finite.min()), float(finite.max())
+    if low == high:
+        return low - 0.5, high + 0.5
+    return low, high
+
+
+def __padded__(value_range: tuple, padding: float = 0.05) -> tuple:
+    margin = (value_range[1] - value_range[0]) * padding
+    return value_range[0] - margin, value_range[1] + margin
+
+
+def __decimals__(ticks: np.ndarray) -> int:
+    """ Gets the number of decimals telling ticks apart """
+    if len(ticks) < 2:
+        return 2
+    return max(0, -math.floor(math.log10(ticks[1] - ticks[0])))
+
+
+def __qcolor__(color) -> QColor:
+    if isinstance(color, QColor):
+        return color
+    if isinstance(color, str) and color in COLORS:
+        return QColor(*COLORS[color])
+    if isinstance(color, tuple):
+        return QColor(*color)
+    return QColor(color)
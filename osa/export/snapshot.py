@@ -0,0 +1,71 @@
+import numpy as np
+
+from osa.services.server_requests import TraceData
+from osa.utils.x_axis_cache import XAxisCache
+
+# Colour of the trace in exported images, as in the live plot
+TRACE_COLOR = 'g'
+
+
+class PlotSnapshot:
+    """
+    Everything needed to draw a plot and write its data, taken on the GUI thread and exported
+    on another thread. y-values are copied, as the plotted arrays (e.g. max-holds) are updated in place.
+    x-values are shared with the plot, since x-axes are never modified once computed.
+    """
+    __slots__ = ('title', 'trace_data', 'x', 'y', 'x_label', 'y_label', 'display_frequency',
+                 'overlays', 'markers', 'x_range', 'y_range')
+
+    def __init__(self, title: str, trace_data: TraceData, x: np.ndarray, y: np.ndarray,
+                 x_label: str, y_label: str, display_frequency: bool = False, overlays: dict = None,
+                 markers: tuple = None, x_range: tuple = None, y_range: tuple = None):
+        """
+        :param title: Plot title, also the base of exported file names
+        :param trace_data: Trace shown, whose x-values in nm are written to data sidecars
+        :param x: x-values in the units shown
+        :param y: y-values shown
+        :param x_label: Label of the x-axis
+        :param y_label: Label of the y-axis
+        :param display_frequency: True if x-values are frequencies, drawn decreasing to the right
+        :param overlays: Curves drawn over the trace, name to (y-values, colour)
+        :param markers: (x, y) of points marked on the plot, if any
+        :param x_range: (min, max) of the x-axis, None to fit the trace
+        :param y_range: (min, max) of the y-axis, None to fit the trace
+        """
+        self.title = title
+        self.trace_data = trace_data
+        self.x = x
+        self.y = np.array(y, copy=True)
+        self.x_label = x_label
+        self.y_label = y_label
+        self.display_frequency = display_frequency
+        self.overlays = {name: (np.array(values, copy=True), color) for name, (values, color) in (overlays or {}).items()}
+        self.markers = None if markers is None else tuple(np.array(values, copy=True) for values in markers)
+        self.x_range = x_range
+        self.y_range = y_range
+
+    @staticmethod
+    def from_trace(trace_data: TraceData, title: str = None, display_frequency: bool = False,
+                   x_axis_cache: XAxisCache = None):
+        """
+        Creates a snapshot of a trace as it would be plotted on its own, e.g. for exporting a recording
+        :param trace_data: Trace with x-values in nm
+        :param title: Plot title, defaults to '<instrument>::<time>' as in the live plot
+        :param display_frequency: True to draw x-values as frequencies
+        :param x_axis_cache: Cache reusing x-axes of traces with the same sweep, if any
+        :return: PlotSnapshot fitting the axes to the trace
+        """
+        x_axis_cache = x_axis_cache or XAxisCache()
+        return PlotSnapshot(title or f"{trace_data.instrument}::{trace_data.time}", trace_data,
+                            x_axis_cache.get(trace_data, frequency=display_frequency), trace_data.data,
+                            x_label="Frequency (THz)" if display_frequency else "Wavelength (nm)",
+                            y_label=trace_data.y_label, display_frequency=display_frequency)
+
+    def data_columns(self) -> dict:
+        """
+        Gets the raw data written to sidecars
+        :return: Column name to values: wavelength_nm, the plotted trace as power_dbm, and each overlay by name
+        """
+        columns = {'wavelength_nm': self.trace_data.x, 'power_dbm': self.y}
+        columns.update({name: values for name, (values, color) in self.overlays.items()})
+        return columns
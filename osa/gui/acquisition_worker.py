@@ -0,0 +1,105 @@
+import logging
+from concurrent.futures import CancelledError
+
+from PyQt5.QtCore import QObject, pyqtSignal, pyqtSlot
+
+from osa.config import ACQUISITION_DEADLINE
+from osa.exceptions.osa_server_exception import OsaServerException
+from osa.services.async_client import AsyncOsaClient, EventLoopThread
+from osa.services.limits_cache import LimitsCache
+from osa.services.request_error_manager import CircuitBreaker, RetryPolicy, request_until_success
+from osa.services.server_requests import get_trace
+from osa.utils.metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+
+
+class AcquisitionWorker(QObject):
+    """
+    Fetches traces from the OSA server away from the GUI thread.
+    Intended to be moved to a QThread; requests arrive through the acquire slot
+    and finished traces are sent back with the trace_acquired signal.
+    """
+
+    # request id, TraceData, x limits
+    trace_acquired = pyqtSignal(int, object, object)
+    # request id, error message, whether the request was retried
+    acquisition_failed = pyqtSignal(int, str, bool)
+
+    def __init__(self, fetch_trace=get_trace, x_lims_cache: LimitsCache = None,
+                 retry_policy: RetryPolicy = None, circuit_breaker: CircuitBreaker = None,
+                 client: AsyncOsaClient = None,
+                 loop_thread: EventLoopThread = None, deadline: float = ACQUISITION_DEADLINE,
+                 *args, **kwargs):
+        """
+        :param fetch_trace: Function returning a TraceData, used when no client is given
+        :param x_lims_cache: Cache of the [start, stop] x limits, requested with get_x_lims by default
+        :param retry_policy: How acquisitions are retried when retrying on error
+        :param circuit_breaker: Breaker shared by all acquisitions, pausing requests
+            while the server keeps failing
+        :param client: If given with loop_thread, trace and x limits are requested
+            concurrently with this client instead of one after the other
+        :param loop_thread: Event loop thread running the client
+        :param deadline: Seconds allowed for each acquisition made with the client
+        """
+        super().__init__(*args, **kwargs)
+        self.fetch_trace = fetch_trace
+        self.x_lims_cache = x_lims_cache or LimitsCache()
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.circuit_breaker = circuit_breaker or CircuitBreaker()
+        self.client = client
+        self.loop_thread = loop_thread
+        self.deadline = deadline
+        self.current_future = None
+
+    @pyqtSlot(int, bool)
+    def acquire(self, request_id: int, retry_on_error: bool):
+        """
+        Requests a trace and its x limits, then emits the result.
+        x limits are only requested when the cached limits are stale.
+        :param request_id: Id of the request, passed back with the result
+        :param retry_on_error:
+            - If True, repeats requests according to retry_policy until a valid response is received.
+            - If False, gives up after the first server error.
+        """
+        logger.debug("Requesting new plot data.")
+        try:
+            with get_metrics().timer('acquire'):
+                if retry_on_error:
+                    trace_data, x_lims = request_until_success(
+                        self.acquire_once, policy=self.retry_policy, breaker=self.circuit_breaker)
+                else:
+                    trace_data, x_lims = self.circuit_breaker.call(self.acquire_once)
+        except OsaServerException as e:
+            self.acquisition_failed.emit(request_id, str(e), retry_on_error)
+            return
+        except CancelledError:
+            self.acquisition_failed.emit(request_id, "Acquisition cancelled.", False)
+            return
+
+        self.trace_acquired.emit(request_id, trace_data, x_lims)
+
+    def acquire_once(self) -> tuple:
+        """
+        Requests a trace and its x limits once.
+        :return: (TraceData, [start, stop] x limits)
+        """
+        if self.client is None or self.loop_thread is None:
+            trace_data = self.fetch_trace()
+            return trace_data, self.x_lims_cache.get(trace_data)
+
+        self.current_future = self.loop_thread.submit(
+            self.client.acquire(self.x_lims_cache, deadline=self.deadline))
+        try:
+            return self.current_future.result()
+        finally:
+            self.current_future = None
+
+    def cancel(self):
+        """
+        Cancels the acquisition in progress, if it was made with the client.
+        Safe to call from any thread.
+        """
+        future = self.current_future
+        if future is not None:
+            future.cancel()
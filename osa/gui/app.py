@@ -1,15 +1,31 @@
+import logging
 import os
 import sys
+import threading
+import time
+
+import numpy as np
 from PyQt5 import QtWidgets
-from PyQt5.QtCore import pyqtSlot, QTimer
+from PyQt5.QtCore import pyqtSlot, pyqtSignal, QTimer, QThread
 from PyQt5.QtWidgets import QMessageBox, QFileDialog
 
-from osa.exceptions.invalid_response import InvalidResponse
-from osa.exceptions.osa_server_exception import OsaServerException
+from osa.analysis.trace_processing import TraceProcessor
+from osa.config import EXPORT_EVERY_N_TRACES, EXPORT_FORMATS
+from osa.export.plot_exporter import FORMATS, PlotExporter, export_recording
+from osa.gui.acquisition_worker import AcquisitionWorker
+from osa.gui.channel_table_widget import ChannelTableWidget
 from osa.gui.controller_widget import Controller
+from osa.gui.performance_overlay import PerformanceOverlay
+from osa.gui.playback_widget import PlaybackWidget
 from osa.gui.plot_widget import PlotWidget
-from osa.services.request_error_manager import request_until_success
-from osa.services.server_requests import get_trace, get_x_lims, TraceData
+from osa.gui.waterfall_widget import WaterfallWidget
+from osa.services.async_client import AsyncOsaClient, EventLoopThread
+from osa.services.rate_controller import RateController
+from osa.services.server_requests import TraceData
+from osa.utils.log import configure_logging
+from osa.utils.metrics import get_metrics
+
+logger = logging.getLogger(__name__)
 
 
 class MainWindow(QtWidgets.QMainWindow):
@@ -17,6 +33,15 @@ class MainWindow(QtWidgets.QMainWindow):
     Main GUI interface for OSA app
     """
 
+    # request id, retry on error
+    acquisition_requested = pyqtSignal(int, bool)
+    # trace id, channels, stage times; emitted from the analysis pipeline's thread
+    analysis_finished = pyqtSignal(int, object, object)
+    # paths written for a snapshot; emitted from the exporter's thread
+    plot_exported = pyqtSignal(object)
+    # status message; emitted from the thread exporting a recording
+    recording_exported = pyqtSignal(str)
+
     def __init__(self, parent=None):
         super().__init__(parent)
 
@@ -24,21 +49,53 @@ class MainWindow(QtWidgets.QMainWindow):
         self.layout = QtWidgets.QGridLayout()
         self.window = QtWidgets.QWidget()
         self.plot_widget = PlotWidget()
+        self.performance_overlay = PerformanceOverlay(self.plot_widget.graph_widget)
+        self.waterfall_widget = WaterfallWidget()
+        self.channel_table = ChannelTableWidget()
         self.menu_bar = self.menuBar()
         self.controller = Controller()
+        self.playback_widget = PlaybackWidget()
         self.update_data_timer = QTimer()
+        self.rate_controller = RateController()
+        self.trace_processor = TraceProcessor()
+        self.acquisition_status_label = QtWidgets.QLabel()
+        self.analysis_status_label = QtWidgets.QLabel()
+        self.analysis_pipeline = None
         self.alert_box = QtWidgets.QMessageBox()
+        self.acquisition_thread = QThread()
+        self.event_loop_thread = EventLoopThread()
+        self.osa_client = AsyncOsaClient()
+        self.acquisition_worker = AcquisitionWorker(client=self.osa_client,
+                                                    loop_thread=self.event_loop_thread)
 
         # State
         self.file_save_directory = os.getcwd()
+        self.recorder = None
+        self.plot_exporter = PlotExporter(on_exported=self.plot_exported.emit)
+        self.export_formats = list(EXPORT_FORMATS)
+        # Export a snapshot every this many traces of continuous acquisition, 0 for never
+        self.auto_export_every = 0
+        self.auto_export_count = 0
+        self.recording_export_stop_event = threading.Event()
+        self.recording_export_thread = None
+        # Channels of the last analysed trace, None if channel analysis is off
+        self.channels = None
+        self.acquiring = False
+        self.request_in_flight = False
+        self.pending_retry_request = False
+        self.last_request_id = 0
+        self.first_valid_request_id = 0
 
         # Init
         self.init_window()
         self.init_plot()
         self.init_controller()
+        self.init_playback_widget()
         self.init_save_action()
         self.init_menu_bar()
         self.init_timer()
+        self.init_status_bar()
+        self.init_acquisition_thread()
         self.init_failed_connection_alert_box()
 
     def init_window(self):
@@ -48,38 +105,174 @@ class MainWindow(QtWidgets.QMainWindow):
 
     def init_plot(self):
         self.layout.addWidget(self.plot_widget)
+        self.plot_widget.add_overlay('max_hold', color='r')
+        self.plot_widget.add_overlay('min_hold', color='c')
+        self.layout.addWidget(self.waterfall_widget)
+        # Zooming and panning either plot moves both along the x-axis
+        self.waterfall_widget.graph_widget.setXLink(self.plot_widget.graph_widget)
+        self.layout.addWidget(self.channel_table)
+        self.channel_table.hide()
 
     def init_menu_bar(self):
         file_menu = self.menu_bar.addMenu('&File')
         file_menu.addAction(self.init_save_action())
         file_menu.addAction(self.init_set_directory_action())
+        file_menu.addMenu(self.init_export_formats_menu(file_menu))
+        file_menu.addAction(self.init_auto_export_action())
+        file_menu.addSeparator()
+        file_menu.addAction(self.init_recording_action())
+        file_menu.addAction(self.init_open_recording_action())
+        file_menu.addAction(self.init_export_recording_action())
+        file_menu.addSeparator()
+        file_menu.addAction(self.init_export_metrics_action())
         file_menu.setToolTipsVisible(True)
+        view_menu = self.menu_bar.addMenu('&View')
+        view_menu.addAction(self.init_downsampling_action())
+        view_menu.addAction(self.init_waterfall_action())
+        view_menu.addAction(self.init_channel_analysis_action())
+        view_menu.addAction(self.init_performance_overlay_action())
+        view_menu.setToolTipsVisible(True)
 
     def init_save_action(self):
         save_action = QtWidgets.QAction('&Save', self)
         save_action.setShortcut('Ctrl+S')
-        save_action.setToolTip('Save image of current plot view')
+        save_action.setToolTip('Save current plot view in the export formats, in the background')
         save_action.triggered.connect(self.save_plot_image)
         return save_action
 
+    def init_export_formats_menu(self, parent_menu: QtWidgets.QMenu) -> QtWidgets.QMenu:
+        export_formats_menu = QtWidgets.QMenu('Export formats', parent_menu)
+        export_formats_menu.setToolTipsVisible(True)
+        for export_format in FORMATS:
+            format_action = QtWidgets.QAction(export_format.upper(), export_formats_menu)
+            format_action.setCheckable(True)
+            format_action.setChecked(export_format in self.export_formats)
+            format_action.setToolTip('Raw data sidecar with wavelengths, powers and holds'
+                                     if export_format in ('csv', 'npy') else 'Image of the plot view')
+            format_action.toggled.connect(
+                lambda checked, action=format_action, name=export_format: self.set_export_format(action, name, checked))
+            export_formats_menu.addAction(format_action)
+        return export_formats_menu
+
+    def init_auto_export_action(self):
+        auto_export_action = QtWidgets.QAction('Auto export', self)
+        auto_export_action.setCheckable(True)
+        auto_export_action.setToolTip('Save the plot every Nth trace of continuous acquisition, in the background')
+        auto_export_action.toggled.connect(lambda checked: self.set_auto_export(auto_export_action, checked))
+        return auto_export_action
+
     def init_set_directory_action(self):
         set_directory_action = QtWidgets.QAction('Set directory', self)
         set_directory_action.setToolTip('Save location to save plot images')
         set_directory_action.triggered.connect(self.set_image_save_directory)
         return set_directory_action
 
+    def init_recording_action(self):
+        recording_action = QtWidgets.QAction('Record traces', self)
+        recording_action.setCheckable(True)
+        recording_action.setShortcut('Ctrl+R')
+        recording_action.setToolTip('Record raw data of every acquired trace to a new session in the save directory')
+        recording_action.toggled.connect(self.set_recording)
+        return recording_action
+
+    def init_open_recording_action(self):
+        open_recording_action = QtWidgets.QAction('Open recording', self)
+        open_recording_action.setShortcut('Ctrl+O')
+        open_recording_action.setToolTip('Replay a recorded session')
+        open_recording_action.triggered.connect(self.open_recording)
+        return open_recording_action
+
+    def init_export_recording_action(self):
+        export_recording_action = QtWidgets.QAction('Export recording', self)
+        export_recording_action.setToolTip('Save every trace of a recorded session in the export formats')
+        export_recording_action.triggered.connect(self.export_recording)
+        return export_recording_action
+
+    def init_export_metrics_action(self):
+        export_metrics_action = QtWidgets.QAction('Export metrics', self)
+        export_metrics_action.setToolTip('Save timings and counters recorded while the performance overlay is shown, '
+                                         'as JSON or Prometheus text')
+        export_metrics_action.triggered.connect(self.export_metrics)
+        return export_metrics_action
+
+    def init_downsampling_action(self):
+        downsampling_action = QtWidgets.QAction('Downsample large traces', self)
+        downsampling_action.setCheckable(True)
+        downsampling_action.setChecked(self.plot_widget.downsampling_enabled)
+        downsampling_action.setToolTip('Draw large traces at screen resolution, keeping peaks and notches')
+        downsampling_action.toggled.connect(self.plot_widget.set_downsampling)
+        return downsampling_action
+
+    def init_waterfall_action(self):
+        waterfall_action = QtWidgets.QAction('Waterfall', self)
+        waterfall_action.setCheckable(True)
+        waterfall_action.setChecked(True)
+        waterfall_action.setShortcut('Ctrl+W')
+        waterfall_action.setToolTip(f'Show the last {self.waterfall_widget.ring_buffer.rows} traces as a heatmap')
+        waterfall_action.toggled.connect(self.waterfall_widget.setVisible)
+        return waterfall_action
+
+    def init_channel_analysis_action(self):
+        channel_analysis_action = QtWidgets.QAction('Channel analysis', self)
+        channel_analysis_action.setCheckable(True)
+        channel_analysis_action.setToolTip('Find channels and show their power, width and OSNR')
+        channel_analysis_action.toggled.connect(self.set_channel_analysis)
+        return channel_analysis_action
+
+    def init_performance_overlay_action(self):
+        performance_overlay_action = QtWidgets.QAction('Performance overlay', self)
+        performance_overlay_action.setCheckable(True)
+        performance_overlay_action.setShortcut('Ctrl+P')
+        performance_overlay_action.setToolTip('Record and show request, parse and render times, retries and frame rate')
+        performance_overlay_action.toggled.connect(self.performance_overlay.set_enabled)
+        return performance_overlay_action
+
     def init_controller(self):
         self.layout.addWidget(self.controller)
         signals = self.controller.signals
-        signals.single_clicked.connect(
-            lambda: self.update_plot_data(retry_on_error=True))
+        signals.single_clicked.connect(self.request_single_trace)
         signals.start_clicked.connect(self.start_acquisition)
         signals.stop_clicked.connect(self.stop_acquisition)
         signals.wavelength_toggled.connect(self.set_plot_units_wavelength)
         signals.frequency_toggled.connect(self.set_plot_units_frequency)
+        signals.rate_changed.connect(self.set_acquisition_rate)
+        signals.averaging_changed.connect(self.set_averaging)
+        signals.max_hold_toggled.connect(self.set_max_hold)
+        signals.min_hold_toggled.connect(self.set_min_hold)
+        signals.reset_processing_clicked.connect(self.trace_processor.reset)
+
+    def init_playback_widget(self):
+        self.layout.addWidget(self.playback_widget)
+        self.playback_widget.hide()
+        self.playback_widget.trace_selected.connect(self.show_recorded_trace)
+        self.controller.signals.start_clicked.connect(self.playback_widget.pause)
+        self.controller.signals.single_clicked.connect(self.playback_widget.pause)
 
     def init_timer(self):
-        self.update_data_timer.timeout.connect(self.update_plot_data)
+        """
+        The timer starts each frame of continuous acquisition once.
+        It is restarted when a frame finishes, so frames never overlap.
+        """
+        self.update_data_timer.setSingleShot(True)
+        self.update_data_timer.timeout.connect(self.request_next_frame)
+
+    def init_status_bar(self):
+        self.statusBar().addPermanentWidget(self.analysis_status_label)
+        self.statusBar().addPermanentWidget(self.acquisition_status_label)
+        self.analysis_finished.connect(self.on_analysis_finished)
+        self.plot_exported.connect(self.on_plot_exported)
+        self.recording_exported.connect(self.statusBar().showMessage)
+
+    def init_acquisition_thread(self):
+        """
+        Moves the acquisition worker to its own thread so that server requests
+        never block the GUI event loop.
+        """
+        self.acquisition_worker.moveToThread(self.acquisition_thread)
+        self.acquisition_requested.connect(self.acquisition_worker.acquire)
+        self.acquisition_worker.trace_acquired.connect(self.on_trace_acquired)
+        self.acquisition_worker.acquisition_failed.connect(self.on_acquisition_failed)
+        self.acquisition_thread.start()
 
     def init_failed_connection_alert_box(self):
         """
@@ -102,77 +295,162 @@ class MainWindow(QtWidgets.QMainWindow):
     @pyqtSlot()
     def start_acquisition(self):
         """
-        Starts automatic calls to update plot data at 1 Hz
+        Starts automatic calls to update plot data at the target rate
         """
-        print("Starting continuous acquisition at 1 Hz.")
-        self.update_data_timer.start(1000)
+        logger.info("Starting continuous acquisition at %s.", self.format_rate(self.rate_controller.target_rate))
+        self.acquiring = True
+        self.rate_controller.reset()
+        self.acquisition_worker.x_lims_cache.invalidate()
+        self.update_data_timer.start(0)
+
+    @pyqtSlot(float)
+    def set_acquisition_rate(self, rate: float):
+        """
+        Sets target rate of continuous acquisition
+        :param rate: Rate in Hz, 0 to acquire as fast as possible
+        """
+        self.rate_controller.set_target_rate(rate)
+
+    @pyqtSlot()
+    def request_next_frame(self):
+        """
+        Requests next trace of continuous acquisition.
+        If a request is still in flight, the frame starts once it finishes.
+        """
+        if not self.acquiring or self.request_in_flight:
+            return
+        self.rate_controller.frame_started()
+        self.update_plot_data()
+
+    @pyqtSlot()
+    def request_single_trace(self):
+        """
+        Requests and plots a single trace, with up to date x limits
+        """
+        self.acquisition_worker.x_lims_cache.invalidate()
+        self.update_plot_data(retry_on_error=True)
 
     @pyqtSlot()
     def stop_acquisition(self):
         """
         Stops automatically updating plot data
         """
-        print("Stopping continuous acquisition.")
+        logger.info("Stopping continuous acquisition.")
+        self.acquiring = False
         self.update_data_timer.stop()
+        # Results of requests made before stopping are stale
+        self.first_valid_request_id = self.last_request_id + 1
+        self.acquisition_worker.cancel()
 
     @pyqtSlot()
     def update_plot_data(self, retry_on_error=False):
         """
-        Requests and plots new trace.
+        Requests a new trace from the acquisition thread.
+        Only one request is in flight at a time: timer ticks arriving while a request
+        is in flight are skipped, requests with retry_on_error are deferred until it finishes.
         :param retry_on_error:
             - If True, will repeat requests up to 5 times until a valid response is received.
                 If still no valid response is received, displays popup alert and skips update.
             - If false, will log errors and skip plot data update.
         """
-
-        # Request new trace
-        print("Requesting new plot data.")
-        num_attempts = 5
-        if retry_on_error:
-            try:
-                trace_data = request_until_success(get_trace, num_attempts)
-                x_lims = request_until_success(get_x_lims, num_attempts)
-            except InvalidResponse as e:
-                print(str(e))
-                self.show_failed_connection_alert()
-                return
+        if self.request_in_flight:
+            if retry_on_error:
+                self.pending_retry_request = True
+            else:
+                logger.debug("Previous request still in progress, skipping plot update.")
+            return
+
+        self.request_in_flight = True
+        self.last_request_id += 1
+        self.acquisition_requested.emit(self.last_request_id, retry_on_error)
+
+    @pyqtSlot(int, object, object)
+    def on_trace_acquired(self, request_id: int, trace_data: TraceData, x_lims: list[float]):
+        """ Plots trace received from the acquisition thread, unless it is stale. """
+        if request_id < self.first_valid_request_id:
+            logger.debug("Discarding stale trace.")
         else:
-            try:
-                trace_data = get_trace()
-                x_lims = get_x_lims()
-            except OsaServerException as e:
-                print(str(e))
-                print("Skipping plot update due to server error.")
-                return
+            self.set_plot_data(trace_data, x_lims)
+        self.finish_request(success=True)
+
+    @pyqtSlot(int, str, bool)
+    def on_acquisition_failed(self, request_id: int, message: str, retry_on_error: bool):
+        """ Handles failed request from the acquisition thread. """
+        logger.warning(message)
+        if request_id >= self.first_valid_request_id:
+            if retry_on_error:
+                self.show_failed_connection_alert()
+            else:
+                logger.warning("Skipping plot update due to server error.")
+        self.finish_request(success=False)
 
-        self.set_plot_data(trace_data, x_lims)
+    def finish_request(self, success: bool):
+        """
+        Marks the in-flight request as finished, sends any deferred request
+        and schedules the next frame of continuous acquisition.
+        :param success: False if the request failed
+        """
+        self.request_in_flight = False
+        metrics = get_metrics()
+        metrics.increment('frames')
+        if not success:
+            metrics.increment('failed_frames')
+        if self.pending_retry_request:
+            self.pending_retry_request = False
+            self.update_plot_data(retry_on_error=True)
+
+        if self.acquiring:
+            delay = self.rate_controller.frame_finished(success)
+            self.update_data_timer.start(int(delay * 1000))
+            metrics.set_gauge('frame_rate', self.rate_controller.achieved_rate)
+            self.update_acquisition_status()
+
+    def update_acquisition_status(self):
+        """ Shows achieved acquisition rate and skipped or failed frames in the status bar. """
+        controller = self.rate_controller
+        frame_time = f"{controller.frame_time * 1000:.0f} ms" if controller.frame_time is not None else "-"
+        self.acquisition_status_label.setText(
+            f"Rate: {controller.achieved_rate:.2f} Hz (target {self.format_rate(controller.target_rate)})"
+            f" | Frame time: {frame_time}"
+            f" | Skipped: {controller.skipped_frames}"
+            f" | Failed: {controller.failed_frames}")
+
+    @staticmethod
+    def format_rate(rate: float) -> str:
+        return f"{rate:g} Hz" if rate else "max rate"
 
     def set_plot_data(self, trace_data: TraceData, x_lims: list[float]):
         """
         Sets plot data from trace data and x limits retrieved from server.
-        Updates plot title to reflect time trace was taken.
         """
+        if trace_data.x_data is None:
+            trace_data.x_start = x_lims[0]
+        self.plot_trace(trace_data)
+        logger.debug("Set new plot data.")
 
-        # Update plot title
-        self.plot_widget.set_title(
-            f"{trace_data.instrument}::{trace_data.time}")
+        if self.recorder is not None:
+            self.recorder.record(trace_data)
 
-        # Update data
-        self.plot_widget.update_data(
-            trace_data.data,
-            x_lims[0],
-            trace_data.x_increment)
-        print("Set new plot data.")
+        if self.auto_export_every and self.acquiring:
+            self.auto_export_count += 1
+            if self.auto_export_count % self.auto_export_every == 0:
+                self.plot_exporter.submit(self.plot_widget.snapshot(), self.file_save_directory, self.export_formats)
 
     @pyqtSlot()
     def set_plot_units_wavelength(self):
         """ Set plot to display x-axis as wavelength """
         self.plot_widget.set_x_units(frequency=False)
+        self.waterfall_widget.set_x_units(frequency=False, x=self.plot_widget.x)
+        if self.channels is not None:
+            self.show_channels()
 
     @pyqtSlot()
     def set_plot_units_frequency(self):
         """ Set plot to display x-axis as frequency """
         self.plot_widget.set_x_units(frequency=True)
+        self.waterfall_widget.set_x_units(frequency=True, x=self.plot_widget.x)
+        if self.channels is not None:
+            self.show_channels()
 
     def show_failed_connection_alert(self):
         """ Shows popup alert for failed connection to server."""
@@ -183,16 +461,269 @@ class MainWindow(QtWidgets.QMainWindow):
         self.file_save_directory = str(QFileDialog.getExistingDirectory(self, 'Select Directory'))
 
     def save_plot_image(self):
-        """ Saves plot image as png. """
-        self.plot_widget.export_plot(self.file_save_directory)
+        """ Saves current plot view in the export formats, from the exporter's thread """
+        snapshot = self.plot_widget.snapshot()
+        if snapshot is None:
+            return
+        if not self.plot_exporter.submit(snapshot, self.file_save_directory, self.export_formats):
+            self.statusBar().showMessage("Export queue is full, plot not saved")
+
+    @pyqtSlot(object)
+    def on_plot_exported(self, paths: list):
+        self.statusBar().showMessage(f"Exported plot to {', '.join(paths)}")
+
+    def set_export_format(self, action: QtWidgets.QAction, export_format: str, enabled: bool):
+        """ Adds or removes a format plots are exported in. The last format cannot be removed. """
+        if enabled and export_format not in self.export_formats:
+            self.export_formats.append(export_format)
+        elif not enabled and export_format in self.export_formats:
+            if len(self.export_formats) == 1:
+                action.setChecked(True)
+                return
+            self.export_formats.remove(export_format)
+
+    def set_auto_export(self, action: QtWidgets.QAction, enabled: bool):
+        """ Starts exporting every Nth trace of continuous acquisition, asking for N, or stops it """
+        if not enabled:
+            self.auto_export_every = 0
+            return
+        every, accepted = QtWidgets.QInputDialog.getInt(self, 'Auto export', 'Export every Nth trace, N:',
+                                                        EXPORT_EVERY_N_TRACES, 1)
+        if not accepted:
+            action.setChecked(False)
+            return
+        self.auto_export_every = every
+        self.auto_export_count = 0
+
+    @pyqtSlot()
+    def export_recording(self):
+        """
+        Opens file select dialog to choose a recorded session and exports each of its traces, in the
+        export formats, to a '<recording>-export' directory in the save directory.
+        Traces are exported in the background, without dropping any.
+        """
+        if self.recording_export_thread is not None and self.recording_export_thread.is_alive():
+            self.statusBar().showMessage("A recording is already being exported")
+            return
+        path = QFileDialog.getExistingDirectory(self, 'Export Recording', self.file_save_directory)
+        if not path:
+            return
+        from osa.recording.trace_store import TraceStoreReader
+        try:
+            reader = TraceStoreReader(path)
+        except (OSError, ValueError) as e:
+            logger.error("Failed to open recording %s: %s", path, e)
+            self.statusBar().showMessage(f"{path} is not a recording")
+            return
+        directory = os.path.join(self.file_save_directory, os.path.basename(os.path.normpath(path)) + '-export')
+        try:
+            os.makedirs(directory, exist_ok=True)
+        except OSError as e:
+            logger.error("Failed to create %s: %s", directory, e)
+            self.statusBar().showMessage(f"Cannot export to {directory}: {e}")
+            reader.close()
+            return
+        self.statusBar().showMessage(f"Exporting {len(reader)} traces to {directory}")
+        self.recording_export_stop_event.clear()
+        self.recording_export_thread = threading.Thread(
+            target=self.export_recording_traces, name='osa-recording-export', daemon=True,
+            args=(reader, directory, tuple(self.export_formats), self.plot_widget.display_frequency))
+        self.recording_export_thread.start()
+
+    def export_recording_traces(self, reader, directory: str, formats: tuple,
+                                display_frequency: bool):
+        """
+        Exports the traces of a recording with its own exporter. Runs on the recording export thread.
+        :param reader: TraceStoreReader of the recording
+        """
+        exporter = PlotExporter()
+        try:
+            queued = export_recording(reader, exporter, directory, formats, display_frequency=display_frequency,
+                                      stop_event=self.recording_export_stop_event)
+        finally:
+            exporter.stop()
+            reader.close()
+        message = f"Exported {exporter.exported_snapshots} of {queued} traces to {directory}"
+        if exporter.failed_snapshots:
+            message += f", failed to export {exporter.failed_snapshots}: {exporter.error}"
+        logger.info(message)
+        self.recording_exported.emit(message)
+
+    def export_metrics(self):
+        """ Opens file dialog to save current metrics, as JSON if the name ends with .json, else as Prometheus text """
+        path, _ = QFileDialog.getSaveFileName(self, 'Export Metrics', os.path.join(self.file_save_directory, 'osa.prom'),
+                                              'Prometheus text (*.prom);;JSON (*.json)')
+        if not path:
+            return
+        try:
+            get_metrics().write(path)
+        except OSError as e:
+            logger.error("Failed to export metrics to %s: %s", path, e)
+            self.statusBar().showMessage(f"Failed to export metrics to {path}")
+            return
+        self.statusBar().showMessage(f"Exported metrics to {path}")
+
+    @pyqtSlot(bool)
+    def set_recording(self, recording: bool):
+        """
+        Starts or stops recording acquired traces.
+        Each recording is a new session directory in the save directory.
+        """
+        if recording:
+            # Recording modules are only imported once the user records or opens a recording
+            from osa.recording.recorder import Recorder
+
+            session_name = time.strftime('recording-%Y%m%d-%H%M%S')
+            path = os.path.join(self.file_save_directory, session_name)
+            try:
+                self.recorder = Recorder(path)
+            except (OSError, ValueError) as e:
+                logger.error("Failed to record to %s: %s", path, e)
+                self.statusBar().showMessage(f"Cannot record to {path}: {e}")
+                if isinstance(self.sender(), QtWidgets.QAction):
+                    self.sender().setChecked(False)
+                return
+            logger.info("Recording traces to %s", path)
+            self.statusBar().showMessage(f"Recording traces to {path}")
+        elif self.recorder is not None:
+            self.recorder.stop()
+            message = f"Recorded {self.recorder.recorded_traces} traces to {self.recorder.path}"
+            if self.recorder.dropped_traces:
+                message += f", dropped {self.recorder.dropped_traces}"
+            if self.recorder.failed_traces:
+                message += f", failed to write {self.recorder.failed_traces}"
+            logger.info(message)
+            self.statusBar().showMessage(message)
+            self.recorder = None
+
+    @pyqtSlot()
+    def open_recording(self):
+        """
+        Opens file select dialog to choose a recorded session and replays it.
+        Continuous acquisition is stopped while the recording is replayed.
+        """
+        path = QFileDialog.getExistingDirectory(self, 'Open Recording', self.file_save_directory)
+        if not path:
+            return
+        from osa.recording.playback import PlaybackSource
+        from osa.recording.trace_store import TraceStoreReader
+        try:
+            reader = TraceStoreReader(path)
+        except (OSError, ValueError) as e:
+            logger.error("Failed to open recording %s: %s", path, e)
+            self.statusBar().showMessage(f"{path} is not a recording")
+            return
+
+        self.controller.start_stop_button.setChecked(False)
+        self.waterfall_widget.clear()
+        logger.info("Replaying %d traces from %s", len(reader), path)
+        self.playback_widget.open(PlaybackSource(reader))
+
+    @pyqtSlot(object, object)
+    def show_recorded_trace(self, trace_data: TraceData, x_lims: list[float]):
+        """ Plots a replayed trace. Replayed traces are not recorded again. """
+        self.plot_trace(trace_data)
+
+    def plot_trace(self, trace_data: TraceData):
+        """
+        Shows a trace in the plot, after averaging if enabled, with its max/min-holds,
+        and adds the unprocessed trace to the waterfall.
+        Updates plot title to reflect time trace was taken.
+        """
+        self.plot_widget.set_title(f"{trace_data.instrument}::{trace_data.time}")
+        processor = self.trace_processor
+        with get_metrics().timer('render'):
+            processed = processor.process(trace_data)
+            self.plot_widget.update_data(processed, overlays={'max_hold': processor.max_hold,
+                                                              'min_hold': processor.min_hold})
+            self.waterfall_widget.update_data(trace_data, self.plot_widget.x)
+        if self.analysis_pipeline is not None:
+            self.analysis_pipeline.submit(processed)
+
+    @pyqtSlot(bool)
+    def set_channel_analysis(self, enabled: bool):
+        """
+        Enables or disables finding channels in plotted traces, shown as markers and a table.
+        Traces are analysed in worker processes, so markers may lag the plot by a trace.
+        """
+        self.channel_table.setVisible(enabled)
+        self.analysis_status_label.setVisible(enabled)
+        if enabled:
+            # Process pools and shared memory are only imported once analysis is enabled
+            from osa.analysis.channel_analysis import CHANNEL_DTYPE
+            from osa.analysis.pipeline import AnalysisPipeline
+
+            self.analysis_pipeline = AnalysisPipeline(on_result=self.analysis_finished.emit)
+            self.channels = np.empty(0, dtype=CHANNEL_DTYPE)
+            self.show_channels()
+            if self.plot_widget.trace_data is not None:
+                self.analysis_pipeline.submit(self.plot_widget.trace_data)
+        elif self.analysis_pipeline is not None:
+            self.analysis_pipeline.close()
+            self.analysis_pipeline = None
+            self.channels = None
+            self.plot_widget.set_markers()
+
+    @pyqtSlot(int, object, object)
+    def on_analysis_finished(self, trace_id: int, channels: np.ndarray, times: dict):
+        """ Shows channels found by the analysis pipeline and its timing """
+        if self.analysis_pipeline is None:
+            return
+        self.channels = channels
+        self.show_channels()
+        timings = self.analysis_pipeline.stage_timings()
+        self.analysis_status_label.setText(
+            "Analysis: " + ", ".join(f"{stage} {seconds * 1000:.1f} ms" for stage, seconds in timings.items())
+            + f" | Dropped: {self.analysis_pipeline.dropped_traces}")
+
+    def show_channels(self):
+        """ Marks channel peaks on the plot, in the units shown, and lists them in the table """
+        x_field = 'frequency_thz' if self.plot_widget.display_frequency else 'wavelength_nm'
+        self.plot_widget.set_markers(self.channels[x_field], self.channels['power_dbm'])
+        self.channel_table.set_channels(self.channels)
+
+    @pyqtSlot(str, int)
+    def set_averaging(self, mode: str, count: int):
+        """ Sets averaging of plotted traces, restarting the average """
+        self.trace_processor.set_averaging(mode, count)
+
+    @pyqtSlot(bool)
+    def set_max_hold(self, enabled: bool):
+        """ Shows or hides the maximum of each point over the traces plotted since enabled """
+        self.trace_processor.set_max_hold(enabled)
+
+    @pyqtSlot(bool)
+    def set_min_hold(self, enabled: bool):
+        """ Shows or hides the minimum of each point over the traces plotted since enabled """
+        self.trace_processor.set_min_hold(enabled)
+
+    def closeEvent(self, event):
+        """ Stops acquisition and recording and waits for background threads to finish. """
+        self.update_data_timer.stop()
+        self.playback_widget.close_recording()
+        self.set_channel_analysis(False)
+        self.set_recording(False)
+        self.recording_export_stop_event.set()
+        if self.recording_export_thread is not None:
+            self.recording_export_thread.join()
+        self.plot_exporter.stop()
+        self.acquisition_worker.cancel()
+        self.acquisition_thread.quit()
+        self.acquisition_thread.wait()
+        self.event_loop_thread.stop()
+        self.osa_client.close()
+        super().closeEvent(event)
 
 
 def run():
+    configure_logging()
     app = QtWidgets.QApplication([])
 
     win = MainWindow()
     win.show()
-    win.populate_plot()
+    # The first trace is requested once the event loop runs, so the window is drawn and
+    # responds to input while it is acquired
+    QTimer.singleShot(0, win.populate_plot)
 
     sys.exit(app.exec_())
 
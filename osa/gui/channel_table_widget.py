@@ -0,0 +1,41 @@
+import numpy as np
+from PyQt5 import QtWidgets
+
+# Column header and format of each channel field shown
+CHANNEL_COLUMNS = (
+    ('Wavelength (nm)', 'wavelength_nm', '{:.3f}'),
+    ('Frequency (THz)', 'frequency_thz', '{:.3f}'),
+    ('Power (dBm)', 'power_dbm', '{:.2f}'),
+    ('-3 dB width (nm)', 'width_3db_nm', '{:.3f}'),
+    ('-20 dB width (nm)', 'width_20db_nm', '{:.3f}'),
+    ('Noise (dBm)', 'noise_dbm', '{:.2f}'),
+    ('OSNR (dB)', 'osnr_db', '{:.2f}'),
+)
+
+
+class ChannelTableWidget(QtWidgets.QTableWidget):
+    """
+    Table of the channels found by analyze_channels, one row per channel.
+    Cells are created once and their text updated for every trace.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(0, len(CHANNEL_COLUMNS), *args, **kwargs)
+        self.setHorizontalHeaderLabels([header for header, _, _ in CHANNEL_COLUMNS])
+        self.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        self.horizontalHeader().setSectionResizeMode(QtWidgets.QHeaderView.Stretch)
+
+    def set_channels(self, channels: np.ndarray):
+        """
+        Shows channels
+        :param channels: Array of CHANNEL_DTYPE records
+        """
+        rows = self.rowCount()
+        self.setRowCount(len(channels))
+        for row in range(rows, len(channels)):
+            for column in range(len(CHANNEL_COLUMNS)):
+                self.setItem(row, column, QtWidgets.QTableWidgetItem())
+
+        for column, (_, field, text_format) in enumerate(CHANNEL_COLUMNS):
+            for row, value in enumerate(channels[field].tolist()):
+                self.item(row, column).setText('-' if np.isnan(value) else text_format.format(value))
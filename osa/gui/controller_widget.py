@@ -2,6 +2,9 @@ from PyQt5 import QtWidgets
 from PyQt5.QtCore import pyqtSlot, pyqtSignal, QObject
 from PyQt5.QtWidgets import QGroupBox
 
+from osa.analysis.trace_processing import AVERAGING_EXPONENTIAL, AVERAGING_MOVING, AVERAGING_OFF
+from osa.config import ACQUISITION_RATE, TRACE_AVERAGE_COUNT
+
 
 class Signals(QObject):
     wavelength_toggled = pyqtSignal()
@@ -9,13 +12,22 @@ class Signals(QObject):
     start_clicked = pyqtSignal()
     stop_clicked = pyqtSignal()
     single_clicked = pyqtSignal()
+    # Target acquisition rate in Hz, 0 for as fast as possible
+    rate_changed = pyqtSignal(float)
+    # Averaging mode, number of traces averaged
+    averaging_changed = pyqtSignal(str, int)
+    max_hold_toggled = pyqtSignal(bool)
+    min_hold_toggled = pyqtSignal(bool)
+    reset_processing_clicked = pyqtSignal()
 
 
 class Controller(QtWidgets.QWidget):
     """
     Controller box for requesting traces.
     Includes 'start/stop' button for continuous acquisition,
-    'single' button for getting and displaying a single trace.
+    'single' button for getting and displaying a single trace,
+    the target rate of continuous acquisition,
+    and averaging and max/min-hold of displayed traces.
     """
 
     def __init__(self, *args, **kwargs):
@@ -27,6 +39,12 @@ class Controller(QtWidgets.QWidget):
         self.radio_button_group = QtWidgets.QButtonGroup()
         self.start_stop_button = QtWidgets.QPushButton('Start')
         self.single_button = QtWidgets.QPushButton('Single')
+        self.rate_spin_box = QtWidgets.QDoubleSpinBox()
+        self.averaging_combo_box = QtWidgets.QComboBox()
+        self.average_count_spin_box = QtWidgets.QSpinBox()
+        self.max_hold_check_box = QtWidgets.QCheckBox('Max hold')
+        self.min_hold_check_box = QtWidgets.QCheckBox('Min hold')
+        self.reset_processing_button = QtWidgets.QPushButton('Reset')
 
         # Signals
         self.signals = Signals()
@@ -39,7 +57,9 @@ class Controller(QtWidgets.QWidget):
         self.init_radio_buttons()
         self.init_start_stop_button()
         self.init_single_button()
+        self.init_rate_spin_box()
         self.layout.addLayout(self.buttons_layout)
+        self.init_processing_controls()
 
     def init_start_stop_button(self):
         self.start_stop_button.setCheckable(True)
@@ -50,6 +70,53 @@ class Controller(QtWidgets.QWidget):
         self.single_button.clicked.connect(self.single_clicked)
         self.buttons_layout.addWidget(self.single_button)
 
+    def init_rate_spin_box(self):
+        rate_layout = QtWidgets.QHBoxLayout()
+        rate_layout.addWidget(QtWidgets.QLabel('Rate:'))
+        # Minimum value 0 is shown as 'Max': acquire as fast as possible
+        self.rate_spin_box.setRange(0, 100)
+        self.rate_spin_box.setDecimals(1)
+        self.rate_spin_box.setSingleStep(0.5)
+        self.rate_spin_box.setSuffix(' Hz')
+        self.rate_spin_box.setSpecialValueText('Max')
+        self.rate_spin_box.setToolTip('Target rate of continuous acquisition')
+        self.rate_spin_box.setValue(ACQUISITION_RATE)
+        self.rate_spin_box.valueChanged.connect(self.signals.rate_changed)
+        rate_layout.addWidget(self.rate_spin_box)
+        self.buttons_layout.addLayout(rate_layout)
+
+    def init_processing_controls(self):
+        processing_container = QtWidgets.QGroupBox()
+        processing_container.setTitle('Processing:')
+        processing_layout = QtWidgets.QGridLayout()
+        processing_container.setLayout(processing_layout)
+        self.layout.addWidget(processing_container)
+
+        for text, mode in (('No averaging', AVERAGING_OFF), ('Average', AVERAGING_MOVING),
+                           ('Exp. average', AVERAGING_EXPONENTIAL)):
+            self.averaging_combo_box.addItem(text, mode)
+        self.averaging_combo_box.setToolTip('Average of the last traces, or exponentially weighted average')
+        self.averaging_combo_box.currentIndexChanged.connect(self.averaging_changed)
+        self.average_count_spin_box.setRange(1, 1000)
+        self.average_count_spin_box.setValue(TRACE_AVERAGE_COUNT)
+        self.average_count_spin_box.setToolTip('Number of traces averaged')
+        self.average_count_spin_box.valueChanged.connect(self.averaging_changed)
+        self.max_hold_check_box.toggled.connect(self.signals.max_hold_toggled)
+        self.min_hold_check_box.toggled.connect(self.signals.min_hold_toggled)
+        self.reset_processing_button.setToolTip('Restart averaging and holds')
+        self.reset_processing_button.clicked.connect(self.signals.reset_processing_clicked)
+
+        processing_layout.addWidget(self.averaging_combo_box, 0, 0)
+        processing_layout.addWidget(self.average_count_spin_box, 0, 1)
+        processing_layout.addWidget(self.max_hold_check_box, 1, 0)
+        processing_layout.addWidget(self.min_hold_check_box, 1, 1)
+        processing_layout.addWidget(self.reset_processing_button, 2, 0, 1, 2)
+
+    @pyqtSlot()
+    def averaging_changed(self):
+        self.signals.averaging_changed.emit(self.averaging_combo_box.currentData(),
+                                            self.average_count_spin_box.value())
+
     def init_radio_buttons(self):
         wavelength_radio_button = QtWidgets.QRadioButton('Wavelength')
         frequency_radio_button = QtWidgets.QRadioButton('Frequency')
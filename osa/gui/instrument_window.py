@@ -0,0 +1,232 @@
+"""
+Multi-instrument view: acquires from every instrument in INSTRUMENTS, or in a JSON file of instruments,
+at once and shows each in its own plot.
+
+Run from the project root with: python -m osa.gui.instrument_window [instruments.json]
+"""
+import argparse
+import logging
+import math
+import sys
+import threading
+import time
+
+from PyQt5 import QtWidgets
+from PyQt5.QtCore import QTimer, pyqtSlot
+
+from osa.config import EXPORT_FORMATS, EXPORT_QUEUE_SIZE, INSTRUMENT_REFRESH_BUDGET, INSTRUMENT_REFRESH_INTERVAL
+from osa.export.plot_exporter import PlotExporter
+from osa.gui.plot_widget import PlotWidget
+from osa.services.acquisition_scheduler import AcquisitionScheduler
+from osa.services.instruments import Instrument, InstrumentRegistry
+from osa.services.server_requests import TraceData
+from osa.utils.log import configure_logging
+
+# Smallest size in pixels of each instrument's plot. The grid scrolls once it no longer fits the window.
+MIN_TILE_WIDTH = 360
+MIN_TILE_HEIGHT = 220
+
+logger = logging.getLogger(__name__)
+
+
+class InstrumentGridWidget(QtWidgets.QScrollArea):
+    """
+    Tiles one PlotWidget per instrument in a grid, as close to square as possible.
+    Results arrive from acquisition threads with set_trace and set_failure, which only keep the
+    latest result of each instrument. A timer draws the plots of instruments with new results,
+    so the GUI thread draws at most one trace per instrument per refresh however fast traces arrive,
+    and stops drawing once a refresh has taken INSTRUMENT_REFRESH_BUDGET.
+    """
+
+    def __init__(self, instruments: list, *args, **kwargs):
+        """
+        :param instruments: Instruments shown, in order
+        """
+        super().__init__(*args, **kwargs)
+
+        # Components
+        self.grid = QtWidgets.QWidget()
+        self.layout = QtWidgets.QGridLayout()
+        self.plot_widgets = {}
+        self.refresh_timer = QTimer()
+
+        # State
+        self.instruments = {instrument.name: instrument for instrument in instruments}
+        self.display_frequency = False
+        # Latest result of each instrument not drawn yet, a (TraceData, x limits) or an error message
+        self.pending = {}
+        self.pending_lock = threading.Lock()
+
+        # Init
+        self.build_ui()
+        self.refresh_timer.timeout.connect(self.refresh)
+        self.refresh_timer.start(INSTRUMENT_REFRESH_INTERVAL)
+
+    def build_ui(self):
+        self.grid.setLayout(self.layout)
+        self.setWidget(self.grid)
+        self.setWidgetResizable(True)
+        columns = math.ceil(math.sqrt(len(self.instruments))) or 1
+        for i, instrument in enumerate(self.instruments.values()):
+            plot_widget = PlotWidget()
+            plot_widget.setMinimumSize(MIN_TILE_WIDTH, MIN_TILE_HEIGHT)
+            plot_widget.set_x_units(frequency=False)
+            plot_widget.set_title(instrument.name)
+            self.plot_widgets[instrument.name] = plot_widget
+            self.layout.addWidget(plot_widget, i // columns, i % columns)
+
+    def set_trace(self, instrument: Instrument, trace_data: TraceData, x_lims: list[float]):
+        """ Queues a trace to be drawn. Safe to call from any thread. """
+        with self.pending_lock:
+            self.pending[instrument.name] = (trace_data, x_lims)
+
+    def set_failure(self, instrument: Instrument, message: str):
+        """ Queues a failure to be shown in the instrument's title. Safe to call from any thread. """
+        with self.pending_lock:
+            self.pending[instrument.name] = message
+
+    @pyqtSlot()
+    def refresh(self):
+        """
+        Draws the latest result of instruments with a new one, in the order results arrived, until the
+        time budget is spent. Instruments left over keep their place, so every instrument is drawn in turn.
+        """
+        deadline = time.perf_counter() + INSTRUMENT_REFRESH_BUDGET / 1000
+        while time.perf_counter() < deadline:
+            with self.pending_lock:
+                if not self.pending:
+                    return
+                name = next(iter(self.pending))
+                result = self.pending.pop(name)
+            plot_widget = self.plot_widgets[name]
+            rate_controller = self.instruments[name].rate_controller
+            plot_widget.setToolTip(f"Rate: {rate_controller.achieved_rate:.2f} Hz"
+                                   f" | Skipped: {rate_controller.skipped_frames}"
+                                   f" | Failed: {rate_controller.failed_frames}")
+            if isinstance(result, str):
+                # Shown without changing plot_title, which names exported images
+                plot_widget.graph_widget.setTitle(f"{plot_widget.plot_title} | {result}", color='r')
+                continue
+            trace_data, x_lims = result
+            plot_widget.set_title(f"{name}::{trace_data.time}")
+            plot_widget.update_data(trace_data)
+
+    def set_x_units(self, frequency: bool):
+        self.display_frequency = frequency
+        for plot_widget in self.plot_widgets.values():
+            plot_widget.set_x_units(frequency=frequency)
+
+    def export_plots(self, exporter: PlotExporter, path: str) -> int:
+        """
+        Queues a snapshot of each plot with a trace to be exported to path
+        :return: Number of plots queued
+        """
+        snapshots = [plot_widget.snapshot() for plot_widget in self.plot_widgets.values()]
+        return sum(exporter.submit(snapshot, path, EXPORT_FORMATS) for snapshot in snapshots if snapshot is not None)
+
+
+class InstrumentWindow(QtWidgets.QMainWindow):
+    """
+    Window acquiring from many instruments at once, with one plot per instrument
+    """
+
+    def __init__(self, registry: InstrumentRegistry, parent=None):
+        super().__init__(parent)
+
+        # Components
+        self.registry = registry
+        self.grid_widget = InstrumentGridWidget(list(registry))
+        self.scheduler = AcquisitionScheduler(registry, on_trace=self.grid_widget.set_trace,
+                                              on_failure=self.grid_widget.set_failure)
+        # Room for a snapshot of every plot, so saving all of them at once drops none
+        self.plot_exporter = PlotExporter(queue_size=max(EXPORT_QUEUE_SIZE, len(registry)))
+        self.tool_bar = self.addToolBar('Acquisition')
+        self.acquisition_status_label = QtWidgets.QLabel()
+        self.status_timer = QTimer()
+
+        # State
+        self.file_save_directory = '.'
+
+        # Init
+        self.setCentralWidget(self.grid_widget)
+        self.setWindowTitle(f'Optical Spectrum Analyzer - {len(registry)} instruments')
+        self.init_tool_bar()
+        self.statusBar().addPermanentWidget(self.acquisition_status_label)
+        self.status_timer.timeout.connect(self.update_acquisition_status)
+        self.status_timer.start(1000)
+
+    def init_tool_bar(self):
+        start_stop_action = QtWidgets.QAction('Start', self)
+        start_stop_action.setCheckable(True)
+        start_stop_action.setToolTip('Acquire from all instruments, each at its own rate')
+        start_stop_action.toggled.connect(self.set_acquiring)
+        self.tool_bar.addAction(start_stop_action)
+
+        frequency_action = QtWidgets.QAction('Frequency', self)
+        frequency_action.setCheckable(True)
+        frequency_action.setToolTip('Show x-axes in THz instead of nm')
+        frequency_action.toggled.connect(self.grid_widget.set_x_units)
+        self.tool_bar.addAction(frequency_action)
+
+        save_action = QtWidgets.QAction('Save', self)
+        save_action.setShortcut('Ctrl+S')
+        save_action.setToolTip('Save every plot in the background')
+        save_action.triggered.connect(self.save_plot_images)
+        self.tool_bar.addAction(save_action)
+
+    @pyqtSlot(bool)
+    def set_acquiring(self, acquiring: bool):
+        if acquiring:
+            logger.info("Starting acquisition from %d instruments.", len(self.registry))
+            self.scheduler.start()
+        else:
+            logger.info("Stopping acquisition.")
+            # Frames in flight finish in the background, their results are drawn as usual
+            self.scheduler.stop(wait=False)
+
+    def update_acquisition_status(self):
+        """ Shows total rate of all instruments and instruments failing their latest frames in the status bar """
+        instruments = list(self.registry)
+        rate = sum(instrument.rate_controller.achieved_rate for instrument in instruments)
+        open_circuits = sum(instrument.circuit_breaker.state != instrument.circuit_breaker.CLOSED
+                            for instrument in instruments)
+        self.acquisition_status_label.setText(f"Total rate: {rate:.1f} Hz | Instruments not responding: {open_circuits}")
+
+    def save_plot_images(self):
+        path = QtWidgets.QFileDialog.getExistingDirectory(self, 'Select Directory', self.file_save_directory)
+        if path:
+            self.file_save_directory = path
+            queued = self.grid_widget.export_plots(self.plot_exporter, path)
+            self.statusBar().showMessage(f"Exporting {queued} plots to {path}")
+
+    def closeEvent(self, event):
+        """ Stops acquisition and closes all connections """
+        self.grid_widget.refresh_timer.stop()
+        # Waits for frames still using the sessions, including those left running when acquisition was toggled off
+        self.scheduler.stop(wait=True)
+        self.plot_exporter.stop()
+        self.registry.close()
+        super().closeEvent(event)
+
+
+def run(argv: list = None):
+    parser = argparse.ArgumentParser(prog='python -m osa.gui.instrument_window',
+                                     description="Acquire from many OSAs at once, one plot per instrument.")
+    parser.add_argument('instruments', nargs='?',
+                        help="JSON file with a list of instruments, each with a name and url and optionally "
+                             "timeouts and rate (default: INSTRUMENTS in osa/config.py)")
+    args = parser.parse_args(argv)
+    configure_logging()
+    try:
+        registry = InstrumentRegistry.load(args.instruments) if args.instruments else InstrumentRegistry.from_config()
+    except (OSError, ValueError) as e:
+        parser.error(f"Cannot load instruments: {e}")
+
+    app = QtWidgets.QApplication(sys.argv[:1])
+    win = InstrumentWindow(registry)
+    win.show()
+    sys.exit(app.exec_())
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,71 @@
+from PyQt5 import QtWidgets
+from PyQt5.QtCore import Qt, QTimer
+
+from osa.utils.metrics import Metrics, get_metrics
+
+# Milliseconds between refreshes of the overlay
+OVERLAY_REFRESH_INTERVAL = 1000
+
+# Timers shown first, in pipeline order. Other timers follow in alphabetical order.
+TIMER_ORDER = ('acquire', 'fetch', 'parse', 'lim', 'render', 'export', 'analysis')
+
+
+class PerformanceOverlay(QtWidgets.QLabel):
+    """
+    Shows timing percentiles, counters and the achieved frame rate over the top left corner of a plot.
+    Metrics are recorded while the overlay is shown, and only then.
+    """
+
+    def __init__(self, parent: QtWidgets.QWidget, metrics: Metrics = None):
+        """
+        :param parent: Widget the overlay is drawn over
+        :param metrics: Metrics shown, defaults to the app's metrics
+        """
+        super().__init__(parent)
+        self.metrics = metrics or get_metrics()
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.timeout.connect(self.refresh)
+
+        self.setAttribute(Qt.WA_TransparentForMouseEvents)
+        self.setTextFormat(Qt.PlainText)
+        self.setStyleSheet('background-color: rgba(0, 0, 0, 160); color: white; padding: 4px;'
+                           'font-family: monospace;')
+        self.move(60, 10)
+        self.hide()
+
+    def set_enabled(self, enabled: bool):
+        """ Shows the overlay and starts recording metrics, or hides it and stops recording """
+        self.metrics.set_enabled(enabled)
+        self.setVisible(enabled)
+        if enabled:
+            self.refresh()
+            self.refresh_timer.start(OVERLAY_REFRESH_INTERVAL)
+        else:
+            self.refresh_timer.stop()
+
+    def refresh(self):
+        self.setText(format_metrics(self.metrics.snapshot()))
+        self.adjustSize()
+        self.raise_()
+
+
+def format_metrics(snapshot: dict) -> str:
+    """
+    Formats a metrics snapshot as a table
+    :param snapshot: Result of Metrics.snapshot()
+    :return: One line per metric, with times in milliseconds
+    """
+    timers = snapshot['timers']
+    names = [name for name in TIMER_ORDER if name in timers]
+    names += sorted(name for name in timers if name not in TIMER_ORDER)
+    lines = [f"{'':<10}{'p50':>8}{'p95':>8}{'p99':>8} ms"]
+    for name in names:
+        timer = timers[name]
+        lines.append(f"{name:<10}" + ''.join(f"{timer[p] * 1000:>8.1f}" for p in ('p50', 'p95', 'p99')))
+    if not names:
+        lines.append("No timings yet")
+    gauges = snapshot['gauges']
+    if 'frame_rate' in gauges:
+        lines.append(f"Frame rate: {gauges['frame_rate']:.2f} Hz")
+    lines += [f"{name.replace('_', ' ').capitalize()}: {count}" for name, count in sorted(snapshot['counters'].items())]
+    return '\n'.join(lines)
@@ -0,0 +1,158 @@
+import time
+
+from PyQt5 import QtWidgets
+from PyQt5.QtCore import Qt, QTimer, pyqtSignal, pyqtSlot
+
+# Playback speeds offered, relative to the recording
+PLAYBACK_SPEEDS = (0.25, 0.5, 1, 2, 4, 8, 16)
+
+
+class PlaybackWidget(QtWidgets.QWidget):
+    """
+    Controls for replaying a recorded session.
+    Includes play/pause, frame stepping, playback speed and a slider to scrub through the recording.
+    Each trace shown is sent with the trace_selected signal.
+    """
+
+    # TraceData, x limits
+    trace_selected = pyqtSignal(object, object)
+    closed = pyqtSignal()
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        # Components
+        self.layout = QtWidgets.QHBoxLayout()
+        self.play_button = QtWidgets.QPushButton('Play')
+        self.step_back_button = QtWidgets.QPushButton('<')
+        self.step_forward_button = QtWidgets.QPushButton('>')
+        self.speed_combo_box = QtWidgets.QComboBox()
+        self.slider = QtWidgets.QSlider(Qt.Horizontal)
+        self.position_label = QtWidgets.QLabel()
+        self.close_button = QtWidgets.QPushButton('Close')
+        self.frame_timer = QTimer()
+
+        # State
+        self.source = None
+
+        # Init
+        self.init_ui()
+        self.init_timer()
+
+    def init_ui(self):
+        self.setLayout(self.layout)
+        self.play_button.setCheckable(True)
+        self.play_button.toggled.connect(self.set_playing)
+        self.step_back_button.setToolTip('Previous trace')
+        self.step_back_button.clicked.connect(lambda: self.step(-1))
+        self.step_forward_button.setToolTip('Next trace')
+        self.step_forward_button.clicked.connect(lambda: self.step(1))
+        for speed in PLAYBACK_SPEEDS:
+            self.speed_combo_box.addItem(f'{speed:g}x', speed)
+        self.speed_combo_box.setCurrentIndex(PLAYBACK_SPEEDS.index(1))
+        self.speed_combo_box.setToolTip('Playback speed')
+        self.speed_combo_box.currentIndexChanged.connect(self.set_speed)
+        self.slider.valueChanged.connect(self.seek)
+        self.close_button.clicked.connect(self.close_recording)
+
+        for widget in (self.step_back_button, self.play_button, self.step_forward_button,
+                       self.speed_combo_box):
+            self.layout.addWidget(widget)
+        self.layout.addWidget(self.slider, stretch=1)
+        self.layout.addWidget(self.position_label)
+        self.layout.addWidget(self.close_button)
+
+    def init_timer(self):
+        """ The timer shows the next trace once, and is restarted with the recorded delay to the following one. """
+        self.frame_timer.setSingleShot(True)
+        self.frame_timer.timeout.connect(self.show_next_trace)
+
+    def open(self, source):
+        """
+        Starts replaying a recording from its first trace, paused.
+        :param source: PlaybackSource of the recording. Recording modules are only imported once one is opened.
+        """
+        self.source = source
+        self.source.speed = self.speed_combo_box.currentData()
+        self.play_button.setChecked(False)
+        self.update_slider_range()
+        self.slider.setValue(0)
+        self.show_trace()
+        self.show()
+
+    def update_slider_range(self):
+        self.slider.blockSignals(True)
+        self.slider.setRange(0, max(len(self.source) - 1, 0))
+        self.slider.blockSignals(False)
+
+    @pyqtSlot(bool)
+    def set_playing(self, playing: bool):
+        self.play_button.setText('Pause' if playing else 'Play')
+        if playing and self.source is not None:
+            self.frame_timer.start(0)
+        else:
+            self.frame_timer.stop()
+
+    @pyqtSlot()
+    def pause(self):
+        self.play_button.setChecked(False)
+
+    @pyqtSlot(int)
+    def set_speed(self, index: int):
+        if self.source is not None:
+            self.source.speed = self.speed_combo_box.itemData(index)
+
+    def step(self, frames: int):
+        """ Pauses and shows the trace frames after the current one """
+        self.pause()
+        self.slider.setValue(self.slider.value() + frames)
+
+    @pyqtSlot(int)
+    def seek(self, position: int):
+        """ Shows the trace at a position, e.g. while the slider is dragged """
+        if self.source is None:
+            return
+        self.source.seek(position)
+        self.show_trace()
+
+    @pyqtSlot()
+    def show_next_trace(self):
+        """
+        Shows the trace at the playback position and schedules the next one.
+        At the end of the recording, traces recorded since it was opened are picked up,
+        otherwise playback pauses.
+        """
+        if self.source.at_end:
+            self.source.reader.refresh()
+            self.update_slider_range()
+            if self.source.at_end:
+                self.show_trace()
+                self.pause()
+                return
+
+        self.show_trace()
+        self.frame_timer.start(int(self.source.frame_delay() * 1000))
+
+    def show_trace(self):
+        """ Sends the trace at the playback position, which then moves on to the next trace. """
+        if len(self.source) == 0:
+            self.position_label.setText('Empty recording')
+            return
+        position = self.source.position
+        trace_data = self.source.get_trace()
+        self.trace_selected.emit(trace_data, self.source.get_x_lims())
+
+        recorded_at = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.source.reader.timestamps[position]))
+        self.position_label.setText(f'{position + 1}/{len(self.source)} {recorded_at}')
+        self.slider.blockSignals(True)
+        self.slider.setValue(position)
+        self.slider.blockSignals(False)
+
+    @pyqtSlot()
+    def close_recording(self):
+        self.pause()
+        if self.source is not None:
+            self.source.reader.close()
+            self.source = None
+        self.hide()
+        self.closed.emit()
@@ -1,12 +1,16 @@
-import os
-
 import numpy as np
 import pyqtgraph as pg
 from PyQt5 import QtWidgets
-import pyqtgraph.exporters
 from pyqtgraph import PlotItem
 
-from osa.utils.unit_conversions import wavelength_to_frequency
+from osa.config import PLOT_DOWNSAMPLING_ENABLED, PLOT_DOWNSAMPLING_POINTS_PER_PIXEL
+from osa.export.snapshot import PlotSnapshot
+from osa.services.server_requests import TraceData
+from osa.utils.downsampling import MinMaxPyramid, visible_range
+from osa.utils.x_axis_cache import XAxisCache
+
+# Plot width in pixels assumed before the plot is first shown
+MIN_PLOT_WIDTH = 640
 
 
 class PlotWidget(QtWidgets.QWidget):
@@ -18,13 +22,22 @@ class PlotWidget(QtWidgets.QWidget):
         self.layout = QtWidgets.QGridLayout()
         self.graph_widget = pg.PlotWidget()
         self.line_pen = pg.mkPen(color='g', width=1)
-        self.line = None
+        self.line = self.graph_widget.plot(pen=self.line_pen)
+        self.markers = pg.ScatterPlotItem(symbol='t', size=10, pen=None, brush='y')
 
         # State
         self.display_frequency = False
-        self.data = []
-        self.x_start = 0
-        self.x_increment = 1
+        self.trace_data = None
+        self.x_axis_cache = XAxisCache()
+        self.x = None
+        # Min/max pyramid of each drawn curve, keyed by overlay name or None for the trace
+        self.pyramids = {}
+        # Curves drawn over the trace and their y-values, keyed by name
+        self.overlays = {}
+        self.overlay_data = {}
+        self.downsampling_enabled = PLOT_DOWNSAMPLING_ENABLED
+        self.points_per_pixel = PLOT_DOWNSAMPLING_POINTS_PER_PIXEL
+        self.refreshing_curve = False
         self.plot_title = ''
 
         # Init
@@ -34,6 +47,10 @@ class PlotWidget(QtWidgets.QWidget):
         self.setLayout(self.layout)
         self.layout.addWidget(self.graph_widget)
         self.graph_widget.showGrid(x=True, y=True)
+        self.graph_widget.addItem(self.markers)
+        view_box = self.graph_widget.getViewBox()
+        view_box.sigXRangeChanged.connect(self.refresh_curve)
+        view_box.sigResized.connect(self.refresh_curve)
 
     def set_labels(self, x_label: str, y_label: str):
         self.graph_widget.setLabels(bottom=x_label, left=y_label)
@@ -59,43 +76,124 @@ class PlotWidget(QtWidgets.QWidget):
                 x_label=f"Wavelength (nm)", y_label="dBm")
             self.graph_widget.invertX(False)
 
-        self.update_data(self.data, self.x_start, self.x_increment)
+        # View range in the previous units is meaningless in the new units
+        self.graph_widget.enableAutoRange()
+        if self.trace_data is not None:
+            self.x = self.x_axis_cache.get(self.trace_data, frequency=frequency)
+            self.refresh_curve()
 
-    def update_data(self, data: list[float], x_start: float, x_increment: float):
+    def set_downsampling(self, enabled: bool, points_per_pixel: int = None):
         """
-        Updates plot data.
-        :param data: List of y-values to plot
-        :param x_start: Starting x value (wavelength) in nm
-        :param x_increment: Increment in x between each y-value in nm
+        Enables or disables drawing large traces downsampled to the plot width.
+        :param enabled: If True, traces with more points than fit the plot width are
+            drawn as the min and max of each group of points.
+        :param points_per_pixel: Points drawn per horizontal pixel, unchanged if None
         """
-        self.data = data
-        self.x_start = x_start
-        self.x_increment = x_increment
-
-        # Create x data from range
-        x_end = x_start + x_increment * len(data)
-        x = np.arange(x_start, x_end, x_increment)
+        self.downsampling_enabled = enabled
+        if points_per_pixel is not None:
+            self.points_per_pixel = points_per_pixel
+        self.refresh_curve()
 
-        if self.display_frequency:
-            x = [wavelength_to_frequency(x_point) for x_point in x]
+    def add_overlay(self, name: str, color):
+        """
+        Adds a curve drawn over the trace, e.g. a max-hold. Its values are set with update_data.
+        :param name: Name of the overlay
+        :param color: Colour of the curve, any value accepted by pg.mkPen
+        """
+        if name not in self.overlays:
+            self.overlays[name] = self.graph_widget.plot(pen=pg.mkPen(color=color, width=1))
 
-        # Clear past line
-        if self.line:
-            self.line.clear()
+    def remove_overlay(self, name: str):
+        overlay = self.overlays.pop(name, None)
+        if overlay is not None:
+            self.graph_widget.removeItem(overlay)
+        self.overlay_data.pop(name, None)
+        self.pyramids.pop(name, None)
 
-        # Draw new line
-        self.line = self.graph_widget.plot(x=x, y=data, pen=self.line_pen)
+    def set_markers(self, x: np.ndarray = None, y: np.ndarray = None):
+        """
+        Marks points of the plot, e.g. channel peaks.
+        :param x: x-values of the points, in the units shown. None to remove all markers.
+        :param y: y-values of the points
+        """
+        if x is None:
+            self.markers.clear()
+        else:
+            self.markers.setData(x=x, y=y)
 
-    def export_plot(self, path: str):
+    def update_data(self, trace_data: TraceData, overlays: dict = None):
+        """
+        Updates plot data.
+        The trace arrays are plotted directly, without copying. The x-axis is reused
+        from the previous trace when the sweep settings have not changed.
+        :param trace_data: Trace to plot, with x-values in nm
+        :param overlays: y-values of overlays added with add_overlay, keyed by name.
+            Each has a value for every x-value of the trace. Overlays not given are not drawn.
+        """
+        self.trace_data = trace_data
+        self.x = self.x_axis_cache.get(trace_data, frequency=self.display_frequency)
+        self.overlay_data = {name: y for name, y in (overlays or {}).items()
+                             if name in self.overlays and y is not None}
+        self.pyramids = {}
+        for name, overlay in self.overlays.items():
+            if name not in self.overlay_data:
+                overlay.setData([], [])
+        self.refresh_curve()
+
+    def refresh_curve(self):
+        """
+        Draws the current trace and its overlays.
+        With downsampling enabled, only the visible part of the trace is drawn,
+        at most points_per_pixel points per pixel of the plot width.
+        Called again whenever the view is zoomed, panned or resized.
+        """
+        if self.trace_data is None or self.refreshing_curve:
+            return
+
+        length = len(self.trace_data.data)
+        view_box = self.graph_widget.getViewBox()
+        max_points = max(int(view_box.width()), MIN_PLOT_WIDTH) * self.points_per_pixel
+        downsample = self.downsampling_enabled and length > max_points
+        if not downsample:
+            self.pyramids = {}
+            start, stop = 0, length
+        elif view_box.autoRangeEnabled()[0]:
+            start, stop = 0, length
+        else:
+            x_min, x_max = view_box.viewRange()[0]
+            start, stop = visible_range(self.x, x_min, x_max, margin=1)
+
+        # Ignore view range changes caused by setting curve data
+        self.refreshing_curve = True
+        try:
+            curves = [(None, self.line, self.trace_data.data)]
+            curves += [(name, self.overlays[name], y) for name, y in self.overlay_data.items()]
+            for name, line, y in curves:
+                if not downsample:
+                    line.setData(x=self.x, y=y)
+                    continue
+                if name not in self.pyramids:
+                    self.pyramids[name] = MinMaxPyramid(y)
+                x, y = self.pyramids[name].decimate(self.x, start, stop, max_points)
+                line.setData(x=x, y=y)
+        finally:
+            self.refreshing_curve = False
+
+    def snapshot(self) -> PlotSnapshot:
         """
-        Exports image of plot to .png file.
-        The file name is equal to the current plot title.
-        :param path: Location to export file
+        Takes a snapshot of the plot as shown, with its view range, overlays and markers,
+        to be exported on another thread with a PlotExporter
+        :return: PlotSnapshot, None if no trace is plotted
         """
-        # Replace ':' character in plot title as it is not allowed in a file name
-        file_name = self.plot_title.replace(':', '-') + '.png'
-        file_location = os.path.join(path, os.path.basename(file_name))
-        exporter = pg.exporters.ImageExporter(self.graph_widget.plotItem)
-        exporter.export(fileName=file_location)
-        print(f"Exported plot to {file_location}")
+        if self.trace_data is None:
+            return None
+        x_range, y_range = self.graph_widget.getViewBox().viewRange()
+        overlays = {name: (y, self.overlays[name].opts['pen'].color()) for name, y in self.overlay_data.items()}
+        marker_x, marker_y = self.markers.getData()
+        return PlotSnapshot(self.plot_title, self.trace_data, self.x, self.trace_data.data,
+                            x_label=self.graph_widget.getAxis('bottom').labelText,
+                            y_label=self.graph_widget.getAxis('left').labelText,
+                            display_frequency=self.display_frequency, overlays=overlays,
+                            markers=(marker_x, marker_y) if len(marker_x) else None,
+                            x_range=tuple(x_range), y_range=tuple(y_range))
 
@@ -0,0 +1,144 @@
+import numpy as np
+import pyqtgraph as pg
+from PyQt5 import QtWidgets
+from PyQt5.QtGui import QTransform
+
+from osa.config import WATERFALL_MAX_COLUMNS, WATERFALL_ROWS
+from osa.services.server_requests import TraceData
+from osa.utils.ring_buffer import RingBuffer2D
+
+
+class WaterfallWidget(QtWidgets.QWidget):
+    """
+    Heatmap of the last traces, x-axis against trace number with the newest trace at the top.
+    Traces are kept in a fixed-size ring buffer, so memory and redraw time per trace
+    do not grow with the length of the acquisition.
+    Traces longer than max_columns are reduced to max_columns columns holding
+    the maximum of the samples they cover, so narrow peaks stay visible.
+    """
+
+    def __init__(self, rows: int = WATERFALL_ROWS, max_columns: int = WATERFALL_MAX_COLUMNS, *args, **kwargs):
+        """
+        :param rows: Number of traces shown
+        :param max_columns: Maximum number of columns of the heatmap
+        """
+        super().__init__(*args, **kwargs)
+
+        # Components
+        self.layout = QtWidgets.QGridLayout()
+        self.graph_widget = pg.PlotWidget()
+        self.image_item = pg.ImageItem(axisOrder='row-major')
+        self.ring_buffer = RingBuffer2D(rows, columns=0)
+
+        # State
+        self.max_columns = max_columns
+        self.sweep = None
+        self.x = None
+        # Start of each column's samples, None if traces fit without reduction
+        self.column_starts = None
+        self.row = None
+        self.levels = None
+        self.update_transform_needed = False
+
+        # Init
+        self.build_ui()
+
+    def build_ui(self):
+        self.setLayout(self.layout)
+        self.layout.addWidget(self.graph_widget)
+        self.graph_widget.addItem(self.image_item)
+        self.graph_widget.setLabels(left='Trace')
+        self.image_item.setLookupTable(pg.colormap.get('viridis').getLookupTable(nPts=256))
+
+    def set_x_units(self, frequency: bool, x: np.ndarray = None):
+        """
+        Sets x-axis to frequency or wavelength.
+        Traces already shown are kept, only the axis is rescaled.
+        :param frequency: If True, x-values are frequencies and the axis is inverted like the trace plot
+        :param x: x-values of the current trace in the new units
+        """
+        self.graph_widget.invertX(frequency)
+        if x is not None:
+            self.x = x
+            self.update_transform()
+
+    def update_data(self, trace_data: TraceData, x: np.ndarray):
+        """
+        Adds a trace to the top of the waterfall.
+        The waterfall is cleared if the sweep differs from the previous trace.
+        :param trace_data: Trace to add
+        :param x: x-values of the trace, in the units shown
+        """
+        sweep = trace_data.sweep
+        if sweep != self.sweep:
+            self.set_sweep(sweep, len(trace_data))
+        self.x = x
+
+        y = trace_data.data
+        if self.column_starts is None:
+            row = y
+        else:
+            row = np.maximum.reduceat(y, self.column_starts, out=self.row)
+        self.ring_buffer.append(row)
+        self.update_levels(self.ring_buffer.latest())
+
+        if self.isVisible():
+            self.refresh_image()
+
+    def set_sweep(self, sweep: tuple, length: int):
+        """ Clears the waterfall and sets up columns for traces of length samples """
+        self.sweep = sweep
+        self.levels = None
+        columns = min(length, self.max_columns)
+        if columns < length:
+            self.column_starts = np.linspace(0, length, columns, endpoint=False).astype(np.intp)
+            self.row = np.empty(columns, dtype=self.ring_buffer.buffer.dtype)
+        else:
+            self.column_starts = None
+            self.row = None
+        self.ring_buffer.clear(columns=columns)
+        self.update_transform_needed = True
+
+    def update_levels(self, row: np.ndarray):
+        """ Widens the colour scale to include the values of a new row """
+        if not np.isfinite(row).any():
+            return
+        low, high = float(np.nanmin(row)), float(np.nanmax(row))
+        if self.levels is not None:
+            low, high = min(low, self.levels[0]), max(high, self.levels[1])
+        self.levels = (low, high)
+
+    def refresh_image(self):
+        """ Draws the traces in the ring buffer """
+        if not len(self.ring_buffer):
+            self.image_item.clear()
+            return
+        self.image_item.setImage(self.ring_buffer.view(), autoLevels=False, levels=self.levels)
+        if self.update_transform_needed:
+            self.update_transform()
+
+    def update_transform(self):
+        """
+        Places the image so that columns line up with the x-values of the samples they cover
+        and rows are numbered from -rows (oldest) to 0 (newest).
+        """
+        if self.x is None or len(self.x) < 2:
+            return
+        self.update_transform_needed = False
+        # Span from half a sample before the first x-value to half a sample after the last one
+        span = (self.x[-1] - self.x[0]) * len(self.x) / (len(self.x) - 1)
+        transform = QTransform()
+        transform.translate(self.x[0] - span / len(self.x) / 2, -self.ring_buffer.rows)
+        transform.scale(span / self.ring_buffer.columns, 1)
+        self.image_item.setTransform(transform)
+
+    def showEvent(self, event):
+        """ Draws traces added while the waterfall was hidden """
+        super().showEvent(event)
+        self.refresh_image()
+
+    def clear(self):
+        self.ring_buffer.clear()
+        self.levels = None
+        self.image_item.clear()
+
@@ -0,0 +1,94 @@
+from osa.config import PLAYBACK_MAX_FRAME_DELAY
+from osa.recording.trace_store import TraceStoreReader
+
+
+class PlaybackSource:
+    """
+    Replays traces of a trace store.
+    get_trace and get_x_lims behave like the live server requests, returning the trace
+    at the playback position and moving on to the next one, so a PlaybackSource can be
+    used wherever traces are fetched from the server, e.g. as an AcquisitionWorker's fetch_trace.
+    """
+
+    def __init__(self, reader: TraceStoreReader, speed: float = 1, loop: bool = False,
+                 max_frame_delay: float = PLAYBACK_MAX_FRAME_DELAY):
+        """
+        :param reader: Reader of the recorded session
+        :param speed: Playback speed relative to the recording, 2 to replay twice as fast
+        :param loop: If True, playback continues from the first trace after the last one
+        :param max_frame_delay: Longest delay returned by frame_delay, in seconds at speed 1
+        """
+        self.reader = reader
+        self.speed = speed
+        self.loop = loop
+        self.max_frame_delay = max_frame_delay
+        self.position = 0
+        self.last_position = None
+
+    def __len__(self):
+        return len(self.reader)
+
+    @property
+    def at_end(self) -> bool:
+        """ True if the trace at the playback position is the last recorded one """
+        return self.position >= len(self.reader) - 1
+
+    def seek(self, position: int):
+        """
+        Moves playback to a trace
+        :param position: Index of the trace, clipped to the recorded traces
+        """
+        self.position = min(max(position, 0), max(len(self.reader) - 1, 0))
+
+    def seek_time(self, recorded_at: float):
+        """
+        Moves playback to the last trace acquired at or before a time
+        :param recorded_at: Unix time
+        """
+        self.seek(self.reader.position_at(recorded_at))
+
+    def step(self, frames: int = 1):
+        """ Moves playback forwards, or backwards if frames is negative """
+        self.seek(self.position + frames)
+
+    def get_trace(self):
+        """
+        Gets trace at the playback position and moves to the next trace.
+        At the end of the recording, the last trace is returned again unless looping.
+        :return: TraceData
+        :raises:
+            IndexError - raised if the recording has no traces
+        """
+        trace_data = self.reader[self.position]
+        self.last_position = self.position
+        if not self.at_end:
+            self.position += 1
+        elif self.loop:
+            self.position = 0
+        return trace_data
+
+    def get_x_lims(self) -> list[float]:
+        """
+        Gets [start, stop] x limits of the trace last returned by get_trace
+        :return: Limits in nm
+        """
+        record = self.reader.index[self.last_position if self.last_position is not None else self.position]
+        start = float(record['x_start'])
+        return [start, start + float(record['x_increment']) * (int(record['length']) - 1)]
+
+    def frame_delay(self) -> float:
+        """
+        Gets time to wait before the next trace, so traces replay at the pace they were
+        recorded at, scaled by speed.
+        :return: Delay in seconds
+        """
+        if self.last_position is None or self.position == self.last_position:
+            return 0
+        timestamps = self.reader.timestamps
+        interval = abs(float(timestamps[self.position] - timestamps[self.last_position]))
+        return min(interval, self.max_frame_delay) / self.speed
+
+    @property
+    def recorded_at(self) -> float:
+        """ Unix time the trace at the playback position was acquired """
+        return float(self.reader.timestamps[self.position])
@@ -0,0 +1,91 @@
+import logging
+import queue
+import threading
+import time
+
+import numpy as np
+
+from osa.config import RECORDING_QUEUE_SIZE
+from osa.recording.trace_store import TraceStoreWriter
+
+logger = logging.getLogger(__name__)
+
+
+class Recorder:
+    """
+    Records traces to a trace store from a background thread.
+    record() never blocks: if the writer falls behind and the queue is full,
+    the trace is dropped and counted in dropped_traces.
+    """
+
+    # Queued to stop the writer thread
+    __stop__ = object()
+
+    def __init__(self, path: str, dtype=np.float64, queue_size: int = RECORDING_QUEUE_SIZE,
+                 **writer_options):
+        """
+        :param path: Directory of the trace store
+        :param dtype: Type y-values are stored as
+        :param queue_size: Maximum number of traces waiting to be written
+        :param writer_options: Options passed on to TraceStoreWriter, e.g. max_chunk_bytes
+        """
+        self.path = path
+        self.writer = TraceStoreWriter(path, dtype=dtype, **writer_options)
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.recorded_traces = 0
+        self.dropped_traces = 0
+        self.failed_traces = 0
+        self.error = None
+        self.thread = threading.Thread(target=self.write_traces, name='osa-recorder', daemon=True)
+        self.thread.start()
+
+    def record(self, trace_data, recorded_at: float = None) -> bool:
+        """
+        Queues a trace to be written.
+        :param trace_data: TraceData to record. Its arrays must not be modified afterwards.
+        :param recorded_at: Unix time the trace was acquired, defaults to now
+        :return: False if the trace was dropped
+        """
+        try:
+            self.queue.put_nowait((trace_data, time.time() if recorded_at is None else recorded_at))
+            return True
+        except queue.Full:
+            self.dropped_traces += 1
+            return False
+
+    def write_traces(self):
+        """
+        Writes queued traces until stopped, flushing whenever the queue is empty.
+        A trace failing to be written is counted in failed_traces and the rest are still written,
+        so the queue keeps draining and stop() returns.
+        """
+        while True:
+            item = self.queue.get()
+            if item is Recorder.__stop__:
+                break
+            try:
+                self.writer.append(*item)
+                self.recorded_traces += 1
+                if self.queue.empty():
+                    self.writer.flush()
+            except Exception as e:
+                if self.error is None:
+                    logger.error("Failed to record trace to %s: %s", self.path, e)
+                self.error = e
+                self.failed_traces += 1
+        try:
+            self.writer.close()
+        except OSError as e:
+            logger.error("Failed to close recording %s: %s", self.path, e)
+            self.error = e
+
+    def stop(self):
+        """ Writes remaining queued traces, then stops the writer thread """
+        # Waits for room only while the writer thread can still make some
+        while self.thread.is_alive():
+            try:
+                self.queue.put(Recorder.__stop__, timeout=0.1)
+                break
+            except queue.Full:
+                continue
+        self.thread.join()
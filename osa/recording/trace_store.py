@@ -0,0 +1,286 @@
+import json
+import os
+import time
+
+import numpy as np
+
+from osa.config import RECORDING_INDEX_BATCH, RECORDING_MAX_CHUNK_BYTES, RECORDING_MAX_CHUNK_SECONDS
+from osa.services.server_requests import TraceData
+
+# Trace store layout, one directory per recorded session:
+#   session.json        - format version and sample type
+#   index.bin           - one INDEX_DTYPE record per trace, appended as traces are written
+#   chunk_00000.bin ... - raw little-endian trace values, appended. A trace's y-values are
+#                         followed by its float64 x-values if the server provided them.
+# All files are append-only, so a session can be read while it is being recorded.
+STORE_VERSION = 1
+SESSION_FILE = 'session.json'
+INDEX_FILE = 'index.bin'
+
+INDEX_DTYPE = np.dtype([
+    ('chunk', '<u4'),
+    # Byte offset of the trace values in the chunk file
+    ('offset', '<u8'),
+    ('length', '<u4'),
+    ('has_x_data', '?'),
+    ('recorded_at', '<f8'),
+    ('x_start', '<f8'),
+    ('x_increment', '<f8'),
+    ('resolution_bandwidth_nm', '<f8'),
+    ('total_power_dbm', '<f8'),
+    ('time', 'S32'),
+    ('instrument', 'S64'),
+])
+
+
+def chunk_file_name(chunk: int) -> str:
+    return f'chunk_{chunk:05d}.bin'
+
+
+class TraceStoreWriter:
+    """
+    Appends traces to a trace store directory.
+    Chunk files are rotated once they reach max_chunk_bytes or are older than max_chunk_seconds.
+    Index and chunk files are buffered separately, so index records are held back and only written
+    once the values they point to are flushed: a store can be read while it is being recorded.
+    Not thread safe: use from one thread, e.g. through Recorder.
+    """
+
+    def __init__(self, path: str, dtype=np.float64,
+                 max_chunk_bytes: int = RECORDING_MAX_CHUNK_BYTES,
+                 max_chunk_seconds: float = RECORDING_MAX_CHUNK_SECONDS,
+                 index_batch: int = RECORDING_INDEX_BATCH, clock=time.monotonic):
+        """
+        :param path: Directory of the store, created if it does not exist
+        :param dtype: Type y-values are stored as, float64 or float32
+        :param max_chunk_bytes: Size after which a new chunk file is started
+        :param max_chunk_seconds: Age after which a new chunk file is started
+        :param index_batch: Number of traces appended after which the store is flushed
+        :param clock: Function returning the current time in seconds, used for chunk age
+        """
+        self.path = path
+        self.dtype = np.dtype(dtype).newbyteorder('<')
+        self.max_chunk_bytes = max_chunk_bytes
+        self.max_chunk_seconds = max_chunk_seconds
+        self.index_batch = index_batch
+        self.clock = clock
+        # Index records of traces whose values may not be flushed yet
+        self.pending_records = []
+
+        os.makedirs(path, exist_ok=True)
+        self.write_session_file()
+        self.index_file = open(os.path.join(path, INDEX_FILE), 'ab')
+        self.count = self.index_file.tell() // INDEX_DTYPE.itemsize
+
+        self.chunk = self.last_chunk() + 1
+        self.chunk_file = None
+        self.chunk_size = 0
+        self.chunk_started_at = None
+
+    def write_session_file(self):
+        session_path = os.path.join(self.path, SESSION_FILE)
+        if os.path.exists(session_path):
+            with open(session_path) as f:
+                session = json.load(f)
+            if session['dtype'] != self.dtype.str:
+                raise ValueError(f"Store at {self.path} holds {session['dtype']} values, not {self.dtype.str}.")
+            return
+        with open(session_path, 'w') as f:
+            json.dump({'version': STORE_VERSION, 'dtype': self.dtype.str}, f)
+
+    def last_chunk(self) -> int:
+        """ Gets number of the last chunk file in the store, -1 if there is none """
+        chunks = [int(name[6:11]) for name in os.listdir(self.path)
+                  if name.startswith('chunk_') and name.endswith('.bin')]
+        return max(chunks, default=-1)
+
+    def append(self, trace_data, recorded_at: float = None):
+        """
+        Appends a trace to the store.
+        :param trace_data: TraceData to store
+        :param recorded_at: Unix time the trace was acquired, defaults to now
+        """
+        y = np.ascontiguousarray(trace_data.data, dtype=self.dtype)
+        x = trace_data.x_data
+        x = None if x is None else np.ascontiguousarray(x, dtype='<f8')
+        size = y.nbytes + (0 if x is None else x.nbytes)
+        self.rotate_chunk_if_needed(size)
+
+        record = index_record(trace_data, len(y), x is not None, recorded_at, self.chunk, self.chunk_size)
+
+        self.chunk_file.write(y.data)
+        if x is not None:
+            self.chunk_file.write(x.data)
+        self.chunk_size += size
+        self.pending_records.append(record.tobytes())
+        self.count += 1
+        if len(self.pending_records) >= self.index_batch:
+            self.flush()
+
+    def rotate_chunk_if_needed(self, size: int):
+        """ Starts a new chunk file if a trace of size bytes does not fit in the current one """
+        if self.chunk_file is not None:
+            too_big = self.chunk_size > 0 and self.chunk_size + size > self.max_chunk_bytes
+            too_old = self.clock() - self.chunk_started_at >= self.max_chunk_seconds
+            if not too_big and not too_old:
+                return
+            self.chunk_file.close()
+            self.chunk += 1
+
+        self.chunk_file = open(os.path.join(self.path, chunk_file_name(self.chunk)), 'ab')
+        self.chunk_size = 0
+        self.chunk_started_at = self.clock()
+
+    def flush(self):
+        """ Writes buffered traces to disk, their values before the index records pointing to them """
+        if self.chunk_file is not None:
+            self.chunk_file.flush()
+        self.index_file.write(b''.join(self.pending_records))
+        self.pending_records.clear()
+        self.index_file.flush()
+
+    def close(self):
+        self.flush()
+        if self.chunk_file is not None:
+            self.chunk_file.close()
+        self.index_file.close()
+
+
+def index_record(trace_data, length: int, has_x_data: bool, recorded_at: float = None,
+                 chunk: int = 0, offset: int = 0) -> np.ndarray:
+    """
+    Gets the index record of a trace
+    :param trace_data: TraceData the record describes
+    :param length: Number of values stored
+    :param has_x_data: True if the trace's x-values are stored after its y-values
+    :param recorded_at: Unix time the trace was acquired, defaults to now
+    :param chunk: Number of the chunk the values are stored in
+    :param offset: Byte offset of the values in the chunk
+    :return: Array holding one INDEX_DTYPE record
+    """
+    record = np.zeros(1, dtype=INDEX_DTYPE)
+    record['chunk'] = chunk
+    record['offset'] = offset
+    record['length'] = length
+    record['has_x_data'] = has_x_data
+    record['recorded_at'] = time.time() if recorded_at is None else recorded_at
+    record['x_start'] = __value_or_nan__(trace_data.x_start)
+    record['x_increment'] = __value_or_nan__(trace_data.x_increment)
+    record['resolution_bandwidth_nm'] = __value_or_nan__(trace_data.resolution_bandwidth_nm)
+    record['total_power_dbm'] = __value_or_nan__(trace_data.total_power_dbm)
+    record['time'] = __encode_truncated__(trace_data.time, INDEX_DTYPE['time'].itemsize)
+    record['instrument'] = __encode_truncated__(trace_data.instrument, INDEX_DTYPE['instrument'].itemsize)
+    return record
+
+
+def trace_from_record(record, y: np.ndarray, x_data: np.ndarray = None):
+    """
+    Gets TraceData from an index record and the stored values, without copying them
+    :param record: INDEX_DTYPE record of the trace
+    :param y: Stored y-values
+    :param x_data: Stored x-values, if any
+    :return: TraceData
+    """
+    return TraceData(data=y,
+                     time=record['time'].decode(errors='replace'),
+                     instrument=record['instrument'].decode(errors='replace'),
+                     x_label='Wavelength',
+                     y_label='dBm',
+                     x_units='nm',
+                     x_increment=__nan_to_none__(record['x_increment']),
+                     x_start=None if x_data is not None else __nan_to_none__(record['x_start']),
+                     x_data=x_data,
+                     dtype=y.dtype,
+                     resolution_bandwidth_nm=__nan_to_none__(record['resolution_bandwidth_nm']),
+                     total_power_dbm=__nan_to_none__(record['total_power_dbm']))
+
+
+def __value_or_nan__(value) -> float:
+    return np.nan if value is None else value
+
+
+def __encode_truncated__(text: str, size: int) -> bytes:
+    """ Encodes text as UTF-8 in at most size bytes, without splitting a character """
+    return (text or '').encode()[:size].decode(errors='ignore').encode()
+
+
+class TraceStoreReader:
+    """
+    Reads traces from a trace store through memory-mapped files.
+    Opening a store only maps its index, and trace values are read lazily when a trace
+    is accessed, so stores larger than memory open instantly. Traces are looked up
+    by position in O(1), and by acquisition time with a binary search of the index.
+    """
+
+    def __init__(self, path: str):
+        """
+        :param path: Directory of the store
+        :raises:
+            FileNotFoundError - raised if path is not a trace store
+        """
+        self.path = path
+        with open(os.path.join(path, SESSION_FILE)) as f:
+            session = json.load(f)
+        self.dtype = np.dtype(session['dtype'])
+        self.chunks = {}
+        self.index = None
+        self.refresh()
+
+    def refresh(self):
+        """ Maps traces appended since the store was opened, e.g. while it is being recorded """
+        index_path = os.path.join(self.path, INDEX_FILE)
+        count = os.path.getsize(index_path) // INDEX_DTYPE.itemsize
+        if count == 0:
+            self.index = np.empty(0, dtype=INDEX_DTYPE)
+        else:
+            self.index = np.memmap(index_path, dtype=INDEX_DTYPE, mode='r', shape=(count,))
+        # Chunks may have grown too
+        self.chunks = {}
+
+    def __len__(self):
+        return len(self.index)
+
+    @property
+    def timestamps(self) -> np.ndarray:
+        """ Unix time each trace was acquired """
+        return self.index['recorded_at']
+
+    def chunk(self, chunk: int) -> np.ndarray:
+        """ Gets memory map of a chunk file """
+        if chunk not in self.chunks:
+            self.chunks[chunk] = np.memmap(os.path.join(self.path, chunk_file_name(chunk)),
+                                           dtype=np.uint8, mode='r')
+        return self.chunks[chunk]
+
+    def __getitem__(self, position: int):
+        """
+        Reads trace at a position.
+        Returned arrays are read-only views of the memory-mapped chunk file.
+        :return: TraceData
+        """
+        record = self.index[position]
+        chunk = self.chunk(int(record['chunk']))
+        offset = int(record['offset'])
+        length = int(record['length'])
+        y = np.frombuffer(chunk, dtype=self.dtype, count=length, offset=offset)
+        x_data = None
+        if record['has_x_data']:
+            x_data = np.frombuffer(chunk, dtype='<f8', count=length, offset=offset + y.nbytes)
+        return trace_from_record(record, y, x_data)
+
+    def position_at(self, recorded_at: float) -> int:
+        """
+        Gets position of the last trace acquired at or before a time.
+        :param recorded_at: Unix time
+        :return: Position, 0 if the time is before the first trace
+        """
+        position = int(np.searchsorted(self.timestamps, recorded_at, side='right')) - 1
+        return min(max(position, 0), max(len(self) - 1, 0))
+
+    def close(self):
+        self.chunks = {}
+        self.index = np.empty(0, dtype=INDEX_DTYPE)
+
+
+def __nan_to_none__(value: float):
+    return None if np.isnan(value) else float(value)
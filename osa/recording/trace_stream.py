@@ -0,0 +1,142 @@
+import json
+
+import numpy as np
+
+from osa.recording.trace_store import INDEX_DTYPE, STORE_VERSION, index_record, trace_from_record
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Trace stream formats, written to a pipe or file one trace at a time:
+#   ndjson - one JSON object per line and trace. NaN values are written as null.
+#   binary - a JSON header line holding the format version and sample type, as in a trace
+#            store's session.json, then for each trace an INDEX_DTYPE record followed by its
+#            little-endian y-values and, if the record has_x_data, its float64 x-values.
+#            The record's offset is the byte offset of the values in the stream.
+STREAM_FORMATS = ('ndjson', 'binary')
+
+
+class NdjsonTraceWriter:
+    """
+    Writes traces as newline delimited JSON.
+    Each line holds the trace's metadata, its y-values as 'y', its x-values as 'x' if the
+    server provided them, and the channels found in it as 'channels' if it was analysed.
+    """
+
+    def __init__(self, stream, use_fast_backend: bool = True):
+        """
+        :param stream: Binary stream to write to
+        :param use_fast_backend: If True and orjson is installed, uses orjson for serialization.
+        """
+        self.stream = stream
+        self.use_fast_backend = use_fast_backend and orjson is not None
+
+    def write(self, trace_data, recorded_at: float, channels: np.ndarray = None):
+        """
+        Writes a trace and flushes the stream, so readers see every trace as it arrives
+        :param trace_data: TraceData to write
+        :param recorded_at: Unix time the trace was acquired
+        :param channels: CHANNEL_DTYPE records of the trace, if it was analysed
+        """
+        line = {'recorded_at': recorded_at,
+                'time': trace_data.time,
+                'instrument': trace_data.instrument,
+                'x_units': trace_data.x_units,
+                'x_start': trace_data.x_start,
+                'x_increment': trace_data.x_increment,
+                'resolution_bandwidth_nm': trace_data.resolution_bandwidth_nm,
+                'total_power_dbm': trace_data.total_power_dbm,
+                'y': trace_data.data}
+        if trace_data.x_data is not None:
+            line['x'] = trace_data.x_data
+        if channels is not None:
+            line['channels'] = [dict(zip(channels.dtype.names, channel)) for channel in channels.tolist()]
+
+        if self.use_fast_backend:
+            self.stream.write(orjson.dumps(line, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_APPEND_NEWLINE))
+        else:
+            for key in ('y', 'x'):
+                if key in line:
+                    line[key] = __json_values__(line[key])
+            if channels is not None:
+                line['channels'] = [{name: (None if value != value else value) for name, value in channel.items()}
+                                    for channel in line['channels']]
+            self.stream.write(json.dumps(line).encode() + b'\n')
+        self.stream.flush()
+
+
+class BinaryTraceWriter:
+    """ Writes traces in the binary stream format, the same records and values as a trace store """
+
+    def __init__(self, stream, dtype=np.float64):
+        """
+        :param stream: Binary stream to write to
+        :param dtype: Type y-values are written as, float64 or float32
+        """
+        self.stream = stream
+        self.dtype = np.dtype(dtype).newbyteorder('<')
+        header = json.dumps({'version': STORE_VERSION, 'dtype': self.dtype.str}).encode() + b'\n'
+        self.stream.write(header)
+        self.position = len(header)
+
+    def write(self, trace_data, recorded_at: float, channels: np.ndarray = None):
+        """
+        Writes a trace and flushes the stream
+        :param trace_data: TraceData to write
+        :param recorded_at: Unix time the trace was acquired
+        :param channels: Ignored, channels are not part of the binary format
+        """
+        y = np.ascontiguousarray(trace_data.data, dtype=self.dtype)
+        x = trace_data.x_data
+        x = None if x is None else np.ascontiguousarray(x, dtype='<f8')
+        record = index_record(trace_data, len(y), x is not None, recorded_at,
+                              offset=self.position + INDEX_DTYPE.itemsize)
+        self.stream.write(record.data)
+        self.stream.write(y.data)
+        if x is not None:
+            self.stream.write(x.data)
+        self.position += INDEX_DTYPE.itemsize + y.nbytes + (0 if x is None else x.nbytes)
+        self.stream.flush()
+
+
+def read_binary_traces(stream):
+    """
+    Reads traces written by BinaryTraceWriter until the end of the stream.
+    A trace cut off by the end of the stream is not returned.
+    :param stream: Binary stream to read from
+    :return: Generator of (TraceData, recorded_at)
+    :raises:
+        ValueError - raised if the stream does not start with a trace stream header
+    """
+    try:
+        header = json.loads(stream.readline())
+        dtype = np.dtype(header['dtype'])
+    except (ValueError, KeyError, TypeError):
+        raise ValueError("Not a binary trace stream.")
+
+    while True:
+        record_bytes = stream.read(INDEX_DTYPE.itemsize)
+        if len(record_bytes) < INDEX_DTYPE.itemsize:
+            return
+        record = np.frombuffer(record_bytes, dtype=INDEX_DTYPE)[0]
+        length = int(record['length'])
+        values_size = length * (dtype.itemsize + (8 if record['has_x_data'] else 0))
+        values = stream.read(values_size)
+        if len(values) < values_size:
+            # Last trace was cut off, e.g. by the writer being stopped
+            return
+        y = np.frombuffer(values, dtype=dtype, count=length)
+        x_data = None
+        if record['has_x_data']:
+            x_data = np.frombuffer(values, dtype='<f8', count=length, offset=y.nbytes)
+        yield trace_from_record(record, y, x_data), float(record['recorded_at'])
+
+
+def __json_values__(values: np.ndarray) -> list:
+    """ Gets array values as a list for json, NaN values as None """
+    values_list = values.tolist()
+    if np.isnan(values).any():
+        return [None if value != value else value for value in values_list]
+    return values_list
@@ -0,0 +1,163 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from osa.config import INSTRUMENT_WORKERS
+from osa.exceptions.osa_server_exception import OsaServerException
+from osa.services.instruments import Instrument
+from osa.utils.metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+
+
+class AcquisitionScheduler:
+    """
+    Acquires traces from many instruments at once, each at its own rate.
+    A scheduling thread starts the frames of each instrument on a fixed timeline and hands them to
+    a pool of worker threads. An instrument has at most one frame in flight: frames falling due while
+    it is still in flight are skipped rather than queued, so a slow instrument only ever holds one worker
+    and does not delay frames of the others. Results are passed to the callbacks from the worker threads.
+    Frames still in flight from before a restart count as in flight, so an instrument never has two.
+    """
+
+    def __init__(self, instruments, on_trace=None, on_failure=None, workers: int = None, clock=time.monotonic):
+        """
+        :param instruments: Instruments to acquire from, e.g. an InstrumentRegistry
+        :param on_trace: Function called with (Instrument, TraceData, x limits) for every trace acquired.
+            Called from worker threads, so it should return quickly.
+        :param on_failure: Function called with (Instrument, error message) for every failed frame.
+            Called from worker threads, so it should return quickly.
+        :param workers: Number of worker threads, defaults to one per instrument up to INSTRUMENT_WORKERS
+        :param clock: Function returning the current time in seconds
+        """
+        self.instruments = list(instruments)
+        self.on_trace = on_trace
+        self.on_failure = on_failure
+        self.workers = workers or max(min(len(self.instruments), INSTRUMENT_WORKERS), 1)
+        self.clock = clock
+
+        self.lock = threading.Lock()
+        self.wake_event = threading.Event()
+        self.in_flight = set()
+        self.next_frame_at = {}
+        self.running = False
+        # Incremented on every start, so frames still in flight from before a restart are not rescheduled
+        self.generation = 0
+        self.executor = None
+        # Executors stopped without waiting, whose frames may still be running
+        self.stopped_executors = []
+        self.thread = None
+
+    def start(self):
+        """
+        Starts acquiring from all instruments.
+        First frames are spread over the interval of each instrument rather than all started at once,
+        so traces keep arriving evenly instead of in bursts. Instruments with a frame still in flight
+        from before, after stop(wait=False), start once it finishes.
+        """
+        if self.running:
+            return
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='osa-instrument')
+        with self.lock:
+            now = self.clock()
+            for i, instrument in enumerate(self.instruments):
+                # A frame in flight finishes against the statistics and limits it started with
+                if instrument.name not in self.in_flight:
+                    instrument.rate_controller.reset()
+                    instrument.x_lims_cache.invalidate()
+                offset = instrument.rate_controller.interval * i / len(self.instruments)
+                self.next_frame_at[instrument.name] = now + offset
+            self.generation += 1
+            self.running = True
+        self.thread = threading.Thread(target=self.schedule, name='osa-scheduler', daemon=True)
+        self.thread.start()
+
+    def schedule(self):
+        """ Starts frames as they fall due until stopped. Runs on the scheduling thread. """
+        while True:
+            # Cleared before looking for due frames, so frames finishing from here on wake the loop
+            self.wake_event.clear()
+            with self.lock:
+                if not self.running:
+                    return
+                now = self.clock()
+                due = [instrument for instrument in self.instruments
+                       if instrument.name not in self.in_flight and self.next_frame_at[instrument.name] <= now]
+                self.in_flight.update(instrument.name for instrument in due)
+                waiting = [self.next_frame_at[instrument.name] for instrument in self.instruments
+                           if instrument.name not in self.in_flight]
+                for instrument in due:
+                    future = self.executor.submit(self.acquire_frame, instrument, self.generation)
+                    future.add_done_callback(lambda future, name=instrument.name: self.frame_cancelled(name, future))
+            self.wake_event.wait(min(waiting) - now if waiting else None)
+
+    def acquire_frame(self, instrument: Instrument, generation: int):
+        """
+        Acquires one trace from an instrument and schedules its next frame. Runs on a worker thread.
+        :param generation: Generation of the scheduler the frame was started in
+        """
+        instrument.rate_controller.frame_started()
+        error = None
+        try:
+            trace_data, x_lims = instrument.acquire()
+        except OsaServerException as e:
+            error = str(e)
+        except Exception as e:
+            # A misbehaving instrument must not stop acquisition from the others
+            logger.exception("Acquisition from %s failed", instrument.name)
+            error = repr(e)
+
+        # Callbacks run before the next frame is scheduled, so results of an instrument arrive in order
+        try:
+            if error is None and self.on_trace is not None:
+                self.on_trace(instrument, trace_data, x_lims)
+            elif error is not None and self.on_failure is not None:
+                self.on_failure(instrument, error)
+        finally:
+            self.finish_frame(instrument, generation, success=error is None)
+
+    def finish_frame(self, instrument: Instrument, generation: int, success: bool):
+        """ Records the end of a frame and schedules the next one, skipping frames that are already late """
+        rate_controller = instrument.rate_controller
+        rate_controller.frame_finished(success)
+        metrics = get_metrics()
+        metrics.increment('frames')
+        if not success:
+            metrics.increment('failed_frames')
+
+        with self.lock:
+            # Frames from before a restart do not move the new schedule
+            if generation == self.generation:
+                now = self.clock()
+                next_frame_at = self.next_frame_at[instrument.name] + rate_controller.interval
+                self.next_frame_at[instrument.name] = max(next_frame_at, now)
+            self.in_flight.discard(instrument.name)
+        self.wake_event.set()
+
+    def frame_cancelled(self, name: str, future):
+        """ Releases the instrument of a frame cancelled by stop() before it started """
+        if not future.cancelled():
+            return
+        with self.lock:
+            self.in_flight.discard(name)
+        self.wake_event.set()
+
+    def stop(self, wait: bool = True):
+        """
+        Stops starting frames
+        :param wait: True to wait for frames in flight to finish, including those left running by
+            earlier calls without waiting, e.g. before closing the instruments
+        """
+        with self.lock:
+            running = self.running
+            self.running = False
+        if running:
+            self.wake_event.set()
+            self.thread.join()
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.stopped_executors.append(self.executor)
+        if wait:
+            for executor in self.stopped_executors:
+                executor.shutdown(wait=True)
+            self.stopped_executors.clear()
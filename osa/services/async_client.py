@@ -0,0 +1,138 @@
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from osa.config import ACQUISITION_DEADLINE
+from osa.exceptions.response_timeout import ResponseTimeout
+from osa.services.osa_session import OsaSession, get_session
+from osa.services.server_requests import TraceData, get_trace, get_x_lims
+
+
+class AsyncOsaClient:
+    """
+    Asyncio client for the OSA server.
+    Requests are sent from a thread pool over a pooled session, so commands awaited
+    together, like TRACE and LIM in acquire(), are in flight at the same time.
+    """
+
+    def __init__(self, session: OsaSession = None, max_workers: int = None):
+        """
+        :param session: Session to send requests with, defaults to the shared session
+        :param max_workers: Maximum number of concurrent requests, defaults to the session pool size
+        """
+        self.session = session or get_session()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers or self.session.pool_size,
+                                           thread_name_prefix='osa-request')
+
+    async def run(self, fn, *args):
+        """ Runs blocking function on the request thread pool """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(fn, *args))
+
+    async def get_trace(self, dtype=np.float64) -> TraceData:
+        """ Requests trace data, see server_requests.get_trace """
+        return await self.run(get_trace, self.session, dtype)
+
+    async def get_x_lims(self) -> list[float]:
+        """ Requests x limits, see server_requests.get_x_lims """
+        return await self.run(get_x_lims, self.session)
+
+    async def acquire(self, x_lims_cache=None,
+                      deadline: float = ACQUISITION_DEADLINE) -> tuple[TraceData, list[float]]:
+        """
+        Requests a trace and its x limits at the same time.
+        :param x_lims_cache: LimitsCache to read x limits from. If given, LIM is only requested
+            when the cached limits are stale.
+        :param deadline: Seconds allowed for the whole acquisition, or None for no deadline
+        :return: (trace data, [start, stop] x limits in nm)
+        :raises:
+            ResponseTimeout - raised if the acquisition does not finish before the deadline
+            OsaServerException - raised if a request fails
+        """
+        try:
+            return await asyncio.wait_for(self.acquire_cycle(x_lims_cache), deadline)
+        except asyncio.TimeoutError:
+            raise ResponseTimeout(f"Acquisition did not finish within {deadline} seconds.")
+
+    async def acquire_cycle(self, x_lims_cache) -> tuple[TraceData, list[float]]:
+        """ Requests trace and x limits, without a deadline """
+        if x_lims_cache is None:
+            return tuple(await gather_or_cancel(self.get_trace(), self.get_x_lims()))
+
+        if x_lims_cache.is_stale(x_lims_cache.sweep):
+            trace_data, _ = await gather_or_cancel(self.get_trace(), self.run(x_lims_cache.get))
+        else:
+            trace_data = await self.get_trace()
+        # Requests limits again only if the trace shows the sweep settings changed
+        x_lims = await self.run(x_lims_cache.get, trace_data)
+        return trace_data, x_lims
+
+    def close(self):
+        """ Stops request threads once pending requests finish """
+        self.executor.shutdown(wait=False)
+
+
+async def gather_or_cancel(*coroutines) -> list:
+    """
+    Awaits coroutines concurrently.
+    If one fails or the gather is cancelled, the others are cancelled too.
+    :return: List of results, in the order of coroutines
+    """
+    tasks = [asyncio.ensure_future(coroutine) for coroutine in coroutines]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
+
+
+class EventLoopThread:
+    """
+    Runs an asyncio event loop on a daemon thread, so coroutines can be
+    used from threads without a running loop, such as Qt threads.
+    """
+
+    def __init__(self, name: str = 'osa-event-loop'):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name=name, daemon=True)
+        self.thread.start()
+
+    def submit(self, coroutine):
+        """
+        Schedules coroutine on the loop.
+        :return: concurrent.futures.Future of the result. Cancelling it cancels the coroutine.
+        """
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+    def run(self, coroutine):
+        """ Runs coroutine on the loop and waits for its result """
+        return self.submit(coroutine).result()
+
+    def stop(self):
+        """
+        Cancels pending coroutines, stops the loop and waits for its thread to finish.
+        Coroutines are cancelled and awaited on the loop before it closes, so none is left to be
+        finalized, and fail, on a closed loop.
+        """
+        if self.loop.is_running():
+            try:
+                self.run(__shutdown_loop__())
+            finally:
+                self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+
+
+async def __shutdown_loop__():
+    """ Cancels and awaits all other tasks of the running loop, then shuts down its generators and executor """
+    loop = asyncio.get_running_loop()
+    tasks = [task for task in asyncio.all_tasks(loop) if task is not asyncio.current_task()]
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    await loop.shutdown_asyncgens()
+    await loop.shutdown_default_executor()
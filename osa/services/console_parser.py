@@ -0,0 +1,133 @@
+import re
+
+from osa.exceptions.console_error import ConsoleError
+from osa.exceptions.invalid_response import InvalidResponse
+
+# Prefix of console replies to commands which succeeded
+READY_PREFIX = '+READY>'
+
+# Console reply prefix, e.g. '+READY>' or '-ERROR>'
+__prefix_pattern__ = re.compile(r'\s*([+-])([A-Za-z]+)>')
+
+# Decimal number, without the nan, inf and digit separators accepted by float()
+__number_pattern__ = re.compile(r'[+-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?')
+
+
+def parse_number(payload: str):
+    """
+    Parses a single number
+    :return: int if the number has no fraction or exponent, otherwise float
+    :raises:
+        ValueError - raised if payload is not a number
+    """
+    payload = payload.strip()
+    if not __number_pattern__.fullmatch(payload):
+        raise ValueError(f"Not a number: {payload!r}")
+    if payload.lstrip('+-').isdigit():
+        return int(payload)
+    return float(payload)
+
+
+def parse_integer(payload: str) -> int:
+    """
+    Parses a single integer
+    :raises:
+        ValueError - raised if payload is not an integer
+    """
+    number = parse_number(payload)
+    if not isinstance(number, int):
+        raise ValueError(f"Not an integer: {payload!r}")
+    return number
+
+
+def parse_number_list(payload: str) -> list:
+    """
+    Parses comma separated numbers, optionally in square brackets, e.g. '[1515, 1580]'
+    :raises:
+        ValueError - raised if payload is not a list of numbers
+    """
+    payload = payload.strip()
+    if payload.startswith('['):
+        if not payload.endswith(']'):
+            raise ValueError(f"Unterminated list: {payload!r}")
+        payload = payload[1:-1]
+    if not payload.strip():
+        return []
+    return [parse_number(value) for value in payload.split(',')]
+
+
+class ConsoleCommand:
+    """
+    Describes an OSA console command and the reply it gets.
+    New commands are added to COMMANDS with register_command, e.g.
+    register_command(ConsoleCommand('SPAN', parse_number))
+    """
+
+    def __init__(self, name: str, parse, length: int = None):
+        """
+        :param name: Command sent to the server
+        :param parse: Function parsing the reply payload, raising ValueError if it is invalid
+        :param length: Required number of values, for commands replying with a list
+        """
+        self.name = name
+        self.parse = parse
+        self.length = length
+
+    def parse_payload(self, payload: str):
+        """
+        Parses the payload of a reply to this command
+        :raises:
+            ValueError - raised if payload is invalid
+        """
+        value = self.parse(payload)
+        if self.length is not None and len(value) != self.length:
+            raise ValueError(f"Expected {self.length} values, got {len(value)}")
+        return value
+
+
+# Console commands by name
+COMMANDS = {}
+
+
+def register_command(command: ConsoleCommand):
+    """ Adds command to COMMANDS so that replies to it can be parsed with parse_reply """
+    COMMANDS[command.name] = command
+
+
+register_command(ConsoleCommand('LIM', parse_number_list, length=2))
+
+
+def split_reply(reply: str) -> str:
+    """
+    Removes prefix from OSA console reply
+    :param reply: Console reply. A reply without a prefix is treated as successful.
+    :return: Reply payload
+    :raises:
+        ConsoleError - raised if reply has an error prefix
+    """
+    match = __prefix_pattern__.match(reply)
+    if match is None:
+        return reply
+    if match.group(0).strip() != READY_PREFIX:
+        message = reply[match.end():].strip()
+        raise ConsoleError(f"OSA server replied with {match.group(0).strip()} {message}".strip())
+    return reply[match.end():]
+
+
+def parse_reply(reply: str, command: str):
+    """
+    Parses console reply to a command
+    :param reply: Reply text, e.g. '+READY>[1515, 1580]'
+    :param command: Name of a command in COMMANDS
+    :return: Parsed reply value
+    :raises:
+        ConsoleError - raised if the server replied with an error
+        InvalidResponse - raised if the reply cannot be parsed
+    """
+    if not isinstance(reply, str):
+        raise InvalidResponse(f"Invalid response to {command} request.")
+    payload = split_reply(reply)
+    try:
+        return COMMANDS[command].parse_payload(payload)
+    except ValueError as e:
+        raise InvalidResponse(f"Invalid response to {command} request: {e}")
@@ -0,0 +1,135 @@
+import json
+
+import numpy as np
+
+from osa.config import ACQUISITION_RATE, CONNECTION_POOL_SIZE, INSTRUMENTS
+from osa.services.limits_cache import LimitsCache
+from osa.services.osa_session import OsaSession
+from osa.services.rate_controller import RateController
+from osa.services.request_error_manager import CircuitBreaker
+from osa.services.server_requests import TraceData, get_trace, get_x_lims
+
+
+class Instrument:
+    """
+    An OSA server acquired from alongside others.
+    Each instrument has its own connection pool, x limits cache, circuit breaker and rate,
+    so a slow or failing instrument does not affect requests to the others.
+    """
+
+    def __init__(self, name: str, url: str, timeouts: dict[str, float] = None,
+                 rate: float = ACQUISITION_RATE, pool_size: int = CONNECTION_POOL_SIZE, dtype=np.float64):
+        """
+        :param name: Name of the instrument, unique in its registry
+        :param url: Base url of its console commands
+        :param timeouts: Timeout in seconds for each command, overrides COMMAND_TIMEOUTS
+        :param rate: Target acquisition rate in Hz, 0 to acquire as fast as it responds
+        :param pool_size: Maximum number of pooled connections to it
+        :param dtype: Array type of trace y-values
+        """
+        self.name = name
+        self.url = url
+        self.dtype = dtype
+        self.session = OsaSession(api_url=url, pool_size=pool_size, timeouts=timeouts)
+        self.x_lims_cache = LimitsCache(lambda: get_x_lims(self.session))
+        self.circuit_breaker = CircuitBreaker()
+        self.rate_controller = RateController(rate)
+
+    @staticmethod
+    def from_config(entry: dict, **kwargs):
+        """
+        Creates an instrument from an entry of INSTRUMENTS
+        :param entry: Dict with 'name', 'url' and optionally 'timeouts' and 'rate'
+        :param kwargs: Further arguments of Instrument
+        :return: Instrument
+        :raises:
+            ValueError - raised if the entry has no name or url, or unknown keys
+        """
+        unknown = set(entry) - {'name', 'url', 'timeouts', 'rate'}
+        if unknown or 'name' not in entry or 'url' not in entry:
+            raise ValueError(f"Instrument entries need a name and url, and may have timeouts and rate: {entry}")
+        return Instrument(entry['name'], entry['url'], timeouts=entry.get('timeouts'),
+                          rate=entry.get('rate', ACQUISITION_RATE), **kwargs)
+
+    def acquire(self) -> tuple[TraceData, list[float]]:
+        """
+        Requests a trace, and its x limits when the cached limits are stale, through the circuit breaker.
+        :return: (TraceData, [start, stop] x limits)
+        :raises:
+            OsaServerException - raised if a request fails or the circuit is open
+        """
+        def acquire_once():
+            trace_data = get_trace(self.session, dtype=self.dtype)
+            x_lims = self.x_lims_cache.get(trace_data)
+            if trace_data.x_data is None:
+                trace_data.x_start = x_lims[0]
+            return trace_data, x_lims
+
+        return self.circuit_breaker.call(acquire_once)
+
+    def close(self):
+        self.session.close()
+
+
+class InstrumentRegistry:
+    """
+    Instruments acquired from together, by name in the order they were added
+    """
+
+    def __init__(self, instruments: list = ()):
+        self.instruments = {}
+        for instrument in instruments:
+            self.add(instrument)
+
+    @staticmethod
+    def from_config(entries: list = None, **kwargs):
+        """
+        Creates instruments from a list of entries
+        :param entries: Dicts with 'name', 'url' and optionally 'timeouts' and 'rate', defaults to INSTRUMENTS
+        :param kwargs: Further arguments of each Instrument
+        :return: InstrumentRegistry
+        :raises:
+            ValueError - raised if an entry is invalid or names are not unique
+        """
+        entries = INSTRUMENTS if entries is None else entries
+        return InstrumentRegistry([Instrument.from_config(entry, **kwargs) for entry in entries])
+
+    @staticmethod
+    def load(path: str, **kwargs):
+        """
+        Creates instruments listed in a JSON file, in the format of INSTRUMENTS
+        :raises:
+            OSError - raised if the file cannot be read
+            ValueError - raised if the file is not a list of valid entries
+        """
+        with open(path) as f:
+            entries = json.load(f)
+        if not isinstance(entries, list):
+            raise ValueError(f"{path} must hold a list of instruments.")
+        return InstrumentRegistry.from_config(entries, **kwargs)
+
+    def add(self, instrument: Instrument):
+        """
+        :raises:
+            ValueError - raised if an instrument with the same name was added before
+        """
+        if instrument.name in self.instruments:
+            raise ValueError(f"Instrument {instrument.name} is already registered.")
+        self.instruments[instrument.name] = instrument
+
+    def remove(self, name: str) -> Instrument:
+        return self.instruments.pop(name)
+
+    def __getitem__(self, name: str) -> Instrument:
+        return self.instruments[name]
+
+    def __iter__(self):
+        return iter(list(self.instruments.values()))
+
+    def __len__(self):
+        return len(self.instruments)
+
+    def close(self):
+        """ Closes the connection pools of all instruments """
+        for instrument in self:
+            instrument.close()
@@ -0,0 +1,67 @@
+import logging
+import time
+
+from osa.config import X_LIMS_CACHE_TTL
+from osa.services.server_requests import get_x_lims
+
+logger = logging.getLogger(__name__)
+
+
+class LimitsCache:
+    """
+    Caches x limits returned by LIM requests.
+    Limits are requested again once they are older than ttl, after invalidate() is called,
+    or when a trace has a different number of points or x increment than the trace
+    the limits were last used with, which means the sweep settings have changed.
+    get() is meant to be called from one thread at a time, invalidate() from any thread.
+    """
+
+    def __init__(self, fetch_x_lims=get_x_lims, ttl: float = X_LIMS_CACHE_TTL, clock=time.monotonic):
+        """
+        :param fetch_x_lims: Function requesting x limits from the server
+        :param ttl: Seconds for which cached limits are used
+        :param clock: Function returning the current time in seconds
+        """
+        self.fetch_x_lims = fetch_x_lims
+        self.ttl = ttl
+        self.clock = clock
+
+        self.x_lims = None
+        self.fetched_at = None
+        self.sweep = None
+        self.generation = 0
+        self.fetched_generation = None
+
+    def get(self, trace_data=None) -> list[float]:
+        """
+        Gets x limits, requesting them from the server if the cached limits are stale.
+        :param trace_data: Trace the limits are used with, if any
+        :return: List of two values: [start, stop] - x limits in nm.
+        :raises:
+            OsaServerException - raised if limits are requested and the request fails
+        """
+        sweep = self.sweep if trace_data is None else (len(trace_data), trace_data.x_increment)
+
+        if self.is_stale(sweep):
+            generation = self.generation
+            self.x_lims = self.fetch_x_lims()
+            self.fetched_at = self.clock()
+            self.fetched_generation = generation
+
+        self.sweep = sweep
+        return self.x_lims
+
+    def is_stale(self, sweep) -> bool:
+        """ Checks if cached limits must be requested again for a trace with given sweep settings """
+        if self.x_lims is None or self.fetched_generation != self.generation:
+            return True
+        if self.clock() - self.fetched_at >= self.ttl:
+            return True
+        if sweep != self.sweep and self.sweep is not None:
+            logger.info("Sweep settings changed, refreshing x limits.")
+            return True
+        return False
+
+    def invalidate(self):
+        """ Forces limits to be requested again on next get() """
+        self.generation += 1
@@ -0,0 +1,120 @@
+import logging
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from osa.config import API_URL, CONNECTION_POOL_SIZE, COMMAND_TIMEOUTS, DEFAULT_COMMAND_TIMEOUT
+
+logger = logging.getLogger(__name__)
+
+
+class OsaSession:
+    """
+    HTTP session for sending console commands to an OSA server.
+    Keeps a pool of keep-alive connections which is reused across commands,
+    and reconnects automatically if the server drops a pooled connection.
+    """
+
+    def __init__(self, api_url: str = API_URL,
+                 pool_size: int = CONNECTION_POOL_SIZE,
+                 timeouts: dict[str, float] = None,
+                 default_timeout: float = DEFAULT_COMMAND_TIMEOUT,
+                 reconnect_attempts: int = 1):
+        """
+        :param api_url: Base url of the server, command names are appended to it
+        :param pool_size: Maximum number of pooled connections to the server
+        :param timeouts: Timeout in seconds for each command, overrides COMMAND_TIMEOUTS
+        :param default_timeout: Timeout in seconds for commands without a configured timeout
+        :param reconnect_attempts: Number of times to reconnect and resend a command
+            after the connection to the server fails
+        """
+        self.api_url = api_url
+        self.pool_size = pool_size
+        self.timeouts = dict(COMMAND_TIMEOUTS)
+        if timeouts:
+            self.timeouts.update(timeouts)
+        self.default_timeout = default_timeout
+        self.reconnect_attempts = reconnect_attempts
+
+        self.lock = threading.Lock()
+        self.session = self.create_session()
+
+    def create_session(self) -> requests.Session:
+        """ Creates requests session with a connection pool sized to pool_size """
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    def timeout_for(self, command: str) -> float:
+        """ Gets timeout in seconds for a command """
+        return self.timeouts.get(command, self.default_timeout)
+
+    def get(self, command: str, timeout: float = None) -> requests.Response:
+        """
+        Sends command to OSA server.
+        :param command: Console command, e.g. 'TRACE'
+        :param timeout: Timeout in seconds, defaults to the timeout configured for the command
+        :return: Server response
+        :raises:
+            requests.exceptions.Timeout - raised if the request times out
+            requests.exceptions.RequestException - raised if the request fails
+                after all reconnect attempts
+        """
+        if timeout is None:
+            timeout = self.timeout_for(command)
+
+        for i in range(0, self.reconnect_attempts + 1):
+            session = self.session
+            try:
+                return session.get(self.api_url + command, timeout=timeout)
+            except requests.exceptions.ConnectionError as e:
+                if isinstance(e, requests.exceptions.Timeout) or i == self.reconnect_attempts:
+                    raise
+                logger.warning("Connection to OSA server failed, reconnecting: %s", e)
+                self.reconnect(session)
+
+    def reconnect(self, failed_session: requests.Session = None):
+        """
+        Drops pooled connections and starts a new session.
+        :param failed_session: Session that failed. If another thread has already
+            replaced it, the current session is kept.
+        """
+        with self.lock:
+            if failed_session is not None and failed_session is not self.session:
+                return
+            old_session = self.session
+            self.session = self.create_session()
+        old_session.close()
+
+    def close(self):
+        """ Closes all pooled connections """
+        self.session.close()
+
+
+__default_session__ = None
+__default_session_lock__ = threading.Lock()
+
+
+def get_session() -> OsaSession:
+    """ Gets the shared session used for OSA server requests, creating it on first use """
+    global __default_session__
+    with __default_session_lock__:
+        if __default_session__ is None:
+            __default_session__ = OsaSession()
+        return __default_session__
+
+
+def set_session(session: OsaSession) -> OsaSession:
+    """
+    Replaces the shared session used for OSA server requests.
+    :param session: New shared session, or None to create a default session on next use
+    :return: Previous shared session
+    """
+    global __default_session__
+    with __default_session_lock__:
+        previous = __default_session__
+        __default_session__ = session
+        return previous
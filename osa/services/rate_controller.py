@@ -0,0 +1,85 @@
+import collections
+import math
+import time
+
+from osa.config import ACQUISITION_RATE
+
+
+class RateController:
+    """
+    Paces continuous acquisition.
+    A frame (request, parse and render of one trace) only starts after the previous frame
+    finished, so requests never overlap. The delay before the next frame is shortened by the
+    time the last frame took, so frames start at the target rate whenever they are fast enough.
+    Frames that could not start on time are counted as skipped.
+    """
+
+    def __init__(self, target_rate: float = ACQUISITION_RATE, clock=time.monotonic,
+                 window: int = 20):
+        """
+        :param target_rate: Target rate in Hz, 0 to acquire as fast as possible
+        :param clock: Function returning the current time in seconds
+        :param window: Number of recent frames the achieved rate is measured over
+        """
+        self.target_rate = target_rate
+        self.clock = clock
+        self.frame_ends = collections.deque(maxlen=window + 1)
+
+        self.frame_start = None
+        self.frame_time = None
+        self.frames = 0
+        self.skipped_frames = 0
+        self.failed_frames = 0
+
+    @property
+    def interval(self) -> float:
+        """ Target seconds between frame starts, 0 if acquiring as fast as possible """
+        return 1 / self.target_rate if self.target_rate else 0
+
+    def set_target_rate(self, target_rate: float):
+        """ :param target_rate: Target rate in Hz, 0 to acquire as fast as possible """
+        self.target_rate = target_rate
+
+    def reset(self):
+        """ Clears frame statistics, e.g. when acquisition restarts """
+        self.frame_ends.clear()
+        self.frame_start = None
+        self.frame_time = None
+        self.frames = 0
+        self.skipped_frames = 0
+        self.failed_frames = 0
+
+    def frame_started(self):
+        """ Records start of a frame """
+        self.frame_start = self.clock()
+
+    def frame_finished(self, success: bool = True) -> float:
+        """
+        Records end of the current frame.
+        :param success: False if no trace was acquired in the frame
+        :return: Seconds to wait before starting the next frame
+        """
+        now = self.clock()
+        if self.frame_start is None:
+            return self.interval
+
+        self.frame_time = now - self.frame_start
+        self.frame_start = None
+        self.frames += 1
+        if not success:
+            self.failed_frames += 1
+        else:
+            self.frame_ends.append(now)
+
+        interval = self.interval
+        if interval and self.frame_time > interval:
+            self.skipped_frames += math.ceil(self.frame_time / interval) - 1
+        return max(interval - self.frame_time, 0)
+
+    @property
+    def achieved_rate(self) -> float:
+        """ Rate in Hz of successful frames over the recent window, 0 until two frames finished """
+        if len(self.frame_ends) < 2:
+            return 0
+        elapsed = self.frame_ends[-1] - self.frame_ends[0]
+        return (len(self.frame_ends) - 1) / elapsed if elapsed > 0 else 0
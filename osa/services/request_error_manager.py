@@ -1,25 +1,203 @@
+import logging
+import random
+import threading
+import time
+
+from osa.config import RETRY_MAX_ATTEMPTS, RETRY_BASE_DELAY, RETRY_MAX_DELAY, RETRY_JITTER, \
+    CIRCUIT_BREAKER_FAILURE_THRESHOLD, CIRCUIT_BREAKER_RESET_TIMEOUT
+from osa.exceptions.circuit_open import CircuitOpen
 from osa.exceptions.invalid_response import InvalidResponse
 from osa.exceptions.osa_server_exception import OsaServerException
+from osa.utils.metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+
+
+class RetryPolicy:
+    """
+    Describes how requests are retried after errors.
+    Retries are delayed with exponential backoff: the delay before retry n is
+    min(max_delay, base_delay * multiplier ** (n - 1)), shortened by a random
+    fraction of up to jitter of itself so that clients do not retry in lockstep.
+    """
+
+    def __init__(self, max_attempts: int = RETRY_MAX_ATTEMPTS,
+                 base_delay: float = RETRY_BASE_DELAY,
+                 max_delay: float = RETRY_MAX_DELAY,
+                 multiplier: float = 2,
+                 jitter: float = RETRY_JITTER,
+                 deadline: float = None,
+                 retryable: tuple = (OsaServerException,),
+                 clock=time.monotonic, sleep=time.sleep, random=random.random):
+        """
+        :param max_attempts: Maximum number of attempts
+        :param base_delay: Delay in seconds before the first retry, before jitter
+        :param max_delay: Maximum delay in seconds between attempts, before jitter
+        :param multiplier: Factor by which the delay grows after each retry
+        :param jitter: Largest fraction of the delay removed at random, between 0 and 1
+        :param deadline: Seconds after the first attempt after which no retry is started,
+            or None for no deadline
+        :param retryable: Exception classes after which a request is retried
+        :param clock: Function returning the current time in seconds
+        :param sleep: Function waiting for a number of seconds
+        :param random: Function returning a random number in [0, 1)
+        """
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.multiplier = multiplier
+        self.jitter = jitter
+        self.deadline = deadline
+        self.retryable = retryable
+        self.clock = clock
+        self.sleep = sleep
+        self.random = random
+
+    def delay(self, retry: int) -> float:
+        """
+        Gets delay before a retry.
+        :param retry: Number of the retry, starting at 1
+        :return: Delay in seconds
+        """
+        delay = min(self.max_delay, self.base_delay * self.multiplier ** (retry - 1))
+        return delay * (1 - self.jitter * self.random())
+
+
+class CircuitBreaker:
+    """
+    Stops sending requests to a server that keeps failing.
+    After failure_threshold consecutive failures the circuit opens and requests fail
+    immediately with CircuitOpen. Once reset_timeout has passed, a single probe request
+    is let through: the circuit closes again if it succeeds, and reopens if it fails.
+    One breaker is meant to be shared by all requests to the same server.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self, failure_threshold: int = CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+                 reset_timeout: float = CIRCUIT_BREAKER_RESET_TIMEOUT,
+                 clock=time.monotonic):
+        """
+        :param failure_threshold: Consecutive failures after which the circuit opens
+        :param reset_timeout: Seconds after opening before a probe request is let through
+        :param clock: Function returning the current time in seconds
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+
+        self.state = CircuitBreaker.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.lock = threading.Lock()
+
+    def allow_request(self) -> bool:
+        """
+        Checks if a request may be sent.
+        Moves an open circuit to half-open, allowing one probe, once reset_timeout has passed.
+        """
+        with self.lock:
+            if self.state == CircuitBreaker.CLOSED:
+                return True
+            if self.state == CircuitBreaker.OPEN and self.clock() - self.opened_at >= self.reset_timeout:
+                logger.info("Sending probe request to OSA server.")
+                self.state = CircuitBreaker.HALF_OPEN
+                return True
+            return False
+
+    def record_success(self):
+        with self.lock:
+            if self.state != CircuitBreaker.CLOSED:
+                logger.info("OSA server is responding again.")
+            self.state = CircuitBreaker.CLOSED
+            self.failures = 0
 
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.state == CircuitBreaker.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != CircuitBreaker.OPEN:
+                    logger.warning("Pausing requests to OSA server for %s seconds after %d consecutive failures.",
+                                   self.reset_timeout, self.failures)
+                    get_metrics().increment('circuit_opened')
+                self.state = CircuitBreaker.OPEN
+                self.opened_at = self.clock()
 
-def request_until_success(fn, max_attempts: int):
+    def release_probe(self):
+        """
+        Reopens a half-open circuit whose probe ended without telling if the server responds, e.g. it was
+        cancelled. opened_at is kept, so the next request is let through as a new probe.
+        """
+        with self.lock:
+            if self.state == CircuitBreaker.HALF_OPEN:
+                self.state = CircuitBreaker.OPEN
+
+    def call(self, fn, failures: tuple = (OsaServerException,)):
+        """
+        Calls fn if the circuit allows it, recording the outcome.
+        :param fn: Request function to call
+        :param failures: Exception classes counted as failures
+        :return: Response from fn
+        :raises:
+            CircuitOpen - raised if the circuit does not allow requests
+        """
+        if not self.allow_request():
+            raise CircuitOpen("Requests to OSA server are paused after repeated failures.")
+        try:
+            response = fn()
+        except failures:
+            self.record_failure()
+            raise
+        except BaseException:
+            # Anything else, e.g. cancellation, must not leave the circuit half-open with no probe in flight
+            self.release_probe()
+            raise
+        self.record_success()
+        return response
+
+
+def request_until_success(fn, max_attempts: int = None, policy: RetryPolicy = None,
+                          breaker: CircuitBreaker = None):
     """
     Makes requests by calling input function.
     On error, retries until valid response is received.
     :param fn: Request function to call
-    :param max_attempts: Maximum number of times to attempt calling fn
+    :param max_attempts: Maximum number of times to attempt calling fn, overrides policy
+    :param policy: Retry policy, defaults to RetryPolicy()
+    :param breaker: Circuit breaker shared with other requests to the same server, if any.
+        No more attempts are made once it is open.
     :return: Valid response from fn
     :raises:
         InvalidResponse - raised if no valid response is received from fn
-        after maxAttempts
+        after maxAttempts or before the policy deadline
+        CircuitOpen - raised if the breaker does not allow requests
     """
+    policy = policy or RetryPolicy()
+    if max_attempts is None:
+        max_attempts = policy.max_attempts
+    start = policy.clock()
 
     for i in range(0, max_attempts):
         try:
-            return fn()
-        except OsaServerException as e:
-            print(str(e))
-            print(f"Attempt {i + 1} to call {fn} failed.")
+            if breaker is None:
+                return fn()
+            return breaker.call(fn, policy.retryable)
+        except CircuitOpen:
+            raise
+        except policy.retryable as e:
+            logger.warning("Attempt %d to call %s failed: %s", i + 1, fn, e)
+            get_metrics().increment('request_errors')
+
+        if i + 1 == max_attempts:
+            break
+        delay = policy.delay(i + 1)
+        if policy.deadline is not None and policy.clock() + delay - start > policy.deadline:
+            raise InvalidResponse(f"Failed to get valid response from {fn} within "
+                                  f"{policy.deadline} seconds.")
+        get_metrics().increment('retries')
+        policy.sleep(delay)
 
     raise InvalidResponse(f"Failed to get valid response from {fn} after "
                           f"{max_attempts} attempts.")
@@ -1,81 +1,182 @@
-import math
+import logging
 
+import numpy as np
 import requests
 
-from osa.config import API_URL
 from osa.exceptions.invalid_response import InvalidResponse
 from osa.exceptions.response_timeout import ResponseTimeout
+from osa.services.console_parser import parse_reply
+from osa.services.osa_session import OsaSession, get_session
+from osa.services.trace_decoder import decode_trace
+from osa.utils.metrics import get_metrics
 from osa.utils.unit_conversions import m_to_nm
 
+logger = logging.getLogger(__name__)
+
 
 class TraceData:
     """
     Represents data returned from get_trace()
+    y-values are held in a contiguous numpy array. x-values (in x_units) are taken
+    from the server when it provides them, otherwise they are computed on first use
+    from x_start and x_increment and reused until x_start changes.
     """
-    def __init__(self, data: list[float], time: str, instrument: str,
+    __slots__ = ('data', 'time', 'instrument', 'x_label', 'y_label', 'x_units',
+                 'x_increment', 'x_data', 'resolution_bandwidth_nm', 'total_power_dbm',
+                 '_x_start', '_x')
+
+    def __init__(self, data, time: str, instrument: str,
                  x_label: str, y_label: str,
-                 x_units: str, x_increment: float):
-        self.data = data
+                 x_units: str, x_increment: float,
+                 x_start: float = None, x_data=None, dtype=np.float64,
+                 resolution_bandwidth_nm: float = None, total_power_dbm: float = None):
+        """
+        :param data: y-values, converted to a contiguous array of dtype without copying
+            when possible
+        :param x_start: First x-value, if known
+        :param x_data: x-values given by the server, if any
+        :param resolution_bandwidth_nm: Resolution bandwidth of the sweep, if known
+        :param total_power_dbm: Total power of the trace, if known
+        :param dtype: Array type for y-values, float64 or float32
+        """
+        self.data = np.ascontiguousarray(data, dtype=dtype)
         self.time = time
         self.instrument = instrument
         self.x_label = x_label
         self.y_label = y_label
         self.x_units = x_units
         self.x_increment = x_increment
-
-
-def get_trace() -> TraceData:
+        self.x_data = None if x_data is None else np.ascontiguousarray(x_data, dtype=np.float64)
+        self.resolution_bandwidth_nm = resolution_bandwidth_nm
+        self.total_power_dbm = total_power_dbm
+        self._x_start = x_start
+        self._x = None
+
+    def __len__(self):
+        return len(self.data)
+
+    @property
+    def x_start(self) -> float:
+        """ First x-value. Set from the x limits when the server does not provide x-values. """
+        if self._x_start is None and self.x_data is not None and len(self.x_data):
+            return float(self.x_data[0])
+        return self._x_start
+
+    @x_start.setter
+    def x_start(self, x_start: float):
+        self._x_start = x_start
+        self._x = None
+
+    @property
+    def x(self) -> np.ndarray:
+        """ x-value for each y-value """
+        if self.x_data is not None:
+            return self.x_data
+        if self._x is None:
+            x_start = self._x_start or 0
+            self._x = x_start + self.x_increment * np.arange(len(self.data), dtype=np.float64)
+        return self._x
+
+    @property
+    def sweep(self) -> tuple:
+        """ Key identifying the x-values, equal for traces of the same sweep """
+        if self.x_data is not None and len(self.x_data):
+            return len(self.data), float(self.x_data[0]), float(self.x_data[-1])
+        return len(self.data), self._x_start, self.x_increment
+
+    def with_data(self, data: np.ndarray):
+        """
+        Gets a trace with the same metadata and x-values but other y-values, e.g. processed ones
+        :param data: y-values of the same length, used without copying
+        :return: TraceData
+        """
+        trace_data = TraceData(data, self.time, self.instrument, self.x_label, self.y_label,
+                               self.x_units, self.x_increment, x_start=self._x_start,
+                               x_data=self.x_data, dtype=data.dtype,
+                               resolution_bandwidth_nm=self.resolution_bandwidth_nm,
+                               total_power_dbm=self.total_power_dbm)
+        trace_data._x = self._x
+        return trace_data
+
+
+def get_trace(session: OsaSession = None, dtype=np.float64) -> TraceData:
     """
     Requests trace data from osa server.
     Converts x_increment to nanometers and returns x_units as nm
+    :param session: Session to send the request with, defaults to the shared session
+    :param dtype: Array type for the trace y-values
     :return: TraceData object with results
     :raises:
-        ResponseTimeout - raised if trace request times out (timeout at 1 second)
+        ResponseTimeout - raised if trace request times out (timeout configured in COMMAND_TIMEOUTS)
         InvalidResponse - raised if trace response is invalid
     """
 
-    print("Requesting trace.")
+    logger.debug("Requesting trace.")
+    session = session or get_session()
+    metrics = get_metrics()
 
     try:
-        trace_res = requests.get(API_URL + 'TRACE', timeout=1).json()
+        with metrics.timer('fetch'):
+            body = session.get('TRACE').content
     except requests.exceptions.Timeout:
         raise ResponseTimeout("TRACE request timed out.")
     except:
         raise InvalidResponse("Invalid response to TRACE request.")
 
-    x_increment_nm = m_to_nm(trace_res['xincrement'])
-    time_formatted = __convert_to_iso_8601__(trace_res['timestamp'])
+    with metrics.timer('parse'):
+        return __create_trace_data__(decode_trace(body, dtype=dtype), dtype)
 
+
+def __create_trace_data__(trace_res: dict, dtype) -> TraceData:
+    """
+    Creates TraceData from a decoded TRACE response
+    :raises:
+        InvalidResponse - raised if the response is missing fields or has invalid ones
+    """
     try:
+        x_increment_nm = m_to_nm(trace_res['xincrement'])
+        time_formatted = __convert_to_iso_8601__(trace_res['timestamp'])
+        x_data = trace_res.get('xdata')
         return TraceData(data=trace_res['ydata'],
                          time=time_formatted,
                          instrument=trace_res['instrument_object'],
                          x_label=trace_res['xlabel'],
                          y_label='dBm',
                          x_increment=x_increment_nm,
-                         x_units='nm')
-    except KeyError:
-        raise InvalidResponse("Missing data in response to TRACE request.")
+                         x_units='nm',
+                         x_data=None if x_data is None else m_to_nm(x_data, out=x_data),
+                         dtype=dtype,
+                         resolution_bandwidth_nm=trace_res.get('resolution_bandwidth_nm'),
+                         total_power_dbm=trace_res.get('total_trace_power_dbm'))
+    except (KeyError, TypeError, ValueError, IndexError, AttributeError):
+        raise InvalidResponse("Invalid data in response to TRACE request.")
 
 
-def get_x_lims() -> list[float]:
+def get_x_lims(session: OsaSession = None) -> list[float]:
     """
     Requests x limits from OSA server.
+    :param session: Session to send the request with, defaults to the shared session
     :return: List of two integers: [start, stop] - x limits in nm.
     :raises:
-        ResponseTimeout - raised if lim request times out (timeout at 2 seconds)
+        ResponseTimeout - raised if lim request times out (timeout configured in COMMAND_TIMEOUTS)
         InvalidResponse - raised if lim response is invalid
+        ConsoleError - raised if server replies to lim request with an error
     """
+    session = session or get_session()
 
     try:
-        res = requests.get(API_URL + 'LIM', timeout=2)
+        with get_metrics().timer('lim'):
+            res = session.get('LIM')
     except requests.exceptions.Timeout:
         raise ResponseTimeout("LIM request timed out.")
+    except requests.exceptions.RequestException:
+        raise InvalidResponse("LIM request failed.")
 
     try:
-        return __parse_lim__(res.text)
-    except:
-        raise (InvalidResponse("Invalid response to LIM request."))
+        text = res.text
+    except AttributeError:
+        raise InvalidResponse("Invalid response to LIM request.")
+    return parse_reply(text, 'LIM')
 
 
 def __convert_to_iso_8601__(date_and_time: str) -> str:
@@ -91,13 +192,3 @@ def __convert_to_iso_8601__(date_and_time: str) -> str:
     date = '20' + date.replace('.', '-')
     time = time + 'Z'
     return date + 'T' + time
-
-
-def __parse_lim__(s: str) -> list[float]:
-    """ Gets list of limits from console output to LIM request """
-    return eval(__remove_console_prefix__(s))
-
-
-def __remove_console_prefix__(s: str):
-    """ Removes prefix from OSA console outputs """
-    return s.replace('+READY>', '', 1)
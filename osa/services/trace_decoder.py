@@ -0,0 +1,159 @@
+import json
+
+import numpy as np
+
+from osa.exceptions.invalid_response import InvalidResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Keys which must be present in a response to TRACE request
+REQUIRED_TRACE_KEYS = ('timestamp', 'instrument_object', 'ydata', 'xincrement', 'xlabel')
+
+# Keys holding numeric arrays, decoded straight into numpy arrays
+ARRAY_TRACE_KEYS = ('ydata', 'xdata')
+
+
+def decode_trace(body: bytes, dtype=np.float64, use_fast_backend: bool = True) -> dict:
+    """
+    Decodes body of response to TRACE request.
+    Numeric arrays are cut out of the body and parsed directly into numpy arrays,
+    so the trace values are never held in Python lists when the pure-Python backend is used.
+    The remaining fields are parsed as regular JSON. If an array key also appears elsewhere in the body,
+    e.g. in a nested object, or the array cut out turns out not to be a top-level value, the whole body
+    is parsed as JSON instead.
+    :param body: Raw response body
+    :param dtype: Array type for 'ydata'. 'xdata' is always float64.
+    :param use_fast_backend: If True and orjson is installed, uses orjson for parsing.
+    :return: Dict of response fields, with 'ydata' (and 'xdata' if present) as numpy arrays
+    :raises:
+        InvalidResponse - raised if body is not valid JSON or a required key is missing
+    """
+    if isinstance(body, str):
+        body = body.encode()
+    loads = orjson.loads if use_fast_backend and orjson is not None else json.loads
+
+    array_values = __find_array_values__(body)
+    if array_values is None:
+        trace = __decode_whole__(body, dtype, loads)
+    else:
+        arrays = {}
+        metadata_parts = []
+        position = 0
+        for key, start, end in array_values:
+            metadata_parts.append(body[position:start])
+            metadata_parts.append(b'null')
+            position = end
+            array_dtype = dtype if key == 'ydata' else np.float64
+            arrays[key] = __parse_array__(body[start + 1:end - 1], array_dtype, loads)
+        metadata_parts.append(body[position:])
+
+        trace = __loads_object__(b''.join(metadata_parts), loads)
+        # Each array cut out leaves a null in its place, which is only a top-level value if it was one
+        if all(key in trace and trace[key] is None for key in arrays):
+            trace.update(arrays)
+        else:
+            trace = __decode_whole__(body, dtype, loads)
+
+    missing_keys = [key for key in REQUIRED_TRACE_KEYS if trace.get(key) is None]
+    if missing_keys:
+        raise InvalidResponse(f"Missing data in response to TRACE request: {', '.join(missing_keys)}.")
+    return trace
+
+
+def __loads_object__(body: bytes, loads) -> dict:
+    """
+    Parses a JSON object
+    :raises:
+        InvalidResponse - raised if body is not valid JSON or not an object
+    """
+    try:
+        trace = loads(body)
+    except ValueError:
+        raise InvalidResponse("Invalid JSON in response to TRACE request.")
+    if not isinstance(trace, dict):
+        raise InvalidResponse("Invalid response to TRACE request.")
+    return trace
+
+
+def __decode_whole__(body: bytes, dtype, loads) -> dict:
+    """ Parses the whole body as JSON, then converts top-level arrays in ARRAY_TRACE_KEYS to numpy arrays """
+    trace = __loads_object__(body, loads)
+    for key in ARRAY_TRACE_KEYS:
+        if trace.get(key) is None:
+            continue
+        try:
+            trace[key] = np.array(trace[key], dtype=dtype if key == 'ydata' else np.float64)
+        except (ValueError, TypeError):
+            raise InvalidResponse("Invalid numeric data in response to TRACE request.")
+        if trace[key].ndim != 1:
+            raise InvalidResponse("Invalid numeric data in response to TRACE request.")
+    return trace
+
+
+def __find_array_values__(body: bytes):
+    """
+    Finds numeric array values in a TRACE response body.
+    :return: Generator of (key, start, end) for each array in ARRAY_TRACE_KEYS,
+        where body[start:end] is the array including its brackets, ordered by start,
+        or None if a key appears more than once, so which occurrence is the top-level one is unknown.
+    """
+    found = []
+    for key in ARRAY_TRACE_KEYS:
+        quoted_key = b'"' + key.encode() + b'"'
+        if body.count(quoted_key) > 1:
+            return None
+        search_from = 0
+        while True:
+            key_position = body.find(quoted_key, search_from)
+            if key_position < 0:
+                break
+            search_from = key_position + len(quoted_key)
+            # Skip escaped occurrences of the key inside string values
+            if key_position > 0 and body[key_position - 1:key_position] == b'\\':
+                continue
+            colon = __skip_whitespace__(body, search_from)
+            if body[colon:colon + 1] != b':':
+                continue
+            start = __skip_whitespace__(body, colon + 1)
+            if body[start:start + 1] != b'[':
+                break
+            end = body.find(b']', start)
+            if end < 0:
+                raise InvalidResponse("Invalid JSON in response to TRACE request.")
+            found.append((key, start, end + 1))
+            break
+
+    return iter(sorted(found, key=lambda value: value[1]))
+
+
+def __skip_whitespace__(body: bytes, position: int) -> int:
+    """ Gets index of first non-whitespace byte at or after position """
+    while body[position:position + 1] in (b' ', b'\t', b'\n', b'\r'):
+        position += 1
+    return position
+
+
+def __parse_array__(values: bytes, dtype, loads) -> np.ndarray:
+    """
+    Parses comma separated numbers into a numpy array
+    :param values: Array contents without brackets
+    :param loads: JSON loads function of the active backend
+    :raises:
+        InvalidResponse - raised if values are not all numbers
+    """
+    if not values.strip():
+        return np.empty(0, dtype=dtype)
+
+    try:
+        if loads is json.loads:
+            # Avoid creating a Python float per value
+            array = np.fromstring(values, dtype=dtype, sep=',')
+            if len(array) != values.count(b',') + 1:
+                raise ValueError
+            return array
+        return np.array(loads(b'[' + values + b']'), dtype=dtype)
+    except (ValueError, TypeError):
+        raise InvalidResponse("Invalid numeric data in response to TRACE request.")
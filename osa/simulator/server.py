@@ -0,0 +1,328 @@
+"""
+Local stand-in for the OSA server, for integration tests, benchmarks and load tests without network access.
+Answers TRACE with synthetic spectra and LIM with the sweep limits, over HTTP on the same paths as the
+real server, and injects latency and faults when configured or asked to.
+
+Run from the project root with: python -m osa.simulator.server --help
+Then point the GUI or the headless command at it, e.g.
+python -m osa.cli acquire --url http://127.0.0.1:8000/cmd/
+"""
+import argparse
+import collections
+import http.server
+import json
+import random
+import threading
+import time
+
+import numpy as np
+
+from osa.config import (SIMULATOR_CHANNEL_COUNT, SIMULATOR_CHANNEL_SPACING_NM, SIMULATOR_HOST, SIMULATOR_POINTS,
+                        SIMULATOR_PORT, SIMULATOR_TIMEOUT_SECONDS)
+from osa.services.console_parser import READY_PREFIX
+from osa.simulator.spectrum import SpectrumGenerator
+from osa.utils.unit_conversions import dbm_to_mw, mw_to_dbm, nm_to_m
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Path commands are sent to, as in API_URL
+COMMAND_PATH = '/cmd/'
+
+# Path faults are queued through while the simulator runs, e.g. /fault/TRACE/timeout
+FAULT_PATH = '/fault/'
+
+# Faults the simulator can inject into replies:
+#   timeout     - waits timeout_seconds before replying, longer than the client waits
+#   malformed   - cuts the reply off halfway, so it is neither valid JSON nor a valid console reply
+#   missing_key - leaves out what the client requires: 'ydata' of TRACE, the stop limit of LIM
+#   error       - replies with the console error prefix
+FAULTS = ('timeout', 'malformed', 'missing_key', 'error')
+
+# Commands the simulator answers
+COMMANDS = ('TRACE', 'LIM')
+
+
+class OsaSimulator:
+    """
+    Simulated OSA server, serving each request from its own thread.
+    Faults queued with queue_faults are injected first, in order, then faults are injected
+    at random with fault_rates. Requests and injected faults are counted per command.
+    """
+
+    def __init__(self, generator: SpectrumGenerator = None, host: str = SIMULATOR_HOST, port: int = SIMULATOR_PORT,
+                 latency: float = 0, latency_jitter: float = 0, fault_rates: dict = None,
+                 timeout_seconds: float = SIMULATOR_TIMEOUT_SECONDS, include_x_data: bool = False,
+                 instrument: str = 'SimulatedOSA', resolution_bandwidth_nm: float = 0.1,
+                 seed: int = None, log_requests: bool = False):
+        """
+        :param generator: Generator of the traces, defaults to SpectrumGenerator()
+        :param host: Address to listen on
+        :param port: Port to listen on, 0 for any free port
+        :param latency: Seconds waited before every reply
+        :param latency_jitter: Maximum random seconds added to latency
+        :param fault_rates: Probability of each fault in FAULTS, e.g. {'malformed': 0.1}
+        :param timeout_seconds: Seconds waited before replying to requests made to time out
+        :param include_x_data: If True, TRACE replies include the x-values as 'xdata'
+        :param instrument: Instrument name sent with traces
+        :param resolution_bandwidth_nm: Resolution bandwidth sent with traces
+        :param seed: Seed of random latencies and faults
+        :param log_requests: If True, each request is logged to stderr
+        :raises:
+            ValueError - raised if fault_rates has a fault not in FAULTS
+        """
+        self.generator = generator or SpectrumGenerator(seed=seed)
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.fault_rates = {}
+        for fault, rate in (fault_rates or {}).items():
+            self.set_fault_rate(fault, rate)
+        self.timeout_seconds = timeout_seconds
+        self.include_x_data = include_x_data
+        self.instrument = instrument
+        self.resolution_bandwidth_nm = resolution_bandwidth_nm
+        self.log_requests = log_requests
+        self.random = random.Random(seed)
+
+        self.lock = threading.Lock()
+        self.queued_faults = collections.defaultdict(collections.deque)
+        self.requests = collections.Counter()
+        self.injected_faults = collections.Counter()
+        self.x_data_m = None
+        self.server = None
+        self.thread = None
+
+    @property
+    def url(self) -> str:
+        """ URL commands are appended to, as API_URL """
+        return f'http://{self.host}:{self.port}{COMMAND_PATH}'
+
+    def set_fault_rate(self, fault: str, rate: float):
+        """
+        :param fault: Fault in FAULTS
+        :param rate: Probability of injecting the fault into a reply, 0 to stop injecting it
+        """
+        if fault not in FAULTS:
+            raise ValueError(f"Unknown fault {fault!r}, expected one of {', '.join(FAULTS)}.")
+        self.fault_rates[fault] = rate
+
+    def queue_faults(self, command: str, *faults: str):
+        """
+        Injects faults into the next replies to a command, one fault per reply.
+        'none' leaves a reply without a fault.
+        """
+        for fault in faults:
+            if fault not in FAULTS and fault != 'none':
+                raise ValueError(f"Unknown fault {fault!r}, expected one of {', '.join(FAULTS)}.")
+        with self.lock:
+            self.queued_faults[command].extend(faults)
+
+    def next_fault(self, command: str):
+        """ Gets the fault to inject into a reply to a command, None for no fault """
+        with self.lock:
+            self.requests[command] += 1
+            queued = self.queued_faults[command]
+            fault = queued.popleft() if queued else None
+            if fault is None:
+                for candidate, rate in self.fault_rates.items():
+                    if rate and self.random.random() < rate:
+                        fault = candidate
+                        break
+            if fault == 'none':
+                fault = None
+            if fault is not None:
+                self.injected_faults[command, fault] += 1
+        return fault
+
+    def reply(self, command: str) -> tuple:
+        """
+        Creates the reply to a command
+        :return: (HTTP status, body, seconds to wait before sending it)
+        """
+        if command not in COMMANDS:
+            return 200, f'-ERROR>Unknown command {command}'.encode(), self.delay()
+        fault = self.next_fault(command)
+        delay = self.delay() + (self.timeout_seconds if fault == 'timeout' else 0)
+        if fault == 'error':
+            return 200, f'-ERROR>Simulated failure of {command}'.encode(), delay
+
+        body = self.trace_body(fault) if command == 'TRACE' else self.lim_body(fault)
+        if fault == 'malformed':
+            body = body[:len(body) // 2]
+        return 200, body, delay
+
+    def delay(self) -> float:
+        with self.lock:
+            jitter = self.random.uniform(0, self.latency_jitter) if self.latency_jitter else 0
+        return self.latency + jitter
+
+    def trace_body(self, fault: str = None) -> bytes:
+        """ Creates a reply to TRACE in the format of the real server, with x-values in m """
+        generator = self.generator
+        y = generator.generate()
+        total_power_mw = np.sum(dbm_to_mw(y)) * generator.x_increment_nm / self.resolution_bandwidth_nm
+        fields = {'version': 3,
+                  'timestamp': time.strftime('%y.%m.%d %H:%M:%S'),
+                  'instrument_model': f'Simulator,{self.instrument}',
+                  'instrument_object': self.instrument,
+                  'ydata': y,
+                  'yunits': 'DBM',
+                  'ylabel': 'Signal',
+                  'xincrement': float(nm_to_m(generator.x_increment_nm)),
+                  'xoffset': 0,
+                  'xunits': 'M',
+                  'xlabel': 'Wavelength',
+                  'resolution_bandwidth_nm': self.resolution_bandwidth_nm,
+                  'total_trace_power_dbm': round(float(mw_to_dbm(total_power_mw)), 2),
+                  'description': ''}
+        if self.include_x_data:
+            if self.x_data_m is None:
+                self.x_data_m = nm_to_m(generator.x_nm)
+            fields['xdata'] = self.x_data_m
+        if fault == 'missing_key':
+            del fields['ydata']
+        return __encode_json__(fields)
+
+    def lim_body(self, fault: str = None) -> bytes:
+        """ Creates a reply to LIM: the sweep limits in nm """
+        limits = [self.generator.start_nm, self.generator.stop_nm]
+        if fault == 'missing_key':
+            limits = limits[:1]
+        return f'{READY_PREFIX}[{", ".join(str(float(limit)) for limit in limits)}]'.encode()
+
+    def start(self):
+        """
+        Starts serving requests from a background thread
+        :return: self, with port set to the port listened on
+        """
+        self.server = http.server.ThreadingHTTPServer((self.host, self.port), SimulatorRequestHandler)
+        self.server.simulator = self
+        self.server.daemon_threads = True
+        # Requests made to time out must not hold up stop()
+        self.server.block_on_close = False
+        self.port = self.server.server_address[1]
+        # Short poll interval, so that stop() returns quickly
+        self.thread = threading.Thread(target=self.server.serve_forever, kwargs={'poll_interval': 0.05},
+                                       name='osa-simulator', daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.thread.join()
+            self.server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+class SimulatorRequestHandler(http.server.BaseHTTPRequestHandler):
+    """ Serves GET requests for commands and queued faults. Keeps connections alive like the real server. """
+
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are sent separately, which would otherwise wait for delayed acknowledgements
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        simulator = self.server.simulator
+        path = self.path.split('?', 1)[0]
+        if path.startswith(COMMAND_PATH):
+            status, body, delay = simulator.reply(path[len(COMMAND_PATH):])
+        elif path.startswith(FAULT_PATH):
+            status, body, delay = self.queue_fault(simulator, path[len(FAULT_PATH):])
+        else:
+            status, body, delay = 404, b'Not found', 0
+
+        if delay:
+            time.sleep(delay)
+        try:
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json' if body.startswith(b'{') else 'text/plain')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            # Client gave up waiting, e.g. after a timeout fault
+            self.close_connection = True
+
+    @staticmethod
+    def queue_fault(simulator: OsaSimulator, path: str) -> tuple:
+        """ Queues a fault given as <command>/<fault> """
+        command, _, fault = path.partition('/')
+        try:
+            simulator.queue_faults(command, fault)
+        except ValueError as e:
+            return 400, str(e).encode(), 0
+        return 200, f'Queued {fault} for {command}'.encode(), 0
+
+    def log_message(self, format, *args):
+        if self.server.simulator.log_requests:
+            super().log_message(format, *args)
+
+
+def __encode_json__(fields: dict) -> bytes:
+    """ Encodes fields as JSON, writing numpy arrays as lists of numbers """
+    if orjson is not None:
+        return orjson.dumps(fields, option=orjson.OPT_SERIALIZE_NUMPY)
+    arrays = {key: value for key, value in fields.items() if isinstance(value, np.ndarray)}
+    body = json.dumps({key: value for key, value in fields.items() if key not in arrays})
+    array_fields = ''.join(f', "{key}": [{",".join(map(repr, values.tolist()))}]' for key, values in arrays.items())
+    return (body[:-1] + array_fields + '}').encode()
+
+
+def __fault_rate__(value: str) -> tuple:
+    """ Parses a --fault-rate argument, e.g. malformed=0.1 """
+    fault, _, rate = value.partition('=')
+    if fault not in FAULTS:
+        raise argparse.ArgumentTypeError(f"Unknown fault {fault!r}, expected one of {', '.join(FAULTS)}.")
+    try:
+        return fault, float(rate)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid rate {rate!r} of fault {fault}.")
+
+
+def main(argv: list = None):
+    parser = argparse.ArgumentParser(prog='python -m osa.simulator.server', description="Simulated OSA server.")
+    parser.add_argument('--host', default=SIMULATOR_HOST)
+    parser.add_argument('--port', type=int, default=SIMULATOR_PORT, help="Port to listen on, 0 for any free port")
+    parser.add_argument('--points', type=int, default=SIMULATOR_POINTS,
+                        help="Points per trace (default: %(default)s)")
+    parser.add_argument('--channels', type=int, default=SIMULATOR_CHANNEL_COUNT,
+                        help="Number of channels (default: %(default)s)")
+    parser.add_argument('--spacing', type=float, default=SIMULATOR_CHANNEL_SPACING_NM,
+                        help="Channel spacing in nm (default: %(default)s)")
+    parser.add_argument('--x-data', action='store_true', help="Send x-values with traces")
+    parser.add_argument('--latency', type=float, default=0, help="Seconds waited before every reply")
+    parser.add_argument('--jitter', type=float, default=0, help="Maximum random seconds added to the latency")
+    parser.add_argument('--fault-rate', type=__fault_rate__, action='append', default=[], metavar='FAULT=RATE',
+                        help=f"Probability of a fault in each reply, one of {', '.join(FAULTS)}. Repeatable.")
+    parser.add_argument('--seed', type=int, help="Seed of the synthetic noise, latencies and faults")
+    parser.add_argument('--log-requests', action='store_true', help="Log each request to stderr")
+    args = parser.parse_args(argv)
+
+    generator = SpectrumGenerator(points=args.points, channels=args.channels,
+                                  channel_spacing_nm=args.spacing, seed=args.seed)
+    simulator = OsaSimulator(generator, host=args.host, port=args.port, latency=args.latency,
+                             latency_jitter=args.jitter, fault_rates=dict(args.fault_rate),
+                             include_x_data=args.x_data, seed=args.seed, log_requests=args.log_requests)
+    simulator.start()
+    print(f"Simulating OSA server at {simulator.url}", flush=True)
+    try:
+        simulator.thread.join()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        simulator.stop()
+
+
+if __name__ == '__main__':
+    main()
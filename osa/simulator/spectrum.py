@@ -0,0 +1,97 @@
+import numpy as np
+
+from osa.config import (SIMULATOR_CHANNEL_COUNT, SIMULATOR_CHANNEL_SPACING_NM, SIMULATOR_POINTS,
+                        SIMULATOR_START_NM, SIMULATOR_STOP_NM)
+from osa.utils.unit_conversions import dbm_to_mw, mw_to_dbm
+
+# Channels are drawn out to this many standard deviations of their line shape
+CHANNEL_EXTENT_SIGMAS = 8
+
+
+class SpectrumGenerator:
+    """
+    Generates synthetic DWDM spectra: Gaussian channels over a tilted ASE noise floor, in dBm.
+    The noiseless spectrum is computed once. Each trace adds random ripple to it in mW,
+    so generating a trace takes a few vectorized passes over its points.
+    """
+
+    def __init__(self, points: int = SIMULATOR_POINTS,
+                 start_nm: float = SIMULATOR_START_NM, stop_nm: float = SIMULATOR_STOP_NM,
+                 channels=SIMULATOR_CHANNEL_COUNT, channel_spacing_nm: float = SIMULATOR_CHANNEL_SPACING_NM,
+                 channel_power_dbm: float = -10, channel_width_nm: float = 0.02,
+                 noise_floor_dbm: float = -60, tilt_db: float = 0, ripple: float = 0.05,
+                 seed: int = None):
+        """
+        :param points: Number of points in each trace
+        :param start_nm: First wavelength of the sweep
+        :param stop_nm: Last wavelength of the sweep
+        :param channels: Number of channels, spaced channel_spacing_nm apart and centred in the sweep,
+            or the centre wavelengths of the channels in nm
+        :param channel_spacing_nm: Spacing of the channels when only their number is given
+        :param channel_power_dbm: Peak power of the channels, a scalar or one value per channel
+        :param channel_width_nm: Standard deviation of the Gaussian line shape of the channels
+        :param noise_floor_dbm: Noise floor at the start of the sweep
+        :param tilt_db: Change of the noise floor from the start to the end of the sweep
+        :param ripple: Standard deviation of the random noise, relative to the power in mW
+        :param seed: Seed of the random noise, None for a different noise on every run
+        :raises:
+            ValueError - raised if points is below 2 or the sweep is empty
+        """
+        if points < 2 or stop_nm <= start_nm:
+            raise ValueError("A sweep needs at least 2 points and stop_nm above start_nm.")
+        self.points = points
+        self.start_nm = start_nm
+        self.stop_nm = stop_nm
+        self.ripple = ripple
+        self.rng = np.random.default_rng(seed)
+
+        if np.ndim(channels) == 0:
+            middle = (start_nm + stop_nm) / 2
+            self.centres_nm = middle + channel_spacing_nm * (np.arange(channels) - (channels - 1) / 2)
+        else:
+            self.centres_nm = np.asarray(channels, dtype=np.float64)
+        self.channel_power_dbm = np.broadcast_to(channel_power_dbm, self.centres_nm.shape)
+        self.channel_width_nm = channel_width_nm
+        self.noise_floor_dbm = noise_floor_dbm
+        self.tilt_db = tilt_db
+        self.power_mw = self.create_noiseless_spectrum()
+
+    @property
+    def x_increment_nm(self) -> float:
+        return (self.stop_nm - self.start_nm) / (self.points - 1)
+
+    @property
+    def x_nm(self) -> np.ndarray:
+        return self.start_nm + self.x_increment_nm * np.arange(self.points)
+
+    def create_noiseless_spectrum(self) -> np.ndarray:
+        """
+        Computes the noiseless spectrum in mW.
+        Each channel is only computed over the points within CHANNEL_EXTENT_SIGMAS of its centre,
+        so the cost does not grow with points times channels.
+        """
+        x = self.x_nm
+        power_mw = dbm_to_mw(self.noise_floor_dbm + self.tilt_db * np.linspace(0, 1, self.points))
+        extent = CHANNEL_EXTENT_SIGMAS * self.channel_width_nm
+        starts = np.searchsorted(x, self.centres_nm - extent)
+        stops = np.searchsorted(x, self.centres_nm + extent)
+        for centre, peak_mw, start, stop in zip(self.centres_nm, dbm_to_mw(self.channel_power_dbm), starts, stops):
+            offset = (x[start:stop] - centre) / self.channel_width_nm
+            power_mw[start:stop] += peak_mw * np.exp(-0.5 * offset * offset)
+        return power_mw
+
+    def generate(self, dtype=np.float64) -> np.ndarray:
+        """
+        Generates a trace
+        :param dtype: Array type of the trace
+        :return: Trace in dBm
+        """
+        if not self.ripple:
+            return mw_to_dbm(self.power_mw).astype(dtype, copy=False)
+        noise = self.rng.standard_normal(self.points, dtype=np.float64)
+        noise *= self.ripple
+        noise += 1
+        # Ripple is clipped so that powers stay positive
+        np.maximum(noise, 1e-3, out=noise)
+        noise *= self.power_mw
+        return mw_to_dbm(noise, out=noise).astype(dtype, copy=False)
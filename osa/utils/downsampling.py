@@ -0,0 +1,97 @@
+import numpy as np
+
+
+class MinMaxPyramid:
+    """
+    Multi-resolution min/max summary of a trace used to draw it at screen resolution.
+    Level k summarises blocks of factor**k samples by their minimum and maximum,
+    so downsampled curves keep every peak and notch of the full trace.
+    """
+
+    def __init__(self, y: np.ndarray, factor: int = 2):
+        """
+        Builds pyramid levels until a level has fewer than factor blocks.
+        :param y: Trace values
+        :param factor: Number of blocks of a level summarised by one block of the next level
+        """
+        self.y = y
+        self.factor = factor
+        # Each level is (block size, block minimums, block maximums)
+        self.levels = []
+
+        mins = maxs = y
+        block_size = 1
+        while len(mins) >= factor:
+            mins = __reduce_blocks__(mins, factor, np.minimum)
+            maxs = __reduce_blocks__(maxs, factor, np.maximum)
+            block_size *= factor
+            self.levels.append((block_size, mins, maxs))
+
+    def __len__(self):
+        return len(self.y)
+
+    def decimate(self, x: np.ndarray, start: int, stop: int, max_points: int) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Gets points to draw trace samples [start, stop) with at most about max_points points.
+        When the range has more samples than max_points, each block of the finest level that fits
+        is drawn as its minimum at the block's first x-value followed by its maximum at its last x-value.
+        :param x: x-value for each sample
+        :param start: Index of first sample in range
+        :param stop: Index after last sample in range
+        :param max_points: Maximum number of points to draw
+        :return: (x, y) arrays to draw. Views of the input arrays if no downsampling is needed.
+        """
+        start = max(start, 0)
+        stop = min(stop, len(self.y))
+        if stop - start <= max_points or not self.levels:
+            return x[start:stop], self.y[start:stop]
+
+        for block_size, mins, maxs in self.levels:
+            first_block = start // block_size
+            last_block = -(-stop // block_size)
+            if 2 * (last_block - first_block) <= max_points:
+                break
+
+        block_starts = np.arange(first_block, last_block) * block_size
+        block_ends = np.minimum(block_starts + block_size, len(self.y))
+        x_out = np.empty(2 * len(block_starts), dtype=x.dtype)
+        x_out[0::2] = x[block_starts]
+        x_out[1::2] = x[block_ends - 1]
+        y_out = np.empty(2 * len(block_starts), dtype=self.y.dtype)
+        y_out[0::2] = mins[first_block:last_block]
+        y_out[1::2] = maxs[first_block:last_block]
+        return x_out, y_out
+
+
+def visible_range(x: np.ndarray, x_min: float, x_max: float, margin: int = 0) -> tuple[int, int]:
+    """
+    Gets indices of samples with x-values between x_min and x_max.
+    :param x: Monotonic x-values, ascending or descending
+    :param margin: Number of extra samples to include on each side
+    :return: (start, stop) indices of visible samples
+    """
+    if len(x) == 0:
+        return 0, 0
+    if x[0] <= x[-1]:
+        start = np.searchsorted(x, x_min, 'left')
+        stop = np.searchsorted(x, x_max, 'right')
+    else:
+        reversed_x = x[::-1]
+        start = len(x) - np.searchsorted(reversed_x, x_max, 'right')
+        stop = len(x) - np.searchsorted(reversed_x, x_min, 'left')
+    return max(int(start) - margin, 0), min(int(stop) + margin, len(x))
+
+
+def __reduce_blocks__(values: np.ndarray, factor: int, reduce) -> np.ndarray:
+    """
+    Reduces each block of factor values to one value.
+    An incomplete last block is reduced over the values it has.
+    """
+    complete_length = len(values) - len(values) % factor
+    # Element-wise reduction of strided views is much faster than reducing along a short axis
+    reduced = values[0:complete_length:factor].copy()
+    for offset in range(1, factor):
+        reduce(reduced, values[offset:complete_length:factor], out=reduced)
+    if complete_length < len(values):
+        reduced = np.append(reduced, reduce.reduce(values[complete_length:]))
+    return reduced
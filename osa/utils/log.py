@@ -0,0 +1,45 @@
+import json
+import logging
+import sys
+
+from osa.config import LOG_LEVEL
+
+# Format of log records when not structured
+LOG_FORMAT = '%(asctime)s %(levelname)-7s %(name)s: %(message)s'
+
+# Attributes every log record has, which are not extra fields given with logger.info(..., extra={...})
+__record_attributes__ = frozenset(vars(logging.makeLogRecord({}))) | {'message', 'asctime'}
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formats log records as one JSON object per line, for log collectors.
+    Fields given with extra={...} are included next to time, level, logger and message.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {'time': self.formatTime(record), 'level': record.levelname,
+                 'logger': record.name, 'message': record.getMessage()}
+        for key, value in vars(record).items():
+            if key not in __record_attributes__:
+                entry[key] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def configure_logging(level=LOG_LEVEL, structured: bool = False, stream=None):
+    """
+    Sends log messages of the osa package to a stream
+    :param level: Lowest level shown, e.g. 'INFO' or logging.DEBUG
+    :param structured: True to write JSON lines, False for plain text
+    :param stream: Stream to write to, defaults to stderr
+    """
+    handler = logging.StreamHandler(stream or sys.stderr)
+    handler.setFormatter(JsonFormatter() if structured else logging.Formatter(LOG_FORMAT))
+    logger = logging.getLogger('osa')
+    for existing_handler in list(logger.handlers):
+        logger.removeHandler(existing_handler)
+    logger.addHandler(handler)
+    logger.setLevel(level.upper() if isinstance(level, str) else level)
+    logger.propagate = False
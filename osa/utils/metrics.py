@@ -0,0 +1,198 @@
+import collections
+import json
+import math
+import os
+import re
+import threading
+import time
+
+import numpy as np
+
+from osa.config import METRICS_ENABLED, METRICS_WINDOW
+
+# Percentiles of each timer reported by snapshot()
+PERCENTILES = (50, 95, 99)
+
+# Prefix of metric names in the Prometheus export
+PROMETHEUS_PREFIX = 'osa_'
+
+
+class NullTimer:
+    """ Context manager doing nothing, returned by Metrics.timer while metrics are disabled """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+__null_timer__ = NullTimer()
+
+
+class Timer:
+    """ Context manager recording the time spent in its block into a Metrics timer """
+    __slots__ = ('metrics', 'name', 'started_at')
+
+    def __init__(self, metrics, name: str):
+        self.metrics = metrics
+        self.name = name
+        self.started_at = None
+
+    def __enter__(self):
+        self.started_at = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.metrics.observe(self.name, time.perf_counter() - self.started_at)
+        return False
+
+
+class Metrics:
+    """
+    Timers, counters and gauges of the hot paths, e.g. fetching, parsing and rendering traces.
+    Timers keep the durations of their last window observations, from which rolling percentiles
+    are computed when a snapshot is taken, so recording an observation is an append.
+    While disabled, nothing is recorded and timer() returns a shared context manager doing nothing,
+    so instrumented code costs a method call and an attribute check.
+    Thread safe.
+    """
+
+    def __init__(self, enabled: bool = METRICS_ENABLED, window: int = METRICS_WINDOW):
+        """
+        :param enabled: True to record metrics
+        :param window: Number of most recent observations percentiles are computed over
+        """
+        self.enabled = enabled
+        self.window = window
+        self.lock = threading.Lock()
+        self.durations = {}
+        self.timer_counts = collections.Counter()
+        self.counters = collections.Counter()
+        self.gauges = {}
+
+    def set_enabled(self, enabled: bool):
+        self.enabled = enabled
+
+    def timer(self, name: str):
+        """
+        Times a block, e.g. with metrics.timer('fetch'): ...
+        :param name: Name of the timer
+        :return: Context manager
+        """
+        if not self.enabled:
+            return __null_timer__
+        return Timer(self, name)
+
+    def observe(self, name: str, seconds: float):
+        """ Records a duration of a timer """
+        if not self.enabled:
+            return
+        with self.lock:
+            durations = self.durations.get(name)
+            if durations is None:
+                durations = self.durations[name] = collections.deque(maxlen=self.window)
+            durations.append(seconds)
+            self.timer_counts[name] += 1
+
+    def increment(self, name: str, amount: int = 1):
+        """ Adds to a counter """
+        if not self.enabled:
+            return
+        with self.lock:
+            self.counters[name] += amount
+
+    def set_gauge(self, name: str, value: float):
+        """ Sets a gauge, a value which can go up and down such as the frame rate """
+        if not self.enabled:
+            return
+        self.gauges[name] = value
+
+    def reset(self):
+        with self.lock:
+            self.durations.clear()
+            self.timer_counts.clear()
+            self.counters.clear()
+            self.gauges.clear()
+
+    def snapshot(self) -> dict:
+        """
+        Gets current values of all metrics
+        :return: Dict with
+            'timers': name to {'count', 'mean', 'max', 'p50', 'p95', 'p99'}, times in seconds over the window,
+            'counters': name to count,
+            'gauges': name to value
+        """
+        with self.lock:
+            durations = {name: np.array(values) for name, values in self.durations.items()}
+            timer_counts = dict(self.timer_counts)
+            counters = dict(self.counters)
+            gauges = dict(self.gauges)
+
+        timers = {}
+        for name, values in durations.items():
+            percentiles = np.percentile(values, PERCENTILES)
+            timers[name] = {'count': timer_counts[name], 'mean': float(values.mean()), 'max': float(values.max()),
+                            **{f'p{p}': float(value) for p, value in zip(PERCENTILES, percentiles)}}
+        return {'timers': timers, 'counters': counters, 'gauges': gauges}
+
+    def to_json(self) -> str:
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_prometheus(self) -> str:
+        """
+        Gets metrics in the Prometheus text format.
+        Timers are summaries in seconds, with their percentiles as quantiles.
+        """
+        snapshot = self.snapshot()
+        lines = []
+        for name, timer in sorted(snapshot['timers'].items()):
+            metric = __metric_name__(name) + '_seconds'
+            lines.append(f'# TYPE {metric} summary')
+            for p in PERCENTILES:
+                lines.append(f'{metric}{{quantile="{p / 100:g}"}} {__prometheus_value__(timer[f"p{p}"])}')
+            lines.append(f'{metric}_count {timer["count"]}')
+        for name, count in sorted(snapshot['counters'].items()):
+            metric = __metric_name__(name) + '_total'
+            lines.append(f'# TYPE {metric} counter')
+            lines.append(f'{metric} {count}')
+        for name, value in sorted(snapshot['gauges'].items()):
+            metric = __metric_name__(name)
+            lines.append(f'# TYPE {metric} gauge')
+            lines.append(f'{metric} {__prometheus_value__(value)}')
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path: str):
+        """
+        Writes metrics to a file, replacing it atomically so readers never see a partial file.
+        :param path: File to write. Written as JSON if it ends with .json, otherwise in the Prometheus
+            text format, e.g. for the node exporter textfile collector (*.prom).
+        """
+        text = self.to_json() if path.endswith('.json') else self.to_prometheus()
+        temporary_path = f'{path}.{os.getpid()}.tmp'
+        with open(temporary_path, 'w') as f:
+            f.write(text)
+        os.replace(temporary_path, path)
+
+
+def __metric_name__(name: str) -> str:
+    """ Gets a valid Prometheus metric name """
+    return PROMETHEUS_PREFIX + re.sub(r'[^a-zA-Z0-9_]', '_', name)
+
+
+def __prometheus_value__(value: float) -> str:
+    """ Formats a sample value, with non-finite values spelled as the Prometheus text format expects """
+    value = float(value)
+    if math.isnan(value):
+        return 'NaN'
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(value)
+
+
+__metrics__ = Metrics()
+
+
+def get_metrics() -> Metrics:
+    """ Gets the metrics shared by the whole app """
+    return __metrics__
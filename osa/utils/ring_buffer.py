@@ -0,0 +1,68 @@
+import numpy as np
+
+
+class RingBuffer2D:
+    """
+    Fixed-size buffer of the last rows appended to it, e.g. the last traces of an acquisition.
+    Every row is stored twice, so the rows in order from oldest to newest are always
+    a contiguous view of the buffer. Appending writes in place and never allocates.
+    """
+
+    def __init__(self, rows: int, columns: int, dtype=np.float32, fill: float = np.nan):
+        """
+        :param rows: Number of rows kept
+        :param columns: Length of each row
+        :param dtype: Type of stored values
+        :param fill: Value of rows not appended yet
+        """
+        self.rows = rows
+        self.fill = fill
+        self.buffer = np.full((2 * rows, columns), fill, dtype=dtype)
+        # Position the next row is written to
+        self.head = 0
+        self.count = 0
+
+    def __len__(self):
+        """ Number of rows appended, up to rows """
+        return self.count
+
+    @property
+    def columns(self) -> int:
+        return self.buffer.shape[1]
+
+    @property
+    def nbytes(self) -> int:
+        return self.buffer.nbytes
+
+    def append(self, row: np.ndarray):
+        """
+        Replaces the oldest row
+        :param row: Values of length columns, cast to the buffer type
+        """
+        np.copyto(self.buffer[self.head], row, casting='unsafe')
+        self.buffer[self.head + self.rows] = self.buffer[self.head]
+        self.head = (self.head + 1) % self.rows
+        self.count = min(self.count + 1, self.rows)
+
+    def view(self) -> np.ndarray:
+        """
+        Gets all rows, oldest first and newest last. Rows not appended yet hold fill.
+        :return: (rows, columns) view of the buffer, overwritten by later appends
+        """
+        return self.buffer[self.head:self.head + self.rows]
+
+    def latest(self) -> np.ndarray:
+        """ Gets the newest row """
+        return self.buffer[self.head + self.rows - 1]
+
+    def clear(self, columns: int = None):
+        """
+        Removes all rows
+        :param columns: New row length. The buffer is only reallocated if it changes.
+        """
+        if columns is not None and columns != self.columns:
+            self.buffer = np.full((2 * self.rows, columns), self.fill, dtype=self.buffer.dtype)
+        else:
+            self.buffer.fill(self.fill)
+        self.head = 0
+        self.count = 0
@@ -1,32 +1,74 @@
-import math
+import numpy as np
 
+# Speed of light in m/s
+SPEED_OF_LIGHT = 299792458
 
-def m_to_nm(measurement: float):
+# Speed of light in nm * THz, the product of a wavelength in nm and its frequency in THz
+SPEED_OF_LIGHT_NM_THZ = SPEED_OF_LIGHT * 1e-3
+
+# All conversions accept a scalar or a numpy array.
+# When out is given, the result is written to that array and returned.
+
+
+def m_to_nm(measurement, out: np.ndarray = None):
     """
     Converts measurement in meters to nanometers
     :param measurement: Value in meters
+    :param out: Optional array to store the result in
     :return: Value in nanometers
     """
-    return measurement * math.pow(10, 9)
+    return np.multiply(measurement, 1e9, out=out)
 
 
-def nm_to_m(measurement: float):
+def nm_to_m(measurement, out: np.ndarray = None):
     """
     Converts measurement in nanometers to meters
     :param measurement: Value in nanometers
-    :return: Value in nanometers
+    :param out: Optional array to store the result in
+    :return: Value in meters
     """
-    return measurement * math.pow(10, -9)
+    return np.multiply(measurement, 1e-9, out=out)
 
 
-def wavelength_to_frequency(wavelength: float):
+def wavelength_to_frequency(wavelength, out: np.ndarray = None):
     """
     Converts a wavelength in nm to a frequency in THz,
     assuming the wave is travelling at the speed of light (c).
     :param wavelength: Wavelength in nanometers
+    :param out: Optional array to store the result in
     :return: Frequency in THz
     """
-    c = 299792458
-    f_in_hz = c / nm_to_m(wavelength)
-    f_in_thz = f_in_hz * math.pow(10, -12)
-    return f_in_thz
+    return np.divide(SPEED_OF_LIGHT_NM_THZ, wavelength, out=out)
+
+
+def frequency_to_wavelength(frequency, out: np.ndarray = None):
+    """
+    Converts a frequency in THz to a wavelength in nm,
+    assuming the wave is travelling at the speed of light (c).
+    :param frequency: Frequency in THz
+    :param out: Optional array to store the result in
+    :return: Wavelength in nanometers
+    """
+    return np.divide(SPEED_OF_LIGHT_NM_THZ, frequency, out=out)
+
+
+def dbm_to_mw(power, out: np.ndarray = None):
+    """
+    Converts power in dBm to mW
+    :param power: Power in dBm
+    :param out: Optional array to store the result in
+    :return: Power in mW
+    """
+    exponent = np.divide(power, 10, out=out)
+    return np.power(10.0, exponent, out=out)
+
+
+def mw_to_dbm(power, out: np.ndarray = None):
+    """
+    Converts power in mW to dBm
+    :param power: Power in mW
+    :param out: Optional array to store the result in
+    :return: Power in dBm
+    """
+    log_power = np.log10(power, out=out)
+    return np.multiply(log_power, 10, out=out)
@@ -0,0 +1,58 @@
+import numpy as np
+
+from osa.utils.unit_conversions import wavelength_to_frequency
+
+
+class XAxisCache:
+    """
+    Caches the wavelength and frequency x-axes of the last trace.
+    Computed axes are keyed on (x start, x increment, number of points),
+    or on the x-values themselves when the server provides x-values,
+    so consecutive traces from the same sweep settings reuse the same arrays.
+    Every response decodes to new x-values, so those are compared by content.
+    """
+
+    def __init__(self):
+        self.key = None
+        self.wavelength = None
+        self.frequency = None
+
+    def get(self, trace_data, frequency: bool = False) -> np.ndarray:
+        """
+        Gets x-axis for a trace.
+        :param trace_data: TraceData with x-values in nm
+        :param frequency:
+            - If True, returns x-axis in THz
+            - If False, returns x-axis in nm
+        :return: x-axis array. Must not be modified, it is shared between traces.
+        """
+        if trace_data.x_data is not None:
+            key = trace_data.x_data
+        else:
+            key = (trace_data.x_start, trace_data.x_increment, len(trace_data))
+
+        if not self.matches(key):
+            self.key = key
+            self.wavelength = trace_data.x
+            self.frequency = None
+
+        if not frequency:
+            return self.wavelength
+        if self.frequency is None:
+            self.frequency = wavelength_to_frequency(self.wavelength)
+        return self.frequency
+
+    def matches(self, key) -> bool:
+        """ Checks if key is the key of the cached axes """
+        if isinstance(key, tuple) and isinstance(self.key, tuple):
+            return key == self.key
+        if isinstance(key, np.ndarray) and isinstance(self.key, np.ndarray):
+            # About as cheap as one conversion, and keeps returning the same arrays to the plot and waterfall
+            return key is self.key or (key.shape == self.key.shape and np.array_equal(key, self.key))
+        return False
+
+    def clear(self):
+        """ Drops cached axes """
+        self.key = None
+        self.wavelength = None
+        self.frequency = None
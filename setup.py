@@ -7,8 +7,14 @@ setup(name='osa',
       packages=['osa',
                 'osa.gui',
                 'osa.exceptions',
+                'osa.export',
+                'osa.recording',
+                'osa.analysis',
                 'osa.services',
+                'osa.simulator',
                 'osa.utils'],
       entry_points={
-          'console_scripts': ['start_osa_gui=osa.gui.app:run'],
+          'console_scripts': ['start_osa_gui=osa.gui.app:run',
+                              'start_osa_instruments=osa.gui.instrument_window:run',
+                              'osa=osa.cli:main'],
       })
@@ -0,0 +1,121 @@
+import unittest
+
+import numpy as np
+
+from osa.analysis import channel_analysis
+from osa.analysis.channel_analysis import analyze_channels, find_peaks
+from osa.services.server_requests import TraceData
+from osa.utils.unit_conversions import mw_to_dbm, wavelength_to_frequency
+
+
+def create_spectrum(centres, power_dbm: float = -10, noise_dbm: float = -60, sigma_nm: float = 0.02,
+                    length: int = 10000, x_start: float = 1525, x_increment: float = 0.004,
+                    ripple: float = 0, resolution_bandwidth_nm: float = 0.1) -> TraceData:
+    """ Gaussian channels over a flat noise floor """
+    x = x_start + x_increment * np.arange(length)
+    power_mw = np.full(length, 10 ** (noise_dbm / 10))
+    for centre in centres:
+        power_mw += 10 ** (power_dbm / 10) * np.exp(-0.5 * ((x - centre) / sigma_nm) ** 2)
+    if ripple:
+        power_mw *= 1 + ripple * np.random.default_rng(0).standard_normal(length)
+    return TraceData(data=mw_to_dbm(power_mw), time='2021-05-29T14:10:43Z', instrument='ExfoFTB500',
+                     x_label='Wavelength', y_label='dBm', x_units='nm', x_increment=x_increment,
+                     x_start=x_start, resolution_bandwidth_nm=resolution_bandwidth_nm)
+
+
+class FindPeaksTests(unittest.TestCase):
+    def test_prominence(self):
+        y = np.array([0, 5, 0, 20, 18, 21, 0, 3, 0], dtype=float)
+        peaks, prominences, left_bases, right_bases = find_peaks(y, min_prominence=4, min_spacing=1)
+        np.testing.assert_array_equal([1, 5], peaks)
+        np.testing.assert_array_equal([5, 21], prominences)
+        np.testing.assert_array_equal([0, 2], left_bases)
+        np.testing.assert_array_equal([2, 6], right_bases)
+
+    def test_min_spacing(self):
+        y = np.array([0, 10, 0, 12, 0, 0, 0, 0, 11, 0], dtype=float)
+        peaks, _, _, _ = find_peaks(y, min_prominence=1, min_spacing=2)
+        np.testing.assert_array_equal([3, 8], peaks)
+
+    def test_plateau(self):
+        y = np.array([0, 5, 5, 5, 0], dtype=float)
+        peaks, _, _, _ = find_peaks(y, min_prominence=1, min_spacing=1)
+        np.testing.assert_array_equal([1], peaks)
+
+    def test_no_peaks(self):
+        for y in (np.zeros(10), np.arange(10.0), np.array([1.0]), np.full(5, np.nan)):
+            peaks, prominences, _, _ = find_peaks(y, min_prominence=1, min_spacing=1)
+            self.assertEqual(0, len(peaks))
+            self.assertEqual(0, len(prominences))
+
+    def test_nan_values(self):
+        y = np.array([0, 5, np.nan, 0, 8, 0], dtype=float)
+        peaks, _, _, _ = find_peaks(y, min_prominence=1, min_spacing=1)
+        np.testing.assert_array_equal([1, 4], peaks)
+
+    def test_sliding_max(self):
+        values = np.random.default_rng(0).standard_normal(101)
+        for half_width in (1, 3, 10, 60):
+            expected = [values[max(i - half_width, 0):i + half_width + 1].max() for i in range(len(values))]
+            np.testing.assert_array_equal(expected, channel_analysis.__sliding_max__(values, half_width))
+
+
+class AnalyzeChannelsTests(unittest.TestCase):
+    def setUp(self):
+        self.centres = 1527 + 0.8 * np.arange(40)
+
+    def test_channels(self):
+        channels = analyze_channels(create_spectrum(self.centres))
+        self.assertEqual(40, len(channels))
+        np.testing.assert_allclose(self.centres, channels['wavelength_nm'], atol=1e-4)
+        np.testing.assert_allclose(wavelength_to_frequency(channels['wavelength_nm']), channels['frequency_thz'])
+        np.testing.assert_allclose(-10, channels['power_dbm'], atol=0.01)
+        # Gaussian widths at -3 dB and -20 dB
+        np.testing.assert_allclose(2 * 0.02 * np.sqrt(2 * 0.3 * np.log(10)), channels['width_3db_nm'], rtol=0.01)
+        np.testing.assert_allclose(2 * 0.02 * np.sqrt(2 * 2 * np.log(10)), channels['width_20db_nm'], rtol=0.01)
+        np.testing.assert_allclose(-60, channels['noise_dbm'], atol=0.01)
+        np.testing.assert_allclose(50, channels['osnr_db'], atol=0.01)
+
+    def test_osnr_reference_bandwidth(self):
+        channels = analyze_channels(create_spectrum(self.centres, resolution_bandwidth_nm=0.05))
+        np.testing.assert_allclose(47, channels['osnr_db'], atol=0.02)
+        channels = analyze_channels(create_spectrum(self.centres, resolution_bandwidth_nm=None))
+        np.testing.assert_allclose(50, channels['osnr_db'], atol=0.01)
+
+    def test_noisy_spectrum(self):
+        channels = analyze_channels(create_spectrum(self.centres, ripple=0.05))
+        self.assertEqual(40, len(channels))
+        np.testing.assert_allclose(self.centres, channels['wavelength_nm'], atol=5e-3)
+        np.testing.assert_allclose(50, channels['osnr_db'], atol=0.5)
+
+    def test_noise_floor_interpolated(self):
+        trace_data = create_spectrum([1530])
+        # Noise floor rising from -60 dBm to -50 dBm across the channel
+        trace_data.data[:] = mw_to_dbm(10 ** (trace_data.data / 10) - 1e-6 + np.linspace(1e-6, 1e-5, 10000))
+        channel = analyze_channels(trace_data, noise_window_nm=0)[0]
+        expected_noise = np.interp(1530, trace_data.x[[0, -1]], [1e-6, 1e-5])
+        self.assertAlmostEqual(mw_to_dbm(expected_noise), channel['noise_dbm'], delta=0.01)
+
+    def test_channel_below_prominence(self):
+        channels = analyze_channels(create_spectrum(self.centres, power_dbm=-55))
+        self.assertEqual(0, len(channels))
+        self.assertEqual(channel_analysis.CHANNEL_DTYPE, channels.dtype)
+
+    def test_width_below_noise_floor(self):
+        # -20 dB points are below the noise floor
+        channels = analyze_channels(create_spectrum(self.centres, power_dbm=-45))
+        self.assertEqual(40, len(channels))
+        self.assertTrue(np.isnan(channels['width_20db_nm']).all())
+        self.assertFalse(np.isnan(channels['width_3db_nm']).any())
+
+    def test_x_data(self):
+        trace_data = create_spectrum(self.centres[:3])
+        trace_data = TraceData(trace_data.data, trace_data.time, trace_data.instrument, trace_data.x_label,
+                               trace_data.y_label, trace_data.x_units, trace_data.x_increment,
+                               x_data=trace_data.x.copy())
+        channels = analyze_channels(trace_data)
+        np.testing.assert_allclose(self.centres[:3], channels['wavelength_nm'], atol=1e-4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+import time
+import unittest
+
+import numpy as np
+
+import helpers
+from osa.analysis.channel_analysis import CHANNEL_DTYPE, analyze_channels
+from osa.analysis.pipeline import PIPELINE_STAGES, AnalysisPipeline
+from osa.services.server_requests import TraceData
+from osa.utils.unit_conversions import mw_to_dbm
+
+
+def create_trace_data(length: int = 1000, x_data=None) -> TraceData:
+    x = 1525 + 0.004 * np.arange(length)
+    power_mw = 1e-6 + 0.1 * np.exp(-0.5 * ((x - x[length // 2]) / 0.02) ** 2)
+    return helpers.create_trace_data(mw_to_dbm(power_mw), x_increment=0.004, x_start=1525, x_data=x_data,
+                                     resolution_bandwidth_nm=0.1)
+
+
+class AnalysisPipelineTests(unittest.TestCase):
+    def setUp(self):
+        self.results = []
+
+    def create_pipeline(self, analyze=analyze_channels, workers: int = 1) -> AnalysisPipeline:
+        pipeline = AnalysisPipeline(analyze=analyze, on_result=self.on_result, workers=workers)
+        self.addCleanup(pipeline.close)
+        return pipeline
+
+    def on_result(self, trace_id: int, result, times: dict):
+        self.results.append((trace_id, result, times))
+
+    def wait_until_done(self, pipeline: AnalysisPipeline, timeout: float = 60):
+        deadline = time.monotonic() + timeout
+        # Each trace is either delivered, dropped or failed
+        while len(self.results) + pipeline.dropped_traces + pipeline.failed_traces < pipeline.submitted_traces:
+            self.assertLess(time.monotonic(), deadline, "Analysis did not finish.")
+            time.sleep(0.01)
+
+    def test_analyze(self):
+        pipeline = self.create_pipeline()
+        trace_id = pipeline.submit(create_trace_data())
+        self.wait_until_done(pipeline)
+
+        self.assertEqual(1, len(self.results))
+        result_id, channels, times = self.results[0]
+        self.assertEqual(trace_id, result_id)
+        self.assertEqual(CHANNEL_DTYPE, channels.dtype)
+        np.testing.assert_array_equal(analyze_channels(create_trace_data()), channels)
+        self.assertEqual(set(PIPELINE_STAGES), set(times))
+        self.assertTrue(all(seconds >= 0 for seconds in times.values()))
+        self.assertEqual(set(PIPELINE_STAGES), set(pipeline.stage_timings()))
+
+    def test_x_data_and_float32(self):
+        pipeline = self.create_pipeline()
+        trace_data = create_trace_data(x_data=1525 + 0.004 * np.arange(1000))
+        trace_data.data = trace_data.data.astype(np.float32)
+        pipeline.submit(trace_data)
+        self.wait_until_done(pipeline)
+        np.testing.assert_array_equal(analyze_channels(trace_data), self.results[0][1])
+
+    def test_latest_wins(self):
+        pipeline = self.create_pipeline(analyze=len)
+        trace_ids = [pipeline.submit(create_trace_data(length)) for length in range(100, 200)]
+        self.wait_until_done(pipeline)
+
+        result_ids = [trace_id for trace_id, _, _ in self.results]
+        self.assertEqual(trace_ids[-1], result_ids[-1])
+        self.assertEqual(sorted(result_ids), result_ids)
+        self.assertEqual(199, self.results[-1][1])
+        self.assertEqual(100, pipeline.submitted_traces)
+        self.assertGreater(pipeline.dropped_traces, 0)
+        self.assertEqual(100, len(self.results) + pipeline.dropped_traces)
+
+    def test_buffers_are_reused(self):
+        pipeline = self.create_pipeline(analyze=len)
+        for length in (1000, 900, 2000):
+            pipeline.submit(create_trace_data(length))
+            self.wait_until_done(pipeline)
+        self.assertEqual([1000, 900, 2000], [result for _, result, _ in self.results])
+        self.assertEqual(1, len(pipeline.free_buffers))
+
+    def test_analysis_error(self):
+        pipeline = self.create_pipeline(analyze=float)
+        pipeline.submit(create_trace_data())
+        self.wait_until_done(pipeline)
+        self.assertEqual([], self.results)
+        self.assertEqual(1, pipeline.failed_traces)
+
+    def test_closed(self):
+        pipeline = self.create_pipeline(analyze=len)
+        pipeline.close()
+        with self.assertRaises(RuntimeError):
+            pipeline.submit(create_trace_data())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,128 @@
+import unittest
+
+import numpy as np
+
+from helpers import create_trace_data
+from osa.analysis.trace_processing import (AVERAGING_EXPONENTIAL, AVERAGING_MOVING, AVERAGING_OFF,
+                                           TraceProcessor)
+from osa.utils.unit_conversions import dbm_to_mw, mw_to_dbm
+
+
+def mean_dbm(traces) -> np.ndarray:
+    return mw_to_dbm(np.mean(dbm_to_mw(np.array(traces, dtype=np.float64)), axis=0))
+
+
+class TraceProcessorTests(unittest.TestCase):
+    def setUp(self):
+        self.traces = np.random.default_rng(0).uniform(-80, -20, size=(12, 50))
+
+    def test_averaging_off(self):
+        processor = TraceProcessor()
+        trace_data = create_trace_data(self.traces[0])
+        self.assertIs(trace_data, processor.process(trace_data))
+        self.assertIsNone(processor.max_hold)
+
+    def test_moving_average(self):
+        processor = TraceProcessor(averaging=AVERAGING_MOVING, average_count=4)
+        for i, trace in enumerate(self.traces):
+            averaged = processor.process(create_trace_data(trace))
+            np.testing.assert_allclose(mean_dbm(self.traces[max(i - 3, 0):i + 1]), averaged.data)
+        self.assertEqual(1515, averaged.x_start)
+        self.assertEqual('ExfoFTB500', averaged.instrument)
+
+    def test_exponential_average(self):
+        processor = TraceProcessor(averaging=AVERAGING_EXPONENTIAL, average_count=4)
+        # The first traces are weighted equally
+        for i in range(4):
+            averaged = processor.process(create_trace_data(self.traces[i]))
+            np.testing.assert_allclose(mean_dbm(self.traces[:i + 1]), averaged.data)
+
+        expected_mw = np.mean(dbm_to_mw(self.traces[:4]), axis=0)
+        for trace in self.traces[4:]:
+            expected_mw += (dbm_to_mw(trace) - expected_mw) / 4
+            averaged = processor.process(create_trace_data(trace))
+        np.testing.assert_allclose(mw_to_dbm(expected_mw), averaged.data)
+
+    def test_constant_trace_round_trip(self):
+        for mode in (AVERAGING_MOVING, AVERAGING_EXPONENTIAL):
+            processor = TraceProcessor(averaging=mode, average_count=3)
+            for _ in range(7):
+                averaged = processor.process(create_trace_data(np.full(10, -42.5)))
+            np.testing.assert_allclose(np.full(10, -42.5), averaged.data)
+
+    def test_float32_traces(self):
+        processor = TraceProcessor(averaging=AVERAGING_MOVING, average_count=4, max_hold=True)
+        for trace in self.traces[:3]:
+            averaged = processor.process(create_trace_data(trace.astype(np.float32)))
+        np.testing.assert_allclose(mean_dbm(self.traces[:3]), averaged.data, rtol=1e-6)
+        np.testing.assert_allclose(np.max(self.traces[:3], axis=0), processor.max_hold, rtol=1e-6)
+
+    def test_buffers_are_reused(self):
+        processor = TraceProcessor(averaging=AVERAGING_MOVING, average_count=4, max_hold=True)
+        first = processor.process(create_trace_data(self.traces[0])).data
+        max_hold = processor.max_hold
+        second = processor.process(create_trace_data(self.traces[1])).data
+        self.assertIs(first, second)
+        self.assertIs(max_hold, processor.max_hold)
+
+    def test_holds(self):
+        processor = TraceProcessor(max_hold=True, min_hold=True)
+        for trace in self.traces:
+            processor.process(create_trace_data(trace))
+        np.testing.assert_array_equal(np.max(self.traces, axis=0), processor.max_hold)
+        np.testing.assert_array_equal(np.min(self.traces, axis=0), processor.min_hold)
+
+    def test_hold_ignores_nan(self):
+        processor = TraceProcessor(max_hold=True)
+        processor.process(create_trace_data([-50.0, -60.0]))
+        processor.process(create_trace_data([np.nan, -40.0]))
+        np.testing.assert_array_equal([-50, -40], processor.max_hold)
+
+    def test_reset(self):
+        processor = TraceProcessor(averaging=AVERAGING_MOVING, average_count=4, max_hold=True, min_hold=True)
+        for trace in self.traces[:3]:
+            processor.process(create_trace_data(trace))
+        processor.reset()
+        averaged = processor.process(create_trace_data(self.traces[3]))
+        np.testing.assert_allclose(self.traces[3], averaged.data)
+        np.testing.assert_array_equal(self.traces[3], processor.max_hold)
+        np.testing.assert_array_equal(self.traces[3], processor.min_hold)
+
+    def test_sweep_change_restarts(self):
+        processor = TraceProcessor(averaging=AVERAGING_MOVING, average_count=4, max_hold=True)
+        processor.process(create_trace_data(self.traces[0]))
+        averaged = processor.process(create_trace_data(self.traces[1], x_start=1520))
+        np.testing.assert_allclose(self.traces[1], averaged.data)
+        np.testing.assert_array_equal(self.traces[1], processor.max_hold)
+
+        averaged = processor.process(create_trace_data(self.traces[2, :10], x_start=1520))
+        self.assertEqual(10, len(averaged))
+
+    def test_set_averaging(self):
+        processor = TraceProcessor(averaging=AVERAGING_MOVING)
+        processor.process(create_trace_data(self.traces[0]))
+        processor.set_averaging(AVERAGING_EXPONENTIAL, count=2)
+        averaged = processor.process(create_trace_data(self.traces[1]))
+        np.testing.assert_allclose(self.traces[1], averaged.data)
+
+        processor.set_averaging(AVERAGING_OFF)
+        trace_data = create_trace_data(self.traces[2])
+        self.assertIs(trace_data, processor.process(trace_data))
+
+        with self.assertRaises(ValueError):
+            processor.set_averaging('median')
+        with self.assertRaises(ValueError):
+            processor.set_averaging(AVERAGING_MOVING, count=0)
+
+    def test_set_hold(self):
+        processor = TraceProcessor()
+        processor.process(create_trace_data(self.traces[0]))
+        processor.set_max_hold(True)
+        processor.process(create_trace_data(self.traces[1]))
+        np.testing.assert_array_equal(self.traces[1], processor.max_hold)
+        processor.set_max_hold(False)
+        self.assertIsNone(processor.max_hold)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Test directories are not packages, so make the shared helpers in this directory importable from all of them
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
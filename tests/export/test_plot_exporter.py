@@ -0,0 +1,171 @@
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+from helpers import create_trace_data
+from osa.export.plot_exporter import PlotExporter, export_recording, reserve_file_stem
+from osa.export.snapshot import PlotSnapshot
+from osa.recording.trace_store import TraceStoreReader, TraceStoreWriter
+
+
+class PlotSnapshotTests(unittest.TestCase):
+    def test_copies_y_values(self):
+        trace_data = create_trace_data()
+        max_hold = np.full(100, -50.0)
+        snapshot = PlotSnapshot.from_trace(trace_data)
+        snapshot = PlotSnapshot(snapshot.title, trace_data, snapshot.x, trace_data.data, 'Wavelength (nm)', 'dBm',
+                                overlays={'max_hold': (max_hold, 'r')})
+        trace_data.data[0] = 0
+        max_hold[0] = 0
+        self.assertEqual(-60, snapshot.y[0])
+        self.assertEqual(-50, snapshot.overlays['max_hold'][0][0])
+
+    def test_from_trace(self):
+        snapshot = PlotSnapshot.from_trace(create_trace_data(), display_frequency=True)
+        self.assertEqual('ExfoFTB500::2021-05-29T14:10:43Z', snapshot.title)
+        self.assertEqual('Frequency (THz)', snapshot.x_label)
+        self.assertAlmostEqual(197.88, snapshot.x[0], places=2)
+        self.assertEqual(['wavelength_nm', 'power_dbm'], list(snapshot.data_columns()))
+
+
+class PlotExporterTests(unittest.TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.exporter = PlotExporter()
+
+    def tearDown(self):
+        self.exporter.stop()
+        shutil.rmtree(self.path)
+
+    def create_snapshot(self, title: str = 'OSA::12:00:00') -> PlotSnapshot:
+        snapshot = PlotSnapshot.from_trace(create_trace_data(), title=title)
+        snapshot.overlays['max_hold'] = (np.full(100, -50.0), 'r')
+        return snapshot
+
+    def test_csv(self):
+        path, = self.exporter.export(self.create_snapshot(), self.path, ('csv',))
+        self.assertEqual(os.path.join(self.path, 'OSA--12-00-00.csv'), path)
+        with open(path) as f:
+            self.assertEqual('wavelength_nm,power_dbm,max_hold', f.readline().strip())
+        data = np.loadtxt(path, delimiter=',', skiprows=1)
+        self.assertEqual((100, 3), data.shape)
+        self.assertAlmostEqual(1515.002, data[1, 0])
+        np.testing.assert_array_equal(-60, data[:, 1])
+
+    def test_npy(self):
+        path, = self.exporter.export(self.create_snapshot(), self.path, ('npy',))
+        data = np.load(path)
+        self.assertEqual(('wavelength_nm', 'power_dbm', 'max_hold'), data.dtype.names)
+        np.testing.assert_array_equal(-50, data['max_hold'])
+
+    def test_same_titles_do_not_overwrite(self):
+        paths = [self.exporter.export(self.create_snapshot(), self.path, ('csv', 'npy')) for _ in range(3)]
+        stems = [os.path.splitext(os.path.basename(csv_path))[0] for csv_path, npy_path in paths]
+        self.assertEqual(['OSA--12-00-00', 'OSA--12-00-00-1', 'OSA--12-00-00-2'], stems)
+        self.assertEqual(6, len(os.listdir(self.path)))
+
+    def test_reserve_file_stem_skips_names_taken_by_any_extension(self):
+        open(os.path.join(self.path, 'plot.npy'), 'w').close()
+        self.assertEqual(os.path.join(self.path, 'plot-1'), reserve_file_stem(self.path, '', ('csv', 'npy')))
+
+    def test_unknown_format(self):
+        with self.assertRaises(ValueError):
+            self.exporter.submit(self.create_snapshot(), self.path, ('jpg',))
+
+    def test_submit(self):
+        exported = []
+        exporter = PlotExporter(on_exported=exported.append)
+        for i in range(3):
+            self.assertTrue(exporter.submit(self.create_snapshot(f'OSA {i}'), self.path, ('csv',)))
+        exporter.stop()
+        self.assertEqual(3, exporter.exported_snapshots)
+        self.assertEqual([[os.path.join(self.path, f'OSA {i}.csv')] for i in range(3)], exported)
+
+    def test_full_queue_drops_snapshots(self):
+        release = threading.Event()
+        exporter = PlotExporter(queue_size=1, on_exported=lambda paths: release.wait())
+        results = [exporter.submit(self.create_snapshot(), self.path, ('csv',)) for _ in range(4)]
+        release.set()
+        exporter.stop()
+        # At most one snapshot is being exported and one queued while the export thread is held
+        self.assertGreaterEqual(exporter.dropped_snapshots, 2)
+        self.assertEqual(results.count(False), exporter.dropped_snapshots)
+        self.assertEqual(results.count(True), exporter.exported_snapshots)
+
+    def test_write_error(self):
+        exporter = PlotExporter()
+        exporter.submit(self.create_snapshot(), os.path.join(self.path, 'missing'), ('csv',))
+        exporter.stop()
+        self.assertIsInstance(exporter.error, OSError)
+        self.assertEqual(0, exporter.exported_snapshots)
+
+    def test_render_errors_do_not_stop_exporting(self):
+        exporter = PlotExporter()
+        export = exporter.export
+
+        def export_or_fail(snapshot, *args):
+            if snapshot.title == 'invalid':
+                raise ValueError("Invalid snapshot")
+            return export(snapshot, *args)
+
+        exporter.export = export_or_fail
+        for title in ('invalid', 'valid', 'invalid'):
+            self.assertTrue(exporter.submit(self.create_snapshot(title), self.path, ('csv',), block=True))
+        exporter.stop()
+        self.assertIsInstance(exporter.error, ValueError)
+        self.assertEqual(2, exporter.failed_snapshots)
+        self.assertEqual(1, exporter.exported_snapshots)
+
+    def test_failed_export_removes_its_files(self):
+        self.exporter.export(self.create_snapshot(), self.path, ('csv',))
+        with patch('osa.export.plot_exporter.write_npy', side_effect=ValueError("Invalid snapshot")):
+            with self.assertRaises(ValueError):
+                self.exporter.export(self.create_snapshot(), self.path, ('csv', 'npy'))
+        self.assertEqual(['OSA--12-00-00.csv'], os.listdir(self.path))
+        # The name of the failed export is used again
+        path, = self.exporter.export(self.create_snapshot(), self.path, ('csv',))
+        self.assertEqual(os.path.join(self.path, 'OSA--12-00-00-1.csv'), path)
+
+    def test_submit_after_export_thread_died(self):
+        exporter = PlotExporter(queue_size=1)
+        exporter.queue.put(PlotExporter.__stop__)
+        exporter.thread.join()
+        exporter.submit(self.create_snapshot(), self.path, ('csv',))
+        # Neither may wait for room in the full queue
+        self.assertFalse(exporter.submit(self.create_snapshot(), self.path, ('csv',), block=True))
+        exporter.stop()
+        self.assertEqual(0, export_recording([create_trace_data()], exporter, self.path))
+
+    def test_export_recording(self):
+        store_path = os.path.join(self.path, 'recording')
+        writer = TraceStoreWriter(store_path)
+        for second in range(5):
+            writer.append(create_trace_data(value=-60 + second, time=f'2021-05-29T14:10:0{second}Z'))
+        writer.close()
+        reader = TraceStoreReader(store_path)
+        self.addCleanup(reader.close)
+        output_path = os.path.join(self.path, 'export')
+        os.mkdir(output_path)
+
+        exporter = PlotExporter(queue_size=1)
+        self.assertEqual(3, export_recording(reader, exporter, output_path, ('npy',), every=2))
+        exporter.stop()
+        self.assertEqual(0, exporter.dropped_snapshots)
+        files = sorted(os.listdir(output_path))
+        self.assertEqual(['ExfoFTB500--2021-05-29T14-10-00Z.npy', 'ExfoFTB500--2021-05-29T14-10-02Z.npy',
+                          'ExfoFTB500--2021-05-29T14-10-04Z.npy'], files)
+        np.testing.assert_array_equal(-56, np.load(os.path.join(output_path, files[2]))['power_dbm'])
+
+    def test_export_recording_stops(self):
+        stop_event = threading.Event()
+        stop_event.set()
+        self.assertEqual(0, export_recording([create_trace_data()], self.exporter, self.path, stop_event=stop_event))
+
+
+if __name__ == "__main__":
+    unittest.main()
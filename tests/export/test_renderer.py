@@ -0,0 +1,78 @@
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+import numpy as np
+
+# Images are drawn without a display
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PyQt5.QtGui import QGuiApplication, QImage  # noqa: E402
+
+from osa.export.plot_exporter import PlotExporter  # noqa: E402
+from osa.export.renderer import nice_ticks, render_png, render_svg  # noqa: E402
+from osa.export.snapshot import PlotSnapshot  # noqa: E402
+from osa.services.server_requests import TraceData  # noqa: E402
+
+
+def create_snapshot(length: int = 10000) -> PlotSnapshot:
+    data = -60 + 30 * np.exp(-np.linspace(-5, 5, length) ** 2)
+    data[length // 3] = np.nan
+    trace_data = TraceData(data=data, time='2021-05-29T14:10:43Z', instrument='ExfoFTB500', x_label='Wavelength',
+                           y_label='dBm', x_units='nm', x_increment=0.002, x_start=1515)
+    return PlotSnapshot.from_trace(trace_data)
+
+
+class RendererTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QGuiApplication.instance() or QGuiApplication([])
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_nice_ticks(self):
+        np.testing.assert_allclose([1515, 1516, 1517, 1518, 1519, 1520], nice_ticks(1514.6, 1520.3, count=6))
+        np.testing.assert_allclose([-60, -40, -20], nice_ticks(-61, -15, count=3))
+        self.assertEqual([3], list(nice_ticks(3, 3)))
+
+    def test_png(self):
+        path = os.path.join(self.path, 'plot.png')
+        render_png(create_snapshot(), path, size=(600, 400))
+        image = QImage(path)
+        self.assertEqual((600, 400), (image.width(), image.height()))
+        trace_pixels = sum(image.pixelColor(x, y).green() > 200 and image.pixelColor(x, y).red() < 100
+                           for x in range(0, 600, 2) for y in range(0, 400, 2))
+        self.assertGreater(trace_pixels, 50)
+
+    def test_png_error(self):
+        with self.assertRaises(OSError):
+            render_png(create_snapshot(), os.path.join(self.path, 'missing', 'plot.png'))
+
+    def test_svg(self):
+        path = os.path.join(self.path, 'plot.svg')
+        render_svg(create_snapshot(), path)
+        with open(path) as f:
+            svg = f.read()
+        self.assertIn('<svg', svg)
+        self.assertIn('ExfoFTB500::2021-05-29T14:10:43Z', svg)
+
+    def test_export_thread(self):
+        exporter = PlotExporter(image_size=(300, 200))
+        thread_names = []
+        exporter.on_exported = lambda paths: thread_names.append(threading.current_thread().name)
+        exporter.submit(create_snapshot(), self.path, ('png', 'svg'))
+        exporter.stop()
+        self.assertIsNone(exporter.error)
+        self.assertEqual(['osa-exporter'], thread_names)
+        self.assertEqual(['ExfoFTB500--2021-05-29T14-10-43Z.png', 'ExfoFTB500--2021-05-29T14-10-43Z.svg'],
+                         sorted(os.listdir(self.path)))
+
+
+if __name__ == "__main__":
+    unittest.main()
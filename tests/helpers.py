@@ -0,0 +1,33 @@
+import numpy as np
+
+from osa.services.server_requests import TraceData
+
+
+def create_trace_data(data=None, length: int = 100, value: float = -60, **kwargs) -> TraceData:
+    """
+    Gets a trace as acquired from an ExfoFTB500, sweeping from 1515 nm in 0.002 nm steps
+    :param data: Trace values, defaults to length values equal to value
+    :param length: Number of values of the default data
+    :param value: Value of the default data
+    :param kwargs: TraceData arguments overriding the defaults
+    :return: TraceData
+    """
+    kwargs = {'time': '2021-05-29T14:10:43Z', 'instrument': 'ExfoFTB500', 'x_label': 'Wavelength',
+              'y_label': 'dBm', 'x_units': 'nm', 'x_increment': 0.002, 'x_start': 1515,
+              'resolution_bandwidth_nm': 0.031, **kwargs}
+    return TraceData(data=np.full(length, value) if data is None else data, **kwargs)
+
+
+class FakeClock:
+    """ Clock which only advances when its time is set or sleep is called """
+
+    def __init__(self):
+        self.time = 0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.time
+
+    def sleep(self, seconds: float):
+        self.sleeps.append(seconds)
+        self.time += seconds
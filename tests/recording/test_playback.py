@@ -0,0 +1,135 @@
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from helpers import create_trace_data
+from osa.gui.acquisition_worker import AcquisitionWorker
+from osa.recording.playback import PlaybackSource
+from osa.recording.trace_store import TraceStoreReader, TraceStoreWriter
+from osa.services.limits_cache import LimitsCache
+
+
+class TraceStoreReaderTests(unittest.TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.writer = TraceStoreWriter(self.path, dtype=np.float32, max_chunk_bytes=1000)
+        for i in range(10):
+            self.writer.append(create_trace_data(value=-i), recorded_at=100 + 2 * i)
+        self.writer.flush()
+
+    def tearDown(self):
+        self.writer.close()
+        shutil.rmtree(self.path)
+
+    def test_read(self):
+        reader = TraceStoreReader(self.path)
+        self.assertEqual(10, len(reader))
+
+        trace_data = reader[7]
+        self.assertEqual(np.float32, trace_data.data.dtype)
+        np.testing.assert_array_equal(np.full(100, -7), trace_data.data)
+        self.assertEqual('ExfoFTB500', trace_data.instrument)
+        self.assertEqual('2021-05-29T14:10:43Z', trace_data.time)
+        self.assertEqual(1515, trace_data.x_start)
+        self.assertEqual(0.031, trace_data.resolution_bandwidth_nm)
+        self.assertIsNone(trace_data.total_power_dbm)
+        self.assertIsNone(trace_data.x_data)
+
+    def test_x_data(self):
+        x_data = np.linspace(1515, 1580, 100)
+        self.writer.append(create_trace_data(value=-60, x_data=x_data))
+        self.writer.flush()
+
+        trace_data = TraceStoreReader(self.path)[10]
+        np.testing.assert_array_equal(x_data, trace_data.x_data)
+        np.testing.assert_array_equal(x_data, trace_data.x)
+
+    def test_position_at(self):
+        reader = TraceStoreReader(self.path)
+        self.assertEqual(0, reader.position_at(0))
+        self.assertEqual(0, reader.position_at(100))
+        self.assertEqual(2, reader.position_at(105.5))
+        self.assertEqual(3, reader.position_at(106))
+        self.assertEqual(9, reader.position_at(1000))
+
+    def test_refresh(self):
+        reader = TraceStoreReader(self.path)
+        self.writer.append(create_trace_data(value=-60))
+        self.writer.flush()
+        self.assertEqual(10, len(reader))
+
+        reader.refresh()
+        self.assertEqual(11, len(reader))
+        np.testing.assert_array_equal(np.full(100, -60), reader[10].data)
+
+    def test_empty_store(self):
+        path = tempfile.mkdtemp()
+        try:
+            TraceStoreWriter(path).close()
+            self.assertEqual(0, len(TraceStoreReader(path)))
+        finally:
+            shutil.rmtree(path)
+
+    def test_not_a_store(self):
+        with self.assertRaises(FileNotFoundError):
+            TraceStoreReader(tempfile.gettempdir() + '/does-not-exist')
+
+
+class PlaybackSourceTests(unittest.TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        writer = TraceStoreWriter(self.path)
+        for i in range(5):
+            writer.append(create_trace_data(value=-i), recorded_at=100 + 3 * i)
+        writer.close()
+        self.source = PlaybackSource(TraceStoreReader(self.path), max_frame_delay=10)
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def values(self, count: int) -> list[float]:
+        return [self.source.get_trace().data[0] for _ in range(count)]
+
+    def test_get_trace(self):
+        self.assertEqual([0, -1, -2, -3, -4, -4], self.values(6))
+        self.assertTrue(self.source.at_end)
+
+    def test_loop(self):
+        self.source.loop = True
+        self.assertEqual([0, -1, -2, -3, -4, 0], self.values(6))
+
+    def test_seek_and_step(self):
+        self.source.seek(3)
+        self.assertEqual([-3], self.values(1))
+        self.source.step(-3)
+        self.assertEqual([-1], self.values(1))
+        self.source.seek(100)
+        self.assertEqual([-4], self.values(1))
+        self.source.seek_time(107)
+        self.assertEqual([-2], self.values(1))
+
+    def test_frame_delay(self):
+        self.assertEqual(0, self.source.frame_delay())
+        self.source.get_trace()
+        self.assertEqual(3, self.source.frame_delay())
+        self.source.speed = 4
+        self.assertEqual(0.75, self.source.frame_delay())
+        self.source.max_frame_delay = 1
+        self.assertEqual(0.25, self.source.frame_delay())
+
+    def test_get_x_lims(self):
+        self.source.get_trace()
+        np.testing.assert_allclose([1515, 1515.198], self.source.get_x_lims())
+
+    def test_as_acquisition_source(self):
+        worker = AcquisitionWorker(fetch_trace=self.source.get_trace,
+                                   x_lims_cache=LimitsCache(self.source.get_x_lims))
+        trace_data, x_lims = worker.acquire_once()
+        np.testing.assert_array_equal(np.zeros(100), trace_data.data)
+        np.testing.assert_allclose([1515, 1515.198], x_lims)
+
+
+if __name__ == "__main__":
+    unittest.main()
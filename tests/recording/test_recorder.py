@@ -0,0 +1,183 @@
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+import numpy as np
+
+import helpers
+from helpers import FakeClock
+from osa.recording.recorder import Recorder
+from osa.recording.trace_store import INDEX_DTYPE, INDEX_FILE, TraceStoreReader, TraceStoreWriter, chunk_file_name
+from osa.services.server_requests import TraceData
+
+
+def create_trace_data(**kwargs) -> TraceData:
+    return helpers.create_trace_data(total_power_dbm=-25.96, **kwargs)
+
+
+class TraceStoreWriterTests(unittest.TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def read_index(self) -> np.ndarray:
+        return np.fromfile(os.path.join(self.path, INDEX_FILE), dtype=INDEX_DTYPE)
+
+    def read_chunk(self, chunk: int, dtype=np.float64) -> np.ndarray:
+        return np.fromfile(os.path.join(self.path, chunk_file_name(chunk)), dtype=dtype)
+
+    def test_append(self):
+        writer = TraceStoreWriter(self.path)
+        writer.append(create_trace_data(value=-60), recorded_at=100)
+        writer.append(create_trace_data(value=-50), recorded_at=101)
+        writer.close()
+
+        index = self.read_index()
+        self.assertEqual(2, len(index))
+        self.assertEqual([0, 800], list(index['offset']))
+        self.assertEqual([100, 101], list(index['recorded_at']))
+        self.assertEqual(b'ExfoFTB500', index['instrument'][0])
+        self.assertEqual(1515, index['x_start'][0])
+        self.assertEqual(0.031, index['resolution_bandwidth_nm'][0])
+        self.assertEqual(-25.96, index['total_power_dbm'][0])
+        np.testing.assert_array_equal(np.r_[np.full(100, -60), np.full(100, -50)], self.read_chunk(0))
+
+    def test_float32_with_x_data(self):
+        writer = TraceStoreWriter(self.path, dtype=np.float32)
+        x_data = np.linspace(1515, 1580, 10)
+        writer.append(create_trace_data(length=10, x_data=x_data))
+        writer.close()
+
+        self.assertTrue(self.read_index()['has_x_data'][0])
+        chunk = open(os.path.join(self.path, chunk_file_name(0)), 'rb').read()
+        np.testing.assert_array_equal(np.full(10, -60, dtype=np.float32), np.frombuffer(chunk[:40], '<f4'))
+        np.testing.assert_array_equal(x_data, np.frombuffer(chunk[40:], '<f8'))
+
+    def test_rotate_by_size(self):
+        writer = TraceStoreWriter(self.path, max_chunk_bytes=2000)
+        for _ in range(5):
+            writer.append(create_trace_data())
+        writer.close()
+
+        self.assertEqual([0, 0, 1, 1, 2], list(self.read_index()['chunk']))
+        self.assertEqual(200, len(self.read_chunk(1)))
+
+    def test_rotate_by_time(self):
+        clock = FakeClock()
+        writer = TraceStoreWriter(self.path, max_chunk_seconds=60, clock=clock)
+        writer.append(create_trace_data())
+        clock.time = 59
+        writer.append(create_trace_data())
+        clock.time = 60
+        writer.append(create_trace_data())
+        writer.close()
+
+        self.assertEqual([0, 0, 1], list(self.read_index()['chunk']))
+
+    def test_reopen_appends(self):
+        writer = TraceStoreWriter(self.path)
+        writer.append(create_trace_data())
+        writer.close()
+        writer = TraceStoreWriter(self.path)
+        writer.append(create_trace_data())
+        writer.close()
+
+        self.assertEqual([0, 1], list(self.read_index()['chunk']))
+        self.assertEqual(2, writer.count)
+
+    def test_read_while_recording(self):
+        writer = TraceStoreWriter(self.path)
+        reader = TraceStoreReader(self.path)
+        for i in range(200):
+            writer.append(create_trace_data(length=10, value=i))
+            reader.refresh()
+            # Every indexed trace is readable, however the buffers of the index and chunk files were flushed
+            for position in range(len(reader)):
+                self.assertEqual(position, reader[position].data[0])
+        self.assertGreater(len(reader), 100)
+        writer.close()
+        reader.refresh()
+        self.assertEqual(200, len(reader))
+
+    def test_long_non_ascii_names(self):
+        writer = TraceStoreWriter(self.path)
+        trace_data = create_trace_data()
+        trace_data.instrument = 'a' + '\u00e9' * 40
+        writer.append(trace_data)
+        writer.close()
+
+        # Cut at 64 bytes without splitting a character
+        self.assertEqual('a' + '\u00e9' * 31, TraceStoreReader(self.path)[0].instrument)
+
+    def test_reopen_with_other_dtype(self):
+        TraceStoreWriter(self.path).close()
+        with self.assertRaises(ValueError):
+            TraceStoreWriter(self.path, dtype=np.float32)
+
+
+class RecorderTests(unittest.TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_record(self):
+        recorder = Recorder(self.path)
+        for i in range(20):
+            self.assertTrue(recorder.record(create_trace_data(value=i)))
+        recorder.stop()
+
+        self.assertEqual(20, recorder.recorded_traces)
+        self.assertEqual(0, recorder.dropped_traces)
+        index = np.fromfile(os.path.join(self.path, INDEX_FILE), dtype=INDEX_DTYPE)
+        self.assertEqual(20, len(index))
+
+    def test_drops_when_queue_full(self):
+        recorder = Recorder(self.path, queue_size=1)
+        # Hold the writer thread until all traces are queued
+        write_allowed = threading.Event()
+        append = recorder.writer.append
+        recorder.writer.append = lambda *args: write_allowed.wait() and append(*args)
+
+        results = [recorder.record(create_trace_data()) for _ in range(10)]
+        write_allowed.set()
+        recorder.stop()
+
+        self.assertLessEqual(results.count(True), 2)
+        self.assertEqual(results.count(False), recorder.dropped_traces)
+        self.assertEqual(10, recorder.recorded_traces + recorder.dropped_traces)
+
+    def test_write_errors_do_not_stop_recording(self):
+        recorder = Recorder(self.path)
+        append = recorder.writer.append
+
+        def append_or_fail(trace_data, *args):
+            if not trace_data.data[0]:
+                raise ValueError("Invalid trace")
+            append(trace_data, *args)
+
+        recorder.writer.append = append_or_fail
+        for i in range(10):
+            self.assertTrue(recorder.record(create_trace_data(value=i % 2)))
+        recorder.stop()
+
+        self.assertIsInstance(recorder.error, ValueError)
+        self.assertEqual(5, recorder.failed_traces)
+        self.assertEqual(5, recorder.recorded_traces)
+
+    def test_stop_after_writer_thread_died(self):
+        recorder = Recorder(self.path, queue_size=1)
+        recorder.queue.put(Recorder.__stop__)
+        recorder.thread.join()
+        recorder.record(create_trace_data())
+        # Must not wait for room in the full queue
+        recorder.stop()
+        self.assertFalse(recorder.thread.is_alive())
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+import io
+import json
+import unittest
+
+import numpy as np
+
+import helpers
+from osa.analysis.channel_analysis import CHANNEL_DTYPE
+from osa.recording.trace_stream import BinaryTraceWriter, NdjsonTraceWriter, orjson, read_binary_traces
+from osa.services.server_requests import TraceData
+
+
+def create_trace_data(**kwargs) -> TraceData:
+    return helpers.create_trace_data((-60.0, np.nan, -40.0), **kwargs)
+
+
+class NdjsonTraceWriterTests(unittest.TestCase):
+    def write_lines(self, use_fast_backend: bool, trace_data: TraceData, channels=None) -> list:
+        stream = io.BytesIO()
+        writer = NdjsonTraceWriter(stream, use_fast_backend=use_fast_backend)
+        writer.write(trace_data, 1622297443.5, channels)
+        writer.write(trace_data, 1622297444.5, channels)
+        return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+    def test_write(self):
+        for use_fast_backend in (False, True):
+            if use_fast_backend and orjson is None:
+                continue
+            lines = self.write_lines(use_fast_backend, create_trace_data(dtype=np.float32))
+            self.assertEqual(2, len(lines))
+            self.assertEqual(1622297443.5, lines[0]['recorded_at'])
+            self.assertEqual('ExfoFTB500', lines[0]['instrument'])
+            self.assertEqual(1515, lines[0]['x_start'])
+            self.assertIsNone(lines[0]['total_power_dbm'])
+            self.assertEqual([-60, None, -40], lines[0]['y'])
+            self.assertNotIn('x', lines[0])
+            self.assertNotIn('channels', lines[0])
+
+    def test_x_data_and_channels(self):
+        channels = np.zeros(2, dtype=CHANNEL_DTYPE)
+        channels['wavelength_nm'] = [1530, 1531]
+        channels['osnr_db'] = [35, np.nan]
+        for use_fast_backend in (False, True):
+            if use_fast_backend and orjson is None:
+                continue
+            line = self.write_lines(use_fast_backend, create_trace_data(x_data=[1515, 1516, 1517]), channels)[0]
+            self.assertEqual([1515, 1516, 1517], line['x'])
+            self.assertEqual([1530, 1531], [channel['wavelength_nm'] for channel in line['channels']])
+            self.assertEqual([35, None], [channel['osnr_db'] for channel in line['channels']])
+
+
+class BinaryTraceWriterTests(unittest.TestCase):
+    def test_round_trip(self):
+        stream = io.BytesIO()
+        writer = BinaryTraceWriter(stream, dtype=np.float32)
+        writer.write(create_trace_data(), 1622297443.5)
+        writer.write(create_trace_data(x_data=[1515, 1516, 1517]), 1622297444.5)
+        stream.seek(0)
+
+        traces = list(read_binary_traces(stream))
+        self.assertEqual(2, len(traces))
+        (first, first_recorded_at), (second, _) = traces
+        self.assertEqual(1622297443.5, first_recorded_at)
+        self.assertEqual(np.float32, first.data.dtype)
+        np.testing.assert_array_equal([-60, np.nan, -40], first.data)
+        self.assertEqual(1515, first.x_start)
+        self.assertEqual(0.031, first.resolution_bandwidth_nm)
+        self.assertEqual('2021-05-29T14:10:43Z', first.time)
+        np.testing.assert_array_equal([1515, 1516, 1517], second.x_data)
+        self.assertEqual(stream.tell(), writer.position)
+
+    def test_cut_off_trace(self):
+        stream = io.BytesIO()
+        writer = BinaryTraceWriter(stream)
+        writer.write(create_trace_data(), 1622297443.5)
+        writer.write(create_trace_data(), 1622297444.5)
+        traces = list(read_binary_traces(io.BytesIO(stream.getvalue()[:-1])))
+        self.assertEqual(1, len(traces))
+
+    def test_not_a_stream(self):
+        with self.assertRaises(ValueError):
+            list(read_binary_traces(io.BytesIO(b'TRACE\n')))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+import threading
+import time
+import unittest
+
+from osa.exceptions.invalid_response import InvalidResponse
+from osa.services.acquisition_scheduler import AcquisitionScheduler
+from osa.services.limits_cache import LimitsCache
+from osa.services.rate_controller import RateController
+from osa.services.request_error_manager import CircuitBreaker
+
+
+class FakeInstrument:
+    """ Instrument taking delay seconds to acquire, failing while fail is set """
+
+    def __init__(self, name: str, rate: float, delay: float = 0, fail: bool = False):
+        self.name = name
+        self.delay = delay
+        self.fail = fail
+        self.rate_controller = RateController(rate)
+        self.x_lims_cache = LimitsCache(lambda: [1525, 1565])
+        self.circuit_breaker = CircuitBreaker()
+        self.acquisitions = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def acquire(self) -> tuple:
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(self.delay)
+        self.in_flight -= 1
+        self.acquisitions += 1
+        if self.fail:
+            raise InvalidResponse(f"{self.name} failed.")
+        return f"trace {self.acquisitions}", [1525, 1565]
+
+
+class AcquisitionSchedulerTests(unittest.TestCase):
+    def run_scheduler(self, instruments: list, seconds: float, **kwargs) -> dict:
+        """ :return: Dict of instrument name to list of traces or error messages received """
+        results = {instrument.name: [] for instrument in instruments}
+        scheduler = AcquisitionScheduler(instruments, on_trace=lambda i, trace, x_lims: results[i.name].append(trace),
+                                         on_failure=lambda i, message: results[i.name].append(message), **kwargs)
+        scheduler.start()
+        time.sleep(seconds)
+        scheduler.stop()
+        return results
+
+    def test_rates_are_per_instrument(self):
+        fast = FakeInstrument('fast', rate=20)
+        slow = FakeInstrument('slow', rate=5)
+        results = self.run_scheduler([fast, slow], 0.5)
+        self.assertAlmostEqual(10, len(results['fast']), delta=2)
+        self.assertAlmostEqual(3, len(results['slow']), delta=1)
+        # Results of an instrument arrive in order
+        self.assertEqual([f"trace {i}" for i in range(1, len(results['fast']) + 1)], results['fast'])
+
+    def test_slow_instrument_does_not_stall_others(self):
+        stalled = FakeInstrument('stalled', rate=20, delay=0.4)
+        others = [FakeInstrument(f'osa{i}', rate=20) for i in range(4)]
+        results = self.run_scheduler([stalled] + others, 0.5, workers=2)
+        for instrument in others:
+            self.assertGreaterEqual(len(results[instrument.name]), 7)
+        # Frames falling due while the stalled instrument's frame was in flight were skipped
+        self.assertLessEqual(stalled.acquisitions, 2)
+        self.assertGreater(stalled.rate_controller.skipped_frames, 0)
+
+    def test_failures_are_isolated(self):
+        failing = FakeInstrument('failing', rate=20, fail=True)
+        working = FakeInstrument('working', rate=20)
+        results = self.run_scheduler([failing, working], 0.3)
+        self.assertEqual("failing failed.", results['failing'][0])
+        self.assertEqual(len(results['failing']), failing.rate_controller.failed_frames)
+        self.assertEqual(0, working.rate_controller.failed_frames)
+        self.assertGreaterEqual(len(results['working']), 4)
+
+    def test_stop(self):
+        instrument = FakeInstrument('osa', rate=0)
+        scheduler = AcquisitionScheduler([instrument])
+        scheduler.start()
+        time.sleep(0.05)
+        scheduler.stop()
+        acquisitions = instrument.acquisitions
+        self.assertGreater(acquisitions, 0)
+        time.sleep(0.05)
+        self.assertEqual(acquisitions, instrument.acquisitions)
+        self.assertFalse(any(thread.name.startswith('osa-instrument') for thread in threading.enumerate()))
+
+    def test_restart_while_frames_in_flight(self):
+        slow = FakeInstrument('slow', rate=20, delay=0.2)
+        others = [FakeInstrument(f'osa{i}', rate=20, delay=0.2) for i in range(3)]
+        # One worker, so frames of the others are queued and cancelled by stop
+        scheduler = AcquisitionScheduler([slow] + others, workers=1)
+        scheduler.start()
+        time.sleep(0.05)
+        scheduler.stop(wait=False)
+        scheduler.start()
+        time.sleep(0.5)
+        scheduler.stop()
+        self.assertEqual(1, slow.max_in_flight)
+        # Frames cancelled before they started do not keep their instruments from acquiring
+        self.assertTrue(all(instrument.acquisitions for instrument in others))
+        self.assertEqual([], scheduler.stopped_executors)
+
+
+if __name__ == "__main__":
+    unittest.main()
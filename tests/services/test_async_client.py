@@ -0,0 +1,104 @@
+import asyncio
+import os
+import time
+import unittest
+from unittest.mock import Mock
+
+from osa.exceptions.invalid_response import InvalidResponse
+from osa.exceptions.response_timeout import ResponseTimeout
+from osa.services.async_client import AsyncOsaClient, EventLoopThread
+from osa.services.limits_cache import LimitsCache
+from osa.services.osa_session import OsaSession
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
+
+
+def create_session(delays: dict[str, float], lim_text: str = "+READY>[1515, 1580]") -> Mock:
+    with open(os.path.join(DATA_DIR, 'small_trace_response.json'), 'rb') as f:
+        trace_body = f.read()
+
+    def get(command):
+        time.sleep(delays.get(command, 0))
+        response = Mock()
+        response.content = trace_body
+        response.text = lim_text
+        return response
+
+    session = Mock(spec=OsaSession)
+    session.pool_size = 4
+    session.get.side_effect = get
+    return session
+
+
+class AsyncOsaClientTests(unittest.TestCase):
+    def setUp(self):
+        self.loop_thread = EventLoopThread()
+
+    def tearDown(self):
+        self.loop_thread.stop()
+
+    def test_concurrent_requests(self):
+        client = AsyncOsaClient(create_session({'TRACE': 0.2, 'LIM': 0.2}))
+
+        start = time.monotonic()
+        trace_data, x_lims = self.loop_thread.run(client.acquire())
+        elapsed = time.monotonic() - start
+
+        self.assertGreater(len(trace_data), 0)
+        self.assertEqual([1515, 1580], x_lims)
+        self.assertLess(elapsed, 0.35)
+
+    def test_deadline(self):
+        client = AsyncOsaClient(create_session({'TRACE': 0.5}))
+        with self.assertRaises(ResponseTimeout):
+            self.loop_thread.run(client.acquire(deadline=0.1))
+
+    def test_failed_request(self):
+        client = AsyncOsaClient(create_session({}, lim_text="+READY>oops"))
+        with self.assertRaises(InvalidResponse):
+            self.loop_thread.run(client.acquire())
+
+    def test_cancel(self):
+        client = AsyncOsaClient(create_session({'TRACE': 0.5}))
+        future = self.loop_thread.submit(client.acquire())
+        time.sleep(0.05)
+        future.cancel()
+        self.assertTrue(future.cancelled())
+
+    def test_stop_cancels_pending_coroutines(self):
+        loop_thread = EventLoopThread()
+        finished = []
+
+        async def wait():
+            try:
+                await asyncio.sleep(10)
+            finally:
+                finished.append(asyncio.get_running_loop().is_closed())
+
+        future = loop_thread.submit(wait())
+        time.sleep(0.05)
+        loop_thread.stop()
+        self.assertTrue(future.cancelled())
+        # Cleaned up while the loop was still open
+        self.assertEqual([False], finished)
+
+    def test_cached_x_lims(self):
+        session = create_session({})
+        client = AsyncOsaClient(session)
+        cache = LimitsCache(lambda: [1500, 1600])
+
+        for _ in range(3):
+            trace_data, x_lims = self.loop_thread.run(client.acquire(cache))
+            self.assertEqual([1500, 1600], x_lims)
+
+        commands = [call.args[0] for call in session.get.call_args_list]
+        self.assertEqual(['TRACE'] * 3, commands)
+
+    def test_without_loop_thread(self):
+        client = AsyncOsaClient(create_session({}))
+        trace_data = asyncio.run(client.get_trace())
+        self.assertGreater(len(trace_data), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,110 @@
+import random
+import string
+import unittest
+
+from osa.exceptions.console_error import ConsoleError
+from osa.exceptions.invalid_response import InvalidResponse
+from osa.services.console_parser import *
+
+
+class ParseReplyTests(unittest.TestCase):
+    def test_lim(self):
+        self.assertEqual([1515, 1580], parse_reply("+READY>[1515, 1580]", 'LIM'))
+        self.assertEqual([1515.5, 1.58e3], parse_reply("+READY>[1515.5,1.58E+3]\r\n", 'LIM'))
+
+    def test_without_prefix(self):
+        self.assertEqual([1515, 1580], parse_reply("[1515, 1580]", 'LIM'))
+
+    def test_error_reply(self):
+        with self.assertRaises(ConsoleError) as context:
+            parse_reply("-ERROR>Unknown command", 'LIM')
+        self.assertIn("Unknown command", str(context.exception))
+
+    def test_wrong_length(self):
+        with self.assertRaises(InvalidResponse):
+            parse_reply("+READY>[1515, 1580, 1600]", 'LIM')
+
+    def test_code_is_not_executed(self):
+        for reply in ("+READY>__import__('os').getcwd()", "+READY>[1515, 1580][0]",
+                      "+READY>[1515, 1580 + 1]", "+READY>[nan, inf]", "+READY>[1_515, 1580]"):
+            with self.assertRaises(InvalidResponse, msg=reply):
+                parse_reply(reply, 'LIM')
+
+    def test_not_text(self):
+        with self.assertRaises(InvalidResponse):
+            parse_reply(None, 'LIM')
+
+    def test_registered_command(self):
+        register_command(ConsoleCommand('POINTS', parse_integer))
+        try:
+            self.assertEqual(10001, parse_reply("+READY>10001", 'POINTS'))
+            with self.assertRaises(InvalidResponse):
+                parse_reply("+READY>10001.5", 'POINTS')
+        finally:
+            del COMMANDS['POINTS']
+
+
+class ParseValueTests(unittest.TestCase):
+    def test_parse_number(self):
+        self.assertEqual(-3, parse_number(' -3 '))
+        self.assertIsInstance(parse_number('3'), int)
+        self.assertEqual(0.031, parse_number('0.031'))
+        self.assertEqual(2e-12, parse_number('2e-12'))
+        self.assertEqual(0.5, parse_number('.5'))
+        for invalid in ('', '-', '1.2.3', '0x10', 'abc', '1e', 'NaN', '1 2'):
+            with self.assertRaises(ValueError, msg=invalid):
+                parse_number(invalid)
+
+    def test_parse_number_list(self):
+        self.assertEqual([1, 2.5], parse_number_list('1, 2.5'))
+        self.assertEqual([], parse_number_list('[]'))
+        for invalid in ('[1, 2', '[1,,2]', '[1, 2,]', '[[1, 2]]'):
+            with self.assertRaises(ValueError, msg=invalid):
+                parse_number_list(invalid)
+
+
+class ParseReplyFuzzTests(unittest.TestCase):
+    """ Malformed replies must raise InvalidResponse or ConsoleError, never another exception """
+
+    def setUp(self):
+        self.random = random.Random(1234)
+
+    def assert_parses_or_rejects(self, reply: str):
+        try:
+            value = parse_reply(reply, 'LIM')
+        except (InvalidResponse, ConsoleError):
+            return
+        except Exception as e:
+            self.fail(f"{e.__class__.__name__} raised for reply {reply!r}")
+        self.assertEqual(2, len(value), reply)
+        for number in value:
+            self.assertIsInstance(number, (int, float), reply)
+
+    def test_random_text(self):
+        alphabet = string.printable + '[]+-.,>eE'
+        for _ in range(2000):
+            length = self.random.randint(0, 30)
+            reply = ''.join(self.random.choice(alphabet) for _ in range(length))
+            self.assert_parses_or_rejects(reply)
+            self.assert_parses_or_rejects(READY_PREFIX + reply)
+
+    def test_mutated_replies(self):
+        valid = "+READY>[1515.25, 1580e0]"
+        for _ in range(2000):
+            reply = list(valid)
+            for _ in range(self.random.randint(1, 4)):
+                position = self.random.randrange(len(reply) + 1)
+                operation = self.random.choice(('insert', 'delete', 'replace'))
+                character = self.random.choice(string.printable)
+                if operation == 'insert':
+                    reply.insert(position, character)
+                elif reply and position < len(reply):
+                    if operation == 'delete':
+                        del reply[position]
+                    else:
+                        reply[position] = character
+            self.assert_parses_or_rejects(''.join(reply))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from osa.exceptions.response_timeout import ResponseTimeout
+from osa.services.instruments import Instrument, InstrumentRegistry
+from osa.simulator.server import OsaSimulator
+from osa.simulator.spectrum import SpectrumGenerator
+
+
+class InstrumentTests(unittest.TestCase):
+    def start_simulator(self, **kwargs) -> OsaSimulator:
+        simulator = OsaSimulator(SpectrumGenerator(points=500, channels=2, seed=0), port=0,
+                                 timeout_seconds=1, seed=0, **kwargs).start()
+        self.addCleanup(simulator.stop)
+        return simulator
+
+    def create_instrument(self, entry: dict) -> Instrument:
+        instrument = Instrument.from_config(entry)
+        self.addCleanup(instrument.close)
+        return instrument
+
+    def test_from_config(self):
+        instrument = self.create_instrument({'name': 'osa1', 'url': 'http://osa1/cmd/',
+                                             'timeouts': {'TRACE': 5}, 'rate': 2})
+        self.assertEqual('osa1', instrument.name)
+        self.assertEqual('http://osa1/cmd/', instrument.session.api_url)
+        self.assertEqual(5, instrument.session.timeout_for('TRACE'))
+        self.assertEqual(2, instrument.session.timeout_for('LIM'))
+        self.assertEqual(0.5, instrument.rate_controller.interval)
+
+        for entry in ({'name': 'osa1'}, {'url': 'http://osa1/cmd/'},
+                      {'name': 'osa1', 'url': 'http://osa1/cmd/', 'timeout': 5}):
+            with self.assertRaises(ValueError):
+                Instrument.from_config(entry)
+
+    def test_acquire(self):
+        simulator = self.start_simulator()
+        instrument = self.create_instrument({'name': 'osa1', 'url': simulator.url})
+        trace_data, x_lims = instrument.acquire()
+        self.assertEqual(500, len(trace_data))
+        self.assertEqual([1525, 1565], x_lims)
+        self.assertEqual(1525, trace_data.x_start)
+
+        # Limits are cached per instrument
+        instrument.acquire()
+        self.assertEqual(1, simulator.requests['LIM'])
+
+    def test_timeouts_are_per_instrument(self):
+        simulator = self.start_simulator(fault_rates={'timeout': 1})
+        slow = self.create_instrument({'name': 'slow', 'url': simulator.url, 'timeouts': {'TRACE': 0.1}})
+        with self.assertRaises(ResponseTimeout):
+            slow.acquire()
+        self.assertEqual(1, slow.circuit_breaker.failures)
+
+
+class InstrumentRegistryTests(unittest.TestCase):
+    def test_from_config(self):
+        registry = InstrumentRegistry.from_config([{'name': 'osa1', 'url': 'http://osa1/cmd/'},
+                                                   {'name': 'osa2', 'url': 'http://osa2/cmd/', 'rate': 0}])
+        self.addCleanup(registry.close)
+        self.assertEqual(['osa1', 'osa2'], [instrument.name for instrument in registry])
+        self.assertEqual(2, len(registry))
+        self.assertEqual(0, registry['osa2'].rate_controller.target_rate)
+
+    def test_names_are_unique(self):
+        with self.assertRaises(ValueError):
+            InstrumentRegistry.from_config([{'name': 'osa1', 'url': 'http://osa1/cmd/'},
+                                            {'name': 'osa1', 'url': 'http://osa2/cmd/'}])
+
+    def test_load(self):
+        path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, path)
+        file_path = os.path.join(path, 'instruments.json')
+        with open(file_path, 'w') as f:
+            json.dump([{'name': f'osa{i}', 'url': f'http://10.0.0.{i}/cmd/'} for i in range(3)], f)
+        registry = InstrumentRegistry.load(file_path)
+        self.addCleanup(registry.close)
+        self.assertEqual('http://10.0.0.2/cmd/', registry['osa2'].url)
+
+        with open(file_path, 'w') as f:
+            json.dump({'name': 'osa1', 'url': 'http://osa1/cmd/'}, f)
+        with self.assertRaises(ValueError):
+            InstrumentRegistry.load(file_path)
+
+
+if __name__ == "__main__":
+    unittest.main()
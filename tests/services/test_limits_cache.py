@@ -0,0 +1,50 @@
+import unittest
+from unittest.mock import Mock
+
+from helpers import FakeClock, create_trace_data
+from osa.exceptions.response_timeout import ResponseTimeout
+from osa.services.limits_cache import LimitsCache
+
+
+class LimitsCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.fetch_x_lims = Mock(side_effect=[[1515, 1580], [1520, 1570], [1500, 1600]])
+        self.clock = FakeClock()
+        self.cache = LimitsCache(self.fetch_x_lims, ttl=10, clock=self.clock)
+
+    def test_cached(self):
+        self.assertEqual([1515, 1580], self.cache.get(create_trace_data()))
+        self.clock.time = 9
+        self.assertEqual([1515, 1580], self.cache.get(create_trace_data()))
+        self.assertEqual([1515, 1580], self.cache.get())
+        self.assertEqual(1, self.fetch_x_lims.call_count)
+
+    def test_expired(self):
+        self.cache.get(create_trace_data())
+        self.clock.time = 10
+        self.assertEqual([1520, 1570], self.cache.get(create_trace_data()))
+        self.assertEqual(2, self.fetch_x_lims.call_count)
+
+    def test_invalidate(self):
+        self.cache.get()
+        self.cache.invalidate()
+        self.assertEqual([1520, 1570], self.cache.get())
+
+    def test_point_count_changed(self):
+        self.cache.get(create_trace_data(length=10))
+        self.assertEqual([1520, 1570], self.cache.get(create_trace_data(length=20)))
+        self.assertEqual([1520, 1570], self.cache.get(create_trace_data(length=20)))
+
+    def test_x_increment_changed(self):
+        self.cache.get(create_trace_data(x_increment=0.002))
+        self.assertEqual([1520, 1570], self.cache.get(create_trace_data(x_increment=0.004)))
+
+    def test_failed_request_not_cached(self):
+        self.fetch_x_lims.side_effect = [ResponseTimeout('timeout'), [1515, 1580]]
+        with self.assertRaises(ResponseTimeout):
+            self.cache.get(create_trace_data())
+        self.assertEqual([1515, 1580], self.cache.get(create_trace_data()))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+import unittest
+from unittest.mock import Mock, patch
+
+import requests
+
+from osa.services.osa_session import OsaSession, get_session, set_session
+
+
+class OsaSessionTests(unittest.TestCase):
+    def setUp(self):
+        self.session = OsaSession(api_url='http://osa/cmd/',
+                                  timeouts={'TRACE': 0.5},
+                                  default_timeout=3)
+
+    @patch('requests.Session.get')
+    def test_command_url_and_timeout(self, mock_get):
+        self.session.get('TRACE')
+        mock_get.assert_called_once_with('http://osa/cmd/TRACE', timeout=0.5)
+
+    @patch('requests.Session.get')
+    def test_configured_default_timeouts(self, mock_get):
+        self.session.get('LIM')
+        mock_get.assert_called_once_with('http://osa/cmd/LIM', timeout=2)
+
+    @patch('requests.Session.get')
+    def test_unknown_command_uses_default_timeout(self, mock_get):
+        self.session.get('SPAN')
+        mock_get.assert_called_once_with('http://osa/cmd/SPAN', timeout=3)
+
+    def test_reuses_connection_pool(self):
+        first = self.session.session
+        with patch('requests.Session.get'):
+            self.session.get('TRACE')
+            self.session.get('LIM')
+        self.assertIs(first, self.session.session)
+
+    @patch('requests.Session.get')
+    def test_reconnect_after_connection_error(self, mock_get):
+        response = Mock()
+        mock_get.side_effect = [requests.exceptions.ConnectionError, response]
+        first = self.session.session
+
+        self.assertIs(response, self.session.get('TRACE'))
+        self.assertIsNot(first, self.session.session)
+        self.assertEqual(2, mock_get.call_count)
+
+    @patch('requests.Session.get')
+    def test_connection_error_after_reconnect_attempts(self, mock_get):
+        mock_get.side_effect = requests.exceptions.ConnectionError
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            self.session.get('TRACE')
+        self.assertEqual(2, mock_get.call_count)
+
+    @patch('requests.Session.get')
+    def test_timeout_does_not_reconnect(self, mock_get):
+        mock_get.side_effect = requests.exceptions.ConnectTimeout
+        first = self.session.session
+        with self.assertRaises(requests.exceptions.Timeout):
+            self.session.get('TRACE')
+        self.assertIs(first, self.session.session)
+        self.assertEqual(1, mock_get.call_count)
+
+
+class SharedSessionTests(unittest.TestCase):
+    def tearDown(self):
+        set_session(None)
+
+    def test_shared_session_is_reused(self):
+        self.assertIs(get_session(), get_session())
+
+    def test_set_session(self):
+        session = Mock(spec=OsaSession)
+        set_session(session)
+        self.assertIs(session, get_session())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+import unittest
+
+from helpers import FakeClock
+from osa.services.rate_controller import RateController
+
+
+class RateControllerTests(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.controller = RateController(target_rate=2, clock=self.clock)
+
+    def run_frame(self, duration: float, success: bool = True) -> float:
+        self.controller.frame_started()
+        self.clock.time += duration
+        delay = self.controller.frame_finished(success)
+        self.clock.time += delay
+        return delay
+
+    def test_delay_shortened_by_frame_time(self):
+        self.assertAlmostEqual(0.4, self.run_frame(0.1))
+
+    def test_slow_frames_do_not_overlap(self):
+        self.assertEqual(0, self.run_frame(0.7))
+        self.assertEqual(1, self.controller.skipped_frames)
+        self.run_frame(1.2)
+        self.assertEqual(3, self.controller.skipped_frames)
+
+    def test_achieved_rate(self):
+        for _ in range(5):
+            self.run_frame(0.1)
+        self.assertAlmostEqual(2, self.controller.achieved_rate)
+
+    def test_achieved_rate_limited_by_frame_time(self):
+        for _ in range(5):
+            self.run_frame(1)
+        self.assertAlmostEqual(1, self.controller.achieved_rate)
+
+    def test_as_fast_as_possible(self):
+        self.controller.set_target_rate(0)
+        for _ in range(5):
+            self.assertEqual(0, self.run_frame(0.05))
+        self.assertAlmostEqual(20, self.controller.achieved_rate)
+        self.assertEqual(0, self.controller.skipped_frames)
+
+    def test_failed_frames(self):
+        self.run_frame(0.1)
+        self.run_frame(0.1, success=False)
+        self.assertEqual(1, self.controller.failed_frames)
+        self.assertEqual(2, self.controller.frames)
+
+    def test_reset(self):
+        self.run_frame(0.7)
+        self.run_frame(0.1)
+        self.controller.reset()
+        self.assertEqual(0, self.controller.skipped_frames)
+        self.assertEqual(0, self.controller.achieved_rate)
+
+
+if __name__ == "__main__":
+    unittest.main()
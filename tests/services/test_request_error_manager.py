@@ -1,6 +1,8 @@
 import unittest
+from concurrent.futures import CancelledError
 from unittest.mock import Mock
 
+from helpers import FakeClock
 from osa.exceptions.response_timeout import ResponseTimeout
 from osa.services.request_error_manager import *
 
@@ -40,5 +42,113 @@ class RequestUntilSuccessTests(unittest.TestCase):
         self.fail("No error thrown for function that continuously fails.")
 
 
+class RetryPolicyTests(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+
+    def create_policy(self, **kwargs) -> RetryPolicy:
+        return RetryPolicy(clock=self.clock, sleep=self.clock.sleep, **kwargs)
+
+    def test_exponential_backoff(self):
+        policy = self.create_policy(base_delay=0.1, max_delay=0.5, multiplier=2, jitter=0)
+        self.assertEqual([0.1, 0.2, 0.4, 0.5, 0.5], [policy.delay(n) for n in range(1, 6)])
+
+    def test_jitter(self):
+        policy = self.create_policy(base_delay=1, jitter=0.5, random=Mock(side_effect=[0, 0.5, 0.999]))
+        self.assertEqual(1, policy.delay(1))
+        self.assertEqual(0.75, policy.delay(1))
+        self.assertAlmostEqual(0.5, policy.delay(1), places=2)
+
+    def test_delays_between_attempts(self):
+        policy = self.create_policy(base_delay=0.1, max_delay=1, jitter=0)
+        fn = Mock(side_effect=ResponseTimeout('timeout'))
+
+        with self.assertRaises(InvalidResponse):
+            request_until_success(fn, policy=policy)
+
+        self.assertEqual(5, fn.call_count)
+        self.assertEqual([0.1, 0.2, 0.4, 0.8], self.clock.sleeps)
+
+    def test_deadline(self):
+        policy = self.create_policy(base_delay=1, max_delay=1, jitter=0, deadline=2.5)
+        fn = Mock(side_effect=ResponseTimeout('timeout'))
+
+        with self.assertRaises(InvalidResponse):
+            request_until_success(fn, policy=policy)
+
+        self.assertEqual(3, fn.call_count)
+        self.assertLessEqual(self.clock.time, 2.5)
+
+    def test_not_retryable(self):
+        policy = self.create_policy(retryable=(ResponseTimeout,))
+        fn = Mock(side_effect=InvalidResponse('invalid'))
+
+        with self.assertRaises(InvalidResponse):
+            request_until_success(fn, policy=policy)
+        self.assertEqual(1, fn.call_count)
+
+
+class CircuitBreakerTests(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.breaker = CircuitBreaker(failure_threshold=3, reset_timeout=10, clock=self.clock)
+        self.failing = Mock(side_effect=ResponseTimeout('timeout'))
+
+    def call_failing(self, times: int):
+        for _ in range(times):
+            with self.assertRaises(ResponseTimeout):
+                self.breaker.call(self.failing)
+
+    def test_opens_after_failures(self):
+        self.call_failing(3)
+        self.assertEqual(CircuitBreaker.OPEN, self.breaker.state)
+        with self.assertRaises(CircuitOpen):
+            self.breaker.call(self.failing)
+        self.assertEqual(3, self.failing.call_count)
+
+    def test_success_resets_failures(self):
+        self.call_failing(2)
+        self.breaker.call(Mock(return_value='value'))
+        self.call_failing(2)
+        self.assertEqual(CircuitBreaker.CLOSED, self.breaker.state)
+
+    def test_single_probe_after_reset_timeout(self):
+        self.call_failing(3)
+        self.clock.time = 10
+        self.assertTrue(self.breaker.allow_request())
+        self.assertEqual(CircuitBreaker.HALF_OPEN, self.breaker.state)
+        self.assertFalse(self.breaker.allow_request())
+
+    def test_closes_after_successful_probe(self):
+        self.call_failing(3)
+        self.clock.time = 10
+        self.assertEqual('value', self.breaker.call(Mock(return_value='value')))
+        self.assertEqual(CircuitBreaker.CLOSED, self.breaker.state)
+
+    def test_reopens_after_failed_probe(self):
+        self.call_failing(3)
+        self.clock.time = 10
+        self.call_failing(1)
+        self.assertEqual(CircuitBreaker.OPEN, self.breaker.state)
+        self.clock.time = 15
+        self.assertFalse(self.breaker.allow_request())
+
+    def test_cancelled_probe_releases_probe(self):
+        self.call_failing(3)
+        self.clock.time = 10
+        with self.assertRaises(CancelledError):
+            self.breaker.call(Mock(side_effect=CancelledError()))
+        self.assertEqual(CircuitBreaker.OPEN, self.breaker.state)
+        self.assertEqual(3, self.breaker.failures)
+        self.assertEqual('value', self.breaker.call(Mock(return_value='value')))
+        self.assertEqual(CircuitBreaker.CLOSED, self.breaker.state)
+
+    def test_retries_stop_when_open(self):
+        policy = RetryPolicy(max_attempts=5, clock=self.clock, sleep=self.clock.sleep)
+        with self.assertRaises(CircuitOpen):
+            request_until_success(self.failing, policy=policy, breaker=self.breaker)
+        self.assertEqual(3, self.failing.call_count)
+
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -1,40 +1,47 @@
 import json
-import sys
+import os
 import unittest
+import numpy as np
 import requests
-from unittest.mock import Mock, patch
+from unittest.mock import Mock
 
 from osa.exceptions.invalid_response import InvalidResponse
 from osa.exceptions.response_timeout import ResponseTimeout
 from osa.services import server_requests
+from osa.services.osa_session import OsaSession
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
 
 
 def load_test_json_response() -> json:
-    with open('./data/small_trace_response.json') as f:
+    with open(os.path.join(DATA_DIR, 'small_trace_response.json')) as f:
         return json.load(f)
 
 
+def encode_json_response(response: json) -> bytes:
+    return json.dumps(response).encode()
+
+
 class GetTraceTests(unittest.TestCase):
     def setUp(self):
         self.test_json_response = load_test_json_response()
+        self.session = Mock(spec=OsaSession)
 
-    @patch('requests.get')
-    def test_valid_response(self, mock_get):
-        mock_get.return_value.json.return_value = self.test_json_response
+    def test_valid_response(self):
+        self.session.get.return_value.content = encode_json_response(self.test_json_response)
 
         try:
-            response = server_requests.get_trace()
+            response = server_requests.get_trace(self.session)
         except:
             self.fail("Error thrown for valid request response.")
 
         self.assertGreater(len(response.data), 0)
 
-    @patch('requests.get')
-    def test_response_timeout(self, mock_get):
-        mock_get.side_effect = requests.exceptions.Timeout
+    def test_response_timeout(self):
+        self.session.get.side_effect = requests.exceptions.Timeout
 
         try:
-            response = server_requests.get_trace()
+            response = server_requests.get_trace(self.session)
         except ResponseTimeout as e:
             self.assertIsNotNone(str(e))
             return
@@ -43,12 +50,11 @@ class GetTraceTests(unittest.TestCase):
 
         self.fail("No error thrown for trace request timeout")
 
-    @patch('requests.get')
-    def test_invalid_response(self, mock_get):
-        mock_get.return_value = 'S8ehEak32JE3'
+    def test_invalid_response(self):
+        self.session.get.return_value = 'S8ehEak32JE3'
 
         try:
-            response = server_requests.get_trace()
+            response = server_requests.get_trace(self.session)
         except InvalidResponse as e:
             self.assertIsNotNone(str(e))
             return
@@ -57,25 +63,93 @@ class GetTraceTests(unittest.TestCase):
 
         self.fail("No error thrown for invalid trace response")
 
+    def test_trace_data_is_array(self):
+        self.session.get.return_value.content = encode_json_response(self.test_json_response)
+
+        response = server_requests.get_trace(self.session, dtype=np.float32)
+
+        self.assertIsInstance(response.data, np.ndarray)
+        self.assertEqual(np.float32, response.data.dtype)
+        self.assertEqual(len(self.test_json_response['ydata']), len(response))
+
+    def test_missing_data(self):
+        del self.test_json_response['ydata']
+        self.session.get.return_value.content = encode_json_response(self.test_json_response)
+
+        with self.assertRaises(InvalidResponse):
+            server_requests.get_trace(self.session)
+
+
+class TraceDataTests(unittest.TestCase):
+    def create_trace_data(self, data, **kwargs) -> server_requests.TraceData:
+        return server_requests.TraceData(data=data, time='2021-05-29T14:10:43Z',
+                                         instrument='ExfoFTB500', x_label='Wavelength',
+                                         y_label='dBm', x_units='nm', x_increment=0.5,
+                                         **kwargs)
+
+    def test_array_data_is_not_copied(self):
+        data = np.array([-60.0, -20.0, -58.0])
+        trace_data = self.create_trace_data(data)
+        self.assertIs(data, trace_data.data)
+
+    def test_x_from_start_and_increment(self):
+        trace_data = self.create_trace_data([-60.0, -20.0, -58.0], x_start=1550)
+        np.testing.assert_array_equal([1550, 1550.5, 1551], trace_data.x)
+        self.assertIs(trace_data.x, trace_data.x)
+
+    def test_x_recomputed_when_start_changes(self):
+        trace_data = self.create_trace_data([-60.0, -20.0, -58.0], x_start=1550)
+        trace_data.x
+        trace_data.x_start = 1500
+        np.testing.assert_array_equal([1500, 1500.5, 1501], trace_data.x)
+
+    def test_x_length_matches_data(self):
+        trace_data = self.create_trace_data(np.zeros(1388), x_start=1515)
+        trace_data.x_increment = 0.0020000727299174477
+        self.assertEqual(len(trace_data.data), len(trace_data.x))
+
+    def test_x_from_server(self):
+        x_data = np.array([1550.0, 1550.2, 1551.0])
+        trace_data = self.create_trace_data([-60.0, -20.0, -58.0], x_data=x_data)
+        self.assertIs(x_data, trace_data.x)
+        self.assertEqual(1550.0, trace_data.x_start)
+
+    def test_sweep(self):
+        trace_data = self.create_trace_data([-60.0, -20.0, -58.0], x_start=1550)
+        self.assertEqual(trace_data.sweep, self.create_trace_data([0.0, 0.0, 0.0], x_start=1550).sweep)
+        self.assertNotEqual(trace_data.sweep, self.create_trace_data([0.0, 0.0, 0.0], x_start=1500).sweep)
+        self.assertNotEqual(trace_data.sweep, self.create_trace_data([0.0, 0.0], x_start=1550).sweep)
+
+    def test_with_data(self):
+        trace_data = self.create_trace_data([-60.0, -20.0, -58.0], x_start=1550, resolution_bandwidth_nm=0.03)
+        x = trace_data.x
+        data = np.array([-1.0, -2.0, -3.0])
+        processed = trace_data.with_data(data)
+        self.assertIs(data, processed.data)
+        self.assertIs(x, processed.x)
+        self.assertEqual(trace_data.sweep, processed.sweep)
+        self.assertEqual(0.03, processed.resolution_bandwidth_nm)
+
 
 class GetLimTests(unittest.TestCase):
-    @patch('requests.get')
-    def test_valid_response(self, mock_get):
-        mock_get.return_value.text = "+READY>[1515, 1580]"
+    def setUp(self):
+        self.session = Mock(spec=OsaSession)
+
+    def test_valid_response(self):
+        self.session.get.return_value.text = "+READY>[1515, 1580]"
 
         try:
-            response = server_requests.get_x_lims()
+            response = server_requests.get_x_lims(self.session)
         except:
             self.fail("Error thrown for valid request response.")
 
         self.assertEqual(response, [1515, 1580])
 
-    @patch('requests.get')
-    def test_response_timeout(self, mock_get):
-        mock_get.side_effect = requests.exceptions.Timeout
+    def test_response_timeout(self):
+        self.session.get.side_effect = requests.exceptions.Timeout
 
         try:
-            response = server_requests.get_x_lims()
+            response = server_requests.get_x_lims(self.session)
         except ResponseTimeout as e:
             self.assertIsNotNone(str(e))
             return
@@ -84,12 +158,11 @@ class GetLimTests(unittest.TestCase):
 
         self.fail("No error thrown for lim request timeout")
 
-    @patch('requests.get')
-    def test_invalid_response(self, mock_get):
-        mock_get.return_value = 'S8ehEak32JE3'
+    def test_invalid_response(self):
+        self.session.get.return_value = 'S8ehEak32JE3'
 
         try:
-            response = server_requests.get_x_lims()
+            response = server_requests.get_x_lims(self.session)
         except InvalidResponse as e:
             self.assertIsNotNone(str(e))
             return
@@ -0,0 +1,99 @@
+import json
+import os
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+from osa.exceptions.invalid_response import InvalidResponse
+from osa.services import trace_decoder
+from osa.services.trace_decoder import decode_trace
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
+
+
+def load_test_response(file_name: str) -> bytes:
+    with open(os.path.join(DATA_DIR, file_name), 'rb') as f:
+        return f.read()
+
+
+class DecodeTraceTests(unittest.TestCase):
+    def assert_decodes_like_json(self, body: bytes, use_fast_backend: bool):
+        expected = json.loads(body)
+        trace = decode_trace(body, use_fast_backend=use_fast_backend)
+
+        self.assertEqual(expected.keys(), trace.keys())
+        for key, value in expected.items():
+            if key in trace_decoder.ARRAY_TRACE_KEYS:
+                self.assertIsInstance(trace[key], np.ndarray)
+                np.testing.assert_array_equal(value, trace[key])
+            else:
+                self.assertEqual(value, trace[key])
+
+    def test_small_trace(self):
+        body = load_test_response('small_trace_response.json')
+        self.assert_decodes_like_json(body, use_fast_backend=True)
+        self.assert_decodes_like_json(body, use_fast_backend=False)
+
+    def test_large_trace_with_xdata(self):
+        body = load_test_response('large_trace_response.json')
+        self.assert_decodes_like_json(body, use_fast_backend=True)
+        self.assert_decodes_like_json(body, use_fast_backend=False)
+
+    def test_without_fast_backend_installed(self):
+        body = load_test_response('small_trace_response.json')
+        with patch.object(trace_decoder, 'orjson', None):
+            self.assert_decodes_like_json(body, use_fast_backend=True)
+
+    def test_dtype(self):
+        body = load_test_response('large_trace_response.json')
+        trace = decode_trace(body, dtype=np.float32)
+        self.assertEqual(np.float32, trace['ydata'].dtype)
+        self.assertEqual(np.float64, trace['xdata'].dtype)
+
+    def test_whitespace_and_key_order(self):
+        body = (b'{ "xdata" : [ 1e-6 ,2e-6 ], "description": "ydata: [oops]",\n'
+                b'  "ydata"\n:\n[-1.5, -2.5E+1], "timestamp": "21.05.29 14:10:43",'
+                b' "instrument_object": "Exfo", "xincrement": 1e-12, "xlabel": "Wavelength"}')
+        for use_fast_backend in (True, False):
+            trace = decode_trace(body, use_fast_backend=use_fast_backend)
+            np.testing.assert_array_equal([-1.5, -25], trace['ydata'])
+            np.testing.assert_array_equal([1e-6, 2e-6], trace['xdata'])
+            self.assertEqual("ydata: [oops]", trace['description'])
+
+    def test_nested_array_keys(self):
+        metadata = (b'"timestamp": "21.05.29 14:10:43", "instrument_object": "Exfo", "xincrement": 1e-12,'
+                    b' "xlabel": "Wavelength"')
+        bodies = (b'{"calibration": {"ydata": [9, 9]}, "ydata": [-1.5, -2.5], ' + metadata + b'}',
+                  b'{"ydata": [-1.5, -2.5], "calibration": {"xdata": [9, 9]}, ' + metadata + b'}',
+                  b'{"ydata": [-1.5, -2.5], "note": "\\"xdata\\": [9]", ' + metadata + b'}')
+        for body in bodies:
+            for use_fast_backend in (True, False):
+                trace = decode_trace(body, use_fast_backend=use_fast_backend)
+                np.testing.assert_array_equal([-1.5, -2.5], trace['ydata'])
+                self.assertNotIn('xdata', trace)
+
+    def test_missing_key(self):
+        response = json.loads(load_test_response('small_trace_response.json'))
+        for key in trace_decoder.REQUIRED_TRACE_KEYS:
+            body = json.dumps({k: v for k, v in response.items() if k != key}).encode()
+            with self.assertRaises(InvalidResponse):
+                decode_trace(body)
+
+    def test_invalid_json(self):
+        body = load_test_response('small_trace_response.json')
+        for invalid_body in (b'', b'S8ehEak32JE3', body[:len(body) // 2], body[:-1], b'[1, 2]'):
+            for use_fast_backend in (True, False):
+                with self.assertRaises(InvalidResponse):
+                    decode_trace(invalid_body, use_fast_backend=use_fast_backend)
+
+    def test_invalid_numbers(self):
+        body = (b'{"ydata": [-1.5, "abc", 3], "timestamp": "21.05.29 14:10:43",'
+                b' "instrument_object": "Exfo", "xincrement": 1e-12, "xlabel": "Wavelength"}')
+        for use_fast_backend in (True, False):
+            with self.assertRaises(InvalidResponse):
+                decode_trace(body, use_fast_backend=use_fast_backend)
+
+
+if __name__ == "__main__":
+    unittest.main()
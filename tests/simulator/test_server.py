@@ -0,0 +1,129 @@
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+import unittest
+
+import numpy as np
+import requests
+
+from osa.exceptions.console_error import ConsoleError
+from osa.exceptions.invalid_response import InvalidResponse
+from osa.exceptions.response_timeout import ResponseTimeout
+from osa.services.async_client import AsyncOsaClient, EventLoopThread
+from osa.services.limits_cache import LimitsCache
+from osa.services.osa_session import OsaSession
+from osa.services.request_error_manager import RetryPolicy, request_until_success
+from osa.services.server_requests import get_trace, get_x_lims
+from osa.simulator.server import OsaSimulator
+from osa.simulator.spectrum import SpectrumGenerator
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class OsaSimulatorTests(unittest.TestCase):
+    """ Integration tests of the services against a simulated server """
+
+    def setUp(self):
+        self.simulator = self.start_simulator()
+        self.session = self.create_session(self.simulator)
+
+    def start_simulator(self, **kwargs) -> OsaSimulator:
+        kwargs.setdefault('generator', SpectrumGenerator(points=2000, channels=4, seed=0))
+        simulator = OsaSimulator(port=0, timeout_seconds=1, seed=0, **kwargs).start()
+        self.addCleanup(simulator.stop)
+        return simulator
+
+    def create_session(self, simulator: OsaSimulator) -> OsaSession:
+        session = OsaSession(api_url=simulator.url, timeouts={'TRACE': 0.2, 'LIM': 0.2})
+        self.addCleanup(session.close)
+        return session
+
+    def test_trace(self):
+        trace_data = get_trace(self.session)
+        self.assertEqual(2000, len(trace_data))
+        self.assertAlmostEqual(40 / 1999, trace_data.x_increment)
+        self.assertRegex(trace_data.time, r'^20\d\d-\d\d-\d\dT\d\d:\d\d:\d\dZ$')
+        self.assertEqual('SimulatedOSA', trace_data.instrument)
+        self.assertEqual(0.1, trace_data.resolution_bandwidth_nm)
+        self.assertIsNone(trace_data.x_data)
+        self.assertEqual(1, self.simulator.requests['TRACE'])
+
+    def test_x_data(self):
+        simulator = self.start_simulator(include_x_data=True)
+        trace_data = get_trace(self.create_session(simulator))
+        np.testing.assert_allclose(simulator.generator.x_nm, trace_data.x_data)
+
+    def test_x_lims(self):
+        self.assertEqual([1525, 1565], get_x_lims(self.session))
+
+    def test_trace_faults(self):
+        self.simulator.queue_faults('TRACE', 'malformed', 'missing_key', 'error', 'timeout')
+        for expected in (InvalidResponse, InvalidResponse, InvalidResponse, ResponseTimeout):
+            with self.assertRaises(expected):
+                get_trace(self.session)
+        self.assertEqual(2000, len(get_trace(self.session)))
+        self.assertEqual(1, self.simulator.injected_faults['TRACE', 'timeout'])
+
+    def test_lim_faults(self):
+        self.simulator.queue_faults('LIM', 'malformed', 'missing_key', 'error', 'timeout')
+        for expected in (InvalidResponse, InvalidResponse, ConsoleError, ResponseTimeout):
+            with self.assertRaises(expected):
+                get_x_lims(self.session)
+        self.assertEqual([1525, 1565], get_x_lims(self.session))
+
+    def test_retry_recovers(self):
+        self.simulator.queue_faults('TRACE', 'malformed', 'none', 'error')
+        policy = RetryPolicy(max_attempts=3, base_delay=0)
+        for _ in range(2):
+            self.assertEqual(2000, len(request_until_success(lambda: get_trace(self.session), policy=policy)))
+        self.assertEqual(4, self.simulator.requests['TRACE'])
+
+    def test_fault_rates(self):
+        simulator = self.start_simulator(fault_rates={'malformed': 1})
+        session = self.create_session(simulator)
+        with self.assertRaises(InvalidResponse):
+            request_until_success(lambda: get_trace(session), policy=RetryPolicy(max_attempts=3, base_delay=0))
+        self.assertEqual(3, simulator.injected_faults['TRACE', 'malformed'])
+        with self.assertRaises(ValueError):
+            simulator.set_fault_rate('slow', 0.5)
+
+    def test_queue_fault_over_http(self):
+        base_url = self.simulator.url.replace('/cmd/', '')
+        self.assertEqual(200, requests.get(base_url + '/fault/TRACE/missing_key').status_code)
+        self.assertEqual(400, requests.get(base_url + '/fault/TRACE/slow').status_code)
+        with self.assertRaises(InvalidResponse):
+            get_trace(self.session)
+
+    def test_latency(self):
+        simulator = self.start_simulator(latency=0.1)
+        session = OsaSession(api_url=simulator.url)
+        self.addCleanup(session.close)
+        started_at = time.monotonic()
+        get_x_lims(session)
+        self.assertGreaterEqual(time.monotonic() - started_at, 0.1)
+
+    def test_async_client(self):
+        loop_thread = EventLoopThread()
+        self.addCleanup(loop_thread.stop)
+        client = AsyncOsaClient(self.session)
+        self.addCleanup(client.close)
+        trace_data, x_lims = loop_thread.run(client.acquire(LimitsCache(lambda: get_x_lims(self.session))))
+        self.assertEqual(2000, len(trace_data))
+        self.assertEqual([1525, 1565], x_lims)
+
+    def test_headless_acquisition(self):
+        result = subprocess.run([sys.executable, '-m', 'osa.cli', 'acquire', '--url', self.simulator.url,
+                                 '--rate', '0', '--count', '3', '--analyze'],
+                                cwd=PROJECT_ROOT, capture_output=True, check=True, timeout=60)
+        lines = [json.loads(line) for line in result.stdout.splitlines()]
+        self.assertEqual(3, len(lines))
+        self.assertEqual(1525, lines[0]['x_start'])
+        self.assertEqual(4, len(lines[0]['channels']))
+        self.assertTrue(re.search(rb'Acquired 3 traces', result.stderr))
+
+
+if __name__ == "__main__":
+    unittest.main()
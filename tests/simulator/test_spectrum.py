@@ -0,0 +1,55 @@
+import unittest
+
+import numpy as np
+
+from osa.analysis.channel_analysis import analyze_channels
+from osa.services.server_requests import TraceData
+from osa.simulator.spectrum import SpectrumGenerator
+
+
+def to_trace_data(generator: SpectrumGenerator, y: np.ndarray) -> TraceData:
+    return TraceData(data=y, time='2021-05-29T14:10:43Z', instrument='SimulatedOSA', x_label='Wavelength',
+                     y_label='dBm', x_units='nm', x_increment=generator.x_increment_nm,
+                     x_start=generator.start_nm, resolution_bandwidth_nm=0.1)
+
+
+class SpectrumGeneratorTests(unittest.TestCase):
+    def test_channel_layout(self):
+        generator = SpectrumGenerator(points=20001, channels=8, channel_spacing_nm=0.4, ripple=0)
+        np.testing.assert_allclose(1545 + 0.4 * (np.arange(8) - 3.5), generator.centres_nm)
+
+        channels = analyze_channels(to_trace_data(generator, generator.generate()))
+        np.testing.assert_allclose(generator.centres_nm, channels['wavelength_nm'], atol=1e-3)
+        np.testing.assert_allclose(-10, channels['power_dbm'], atol=0.01)
+        np.testing.assert_allclose(50, channels['osnr_db'], atol=0.01)
+
+    def test_channel_centres_and_powers(self):
+        generator = SpectrumGenerator(points=4001, channels=[1530, 1550], channel_power_dbm=[-5, -20], ripple=0)
+        channels = analyze_channels(to_trace_data(generator, generator.generate()))
+        np.testing.assert_allclose([1530, 1550], channels['wavelength_nm'], atol=1e-2)
+        np.testing.assert_allclose([-5, -20], channels['power_dbm'], atol=0.1)
+
+    def test_sizes(self):
+        for points in (1000, 1_000_000):
+            y = SpectrumGenerator(points=points, seed=0).generate(dtype=np.float32)
+            self.assertEqual((points,), y.shape)
+            self.assertEqual(np.float32, y.dtype)
+            self.assertTrue(np.isfinite(y).all())
+
+    def test_noise(self):
+        generator = SpectrumGenerator(points=1000, channels=0, tilt_db=10, seed=0)
+        first, second = generator.generate(), generator.generate()
+        self.assertFalse(np.array_equal(first, second))
+        np.testing.assert_allclose([-60, -50], [np.median(first[:50]), np.median(first[-50:])], atol=0.5)
+        np.testing.assert_array_equal(first, SpectrumGenerator(points=1000, channels=0, tilt_db=10,
+                                                               seed=0).generate())
+
+    def test_invalid_sweep(self):
+        with self.assertRaises(ValueError):
+            SpectrumGenerator(points=1)
+        with self.assertRaises(ValueError):
+            SpectrumGenerator(start_nm=1565, stop_nm=1525)
+
+
+if __name__ == "__main__":
+    unittest.main()
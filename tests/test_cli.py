@@ -0,0 +1,182 @@
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import unittest
+from unittest.mock import Mock, patch
+
+import numpy as np
+
+from helpers import FakeClock, create_trace_data
+from osa import cli
+from osa.cli import HeadlessAcquisition
+from osa.exceptions.invalid_response import InvalidResponse
+from osa.recording.trace_store import TraceStoreReader
+from osa.services.limits_cache import LimitsCache
+from osa.services.request_error_manager import RetryPolicy
+from osa.services.server_requests import TraceData
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def create_trace_response(dtype=np.float64) -> TraceData:
+    """ Gets a trace as returned by TRACE, whose x_start is only set from the LIM limits """
+    return create_trace_data(x_start=None, dtype=dtype)
+
+
+class FakeStopEvent:
+    """ Advances a fake clock instead of waiting, oversleeping like a real timer """
+
+    def __init__(self, clock: FakeClock, oversleep: float):
+        self.clock = clock
+        self.oversleep = oversleep
+        self.stopped = False
+
+    def is_set(self) -> bool:
+        return self.stopped
+
+    def set(self):
+        self.stopped = True
+
+    def wait(self, timeout: float):
+        self.clock.time += timeout + self.oversleep
+
+
+class HeadlessAcquisitionTests(unittest.TestCase):
+    def create_acquisition(self, fetch_trace=create_trace_response, **kwargs) -> HeadlessAcquisition:
+        return HeadlessAcquisition(fetch_trace=fetch_trace,
+                                   x_lims_cache=LimitsCache(fetch_x_lims=lambda: [1515, 1515.198]),
+                                   retry_policy=RetryPolicy(max_attempts=1), **kwargs)
+
+    def test_count(self):
+        writer = Mock()
+        acquisition = self.create_acquisition(writers=[writer], rate=0, count=3)
+        self.assertEqual(3, acquisition.run())
+        self.assertEqual(3, writer.write.call_count)
+        trace_data, recorded_at, channels = writer.write.call_args.args
+        self.assertEqual(1515, trace_data.x_start)
+        self.assertIsNone(channels)
+
+    def test_analyze(self):
+        writer = Mock()
+        acquisition = self.create_acquisition(writers=[writer], analyze=len, rate=0, count=1)
+        acquisition.run()
+        self.assertEqual(100, writer.write.call_args.args[2])
+
+    def test_failures_do_not_stop_acquisition(self):
+        results = iter([InvalidResponse("Invalid response to TRACE request."), create_trace_response()])
+
+        def fetch_trace():
+            result = next(results)
+            if isinstance(result, Exception):
+                raise result
+            return result
+
+        acquisition = self.create_acquisition(fetch_trace, rate=0, count=1)
+        self.assertEqual(1, acquisition.run())
+        self.assertEqual(1, acquisition.rate_controller.failed_frames)
+
+    def test_rate_does_not_drift(self):
+        clock = FakeClock()
+        frame_starts = []
+
+        def fetch_trace():
+            frame_starts.append(clock.time)
+            clock.time += 0.03
+            return create_trace_response()
+
+        acquisition = self.create_acquisition(fetch_trace, rate=10, count=1000, clock=clock)
+        acquisition.stop_event = FakeStopEvent(clock, oversleep=0.002)
+        acquisition.run()
+        # Each wait oversleeps, but frames stay on the 0.1 s timeline
+        np.testing.assert_allclose(0.1 * np.arange(1000), frame_starts, atol=0.003)
+        self.assertEqual(0, acquisition.rate_controller.skipped_frames)
+
+    def test_slow_frames_are_skipped(self):
+        clock = FakeClock()
+        frame_starts = []
+
+        def fetch_trace():
+            frame_starts.append(clock.time)
+            clock.time += 0.25
+            return create_trace_response()
+
+        acquisition = self.create_acquisition(fetch_trace, rate=10, duration=1, clock=clock)
+        acquisition.stop_event = FakeStopEvent(clock, oversleep=0)
+        acquisition.run()
+        np.testing.assert_allclose([0, 0.25, 0.5, 0.75], frame_starts)
+        self.assertEqual(8, acquisition.rate_controller.skipped_frames)
+
+    def test_stop(self):
+        acquisition = self.create_acquisition(rate=1000)
+        thread = threading.Thread(target=acquisition.run)
+        thread.start()
+        acquisition.stop()
+        thread.join(timeout=10)
+        self.assertFalse(thread.is_alive())
+
+
+class MainTests(unittest.TestCase):
+    def run_main(self, *args) -> bytes:
+        stdout = io.BytesIO()
+        with patch.object(cli, 'get_trace', create_trace_response), \
+                patch.object(cli, 'LimitsCache', lambda: LimitsCache(fetch_x_lims=lambda: [1515, 1515.198])), \
+                patch.object(cli.sys, 'stdout', Mock(buffer=stdout)):
+            self.assertEqual(0, cli.main(['acquire', '--rate', '0', *args]))
+        return stdout.getvalue()
+
+    def test_ndjson(self):
+        lines = self.run_main('--count', '2').splitlines()
+        self.assertEqual(2, len(lines))
+        self.assertEqual(1515, json.loads(lines[0])['x_start'])
+
+    def test_record(self):
+        path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, path)
+        self.assertEqual(b'', self.run_main('--count', '3', '--dtype', 'float32', '--record', path))
+        reader = TraceStoreReader(path)
+        self.assertEqual(3, len(reader))
+        self.assertEqual(np.float32, reader[0].data.dtype)
+
+    def test_metrics(self):
+        metrics = cli.get_metrics()
+        self.addCleanup(metrics.reset)
+        self.addCleanup(metrics.set_enabled, metrics.enabled)
+        path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, path)
+        metrics_path = os.path.join(path, 'metrics.json')
+        self.run_main('--count', '2', '--metrics', metrics_path)
+        with open(metrics_path) as f:
+            snapshot = json.load(f)
+        self.assertEqual(2, snapshot['counters']['frames'])
+        self.assertIn('frame_rate', snapshot['gauges'])
+
+    def test_export(self):
+        path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, path)
+        recording_path = os.path.join(path, 'recording')
+        self.run_main('--count', '3', '--record', recording_path)
+        output_path = os.path.join(path, 'export')
+        self.assertEqual(0, cli.main(['export', recording_path, '--output', output_path,
+                                      '--formats', 'csv', 'npy', '--every', '2']))
+        files = sorted(os.listdir(output_path))
+        self.assertEqual(['ExfoFTB500--2021-05-29T14-10-43Z-1.csv', 'ExfoFTB500--2021-05-29T14-10-43Z-1.npy',
+                          'ExfoFTB500--2021-05-29T14-10-43Z.csv', 'ExfoFTB500--2021-05-29T14-10-43Z.npy'], files)
+
+    def test_export_missing_recording(self):
+        self.assertEqual(1, cli.main(['export', os.path.join(tempfile.gettempdir(), 'missing-recording')]))
+
+    def test_qt_is_not_imported(self):
+        code = ("import sys, osa.cli, osa.analysis.channel_analysis, osa.recording.playback; "
+                "print(sorted(m for m in sys.modules if m.startswith(('PyQt5', 'pyqtgraph'))))")
+        output = subprocess.run([sys.executable, '-c', code], cwd=PROJECT_ROOT, capture_output=True,
+                                text=True, check=True).stdout
+        self.assertEqual('[]', output.strip())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+import unittest
+
+import numpy as np
+
+from osa.utils.downsampling import MinMaxPyramid, visible_range
+
+
+class MinMaxPyramidTests(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.y = rng.normal(-60, 1, 100003)
+        self.y[12345] = -5
+        self.y[54321] = -120
+        self.x = 1500 + 0.001 * np.arange(len(self.y))
+        self.pyramid = MinMaxPyramid(self.y)
+
+    def test_levels(self):
+        block_size, mins, maxs = MinMaxPyramid(self.y, factor=4).levels[0]
+        self.assertEqual(4, block_size)
+        self.assertEqual(25001, len(mins))
+        np.testing.assert_array_equal(self.y[:8].reshape(2, 4).min(axis=1), mins[:2])
+        np.testing.assert_array_equal(self.y[:8].reshape(2, 4).max(axis=1), maxs[:2])
+        self.assertEqual(self.y[-3:].min(), mins[-1])
+
+    def test_small_range_not_downsampled(self):
+        x, y = self.pyramid.decimate(self.x, 100, 600, max_points=1000)
+        self.assertTrue(np.shares_memory(y, self.y))
+        np.testing.assert_array_equal(self.y[100:600], y)
+        np.testing.assert_array_equal(self.x[100:600], x)
+
+    def test_max_points(self):
+        for max_points in (100, 1000, 4000):
+            x, y = self.pyramid.decimate(self.x, 0, len(self.y), max_points=max_points)
+            self.assertLessEqual(len(y), max_points)
+            self.assertEqual(len(x), len(y))
+
+    def test_peaks_preserved(self):
+        x, y = self.pyramid.decimate(self.x, 0, len(self.y), max_points=500)
+        self.assertEqual(-5, y.max())
+        self.assertEqual(-120, y.min())
+        self.assertAlmostEqual(self.x[12345], x[np.argmax(y)], delta=512 * 0.001)
+
+    def test_range(self):
+        x, y = self.pyramid.decimate(self.x, 50000, 60000, max_points=500)
+        self.assertEqual(-120, y.min())
+        self.assertLess(y.max(), -5)
+        self.assertGreaterEqual(x[0], self.x[50000 - 64])
+        self.assertLessEqual(x[-1], self.x[60000 + 64])
+
+    def test_x_ascending(self):
+        x, y = self.pyramid.decimate(self.x, 0, len(self.y), max_points=2000)
+        self.assertTrue(np.all(np.diff(x) >= 0))
+
+
+class VisibleRangeTests(unittest.TestCase):
+    def test_ascending(self):
+        x = np.arange(10.0)
+        self.assertEqual((3, 7), visible_range(x, 2.5, 6.5))
+        self.assertEqual((2, 8), visible_range(x, 2.5, 6.5, margin=1))
+        self.assertEqual((0, 10), visible_range(x, -5, 50, margin=1))
+
+    def test_descending(self):
+        x = np.arange(10.0)[::-1]
+        self.assertEqual((3, 7), visible_range(x, 2.5, 6.5))
+
+    def test_empty(self):
+        self.assertEqual((0, 0), visible_range(np.empty(0), 0, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+import io
+import json
+import logging
+import unittest
+
+from osa.utils.log import configure_logging
+
+
+class ConfigureLoggingTests(unittest.TestCase):
+    def setUp(self):
+        logger = logging.getLogger('osa')
+        handlers, level, propagate = list(logger.handlers), logger.level, logger.propagate
+
+        def restore():
+            for handler in list(logger.handlers):
+                logger.removeHandler(handler)
+            for handler in handlers:
+                logger.addHandler(handler)
+            logger.setLevel(level)
+            logger.propagate = propagate
+        self.addCleanup(restore)
+
+    def test_text(self):
+        stream = io.StringIO()
+        configure_logging('INFO', stream=stream)
+        logger = logging.getLogger('osa.services.test')
+        logger.debug("Hidden")
+        logger.info("Shown %d", 1)
+        lines = stream.getvalue().splitlines()
+        self.assertEqual(1, len(lines))
+        self.assertTrue(lines[0].endswith("INFO    osa.services.test: Shown 1"))
+
+    def test_json(self):
+        stream = io.StringIO()
+        configure_logging('DEBUG', structured=True, stream=stream)
+        logging.getLogger('osa.cli').warning("Acquisition failed: %s", "timeout", extra={'attempt': 3})
+        entry = json.loads(stream.getvalue())
+        self.assertEqual('WARNING', entry['level'])
+        self.assertEqual('osa.cli', entry['logger'])
+        self.assertEqual("Acquisition failed: timeout", entry['message'])
+        self.assertEqual(3, entry['attempt'])
+        self.assertIn('time', entry)
+
+    def test_reconfigure_replaces_handler(self):
+        first, second = io.StringIO(), io.StringIO()
+        configure_logging(stream=first)
+        configure_logging(stream=second)
+        logging.getLogger('osa').info("Once")
+        self.assertEqual('', first.getvalue())
+        self.assertIn("Once", second.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
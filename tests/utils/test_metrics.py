@@ -0,0 +1,120 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import Mock
+
+from osa.exceptions.invalid_response import InvalidResponse
+from osa.services.request_error_manager import RetryPolicy, request_until_success
+from osa.utils import metrics as metrics_module
+from osa.utils.metrics import Metrics, get_metrics
+
+
+class MetricsTests(unittest.TestCase):
+    def test_disabled_records_nothing(self):
+        metrics = Metrics(enabled=False)
+        with metrics.timer('fetch'):
+            pass
+        metrics.increment('retries')
+        metrics.set_gauge('frame_rate', 5)
+        self.assertEqual({'timers': {}, 'counters': {}, 'gauges': {}}, metrics.snapshot())
+        self.assertIs(metrics.timer('fetch'), metrics.timer('parse'))
+
+    def test_timer(self):
+        metrics = Metrics(enabled=True)
+        with metrics.timer('fetch'):
+            pass
+        with self.assertRaises(ValueError):
+            with metrics.timer('fetch'):
+                raise ValueError()
+        timer = metrics.snapshot()['timers']['fetch']
+        self.assertEqual(2, timer['count'])
+        self.assertGreaterEqual(timer['p50'], 0)
+
+    def test_percentiles_over_window(self):
+        metrics = Metrics(enabled=True, window=100)
+        for milliseconds in range(1, 201):
+            metrics.observe('render', milliseconds / 1000)
+        timer = metrics.snapshot()['timers']['render']
+        self.assertEqual(200, timer['count'])
+        # Only the last 100 observations, 101 to 200 ms, are kept
+        self.assertAlmostEqual(0.1505, timer['p50'])
+        self.assertAlmostEqual(0.19505, timer['p95'])
+        self.assertAlmostEqual(0.19901, timer['p99'])
+        self.assertAlmostEqual(0.2, timer['max'])
+
+    def test_counters_and_gauges(self):
+        metrics = Metrics(enabled=True)
+        metrics.increment('retries')
+        metrics.increment('retries', 2)
+        metrics.set_gauge('frame_rate', 9.5)
+        snapshot = metrics.snapshot()
+        self.assertEqual({'retries': 3}, snapshot['counters'])
+        self.assertEqual({'frame_rate': 9.5}, snapshot['gauges'])
+
+        metrics.reset()
+        self.assertEqual({'timers': {}, 'counters': {}, 'gauges': {}}, metrics.snapshot())
+
+    def test_prometheus(self):
+        metrics = Metrics(enabled=True)
+        metrics.observe('fetch', 0.5)
+        metrics.increment('failed-frames')
+        metrics.set_gauge('frame_rate', 2)
+        lines = metrics.to_prometheus().splitlines()
+        self.assertIn('# TYPE osa_fetch_seconds summary', lines)
+        self.assertIn('osa_fetch_seconds{quantile="0.95"} 0.5', lines)
+        self.assertIn('osa_fetch_seconds_count 1', lines)
+        self.assertIn('osa_failed_frames_total 1', lines)
+        self.assertIn('osa_frame_rate 2.0', lines)
+
+    def test_prometheus_non_finite_values(self):
+        metrics = Metrics(enabled=True)
+        metrics.set_gauge('frame_time', float('nan'))
+        metrics.set_gauge('max_power', float('inf'))
+        metrics.set_gauge('min_power', float('-inf'))
+        lines = metrics.to_prometheus().splitlines()
+        self.assertIn('osa_frame_time NaN', lines)
+        self.assertIn('osa_max_power +Inf', lines)
+        self.assertIn('osa_min_power -Inf', lines)
+
+    def test_write(self):
+        path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, path)
+        metrics = Metrics(enabled=True)
+        metrics.increment('retries')
+
+        metrics.write(os.path.join(path, 'metrics.json'))
+        metrics.write(os.path.join(path, 'metrics.prom'))
+        with open(os.path.join(path, 'metrics.json')) as f:
+            self.assertEqual({'retries': 1}, json.load(f)['counters'])
+        with open(os.path.join(path, 'metrics.prom')) as f:
+            self.assertIn('osa_retries_total 1', f.read())
+        self.assertEqual(['metrics.json', 'metrics.prom'], sorted(os.listdir(path)))
+
+    def test_retries_are_counted(self):
+        metrics = Metrics(enabled=True)
+        original_metrics = metrics_module.__metrics__
+        metrics_module.__metrics__ = metrics
+        self.addCleanup(setattr, metrics_module, '__metrics__', original_metrics)
+        self.assertIs(metrics, get_metrics())
+
+        fn = Mock(side_effect=[InvalidResponse("bad"), InvalidResponse("bad"), 'ok'])
+        self.assertEqual('ok', request_until_success(fn, policy=RetryPolicy(sleep=lambda delay: None)))
+        self.assertEqual({'request_errors': 2, 'retries': 2}, metrics.snapshot()['counters'])
+
+        fn = Mock(side_effect=InvalidResponse("bad"))
+        with self.assertRaises(InvalidResponse):
+            request_until_success(fn, max_attempts=2, policy=RetryPolicy(sleep=lambda delay: None))
+        self.assertEqual({'request_errors': 4, 'retries': 3}, metrics.snapshot()['counters'])
+
+        # No retry is counted when the deadline stops retrying
+        clock = Mock(return_value=0)
+        policy = RetryPolicy(base_delay=1, jitter=0, deadline=0.5, clock=clock, sleep=lambda delay: None)
+        with self.assertRaises(InvalidResponse):
+            request_until_success(fn, policy=policy)
+        self.assertEqual({'request_errors': 5, 'retries': 3}, metrics.snapshot()['counters'])
+
+
+if __name__ == "__main__":
+    unittest.main()
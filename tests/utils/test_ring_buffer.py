@@ -0,0 +1,63 @@
+import unittest
+
+import numpy as np
+
+from osa.utils.ring_buffer import RingBuffer2D
+
+
+class RingBuffer2DTests(unittest.TestCase):
+    def test_view_is_ordered(self):
+        ring_buffer = RingBuffer2D(rows=3, columns=2, fill=0)
+        np.testing.assert_array_equal(np.zeros((3, 2)), ring_buffer.view())
+
+        for i in range(1, 6):
+            ring_buffer.append([i, -i])
+            expected = [[max(row, 0), -max(row, 0)] for row in range(i - 2, i + 1)]
+            np.testing.assert_array_equal(expected, ring_buffer.view())
+            np.testing.assert_array_equal([i, -i], ring_buffer.latest())
+        self.assertEqual(3, len(ring_buffer))
+
+    def test_view_is_contiguous_without_copy(self):
+        ring_buffer = RingBuffer2D(rows=4, columns=10)
+        for i in range(6):
+            ring_buffer.append(np.full(10, i))
+            view = ring_buffer.view()
+            self.assertTrue(view.flags.c_contiguous)
+            self.assertTrue(np.shares_memory(view, ring_buffer.buffer))
+
+    def test_append_does_not_reallocate(self):
+        ring_buffer = RingBuffer2D(rows=4, columns=10)
+        buffer = ring_buffer.buffer
+        for i in range(10):
+            ring_buffer.append(np.full(10, i, dtype=np.float64))
+        self.assertIs(buffer, ring_buffer.buffer)
+        self.assertEqual(np.float32, ring_buffer.view().dtype)
+        self.assertEqual(2 * 4 * 10 * 4, ring_buffer.nbytes)
+
+    def test_fill(self):
+        ring_buffer = RingBuffer2D(rows=3, columns=2)
+        ring_buffer.append([1, 2])
+        view = ring_buffer.view()
+        self.assertTrue(np.isnan(view[:2]).all())
+        np.testing.assert_array_equal([1, 2], view[2])
+
+    def test_clear(self):
+        ring_buffer = RingBuffer2D(rows=3, columns=2, fill=0)
+        ring_buffer.append([1, 2])
+        buffer = ring_buffer.buffer
+        ring_buffer.clear()
+        self.assertIs(buffer, ring_buffer.buffer)
+        self.assertEqual(0, len(ring_buffer))
+        np.testing.assert_array_equal(np.zeros((3, 2)), ring_buffer.view())
+
+        ring_buffer.clear(columns=5)
+        self.assertEqual((3, 5), ring_buffer.view().shape)
+
+    def test_wrong_length(self):
+        ring_buffer = RingBuffer2D(rows=3, columns=2)
+        with self.assertRaises(ValueError):
+            ring_buffer.append([1, 2, 3])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,5 +1,7 @@
 import unittest
 
+import numpy as np
+
 from osa.utils.unit_conversions import *
 
 
@@ -20,6 +22,51 @@ class UnitConversionTests(unittest.TestCase):
         wavelength_nm = 1550
         self.assertAlmostEqual(193.414489, wavelength_to_frequency(wavelength_nm))
 
+    def test_frequency_to_wavelength(self):
+        frequency_thz = 193.414489
+        self.assertAlmostEqual(1550, frequency_to_wavelength(frequency_thz), places=5)
+
+    def test_dbm_to_mw(self):
+        self.assertAlmostEqual(1, dbm_to_mw(0))
+        self.assertAlmostEqual(0.001, dbm_to_mw(-30))
+
+    def test_mw_to_dbm(self):
+        self.assertAlmostEqual(10, mw_to_dbm(10))
+        self.assertAlmostEqual(-30, mw_to_dbm(0.001))
+
+
+class ArrayUnitConversionTests(unittest.TestCase):
+    conversions = (m_to_nm, nm_to_m, wavelength_to_frequency, frequency_to_wavelength,
+                   dbm_to_mw, mw_to_dbm)
+
+    def setUp(self):
+        self.values = np.array([1e-9, 0.5, 1.342, 193.4, 1550.0, 2000.0])
+
+    def test_array_matches_scalar(self):
+        for conversion in self.conversions:
+            expected = [conversion(value) for value in self.values]
+            np.testing.assert_allclose(expected, conversion(self.values), rtol=1e-12,
+                                       err_msg=conversion.__name__)
+
+    def test_out_buffer(self):
+        for conversion in self.conversions:
+            out = np.empty_like(self.values)
+            result = conversion(self.values, out=out)
+            self.assertIs(out, result)
+            np.testing.assert_allclose(conversion(self.values), out, rtol=1e-12,
+                                       err_msg=conversion.__name__)
+
+    def test_in_place(self):
+        for conversion in self.conversions:
+            values = self.values.copy()
+            conversion(values, out=values)
+            np.testing.assert_allclose(conversion(self.values), values, rtol=1e-12,
+                                       err_msg=conversion.__name__)
+
+    def test_dbm_round_trip(self):
+        dbm = np.array([-80.0, -59.08, -25.96, 0.0, 10.0])
+        np.testing.assert_allclose(dbm, mw_to_dbm(dbm_to_mw(dbm)), atol=1e-12)
+
 
 if __name__ == "__main__":
     unittest.main()
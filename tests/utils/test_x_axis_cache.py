@@ -0,0 +1,62 @@
+import unittest
+
+import numpy as np
+
+import helpers
+from osa.services.server_requests import TraceData
+from osa.utils.unit_conversions import wavelength_to_frequency
+from osa.utils.x_axis_cache import XAxisCache
+
+
+def create_trace_data(length: int = 5, x_start: float = 1550, x_increment: float = 0.5, **kwargs) -> TraceData:
+    return helpers.create_trace_data(length=length, x_start=x_start, x_increment=x_increment, **kwargs)
+
+
+class XAxisCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.cache = XAxisCache()
+
+    def test_wavelength(self):
+        trace_data = create_trace_data()
+        np.testing.assert_array_equal(trace_data.x, self.cache.get(trace_data))
+
+    def test_frequency(self):
+        trace_data = create_trace_data()
+        np.testing.assert_array_equal(wavelength_to_frequency(trace_data.x),
+                                      self.cache.get(trace_data, frequency=True))
+
+    def test_reused_for_same_sweep(self):
+        wavelength = self.cache.get(create_trace_data())
+        frequency = self.cache.get(create_trace_data(), frequency=True)
+
+        self.assertIs(wavelength, self.cache.get(create_trace_data()))
+        self.assertIs(frequency, self.cache.get(create_trace_data(), frequency=True))
+
+    def test_recomputed_when_sweep_changes(self):
+        x = self.cache.get(create_trace_data())
+        for trace_data in (create_trace_data(length=6), create_trace_data(x_start=1500),
+                           create_trace_data(x_increment=0.25)):
+            new_x = self.cache.get(trace_data)
+            self.assertIsNot(x, new_x)
+            np.testing.assert_array_equal(trace_data.x, new_x)
+            x = new_x
+
+    def test_server_x_data(self):
+        x_data = np.array([1550.0, 1550.1, 1550.3])
+        self.assertIs(x_data, self.cache.get(create_trace_data(length=3, x_data=x_data)))
+
+        frequency = self.cache.get(create_trace_data(length=3, x_data=x_data), frequency=True)
+        # Each response decodes to a new array with the same values
+        same_x_data = x_data.copy()
+        self.assertIs(x_data, self.cache.get(create_trace_data(length=3, x_data=same_x_data)))
+        self.assertIs(frequency, self.cache.get(create_trace_data(length=3, x_data=same_x_data), frequency=True))
+
+    def test_server_x_data_changes(self):
+        x_data = np.array([1550.0, 1550.1, 1550.3])
+        self.cache.get(create_trace_data(length=3, x_data=x_data))
+        other_x_data = np.array([1550.0, 1550.2, 1550.3])
+        self.assertIs(other_x_data, self.cache.get(create_trace_data(length=3, x_data=other_x_data)))
+
+
+if __name__ == "__main__":
+    unittest.main()